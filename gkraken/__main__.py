@@ -31,8 +31,12 @@ from rx.disposable import CompositeDisposable
 
 from gkraken.app import Application
 from gkraken.conf import APP_PACKAGE_NAME
+from gkraken.device.driver_trace import DriverTracing
 from gkraken.di import INJECTOR
-from gkraken.repository.kraken_repository import KrakenRepository
+from gkraken.interactor.session_interactor import SessionInteractor
+from gkraken.repository.diagnostic_sampler import DiagnosticSampler
+from gkraken.repository.device_registry import DeviceRegistry
+from gkraken.repository.hwmon_sensors import HwmonSensors
 from gkraken.util.log import set_log_level
 
 WHERE_AM_I = abspath(dirname(__file__))
@@ -62,8 +66,16 @@ def _cleanup() -> None:
     composite_disposable.dispose()
     database = INJECTOR.get(SqliteDatabase)
     database.close()
-    kraken_repository = INJECTOR.get(KrakenRepository)
-    kraken_repository.cleanup()
+    session_interactor = INJECTOR.get(SessionInteractor)
+    session_interactor.stop()
+    diagnostic_sampler = INJECTOR.get(DiagnosticSampler)
+    diagnostic_sampler.stop()
+    device_registry = INJECTOR.get(DeviceRegistry)
+    device_registry.shutdown()
+    hwmon_sensors = INJECTOR.get(HwmonSensors)
+    hwmon_sensors.close()
+    driver_tracing = INJECTOR.get(DriverTracing)
+    driver_tracing.stop()
     # futures.thread._threads_queues.clear()
 
 
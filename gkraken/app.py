@@ -16,15 +16,18 @@
 #  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
 
 import logging
+import shlex
+import signal
 from enum import Enum
 from gettext import gettext as _
-from typing import Any, Optional, List
+from typing import Any, Dict, Optional, List
 
 from gi.repository import Gtk, Gio, GLib
 from injector import inject
 from peewee import SqliteDatabase
 
 from gkraken.conf import APP_NAME, APP_ID, APP_VERSION
+from gkraken.device.driver_trace import DriverTracing
 from gkraken.di import MainBuilder
 from gkraken.interactor.udev_interactor import UdevInteractor
 from gkraken.model import load_db_default_data
@@ -33,12 +36,17 @@ from gkraken.model.current_lighting_profile import CurrentLightingProfile
 from gkraken.model.speed_profile import SpeedProfile
 from gkraken.model.speed_step import SpeedStep
 from gkraken.model.current_speed_profile import CurrentSpeedProfile
+from gkraken.model.db_migration import migrate_db
 from gkraken.model.setting import Setting
 from gkraken.presenter.main_presenter import MainPresenter
+from gkraken.repository.diagnostic_sampler import DiagnosticSampler, DEFAULT_SAMPLING_RATE, MIN_SAMPLING_RATE, \
+    MAX_SAMPLING_RATE, SAMPLING_TIME_LIMIT
+from gkraken.repository.helper_client import HelperClient
 from gkraken.util.deployment import is_flatpak
 from gkraken.util.desktop_entry import set_autostart_entry
 from gkraken.util.log import LOG_DEBUG_FORMAT
 from gkraken.util.view import build_glib_option
+from gkraken.util.wakeup_stats import WakeupStats, REPORT_PERIOD
 from gkraken.view.main_view import MainView
 
 _LOG = logging.getLogger(__name__)
@@ -52,6 +60,10 @@ class Application(Gtk.Application):
                  presenter: MainPresenter,
                  builder: MainBuilder,
                  udev_interactor: UdevInteractor,
+                 driver_tracing: DriverTracing,
+                 helper_client: HelperClient,
+                 wakeup_stats: WakeupStats,
+                 diagnostic_sampler: DiagnosticSampler,
                  *args: Any,
                  **kwargs: Any) -> None:
         _LOG.debug("init Application")
@@ -61,6 +73,7 @@ class Application(Gtk.Application):
                          **kwargs)
 
         database.connect()
+        migrate_db(database)
         database.create_tables([
             SpeedProfile, SpeedStep, CurrentSpeedProfile, Setting, CurrentLightingProfile, CurrentLightingColor
         ])
@@ -75,6 +88,10 @@ class Application(Gtk.Application):
         self._window: Optional[Gtk.ApplicationWindow] = None
         self._builder: Gtk.Builder = builder
         self._udev_interactor = udev_interactor
+        self._driver_tracing = driver_tracing
+        self._helper_client = helper_client
+        self._wakeup_stats = wakeup_stats
+        self._diagnostic_sampler = diagnostic_sampler
         self._start_hidden: bool = False
 
     def do_activate(self) -> None:
@@ -111,6 +128,8 @@ class Application(Gtk.Application):
                 handler.formatter = logging.Formatter(LOG_DEBUG_FORMAT)
             _LOG.debug("Option %s selected", _Options.DEBUG.value)
 
+        self._handle_debug_stats_options(options)
+
         if _Options.HIDE_WINDOW.value in options:
             _LOG.debug("Option %s selected", _Options.HIDE_WINDOW.value)
             self._start_hidden = True
@@ -135,11 +154,47 @@ class Application(Gtk.Application):
             exit_value += self._udev_interactor.remove_udev_rule()
             start_app = False
 
+        self._handle_trace_options(options)
+
+        self._handle_helper_options(options)
+
         if start_app:
+            self._handle_diagnostic_sampling_options(options)
             _LOG.info("Starting %s %s", APP_NAME, APP_VERSION)
             self.activate()
         return exit_value
 
+    def _handle_debug_stats_options(self, options: Dict[str, Any]) -> None:
+        if _Options.DEBUG_STATS.value in options:
+            _LOG.debug("Option %s selected", _Options.DEBUG_STATS.value)
+            self._wakeup_stats.enable()
+            GLib.timeout_add_seconds(REPORT_PERIOD, self._wakeup_stats.log_report)
+
+    def _handle_trace_options(self, options: Dict[str, Any]) -> None:
+        if _Options.REPLAY_TRACE.value in options:
+            _LOG.debug("Option %s selected", _Options.REPLAY_TRACE.value)
+            self._driver_tracing.start_replay(options[_Options.REPLAY_TRACE.value],
+                                              options.get(_Options.REPLAY_TIME_SCALE.value, 1.0))
+        elif _Options.RECORD_TRACE.value in options:
+            _LOG.debug("Option %s selected", _Options.RECORD_TRACE.value)
+            self._driver_tracing.start_recording(options[_Options.RECORD_TRACE.value])
+
+    def _handle_helper_options(self, options: Dict[str, Any]) -> None:
+        if _Options.USE_HELPER.value in options:
+            _LOG.debug("Option %s selected", _Options.USE_HELPER.value)
+            self._helper_client.enable(shlex.split(options.get(_Options.HELPER_LAUNCHER.value, '')))
+
+    def _handle_diagnostic_sampling_options(self, options: Dict[str, Any]) -> None:
+        if _Options.DIAGNOSTIC_SAMPLING.value in options:
+            _LOG.debug("Option %s selected", _Options.DIAGNOSTIC_SAMPLING.value)
+            self._diagnostic_sampler.start(options[_Options.DIAGNOSTIC_SAMPLING.value],
+                                           options.get(_Options.DIAGNOSTIC_SAMPLING_RATE.value, DEFAULT_SAMPLING_RATE))
+            GLib.unix_signal_add(GLib.PRIORITY_DEFAULT, signal.SIGUSR1, self._dump_diagnostic_samples)
+
+    def _dump_diagnostic_samples(self) -> bool:
+        self._diagnostic_sampler.dump()
+        return True
+
     @staticmethod
     def _get_main_option_entries() -> List[GLib.OptionEntry]:
         options = [
@@ -148,12 +203,45 @@ class Application(Gtk.Application):
                               description="Show the App version"),
             build_glib_option(_Options.DEBUG.value,
                               description="Show debug messages"),
+            build_glib_option(_Options.DEBUG_STATS.value,
+                              description="Log the wakeups per minute caused by the App, every minute"),
             build_glib_option(_Options.HIDE_WINDOW.value,
                               description="Start with the main window hidden"),
             build_glib_option(_Options.ADD_UDEV_RULE.value,
                               description="Add udev rule to allow execution without root permission"),
             build_glib_option(_Options.REMOVE_UDEV_RULE.value,
                               description="Remove udev rule that allow execution without root permission"),
+            build_glib_option(_Options.RECORD_TRACE.value,
+                              arg=GLib.OptionArg.STRING,
+                              description="Record all the calls made to the devices to a trace file",
+                              arg_description="FILE"),
+            build_glib_option(_Options.REPLAY_TRACE.value,
+                              arg=GLib.OptionArg.STRING,
+                              description="Use the devices recorded in a trace file instead of the real ones",
+                              arg_description="FILE"),
+            build_glib_option(_Options.REPLAY_TIME_SCALE.value,
+                              arg=GLib.OptionArg.DOUBLE,
+                              description="Multiplier of the recorded latencies when replaying a trace "
+                                          "(default 1, 0 to replay without waiting)",
+                              arg_description="SCALE"),
+            build_glib_option(_Options.DIAGNOSTIC_SAMPLING.value,
+                              arg=GLib.OptionArg.STRING,
+                              description=f"Sample the devices at a high rate for at most {SAMPLING_TIME_LIMIT // 60} "
+                                          "minutes and dump the samples, and their decimated view, to CSV files "
+                                          "when done, or on SIGUSR1",
+                              arg_description="FILE"),
+            build_glib_option(_Options.DIAGNOSTIC_SAMPLING_RATE.value,
+                              arg=GLib.OptionArg.DOUBLE,
+                              description="Samples per second taken by the diagnostic sampling "
+                                          f"({MIN_SAMPLING_RATE:g} to {MAX_SAMPLING_RATE:g}, "
+                                          f"default {DEFAULT_SAMPLING_RATE:g})",
+                              arg_description="RATE"),
+            build_glib_option(_Options.USE_HELPER.value,
+                              description="Access the devices from a separate helper process"),
+            build_glib_option(_Options.HELPER_LAUNCHER.value,
+                              arg=GLib.OptionArg.STRING,
+                              description="Command used to start the helper process with, e.g. pkexec",
+                              arg_description="COMMAND"),
         ]
         if not is_flatpak():
             options.append(build_glib_option(_Options.AUTOSTART_ON.value,
@@ -171,3 +259,11 @@ class _Options(Enum):
     AUTOSTART_OFF = 'autostart-off'
     ADD_UDEV_RULE = 'add-udev-rule'
     REMOVE_UDEV_RULE = 'remove-udev-rule'
+    RECORD_TRACE = 'record-trace'
+    REPLAY_TRACE = 'replay-trace'
+    REPLAY_TIME_SCALE = 'replay-time-scale'
+    USE_HELPER = 'use-helper'
+    HELPER_LAUNCHER = 'helper-launcher'
+    DEBUG_STATS = 'debug-stats'
+    DIAGNOSTIC_SAMPLING = 'diagnostic-sampling'
+    DIAGNOSTIC_SAMPLING_RATE = 'diagnostic-sampling-rate'
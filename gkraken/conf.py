@@ -40,12 +40,23 @@ FAN_MIN_DUTY = 25
 PUMP_MIN_DUTY = 30
 MAX_DUTY = 100
 
+# hard bounds of the status refresh interval, in seconds
+MIN_REFRESH_INTERVAL = 1
+MAX_REFRESH_INTERVAL = 3600
+
+# device id of the speed profiles shared by all the devices, and of the settings saved before multi-device support
+SHARED_DEVICE_ID = ''
+
+# temperature source of the speed profiles following the liquid temperature, the only one known to the devices
+LIQUID_TEMPERATURE_SOURCE = 'liquid'
+
 SETTINGS_DEFAULTS: Dict[str, Any] = {
     'settings_launch_on_login': False,
     'settings_load_last_profile': True,
     'settings_check_new_version': False,
     'settings_minimize_to_tray': True,
     'settings_refresh_interval': 3,
+    'settings_max_refresh_interval': 30,
     'settings_show_app_indicator': True,
     'settings_app_indicator_show_water_temp': True,
 }
@@ -0,0 +1,92 @@
+#  This file is part of gkraken.
+#
+#  Copyright (c) 2021 Roberto Leinardi and Guy Boldon
+#
+#  gkraken is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  gkraken is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
+"""The object graph shared by the GUI and the helper process. It doesn't depend on Gtk, so that the helper
+process, possibly privileged, never loads it: the GUI only objects are provided by gkraken.di"""
+
+import logging
+from typing import NewType
+
+from injector import Module, provider, singleton, Injector
+from peewee import SqliteDatabase
+from rx.disposable import CompositeDisposable
+from rx.subject import Subject
+
+from gkraken.conf import APP_DB_NAME
+from gkraken.util.path import get_config_path
+
+_LOG = logging.getLogger(__name__)
+
+SpeedProfileChangedSubject = NewType("SpeedProfileChangedSubject", Subject)  # type: ignore[valid-newtype]
+SpeedStepChangedSubject = NewType("SpeedStepChangedSubject", Subject)  # type: ignore[valid-newtype]
+ConnectionStateChangedSubject = NewType("ConnectionStateChangedSubject", Subject)  # type: ignore[valid-newtype]
+SessionStateChangedSubject = NewType("SessionStateChangedSubject", Subject)  # type: ignore[valid-newtype]
+SettingChangedSubject = NewType("SettingChangedSubject", Subject)  # type: ignore[valid-newtype]
+StatusReceivedSubject = NewType("StatusReceivedSubject", Subject)  # type: ignore[valid-newtype]
+DeviceAddedSubject = NewType("DeviceAddedSubject", Subject)  # type: ignore[valid-newtype]
+
+
+# pylint: disable=no-self-use
+class CoreModule(Module):
+    @singleton
+    @provider
+    def provide_thread_pool_scheduler(self) -> CompositeDisposable:
+        _LOG.debug("provide CompositeDisposable")
+        return CompositeDisposable()
+
+    @singleton
+    @provider
+    def provide_database(self) -> SqliteDatabase:
+        _LOG.debug("provide CompositeDisposable")
+        return SqliteDatabase(get_config_path(APP_DB_NAME))
+
+    @singleton
+    @provider
+    def provide_speed_profile_changed_subject(self) -> SpeedProfileChangedSubject:
+        return SpeedProfileChangedSubject(Subject())
+
+    @singleton
+    @provider
+    def provide_setting_changed_subject(self) -> SettingChangedSubject:
+        return SettingChangedSubject(Subject())
+
+    @singleton
+    @provider
+    def provide_session_state_changed_subject(self) -> SessionStateChangedSubject:
+        return SessionStateChangedSubject(Subject())
+
+    @singleton
+    @provider
+    def provide_speed_step_changed_subject(self) -> SpeedStepChangedSubject:
+        return SpeedStepChangedSubject(Subject())
+
+    @singleton
+    @provider
+    def provide_connection_state_changed_subject(self) -> ConnectionStateChangedSubject:
+        return ConnectionStateChangedSubject(Subject())
+
+    @singleton
+    @provider
+    def provide_status_received_subject(self) -> StatusReceivedSubject:
+        return StatusReceivedSubject(Subject())
+
+    @singleton
+    @provider
+    def provide_device_added_subject(self) -> DeviceAddedSubject:
+        return DeviceAddedSubject(Subject())
+
+
+INJECTOR = Injector(CoreModule)
@@ -0,0 +1,42 @@
+#  This file is part of gkraken.
+#
+#  Copyright (c) 2021 Roberto Leinardi and Guy Boldon
+#
+#  gkraken is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  gkraken is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
+
+from dataclasses import dataclass
+from typing import Optional, Type
+
+from liquidctl.driver.base import BaseDriver
+
+from gkraken.device.device_settings import DeviceSettings, StatusDecoder, StatusReportParser
+
+
+@dataclass(frozen=True)
+class DeviceBinding:
+    """Binds a loaded driver instance to its DeviceSettings and to the status decoder (and, if the device sends
+    status reports by itself, the status report parser) prebuilt for it"""
+    driver: BaseDriver
+    settings: Type[DeviceSettings]
+    decode_status: StatusDecoder
+    parse_status_report: Optional[StatusReportParser] = None
+
+    @classmethod
+    def bind(cls, driver: BaseDriver, init_firmware: Optional[str], device_id: str = '') -> Optional['DeviceBinding']:
+        settings = DeviceSettings.for_driver(driver)
+        if settings is None:
+            return None
+        return cls(driver, settings,
+                   settings.create_status_decoder(driver.description, init_firmware, device_id),
+                   settings.create_status_report_parser(driver.description, init_firmware, device_id))
@@ -0,0 +1,153 @@
+#  This file is part of gkraken.
+#
+#  Copyright (c) 2021 Roberto Leinardi and Guy Boldon
+#
+#  gkraken is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  gkraken is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
+
+import logging
+import os
+import re
+import threading
+from itertools import chain
+from typing import Optional, List, Dict, Tuple, Type, Any, Iterable
+
+from injector import singleton, inject
+from liquidctl.driver.base import BaseDriver
+from liquidctl.driver.usb import HidapiDevice, PyUsbDevice, UsbHidDriver, hid as hidapi
+
+from gkraken.device.device_settings import DeviceSettings
+from gkraken.device.driver_trace import DriverTracing
+from gkraken.util.concurrency import synchronized_with_attr
+
+_LOG = logging.getLogger(__name__)
+
+DeviceTable = Dict[Tuple[int, int], List[Type[DeviceSettings]]]
+# the name of a USB device in sysfs: bus number and port numbers from the root hub, e.g. 1-2.1
+_USB_PORT_PATH = re.compile(r'\d+-\d+(\.\d+)*')
+
+
+@singleton
+class DeviceDiscovery:
+    """Finds all the supported devices with a single enumeration pass per bus (HID and USB).
+
+    The enumerated handles are matched against a VID/PID table built from all the DeviceSettings subclasses,
+    instead of letting every supported_driver enumerate the buses on its own.
+    The result is cached until invalidate() is called (e.g. on hotplug or when the cached handle can't be opened).
+    Every device found is identified by a device id: its serial number or, if the device doesn't report one
+    (or it is not unique), its VID/PID and the USB port it is plugged in: unlike the bus address, the port doesn't
+    change when the device is plugged in again.
+    When replaying a trace the devices found are the ones recorded in the trace, the buses are not enumerated.
+    """
+
+    @inject
+    def __init__(self, driver_tracing: DriverTracing) -> None:
+        self.lock = threading.RLock()
+        self._driver_tracing = driver_tracing
+        self._devices: Optional[Dict[str, BaseDriver]] = None
+
+    def find_drivers(self) -> List[BaseDriver]:
+        return list(self.find_devices().values())
+
+    @synchronized_with_attr("lock")
+    def find_devices(self) -> Dict[str, BaseDriver]:
+        """the drivers of the supported devices found, by device id, in discovery order"""
+        if self._devices is None:
+            if self._driver_tracing.is_replaying:
+                devices: Dict[str, BaseDriver] = dict(self._driver_tracing.load_replay_drivers())
+            else:
+                drivers = self._discover()
+                _LOG.debug("recognized device driver list: %s", [driver.description for driver in drivers])
+                devices = self._assign_device_ids(drivers)
+            if not devices:
+                # don't cache an empty result, the device could be plugged in at any time
+                return {}
+            self._driver_tracing.trace(devices)
+            self._devices = devices
+        return self._devices
+
+    def find_driver(self, device_id: str) -> Optional[BaseDriver]:
+        return self.find_devices().get(device_id)
+
+    @synchronized_with_attr("lock")
+    def invalidate(self) -> None:
+        _LOG.debug("DeviceDiscovery invalidate")
+        self._devices = None
+
+    @staticmethod
+    def _assign_device_ids(drivers: List[BaseDriver]) -> Dict[str, BaseDriver]:
+        serial_numbers = [DeviceDiscovery._get_serial_number(driver) for driver in drivers]
+        devices: Dict[str, BaseDriver] = {}
+        for driver, serial_number in zip(drivers, serial_numbers):
+            if serial_number and serial_numbers.count(serial_number) == 1:
+                devices[serial_number] = driver
+            else:
+                devices[f'{driver.vendor_id:04x}:{driver.product_id:04x}@{get_port_path(driver)}'] = driver
+        return devices
+
+    @staticmethod
+    def _get_serial_number(driver: BaseDriver) -> Optional[str]:
+        try:
+            serial_number = driver.serial_number
+        except (OSError, ValueError):
+            # the USB serial number descriptor could be unreadable, e.g. without permissions
+            return None
+        return str(serial_number) if serial_number else None
+
+    def _discover(self) -> List[BaseDriver]:
+        hid_table, usb_table = self._build_device_tables()
+        found: Dict[Type[DeviceSettings], List[BaseDriver]] = {
+            device_setting: [] for device_setting in DeviceSettings.__subclasses__()
+        }
+        if hid_table:
+            self._match_handles(HidapiDevice.enumerate(hidapi), hid_table, found)
+        if usb_table:
+            self._match_handles(PyUsbDevice.enumerate(), usb_table, found)
+        # keep the DeviceSettings subclasses order, like the per driver lookup used to do
+        return list(chain.from_iterable(found.values()))
+
+    @staticmethod
+    def _build_device_tables() -> Tuple[DeviceTable, DeviceTable]:
+        """builds the VID/PID -> DeviceSettings tables for the HID and the USB bus"""
+        hid_table: DeviceTable = {}
+        usb_table: DeviceTable = {}
+        for device_setting in DeviceSettings.__subclasses__():
+            table = hid_table if issubclass(device_setting.supported_driver, UsbHidDriver) else usb_table
+            for vid, pid, _, _, _ in device_setting.supported_driver.SUPPORTED_DEVICES:
+                table.setdefault((vid, pid), []).append(device_setting)
+        return hid_table, usb_table
+
+    @staticmethod
+    def _match_handles(handles: Iterable[Any],
+                       table: DeviceTable,
+                       found: Dict[Type[DeviceSettings], List[BaseDriver]]) -> None:
+        for handle in handles:
+            for device_setting in table.get((handle.vendor_id, handle.product_id), []):
+                found[device_setting].extend(device_setting.probe(handle))
+
+
+def get_port_path(driver: BaseDriver) -> str:
+    """the USB port path of the device, as named in sysfs (e.g. 1-2.1), or its address if the path is unknown"""
+    port = getattr(driver, 'port', None)
+    bus = str(driver.bus)
+    if port and bus.startswith('usb'):
+        return f"{bus[len('usb'):]}-{'.'.join(str(number) for number in port)}"
+    address = str(driver.address)
+    if address.startswith('/dev/hidraw'):
+        # hidapi doesn't report the port of hidraw devices: the hidraw node in sysfs is below the USB device one,
+        # e.g. /sys/devices/pci0000:00/0000:00:14.0/usb1/1-2/1-2:1.0/0003:1E71:2007.0001/hidraw/hidraw0
+        sysfs_path = os.path.realpath(f'/sys/class/hidraw/{os.path.basename(address)}')
+        for name in reversed(sysfs_path.split('/')):
+            if _USB_PORT_PATH.fullmatch(name):
+                return name
+    return address
@@ -15,8 +15,10 @@
 #  You should have received a copy of the GNU General Public License
 #  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
 
+import logging
+from dataclasses import dataclass
 from enum import auto, unique, Enum
-from typing import Optional, List, Dict, Tuple, Union
+from typing import Optional, List, Dict, Tuple, Union, Any, Callable, Type
 
 from liquidctl.driver.base import BaseDriver
 
@@ -24,6 +26,8 @@ from gkraken.model.lighting_modes import LightingMode
 from gkraken.model.lighting_modes import LightingModes
 from gkraken.model.status import Status
 
+_LOG = logging.getLogger(__name__)
+
 
 @unique
 class StatusIndexType(Enum):
@@ -35,6 +39,56 @@ class StatusIndexType(Enum):
     FAN_DUTY = auto()
 
 
+# the liquidctl status keys (lower case) of the values gkraken uses
+_STATUS_KEYS: Dict[str, StatusIndexType] = {
+    'liquid temperature': StatusIndexType.LIQUID_TEMPERATURE,
+    'firmware version': StatusIndexType.FIRMWARE_VERSION,
+    'pump speed': StatusIndexType.PUMP_RPM,
+    'pump duty': StatusIndexType.PUMP_DUTY,
+    'fan speed': StatusIndexType.FAN_RPM,
+    'fan duty': StatusIndexType.FAN_DUTY,
+}
+
+_STATUS_FIELDS: Dict[StatusIndexType, str] = {
+    StatusIndexType.LIQUID_TEMPERATURE: 'liquid_temperature',
+    StatusIndexType.PUMP_RPM: 'pump_rpm',
+    StatusIndexType.PUMP_DUTY: 'pump_duty',
+    StatusIndexType.FAN_RPM: 'fan_rpm',
+    StatusIndexType.FAN_DUTY: 'fan_duty',
+}
+
+StatusDecoder = Callable[[List[Tuple]], Optional[Status]]
+StatusReportParser = Callable[[bytes], Optional[Status]]
+
+
+@dataclass(frozen=True)
+class StatusLayout:
+    """The positions of the values in the statuses returned by a driver, found from their liquidctl keys"""
+    length: int
+    fields: Tuple[Tuple[str, int], ...]  # (Status field name, index)
+    liquid_temperature_index: Optional[int]
+    firmware_index: Optional[int]
+
+    @classmethod
+    def introspect(cls, driver_status: List[Tuple]) -> 'StatusLayout':
+        indexes: Dict[StatusIndexType, int] = {}
+        for index, (key, _, _) in enumerate(driver_status):
+            index_type = _STATUS_KEYS.get(str(key).strip().lower())
+            if index_type is not None:
+                indexes.setdefault(index_type, index)
+        return cls(length=len(driver_status),
+                   fields=tuple((field_name, indexes[index_type]) for index_type, field_name in _STATUS_FIELDS.items()
+                                if index_type in indexes and index_type is not StatusIndexType.LIQUID_TEMPERATURE),
+                   liquid_temperature_index=indexes.get(StatusIndexType.LIQUID_TEMPERATURE),
+                   firmware_index=indexes.get(StatusIndexType.FIRMWARE_VERSION))
+
+    def index_of(self, field_name: str) -> Optional[int]:
+        """the position of the value of the given Status field, None if the driver doesn't report it"""
+        if field_name == 'liquid_temperature':
+            return self.liquid_temperature_index
+        return next((index for name, index in self.fields if name == field_name), None)
+
+
 class DeviceSettings:
     """This is the base Device Settings class.
     To support a new device simply extend this class and override it's methods and attributes.
@@ -45,8 +99,11 @@ class DeviceSettings:
     supported_driver : BaseDriver
         The supported liquidctl driver class
 
-    _status_index : Dict[StatusIndexType, int]
-        The index values for the various values reported from the liquidctl status list
+    supports_speed_profiles : bool
+        False if the device supports only fixed speeds: its speed profiles are driven by a software curve
+
+    _probe_kwargs : Dict[str, Any]
+        Extra arguments passed to the supported_driver probe() when matching a device handle
 
     _modes_logo : List[LightingMode]
         A List of LightingMode(s) for the 'logo' channel which are supported
@@ -57,17 +114,104 @@ class DeviceSettings:
 
     supported_driver: BaseDriver = None
 
-    _status_index: Dict[StatusIndexType, int] = {}
+    supports_speed_profiles: bool = True
+
+    _probe_kwargs: Dict[str, Any] = {}
+
+    # the status layouts found so far, by driver class and firmware version, shared by all the subclasses
+    _status_layouts: Dict[Tuple[Any, Optional[str]], StatusLayout] = {}
 
     _modes_logo: List[LightingMode] = []
     _modes_ring: List[LightingMode] = []
 
     @classmethod
-    def determine_status(
-            cls, status_list: list, device_description: str, init_firmware: Optional[str]
-    ) -> Optional[Status]:
-        """creates a Status object from the given liquidctl status_list"""
-        raise NotImplementedError('This should be implemented in one of the child classes')
+    def create_status_decoder(cls, device_description: str, init_firmware: Optional[str],
+                              device_id: str = '') -> StatusDecoder:
+        """creates the function that turns a liquidctl status into a Status object.
+        The positions of the values are found from the liquidctl keys of the first status decoded (see StatusLayout)
+        and cached per driver class and firmware version. The decoder is then compiled for that layout:
+        decoding a status is a direct call with no key lookups. A status with a different number of values
+        (e.g. a value missing from a driver update) is introspected again"""
+        driver_type = cls.supported_driver
+        is_valid_status = cls._is_valid_status
+        layout_key = (driver_type, init_firmware)
+        compiled_decoder: Optional[StatusDecoder] = None
+
+        def compile_decoder(layout: StatusLayout) -> StatusDecoder:
+            length = layout.length
+            fields = layout.fields
+            liquid_temperature_index = layout.liquid_temperature_index
+            firmware_index = layout.firmware_index if init_firmware is None else None
+            default_firmware_version = init_firmware if init_firmware is not None else ''
+
+            def decode_with_layout(driver_status: List[Tuple]) -> Optional[Status]:
+                if len(driver_status) != length:
+                    return introspect_and_decode(driver_status)
+                if liquid_temperature_index is None:
+                    return None
+                status = Status(driver_type,
+                                driver_status[liquid_temperature_index][1],
+                                firmware_version=default_firmware_version if firmware_index is None
+                                else str(driver_status[firmware_index][1]),
+                                device_description=device_description,
+                                device_id=device_id,
+                                **{field_name: driver_status[index][1] for field_name, index in fields})
+                return status if is_valid_status(status) else None
+
+            return decode_with_layout
+
+        def introspect_and_decode(driver_status: List[Tuple]) -> Optional[Status]:
+            nonlocal compiled_decoder
+            layout = StatusLayout.introspect(driver_status)
+            if layout.liquid_temperature_index is None:
+                _LOG.error("No liquid temperature in the %s status: %s", driver_type.__name__,
+                           [key for key, _, _ in driver_status])
+            cls._status_layouts[layout_key] = layout
+            compiled_decoder = compile_decoder(layout)
+            return compiled_decoder(driver_status)
+
+        cached_layout = cls._status_layouts.get(layout_key)
+        if cached_layout is not None:
+            compiled_decoder = compile_decoder(cached_layout)
+
+        def decode_status(driver_status: List[Tuple]) -> Optional[Status]:
+            if compiled_decoder is None:
+                return introspect_and_decode(driver_status)
+            return compiled_decoder(driver_status)
+
+        return decode_status
+
+    @classmethod
+    def get_status_layout(cls, init_firmware: Optional[str]) -> Optional[StatusLayout]:
+        """the layout of the statuses of the driver, once found by decoding one of them"""
+        return cls._status_layouts.get((cls.supported_driver, init_firmware))
+
+    @classmethod
+    def create_status_report_parser(cls, device_description: str,
+                                    init_firmware: Optional[str],
+                                    device_id: str = '') -> Optional[StatusReportParser]:
+        """creates the function that decodes the raw status reports that the device sends by itself on its
+        interrupt endpoint. Returns None if the device reports its status only when asked (the default)"""
+        # pylint: disable=unused-argument
+        return None
+
+    @staticmethod
+    def _is_valid_status(status: Status) -> bool:  # pylint: disable=unused-argument
+        """checks the decoded values, invalid statuses are discarded"""
+        return True
+
+    @classmethod
+    def for_driver(cls, driver: BaseDriver) -> Optional[Type['DeviceSettings']]:
+        """finds the DeviceSettings subclass supporting the given driver instance.
+        A driver standing in for another driver class (e.g. a ReplayDriver) gets the settings of that class"""
+        settings_index = {device_setting.supported_driver: device_setting for device_setting in cls.__subclasses__()}
+        return settings_index.get(getattr(driver, 'stand_in_for', driver.__class__))
+
+    @classmethod
+    def probe(cls, handle: Any) -> List[BaseDriver]:
+        """instantiates the supported_driver for the given device handle, if the handle is compatible"""
+        return [driver for driver in cls.supported_driver.probe(handle, **cls._probe_kwargs)
+                if type(driver) is cls.supported_driver]  # pylint: disable=unidiomatic-typecheck
 
     @classmethod
     def get_compatible_lighting_modes(cls) -> LightingModes:
@@ -78,16 +222,6 @@ class DeviceSettings:
             modes_ring={mode.mode_id: mode for mode in cls._modes_ring},
         )
 
-    @classmethod
-    def _safely_determine_firmware(cls, status_list: list, init_firmware: Optional[str]) -> str:
-        """use the init firmware version or the version from status, depending on circumstances"""
-        if init_firmware is not None:
-            return init_firmware
-        firmware_index = cls._status_index.get(StatusIndexType.FIRMWARE_VERSION)
-        if firmware_index is not None and len(status_list) > firmware_index:
-            return str(status_list[firmware_index])
-        return ''
-
     @staticmethod
     def find_firmware(init_status: List[Tuple]) -> Optional[str]:
         status_dict = DeviceSettings._convert_status_to_dict(init_status)
@@ -0,0 +1,308 @@
+#  This file is part of gkraken.
+#
+#  Copyright (c) 2021 Roberto Leinardi and Guy Boldon
+#
+#  gkraken is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  gkraken is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
+
+import builtins
+import functools
+import gzip
+import importlib
+import json
+import logging
+import threading
+import time
+from collections import deque
+from typing import Optional, Dict, Any, List, Tuple, Deque, Callable, Type, IO
+
+from injector import singleton, inject
+from liquidctl.driver.base import BaseDriver
+
+from gkraken.util.concurrency import synchronized_with_attr
+
+_LOG = logging.getLogger(__name__)
+
+TRACED_METHODS = ('connect', 'initialize', 'disconnect', 'get_status', 'set_speed_profile', 'set_fixed_speed',
+                  'set_color')
+
+_DEVICE_RECORD = 'device'
+_CALL_RECORD = 'call'
+
+
+class TraceRecorder:
+    """Writes every call made to the recorded drivers (method, arguments, result or error, latency) to a trace file.
+    The trace is a gzip compressed file with one JSON record per line: a device record, describing the driver,
+    precedes the calls made to that device.
+    The status reports that some devices send by themselves are not driver calls: the status reports listener is
+    not started while recording, so that every status is a recorded get_status call"""
+
+    def __init__(self, path: str) -> None:
+        self.lock = threading.Lock()
+        self._file: IO[str] = gzip.open(path, 'wt', encoding='utf-8')
+        self._start = time.monotonic()
+        self._recorded_devices: Dict[str, BaseDriver] = {}
+        self.calls = 0
+
+    def record_driver(self, device_id: str, driver: BaseDriver) -> None:
+        """replaces the traced methods of the driver instance with wrappers recording every call"""
+        with self.lock:
+            if self._recorded_devices.get(device_id) is driver:
+                return
+            self._recorded_devices[device_id] = driver
+            self._write({
+                'type': _DEVICE_RECORD,
+                'device': device_id,
+                'driver': f'{driver.__class__.__module__}.{driver.__class__.__qualname__}',
+                'description': driver.description,
+                'serial_number': driver.serial_number,
+                'bus': driver.bus,
+                'address': driver.address,
+            })
+        for method_name in TRACED_METHODS:
+            method = getattr(driver, method_name, None)
+            if method is not None:
+                setattr(driver, method_name, self._wrap(device_id, method_name, method))
+
+    def close(self) -> None:
+        with self.lock:
+            if not self._file.closed:
+                _LOG.info("%d driver calls recorded", self.calls)
+                self._file.close()
+
+    def _wrap(self, device_id: str, method_name: str, method: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(method)
+        def recorded_call(*args: Any, **kwargs: Any) -> Any:
+            start = time.monotonic()
+            try:
+                result = method(*args, **kwargs)
+            except Exception as ex:
+                self._record_call(device_id, method_name, args, kwargs, start, error=ex)
+                raise
+            # connect() returns the driver itself, there is nothing worth recording
+            self._record_call(device_id, method_name, args, kwargs, start,
+                              result=None if method_name == 'connect' else result)
+            return result
+
+        return recorded_call
+
+    def _record_call(self, device_id: str, method_name: str, args: Tuple, kwargs: Dict[str, Any], start: float,
+                     result: Any = None, error: Optional[Exception] = None) -> None:
+        latency = time.monotonic() - start
+        with self.lock:
+            self.calls += 1
+            self._write({
+                'type': _CALL_RECORD,
+                'device': device_id,
+                'time': round(start - self._start, 6),
+                'method': method_name,
+                'args': args,
+                'kwargs': kwargs,
+                'result': result,
+                'error': None if error is None else [error.__class__.__name__, str(error)],
+                'latency': round(latency, 6),
+            })
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        if not self._file.closed:
+            self._file.write(json.dumps(record, separators=(',', ':'), default=repr))
+            self._file.write('\n')
+
+
+class ReplayDriver(BaseDriver):
+    """Stands in for the driver of a recorded device: every call returns (or raises) what the recorded driver
+    returned, after waiting the recorded latency multiplied by time_scale (0 to not wait at all).
+    Calls are replayed in the recorded order for each method, starting over when all of them have been replayed.
+    The arguments are not checked.
+
+    The DeviceSettings of the recorded driver class (stand_in_for) are used for the replay driver.
+    A replay driver has no device handle: the statuses are always polled, even for devices sending status reports.
+    """
+
+    def __init__(self, stand_in_for: Type[BaseDriver], description: str, serial_number: Optional[str],
+                 bus: Optional[str], address: Optional[str], calls: Dict[str, List[Dict[str, Any]]],
+                 time_scale: float = 1.0) -> None:
+        self.stand_in_for = stand_in_for
+        self._description = description
+        self._serial_number = serial_number
+        self._bus = bus
+        self._address = address
+        self._recorded_calls = calls
+        self._pending_calls: Dict[str, Deque[Dict[str, Any]]] = {}
+        self._time_scale = time_scale
+
+    @classmethod
+    def find_supported_devices(cls, **kwargs: Any) -> List[BaseDriver]:
+        """replay drivers are created from a trace, they are never found on the buses"""
+        return []
+
+    def connect(self, **kwargs: Any) -> 'ReplayDriver':
+        self._replay('connect')
+        return self
+
+    def initialize(self, **kwargs: Any) -> Any:
+        return self._replay('initialize')
+
+    def disconnect(self, **kwargs: Any) -> None:
+        self._replay('disconnect')
+
+    def get_status(self, **kwargs: Any) -> Any:
+        return self._replay('get_status')
+
+    def set_speed_profile(self, channel: str, profile: Any, **kwargs: Any) -> None:
+        self._replay('set_speed_profile')
+
+    def set_fixed_speed(self, channel: str, duty: int, **kwargs: Any) -> None:
+        self._replay('set_fixed_speed')
+
+    def set_color(self, channel: str, mode: str, colors: Any, **kwargs: Any) -> None:
+        self._replay('set_color')
+
+    @property
+    def description(self) -> str:
+        return self._description
+
+    @property
+    def vendor_id(self) -> Optional[int]:
+        return None
+
+    @property
+    def product_id(self) -> Optional[int]:
+        return None
+
+    @property
+    def release_number(self) -> Optional[int]:
+        return None
+
+    @property
+    def serial_number(self) -> Optional[str]:
+        return self._serial_number
+
+    @property
+    def bus(self) -> Optional[str]:
+        return self._bus
+
+    @property
+    def address(self) -> Optional[str]:
+        return self._address
+
+    @property
+    def port(self) -> Optional[Tuple]:
+        return None
+
+    def _replay(self, method_name: str) -> Any:
+        pending = self._pending_calls.get(method_name)
+        if not pending:
+            if not self._recorded_calls.get(method_name):
+                # an operation that has never been recorded: e.g. a write that was never done while recording
+                _LOG.debug("No recorded %s call to replay", method_name)
+                return None
+            pending = deque(self._recorded_calls[method_name])
+            self._pending_calls[method_name] = pending
+        call = pending.popleft()
+        if self._time_scale > 0:
+            time.sleep(call['latency'] * self._time_scale)
+        if call['error'] is not None:
+            raise self._create_error(*call['error'])
+        return self._to_driver_result(call['result'])
+
+    @staticmethod
+    def _create_error(type_name: str, message: str) -> Exception:
+        error_type = getattr(builtins, type_name, None)
+        if not isinstance(error_type, type) or not issubclass(error_type, Exception):
+            error_type = OSError
+        error: Exception = error_type(message)
+        return error
+
+    @staticmethod
+    def _to_driver_result(result: Any) -> Any:
+        """liquidctl returns statuses as lists of tuples, JSON has only lists"""
+        if isinstance(result, list):
+            return [tuple(item) if isinstance(item, list) else item for item in result]
+        return result
+
+
+def load_trace(path: str, time_scale: float = 1.0) -> Dict[str, ReplayDriver]:
+    """creates the replay drivers of all the devices recorded in the trace, by device id"""
+    devices: Dict[str, Dict[str, Any]] = {}
+    calls: Dict[str, Dict[str, List[Dict[str, Any]]]] = {}
+    with gzip.open(path, 'rt', encoding='utf-8') as trace:
+        for line in trace:
+            record = json.loads(line)
+            device_id = record['device']
+            if record['type'] == _DEVICE_RECORD:
+                devices.setdefault(device_id, record)
+                calls.setdefault(device_id, {})
+            elif record['type'] == _CALL_RECORD and device_id in calls:
+                calls[device_id].setdefault(record['method'], []).append(record)
+    return {device_id: ReplayDriver(_find_driver_class(device['driver']), device['description'],
+                                    device['serial_number'], device['bus'], device['address'],
+                                    calls[device_id], time_scale)
+            for device_id, device in devices.items()}
+
+
+def _find_driver_class(name: str) -> Type[BaseDriver]:
+    module_name, _, class_name = name.rpartition('.')
+    driver_class: Type[BaseDriver] = getattr(importlib.import_module(module_name), class_name)
+    return driver_class
+
+
+@singleton
+class DriverTracing:
+    """Records the calls made to the drivers of the devices found to a trace file, or replaces the devices
+    with the replay drivers of a trace file. Both are off unless requested from the command line"""
+
+    @inject
+    def __init__(self) -> None:
+        self.lock = threading.RLock()
+        self._recorder: Optional[TraceRecorder] = None
+        self._replay_path: Optional[str] = None
+        self._time_scale: float = 1.0
+
+    @synchronized_with_attr("lock")
+    def start_recording(self, path: str) -> None:
+        _LOG.info("Recording the driver calls to %s", path)
+        self._recorder = TraceRecorder(path)
+
+    @synchronized_with_attr("lock")
+    def start_replay(self, path: str, time_scale: float = 1.0) -> None:
+        _LOG.info("Replaying the devices recorded in %s, time scale %s", path, time_scale)
+        self._replay_path = path
+        self._time_scale = time_scale
+
+    @property
+    def is_recording(self) -> bool:
+        return self._recorder is not None
+
+    @property
+    def is_replaying(self) -> bool:
+        return self._replay_path is not None
+
+    @synchronized_with_attr("lock")
+    def load_replay_drivers(self) -> Dict[str, ReplayDriver]:
+        if self._replay_path is None:
+            return {}
+        return load_trace(self._replay_path, self._time_scale)
+
+    @synchronized_with_attr("lock")
+    def trace(self, devices: Dict[str, BaseDriver]) -> None:
+        """starts recording the calls made to the given drivers, if recording"""
+        if self._recorder is not None:
+            for device_id, driver in devices.items():
+                self._recorder.record_driver(device_id, driver)
+
+    @synchronized_with_attr("lock")
+    def stop(self) -> None:
+        if self._recorder is not None:
+            self._recorder.close()
+            self._recorder = None
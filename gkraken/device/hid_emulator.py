@@ -0,0 +1,315 @@
+#  This file is part of gkraken.
+#
+#  Copyright (c) 2021 Roberto Leinardi and Guy Boldon
+#
+#  gkraken is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  gkraken is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
+
+import logging
+import math
+import threading
+import time
+from collections import deque
+from typing import List, Dict, Any, Optional, Deque, Callable, Tuple, Sequence
+
+from liquidctl.driver.base import BaseDriver
+from liquidctl.driver.usb import HidapiDevice, UsbHidDriver
+from liquidctl.util import Hue2Accessory, HUE2_MAX_ACCESSORIES_IN_CHANNEL
+
+from gkraken.device.device_settings import DeviceSettings
+
+_LOG = logging.getLogger(__name__)
+
+Clock = Callable[[], float]
+
+# W/K from the liquid to the air: a radiator with still fans, and the gain at full pump and fan duty
+_BASE_CONDUCTANCE = 2.0
+_PUMP_CONDUCTANCE = 2.0
+_FAN_CONDUCTANCE = 6.0
+
+
+class ThermalModel:
+    """Liquid temperature of a loop dissipating a constant heat load through its radiator:
+    C dT/dt = P - G (T - T_ambient), where the conductance G grows with the pump and fan duties.
+    The equation is solved exactly between two updates, so it is stable with any update interval."""
+
+    def __init__(self,
+                 heat_load: float = 150.0,
+                 ambient_temperature: float = 25.0,
+                 heat_capacity: float = 1500.0,
+                 clock: Clock = time.monotonic) -> None:
+        self.heat_load = heat_load
+        self.ambient_temperature = ambient_temperature
+        self.liquid_temperature = ambient_temperature
+        self._heat_capacity = heat_capacity
+        self._clock = clock
+        self._last_update = clock()
+
+    def update(self, pump_duty: float, fan_duty: float) -> float:
+        """advances the model to now, with the given duties (%) since the previous update"""
+        now = self._clock()
+        elapsed = max(now - self._last_update, 0.0)
+        self._last_update = now
+        conductance = _BASE_CONDUCTANCE + _PUMP_CONDUCTANCE * pump_duty / 100 + _FAN_CONDUCTANCE * fan_duty / 100
+        equilibrium = self.ambient_temperature + self.heat_load / conductance
+        self.liquid_temperature = equilibrium + (self.liquid_temperature - equilibrium) * math.exp(
+            -conductance * elapsed / self._heat_capacity)
+        return self.liquid_temperature
+
+
+class EmulatedHidDevice:
+    """A cooler answering the HID reports of its liquidctl driver. Responses to the requests are enqueued, like
+    the status reports that the device sends every report_interval seconds; with a report_interval of 0 a blocking
+    read returns a fresh status report immediately and no report is ever enqueued by the device itself."""
+
+    vendor_id: int = 0
+    product_id: int = 0
+    report_length: int = 64
+
+    def __init__(self,
+                 serial_number: str,
+                 thermal_model: Optional[ThermalModel] = None,
+                 report_interval: float = 0.0,
+                 clock: Clock = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep) -> None:
+        self.lock = threading.Lock()
+        self.serial_number = serial_number
+        self.path = f'emulated/{serial_number}'.encode()
+        self.thermal_model = thermal_model if thermal_model is not None else ThermalModel(clock=clock)
+        self.writes = 0
+        self._report_interval = report_interval
+        self._clock = clock
+        self._sleep = sleep
+        self._responses: Deque[List[int]] = deque()
+        self._next_report_time = clock() + report_interval
+
+    @property
+    def info(self) -> Dict[str, Any]:
+        """the device info returned by hid.enumerate()"""
+        return {
+            'path': self.path,
+            'vendor_id': self.vendor_id,
+            'product_id': self.product_id,
+            'serial_number': self.serial_number,
+            'release_number': 0x100,
+            'manufacturer_string': 'NZXT',
+            'product_string': self.__class__.__name__,
+            'usage_page': 0,
+            'usage': 0,
+            'interface_number': 0,
+        }
+
+    def read(self, max_length: int, timeout_ms: int, nonblocking: bool) -> List[int]:
+        with self.lock:
+            if self._responses:
+                return self._responses.popleft()[:max_length]
+            now = self._clock()
+            if self._report_interval <= 0:
+                return [] if nonblocking else self._status_report()[:max_length]
+            if now >= self._next_report_time:
+                # the reports missed in between would have been dropped by a full queue, only the latest matters
+                self._next_report_time = now + self._report_interval
+                return self._status_report()[:max_length]
+            wait = self._next_report_time - now
+        if nonblocking:
+            return []
+        if 0 < timeout_ms < wait * 1000:
+            self._sleep(timeout_ms / 1000)
+            return []
+        self._sleep(wait)
+        return self.read(max_length, timeout_ms, nonblocking)
+
+    def write(self, data: Sequence[int]) -> int:
+        with self.lock:
+            self.writes += 1
+            self._handle_report(list(data))
+        return len(data)
+
+    def _enqueue_response(self, response: List[int]) -> None:
+        self._responses.append(response + [0] * (self.report_length - len(response)))
+
+    def _status_report(self) -> List[int]:
+        raise NotImplementedError()
+
+    def _handle_report(self, report: List[int]) -> None:
+        raise NotImplementedError()
+
+    @staticmethod
+    def _split_temperature(temperature: float) -> Tuple[int, int]:
+        tenths = int(round(temperature * 10))
+        return tenths // 10, tenths % 10
+
+
+class EmulatedKrakenX3(EmulatedHidDevice):
+    """Kraken X53, X63 or X73: the pump follows a 40 points profile (20-59°C) uploaded by the host.
+    The radiator fans are not controlled by the device, they are emulated at a constant duty"""
+
+    vendor_id = 0x1e71
+    product_id = 0x2007
+
+    _PUMP_CHANNEL = 0x1
+    _PROFILE_START_TEMPERATURE = 20
+    _PROFILE_LENGTH = 40
+    _MAX_PUMP_RPM = 2800
+    _FAN_DUTY = 50
+
+    def __init__(self, *args: Any, firmware_version: Tuple[int, int, int] = (1, 10, 0), **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.firmware_version = firmware_version
+        self.pump_profile: List[int] = [60] * self._PROFILE_LENGTH
+        self.color_reports: Dict[int, List[int]] = {}
+
+    def pump_duty(self, temperature: float) -> int:
+        index = min(max(int(temperature) - self._PROFILE_START_TEMPERATURE, 0), self._PROFILE_LENGTH - 1)
+        return self.pump_profile[index]
+
+    def _status_report(self) -> List[int]:
+        pump_duty = self.pump_duty(self.thermal_model.liquid_temperature)
+        temperature, temperature_decimal = self._split_temperature(
+            self.thermal_model.update(pump_duty, self._FAN_DUTY))
+        pump_rpm = self._MAX_PUMP_RPM * pump_duty // 100
+        report = [0x75, 0x02] + [0] * 13 + [temperature, temperature_decimal, pump_rpm & 0xff, pump_rpm >> 8,
+                                            pump_duty]
+        return report + [0] * (self.report_length - len(report))
+
+    def _handle_report(self, report: List[int]) -> None:
+        opcode = bytes(report[:2])
+        if opcode == b'\x10\x01':
+            major, minor, patch = self.firmware_version
+            self._enqueue_response([0x11, 0x01] + [0] * 15 + [major, minor, patch])
+        elif opcode == b'\x20\x03':
+            accessories = [0] * HUE2_MAX_ACCESSORIES_IN_CHANNEL * 3
+            accessories[HUE2_MAX_ACCESSORIES_IN_CHANNEL] = Hue2Accessory.KRAKENX_GEN4_RING.value
+            accessories[HUE2_MAX_ACCESSORIES_IN_CHANNEL * 2] = Hue2Accessory.KRAKENX_GEN4_LOGO.value
+            self._enqueue_response([0x21, 0x03] + [0] * 12 + [3] + accessories)
+        elif report[0] == 0x72 and report[1] == self._PUMP_CHANNEL:
+            self.pump_profile = report[4:4 + self._PROFILE_LENGTH]
+        elif report[0] in (0x2a, 0x22):
+            self.color_reports[report[2]] = report
+        elif report[0] != 0x70:  # 0x70 only configures the status reports
+            _LOG.debug("Unknown report %s", report[:4])
+
+
+class EmulatedKraken2(EmulatedHidDevice):
+    """Kraken X42, X52, X62 or X72: fan and pump follow profiles of (temperature, duty) points uploaded by the host,
+    one point per report, or an instantaneous duty"""
+
+    vendor_id = 0x1e71
+    product_id = 0x170e
+    report_length = 17
+
+    _FAN_CHANNEL = 0x80
+    _PUMP_CHANNEL = 0xc0
+    _MAX_RPM = {_FAN_CHANNEL: 2000, _PUMP_CHANNEL: 2800}
+
+    def __init__(self, *args: Any, firmware_version: Tuple[int, int, int] = (6, 0, 2), **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.firmware_version = firmware_version
+        self.profiles: Dict[int, Dict[int, Tuple[int, int]]] = {
+            self._FAN_CHANNEL: {0: (20, 50)},
+            self._PUMP_CHANNEL: {0: (20, 60)},
+        }
+        self.color_reports: Dict[int, List[int]] = {}
+
+    def duty(self, channel: int, temperature: float) -> int:
+        points = sorted(self.profiles[channel].values())
+        return next((duty for point_temperature, duty in reversed(points) if point_temperature <= temperature),
+                    points[0][1])
+
+    def _status_report(self) -> List[int]:
+        fan_duty = self.duty(self._FAN_CHANNEL, self.thermal_model.liquid_temperature)
+        pump_duty = self.duty(self._PUMP_CHANNEL, self.thermal_model.liquid_temperature)
+        temperature, temperature_decimal = self._split_temperature(self.thermal_model.update(pump_duty, fan_duty))
+        fan_rpm = self._MAX_RPM[self._FAN_CHANNEL] * fan_duty // 100
+        pump_rpm = self._MAX_RPM[self._PUMP_CHANNEL] * pump_duty // 100
+        major, minor, patch = self.firmware_version
+        return [0x04, temperature, temperature_decimal, fan_rpm >> 8, fan_rpm & 0xff, pump_rpm >> 8, pump_rpm & 0xff,
+                0, 0, 0, 0, major, minor >> 8, minor & 0xff, patch, 0, 0]
+
+    def _handle_report(self, report: List[int]) -> None:
+        if report[:2] == [0x02, 0x4d]:
+            channel_byte, temperature, duty = report[2:5]
+            if channel_byte & 0x80:
+                # one point of a profile: the channel base plus the index of the point
+                channel = channel_byte & 0xc0
+                if channel_byte & 0x3f == 0:
+                    self.profiles[channel] = {}
+                self.profiles[channel][channel_byte & 0x3f] = (temperature, duty)
+            else:
+                # instantaneous duty: the channel base & 0x70
+                channel = self._PUMP_CHANNEL if channel_byte & 0x40 else self._FAN_CHANNEL
+                self.profiles[channel] = {0: (0, duty)}
+        elif report[:2] == [0x02, 0x4c]:
+            self.color_reports[report[2] & 0x07] = report
+        else:
+            _LOG.debug("Unknown report %s", report[:4])
+
+
+class _EmulatedHidHandle:
+    """the hid.device API, over the emulated device opened"""
+
+    def __init__(self, devices: Dict[bytes, EmulatedHidDevice]) -> None:
+        self._devices = devices
+        self._device: Optional[EmulatedHidDevice] = None
+        self._nonblocking = False
+
+    def open_path(self, path: bytes) -> None:
+        if path not in self._devices:
+            raise OSError('open failed')
+        self._device = self._devices[path]
+
+    def close(self) -> None:
+        self._device = None
+
+    def set_nonblocking(self, nonblocking: Any) -> int:
+        self._nonblocking = bool(nonblocking)
+        return 0
+
+    def read(self, max_length: int, timeout_ms: int = 0) -> List[int]:
+        return self._get_device().read(max_length, timeout_ms, self._nonblocking)
+
+    def write(self, data: Sequence[int]) -> int:
+        return self._get_device().write(data)
+
+    def _get_device(self) -> EmulatedHidDevice:
+        if self._device is None:
+            raise OSError('not open')
+        return self._device
+
+
+class EmulatedHidapi:
+    """Stands in for the hidapi module: HidapiDevice.enumerate(EmulatedHidapi(...)) finds the emulated devices,
+    that the unchanged liquidctl drivers then open, read and write like real ones"""
+
+    def __init__(self, *devices: EmulatedHidDevice) -> None:
+        self._devices = {device.path: device for device in devices}
+
+    def enumerate(self, vendor_id: int = 0, product_id: int = 0) -> List[Dict[str, Any]]:
+        return [device.info for device in self._devices.values()
+                if vendor_id in (0, device.vendor_id) and product_id in (0, device.product_id)]
+
+    def device(self) -> _EmulatedHidHandle:
+        return _EmulatedHidHandle(self._devices)
+
+
+def find_emulated_drivers(hidapi: EmulatedHidapi) -> List[BaseDriver]:
+    """probes the emulated devices with the liquidctl drivers of the DeviceSettings, like DeviceDiscovery does
+    with the real ones"""
+    hid_settings = [device_setting for device_setting in DeviceSettings.__subclasses__()
+                    if issubclass(device_setting.supported_driver, UsbHidDriver)]
+    return [driver
+            for handle in HidapiDevice.enumerate(hidapi)
+            for device_setting in hid_settings
+            if any((vid, pid) == (handle.vendor_id, handle.product_id)
+                   for vid, pid, _, _, _ in device_setting.supported_driver.SUPPORTED_DEVICES)
+            for driver in device_setting.probe(handle)]
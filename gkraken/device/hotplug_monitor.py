@@ -0,0 +1,150 @@
+#  This file is part of gkraken.
+#
+#  Copyright (c) 2021 Roberto Leinardi and Guy Boldon
+#
+#  gkraken is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  gkraken is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
+
+import logging
+import socket
+import threading
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Dict, Tuple, AbstractSet
+
+_LOG = logging.getLogger(__name__)
+
+_NETLINK_KOBJECT_UEVENT = 15  # not exported by the socket module
+_KERNEL_UEVENT_GROUP = 1
+_RECEIVE_BUFFER_SIZE = 16384
+_STOP_CHECK_INTERVAL = 1.0  # seconds
+# seconds without events after an event, before reporting it: plugging a device in generates a burst of events
+# (usb device, interfaces, hid, hidraw) and its hidraw node is created after the usb device one
+_SETTLE_TIME = 0.5
+_ACTIONS = ('add', 'remove')
+
+
+@dataclass(frozen=True)
+class HotplugEvent:
+    action: str
+    vendor_id: int
+    product_id: int
+    devpath: str
+
+    def is_at(self, vendor_id: int, product_id: int, port_path: str) -> bool:
+        """True if the event is about the device with the given VID/PID plugged in the given USB port, e.g. 1-4 for
+        /devices/pci0000:00/0000:00:14.0/usb1/1-4 or for the HID device /devices/.../usb1/1-4/1-4:1.0/0003:..."""
+        return (self.vendor_id, self.product_id) == (vendor_id, product_id) and port_path in self.devpath.split('/')
+
+
+def open_uevent_socket() -> socket.socket:
+    """the kernel uevent netlink socket, joined to the multicast group of the kernel events"""
+    sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, _NETLINK_KOBJECT_UEVENT)
+    sock.bind((0, _KERNEL_UEVENT_GROUP))
+    return sock
+
+
+def parse_uevent(message: bytes) -> Optional[HotplugEvent]:
+    """parses a kernel uevent ("action@devpath" followed by NUL separated KEY=VALUE properties).
+    Returns None if it's not the addition or removal of a USB or HID device"""
+    fields = message.split(b'\0')
+    properties: Dict[str, str] = {}
+    for field in fields[1:]:
+        key, separator, value = field.decode('utf-8', 'replace').partition('=')
+        if separator:
+            properties[key] = value
+    action = properties.get('ACTION')
+    if action not in _ACTIONS:
+        return None
+    usb_id = _get_usb_id(properties)
+    if usb_id is None:
+        return None
+    devpath = properties.get('DEVPATH', fields[0].decode('utf-8', 'replace').partition('@')[2])
+    return HotplugEvent(action, usb_id[0], usb_id[1], devpath)
+
+
+def _get_usb_id(properties: Dict[str, str]) -> Optional[Tuple[int, int]]:
+    try:
+        if properties.get('SUBSYSTEM') == 'usb' and properties.get('DEVTYPE') == 'usb_device':
+            # PRODUCT=1e71/2007/200: vendor id, product id and release number, in hex
+            vendor_id, product_id, _ = properties['PRODUCT'].split('/')
+            return int(vendor_id, 16), int(product_id, 16)
+        if properties.get('SUBSYSTEM') == 'hid':
+            # HID_ID=0003:00001E71:00002007: bus, vendor id and product id, in hex
+            _, vendor_id, product_id = properties['HID_ID'].split(':')
+            return int(vendor_id, 16), int(product_id, 16)
+    except (KeyError, ValueError):
+        _LOG.debug("Malformed uevent properties: %s", properties)
+    return None
+
+
+class HotplugMonitor:
+    """Listens to the kernel uevents on the netlink socket and reports the supported devices (by VID/PID) being
+    plugged in or unplugged. The events of a burst are reported together, once no other event arrives for
+    _SETTLE_TIME seconds. If the netlink socket is not available (e.g. in a sandbox) nothing is reported"""
+
+    def __init__(self,
+                 usb_ids: AbstractSet[Tuple[int, int]],
+                 on_events: Callable[[List[HotplugEvent]], None],
+                 open_socket: Callable[[], socket.socket] = open_uevent_socket,
+                 settle_time: float = _SETTLE_TIME) -> None:
+        self._usb_ids = usb_ids
+        self._on_events = on_events
+        self._open_socket = open_socket
+        self._settle_time = settle_time
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> bool:
+        """returns False if the uevents can't be received"""
+        try:
+            sock = self._open_socket()
+        except OSError as ex:
+            _LOG.warning("Unable to monitor the device hotplug events: %s", ex)
+            return False
+        self._thread = threading.Thread(target=self._run, args=(sock,), name='kraken-hotplug', daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(_STOP_CHECK_INTERVAL * 2)
+            self._thread = None
+
+    def _run(self, sock: socket.socket) -> None:
+        pending: List[HotplugEvent] = []
+        with sock:
+            while not self._stop_event.is_set():
+                sock.settimeout(self._settle_time if pending else _STOP_CHECK_INTERVAL)
+                try:
+                    message = sock.recv(_RECEIVE_BUFFER_SIZE)
+                except socket.timeout:
+                    if pending:
+                        self._report(pending)
+                        pending = []
+                    continue
+                except OSError as ex:
+                    _LOG.error("Stopped monitoring the hotplug events: %s", ex)
+                    return
+                if not message:
+                    return
+                event = parse_uevent(message)
+                if event is not None and (event.vendor_id, event.product_id) in self._usb_ids:
+                    _LOG.debug("Hotplug event: %s", event)
+                    pending.append(event)
+
+    def _report(self, events: List[HotplugEvent]) -> None:
+        try:
+            self._on_events(events)
+        except Exception as ex:  # pylint: disable=broad-except
+            _LOG.exception("Error handling the hotplug events: %s", ex)
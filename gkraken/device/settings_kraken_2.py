@@ -16,12 +16,12 @@
 #  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
 
 import logging
-from typing import Optional, Dict, List
+from typing import List
 
 from liquidctl.driver.base import BaseDriver
 from liquidctl.driver.kraken2 import Kraken2
 
-from gkraken.device.device_settings import DeviceSettings, StatusIndexType
+from gkraken.device.device_settings import DeviceSettings
 from gkraken.model.lighting_modes import LightingMode
 from gkraken.model.status import Status
 
@@ -31,13 +31,6 @@ _LOG = logging.getLogger(__name__)
 class SettingsKraken2(DeviceSettings):
     supported_driver: BaseDriver = Kraken2
 
-    _status_index: Dict[StatusIndexType, int] = {
-        StatusIndexType.LIQUID_TEMPERATURE: 0,
-        StatusIndexType.FAN_RPM: 1,
-        StatusIndexType.PUMP_RPM: 2,
-        StatusIndexType.FIRMWARE_VERSION: 3
-    }
-
     # Logo modes have been adjusted to reasonable settings for the single LED, original settings left for reference
     _modes_logo: List[LightingMode] = [
         LightingMode(1, 'off', 'Off', 0, 0, False, False),
@@ -72,19 +65,9 @@ class SettingsKraken2(DeviceSettings):
         LightingMode(20, 'wings', 'Wings', 1, 1, True, False),
     ]
 
-    @classmethod
-    def determine_status(
-            cls, status_list: list, device_description: str, init_firmware: Optional[str]
-    ) -> Optional[Status]:
-        status = Status(
-            driver_type=cls.supported_driver,
-            liquid_temperature=status_list[cls._status_index[StatusIndexType.LIQUID_TEMPERATURE]],
-            firmware_version=cls._safely_determine_firmware(status_list, init_firmware),
-            fan_rpm=status_list[cls._status_index[StatusIndexType.FAN_RPM]],
-            pump_rpm=status_list[cls._status_index[StatusIndexType.PUMP_RPM]],
-            device_description=device_description,
-        )
+    @staticmethod
+    def _is_valid_status(status: Status) -> bool:
         if status.fan_rpm is None or status.fan_rpm >= 3500:
             _LOG.error('Invalid Fan RPM from X2 Device')
-            return None
-        return status
+            return False
+        return True
@@ -16,14 +16,13 @@
 #  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
 
 import logging
-from typing import Optional, Dict, List
+from typing import Dict, List, Any
 
 from liquidctl.driver.asetek import Legacy690Lc
 from liquidctl.driver.base import BaseDriver
 
-from gkraken.device.device_settings import DeviceSettings, StatusIndexType
+from gkraken.device.device_settings import DeviceSettings
 from gkraken.model.lighting_modes import LightingMode
-from gkraken.model.status import Status
 
 _LOG = logging.getLogger(__name__)
 
@@ -31,12 +30,9 @@ _LOG = logging.getLogger(__name__)
 class SettingsKrakenLegacy(DeviceSettings):
     supported_driver: BaseDriver = Legacy690Lc
 
-    _status_index: Dict[StatusIndexType, int] = {
-        StatusIndexType.LIQUID_TEMPERATURE: 0,
-        StatusIndexType.FAN_RPM: 1,
-        StatusIndexType.PUMP_RPM: 2,
-        StatusIndexType.FIRMWARE_VERSION: 3
-    }
+    supports_speed_profiles: bool = False
+
+    _probe_kwargs: Dict[str, Any] = {'legacy_690lc': True}
 
     _modes_logo: List[LightingMode] = [
         LightingMode(1, 'blackout', 'Blackout', 0, 0, False, False),
@@ -47,16 +43,3 @@ class SettingsKrakenLegacy(DeviceSettings):
 
     # no ring LEDs for this model
     _modes_ring: List[LightingMode] = []
-
-    @classmethod
-    def determine_status(
-            cls, status_list: list, device_description: str, init_firmware: Optional[str]
-    ) -> Optional[Status]:
-        return Status(
-            driver_type=cls.supported_driver,
-            liquid_temperature=status_list[cls._status_index[StatusIndexType.LIQUID_TEMPERATURE]],
-            firmware_version=cls._safely_determine_firmware(status_list, init_firmware),
-            fan_rpm=status_list[cls._status_index[StatusIndexType.FAN_RPM]],
-            pump_rpm=status_list[cls._status_index[StatusIndexType.PUMP_RPM]],
-            device_description=device_description,
-        )
@@ -15,25 +15,25 @@
 #  You should have received a copy of the GNU General Public License
 #  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
 
-from typing import Optional, List, Dict
+import struct
+from typing import List, Optional
 
 from liquidctl.driver.base import BaseDriver
 from liquidctl.driver.kraken3 import KrakenX3
 
-from gkraken.device.device_settings import StatusIndexType, DeviceSettings
+from gkraken.device.device_settings import DeviceSettings, StatusReportParser
 from gkraken.model.lighting_modes import LightingMode
 from gkraken.model.status import Status
 
+_STATUS_REPORT_PREFIX = b'\x75\x02'
+# liquid temperature (integer and decimal part), pump rpm and pump duty, after the 15 bytes of header
+_STATUS_REPORT = struct.Struct('<15xBBHB')
+_INVALID_TEMPERATURE = 0xff  # reported by faulty firmwares, see https://github.com/liquidctl/liquidctl/issues/172
+
 
 class SettingsKrakenX3(DeviceSettings):
     supported_driver: BaseDriver = KrakenX3
 
-    _status_index: Dict[StatusIndexType, int] = {
-        StatusIndexType.LIQUID_TEMPERATURE: 0,
-        StatusIndexType.PUMP_RPM: 1,
-        StatusIndexType.PUMP_DUTY: 2,
-    }
-
     # Logo modes have been adjusted to reasonable settings for the single LED, original settings left for reference
     _modes_logo: List[LightingMode] = [
         LightingMode(1, 'off', 'Off', 0, 0, False, False),
@@ -105,14 +105,29 @@ class SettingsKrakenX3(DeviceSettings):
     ]
 
     @classmethod
-    def determine_status(
-            cls, status_list: list, device_description: str, init_firmware: Optional[str]
-    ) -> Optional[Status]:
-        return Status(
-            driver_type=cls.supported_driver,
-            firmware_version=init_firmware if init_firmware is not None else '',
-            liquid_temperature=status_list[cls._status_index[StatusIndexType.LIQUID_TEMPERATURE]],
-            pump_rpm=status_list[cls._status_index[StatusIndexType.PUMP_RPM]],
-            pump_duty=status_list[cls._status_index[StatusIndexType.PUMP_DUTY]],
-            device_description=device_description,
-        )
+    def create_status_report_parser(cls, device_description: str,
+                                    init_firmware: Optional[str],
+                                    device_id: str = '') -> Optional[StatusReportParser]:
+        """the X3 periodically sends a status report on its interrupt endpoint by itself"""
+        driver_type = cls.supported_driver
+        firmware_version = init_firmware if init_firmware is not None else ''
+        report_size = _STATUS_REPORT.size
+        unpack_from = _STATUS_REPORT.unpack_from
+        is_valid_status = cls._is_valid_status
+
+        def parse_status_report(report: bytes) -> Optional[Status]:
+            if len(report) < report_size or report[:2] != _STATUS_REPORT_PREFIX:
+                return None
+            temperature, temperature_decimal, pump_rpm, pump_duty = unpack_from(report)
+            if temperature == _INVALID_TEMPERATURE:
+                return None
+            status = Status(driver_type=driver_type,
+                            liquid_temperature=temperature + temperature_decimal / 10,
+                            firmware_version=firmware_version,
+                            pump_rpm=pump_rpm,
+                            pump_duty=pump_duty,
+                            device_description=device_description,
+                            device_id=device_id)
+            return status if is_valid_status(status) else None
+
+        return parse_status_report
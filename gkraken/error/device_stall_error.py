@@ -0,0 +1,25 @@
+#  This file is part of gkraken.
+#
+#  Copyright (c) 2021 Roberto Leinardi and Guy Boldon
+#
+#  gkraken is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  gkraken is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
+
+
+class DeviceStallError(TimeoutError):
+    """raised when a device operation doesn't complete before its deadline, the device handle must be abandoned"""
+
+    def __init__(self, operation: str, timeout: float) -> None:
+        super().__init__(f"Device operation {operation} stalled for more than {timeout:.1f} s")
+        self.operation = operation
+        self.timeout = timeout
@@ -0,0 +1,47 @@
+#  This file is part of gkraken.
+#
+#  Copyright (c) 2021 Roberto Leinardi and Guy Boldon
+#
+#  gkraken is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  gkraken is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
+
+import logging
+
+import rx
+from injector import singleton, inject
+from rx import Observable
+
+from gkraken.model.apply_batch import ApplyBatch
+from gkraken.repository.device_executor import JobPriority
+from gkraken.repository.device_registry import DeviceRegistry
+
+_LOG = logging.getLogger(__name__)
+
+
+@singleton
+class ApplyBatchInteractor:
+
+    @inject
+    def __init__(self,
+                 device_registry: DeviceRegistry,
+                 ) -> None:
+        self._device_registry = device_registry
+
+    def execute(self, device_id: str, batch: ApplyBatch) -> Observable:
+        """emits the ApplyResult of every item of the batch, in a single list. Batches are never coalesced:
+        the results must match the items of the batch"""
+        _LOG.debug("ApplyBatchInteractor.execute(%s, %d items)", device_id, len(batch))
+        repository = self._device_registry.get_repository(device_id)
+        # pylint: disable=not-callable
+        return rx.defer(lambda _: rx.from_future(repository.submit(
+            JobPriority.USER, repository.apply_batch, batch)))
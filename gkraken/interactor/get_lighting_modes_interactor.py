@@ -21,7 +21,8 @@ import rx
 from injector import singleton, inject
 from rx import Observable
 
-from gkraken.repository.kraken_repository import KrakenRepository
+from gkraken.repository.device_executor import JobPriority
+from gkraken.repository.device_registry import DeviceRegistry
 
 _LOG = logging.getLogger(__name__)
 
@@ -31,11 +32,12 @@ class GetLightingModesInteractor:
 
     @inject
     def __init__(self,
-                 kraken_repository: KrakenRepository,
+                 device_registry: DeviceRegistry,
                  ) -> None:
-        self._kraken_repository = kraken_repository
+        self._device_registry = device_registry
 
-    def execute(self) -> Observable:
-        _LOG.debug("GetLightingModesInteractor.execute()")
+    def execute(self, device_id: str) -> Observable:
+        _LOG.debug("GetLightingModesInteractor.execute(%s)", device_id)
+        repository = self._device_registry.get_repository(device_id)
         # pylint: disable=not-callable
-        return rx.defer(lambda _: rx.just(self._kraken_repository.get_lighting_modes()))
+        return rx.defer(lambda _: rx.from_future(repository.submit(JobPriority.USER, repository.get_lighting_modes)))
@@ -16,12 +16,14 @@
 #  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
 
 import logging
+from typing import Optional
 
 import rx
 from injector import singleton, inject
 from rx import Observable
 
-from gkraken.repository.kraken_repository import KrakenRepository
+from gkraken.repository.device_executor import JobPriority
+from gkraken.repository.device_registry import DeviceRegistry
 
 _LOG = logging.getLogger(__name__)
 
@@ -30,11 +32,17 @@ _LOG = logging.getLogger(__name__)
 class GetStatusInteractor:
     @inject
     def __init__(self,
-                 kraken_repository: KrakenRepository,
+                 device_registry: DeviceRegistry,
                  ) -> None:
-        self._kraken_repository = kraken_repository
+        self._device_registry = device_registry
 
-    def execute(self) -> Observable:
-        _LOG.debug("GetStatusInteractor.execute()")
+    def execute(self, device_id: str) -> Observable:
+        _LOG.debug("GetStatusInteractor.execute(%s)", device_id)
+        repository = self._device_registry.get_repository(device_id)
         # pylint: disable=not-callable
-        return rx.defer(lambda _: rx.just(self._kraken_repository.get_status()))
+        return rx.defer(lambda _: rx.from_future(repository.submit(JobPriority.BACKGROUND, repository.get_status)))
+
+    def get_writes_avoided(self, device_id: str) -> Optional[int]:
+        """the writes avoided by the tuning of the software curves of the device, None if it has none"""
+        writes_avoided: Optional[int] = self._device_registry.get_repository(device_id).writes_avoided
+        return writes_avoided
@@ -16,25 +16,28 @@
 #  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
 
 import logging
+from typing import Dict
 
-import rx
 from injector import singleton, inject
-from rx import Observable
 
-from gkraken.repository.kraken_repository import KrakenRepository
+from gkraken.conf import LIQUID_TEMPERATURE_SOURCE
+from gkraken.repository.hwmon_sensors import HwmonSensors
 
 _LOG = logging.getLogger(__name__)
 
 
 @singleton
-class HasSupportedKrakenInteractor:
+class GetTemperatureSourcesInteractor:
+
     @inject
     def __init__(self,
-                 kraken_repository: KrakenRepository,
+                 hwmon_sensors: HwmonSensors,
                  ) -> None:
-        self._kraken_repository = kraken_repository
+        self._hwmon_sensors = hwmon_sensors
 
-    def execute(self) -> Observable:
-        _LOG.debug("HasSupportedKrakenInteractor.execute()")
-        # pylint: disable=not-callable
-        return rx.defer(lambda _: rx.just(self._kraken_repository.has_supported_kraken()))
+    def execute(self) -> Dict[str, str]:
+        """the labels of the temperature sources a speed profile can follow, by source"""
+        _LOG.debug("GetTemperatureSourcesInteractor.execute()")
+        sources = {LIQUID_TEMPERATURE_SOURCE: 'Liquid'}
+        sources.update({sensor.source: sensor.label for sensor in self._hwmon_sensors.discover()})
+        return sources
@@ -0,0 +1,81 @@
+#  This file is part of gkraken.
+#
+#  Copyright (c) 2021 Roberto Leinardi and Guy Boldon
+#
+#  gkraken is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  gkraken is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
+import logging
+from typing import Optional
+
+import rx
+from injector import singleton, inject
+from rx import Observable
+
+from gkraken.core_di import SessionStateChangedSubject
+from gkraken.model.session_state import SessionState
+from gkraken.repository.device_registry import DeviceRegistry
+from gkraken.util.logind_monitor import LogindMonitor
+
+_LOG = logging.getLogger(__name__)
+
+
+@singleton
+class SessionInteractor:
+    """Publishes the system suspensions and the session idle state, reported by logind,
+    with the SessionStateChangedSubject"""
+
+    @inject
+    def __init__(self,
+                 device_registry: DeviceRegistry,
+                 session_state_changed_subject: SessionStateChangedSubject,
+                 ) -> None:
+        self._device_registry = device_registry
+        self._session_state_changed_subject = session_state_changed_subject
+        self._monitor: Optional[LogindMonitor] = None
+
+    def start(self, bus_address: Optional[str] = None) -> None:
+        """to be called from the main loop thread, where the session state changes are published"""
+        if self._monitor is None:
+            monitor = LogindMonitor(self._on_prepare_for_sleep, self._on_idle_changed, bus_address)
+            if monitor.start():
+                self._monitor = monitor
+
+    def stop(self) -> None:
+        if self._monitor is not None:
+            self._monitor.stop()
+            self._monitor = None
+
+    def prepare_for_sleep(self) -> Observable:
+        """releases the devices, then lets the system suspend"""
+        _LOG.debug("SessionInteractor.prepare_for_sleep()")
+        # pylint: disable=not-callable
+        return rx.defer(lambda _: rx.from_callable(self._prepare_for_sleep))
+
+    def resume(self) -> Observable:
+        """lets the devices reconnect right away"""
+        _LOG.debug("SessionInteractor.resume()")
+        # pylint: disable=not-callable
+        return rx.defer(lambda _: rx.from_callable(self._device_registry.on_system_resumed))
+
+    def _prepare_for_sleep(self) -> None:
+        try:
+            self._device_registry.prepare_for_sleep()
+        finally:
+            if self._monitor is not None:
+                self._monitor.release_sleep_delay()
+
+    def _on_prepare_for_sleep(self, sleeping: bool) -> None:
+        self._session_state_changed_subject.on_next(SessionState.SLEEPING if sleeping else SessionState.RESUMED)
+
+    def _on_idle_changed(self, idle: bool) -> None:
+        self._session_state_changed_subject.on_next(SessionState.IDLE if idle else SessionState.ACTIVE)
@@ -22,7 +22,8 @@ from injector import singleton, inject
 from rx import Observable
 
 from gkraken.model.lighting_settings import LightingSettings
-from gkraken.repository.kraken_repository import KrakenRepository
+from gkraken.repository.device_executor import JobPriority
+from gkraken.repository.device_registry import DeviceRegistry
 
 _LOG = logging.getLogger(__name__)
 
@@ -32,11 +33,14 @@ class SetLightingInteractor:
 
     @inject
     def __init__(self,
-                 kraken_repository: KrakenRepository,
+                 device_registry: DeviceRegistry,
                  ) -> None:
-        self._kraken_repository = kraken_repository
+        self._device_registry = device_registry
 
-    def execute(self, lighting_settings: LightingSettings) -> Observable:
-        _LOG.debug("SetLightingInteractor.execute()")
+    def execute(self, device_id: str, lighting_settings: LightingSettings) -> Observable:
+        _LOG.debug("SetLightingInteractor.execute(%s)", device_id)
+        repository = self._device_registry.get_repository(device_id)
         # pylint: disable=not-callable
-        return rx.defer(lambda _: rx.just(self._kraken_repository.set_lighting_mode(lighting_settings)))
+        return rx.defer(lambda _: rx.from_future(repository.submit(
+            JobPriority.USER, repository.set_lighting_mode, lighting_settings,
+            coalesce_key=lighting_settings.channel.value)))
@@ -22,7 +22,10 @@ import rx
 from injector import singleton, inject
 from rx import Observable
 
-from gkraken.repository.kraken_repository import KrakenRepository
+from gkraken.conf import LIQUID_TEMPERATURE_SOURCE
+from gkraken.model.control_tuning import ControlTuning, DEFAULT_CONTROL_TUNING
+from gkraken.repository.device_executor import JobPriority
+from gkraken.repository.device_registry import DeviceRegistry
 
 _LOG = logging.getLogger(__name__)
 
@@ -31,11 +34,16 @@ _LOG = logging.getLogger(__name__)
 class SetSpeedProfileInteractor:
     @inject
     def __init__(self,
-                 kraken_repository: KrakenRepository,
+                 device_registry: DeviceRegistry,
                  ) -> None:
-        self._kraken_repository = kraken_repository
+        self._device_registry = device_registry
 
-    def execute(self, channel_value: str, profile_data: List[Tuple[int, int]]) -> Observable:
-        _LOG.debug("SetSpeedProfileInteractor.execute()")
+    def execute(self, device_id: str, channel_value: str, profile_data: List[Tuple[int, int]],
+                tuning: ControlTuning = DEFAULT_CONTROL_TUNING,
+                temperature_source: str = LIQUID_TEMPERATURE_SOURCE) -> Observable:
+        _LOG.debug("SetSpeedProfileInteractor.execute(%s)", device_id)
+        repository = self._device_registry.get_repository(device_id)
         # pylint: disable=not-callable
-        return rx.defer(lambda _: rx.just(self._kraken_repository.set_speed_profile(channel_value, profile_data)))
+        return rx.defer(lambda _: rx.from_future(repository.submit(
+            JobPriority.USER, repository.set_speed_profile, channel_value, profile_data, tuning, temperature_source,
+            coalesce_key=channel_value)))
@@ -0,0 +1,102 @@
+#  This file is part of gkraken.
+#
+#  Copyright (c) 2021 Roberto Leinardi and Guy Boldon
+#
+#  gkraken is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  gkraken is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
+
+import logging
+import time
+from dataclasses import dataclass
+from typing import List, Optional
+
+import rx
+from injector import singleton, inject
+from rx import Observable
+
+from gkraken.error.device_stall_error import DeviceStallError
+from gkraken.interactor.udev_interactor import UdevInteractor
+from gkraken.model.lighting_modes import LightingModes
+from gkraken.model.status import Status
+from gkraken.repository.device_executor import JobPriority
+from gkraken.repository.device_registry import DeviceRegistry, DeviceRepository
+
+_LOG = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class DeviceSnapshot:
+    """what is known of a supported device right after connecting to it"""
+    device_id: str
+    description: str
+    status: Optional[Status]
+    lighting_modes: Optional[LightingModes]
+    error: Optional[Exception] = None
+
+
+@singleton
+class StartupInteractor:
+    @inject
+    def __init__(self,
+                 device_registry: DeviceRegistry,
+                 udev_interactor: UdevInteractor,
+                 ) -> None:
+        self._device_registry = device_registry
+        self._udev_interactor = udev_interactor
+
+    def execute(self) -> Observable:
+        """emits the list of the DeviceSnapshot of the supported devices found (empty if none).
+        Every device is connected, initialized and its first status read in a single job of its own worker,
+        so the devices are handled in parallel"""
+        _LOG.debug("StartupInteractor.execute()")
+        # pylint: disable=not-callable
+        return rx.defer(lambda _: rx.from_callable(self._start_up))
+
+    def connect_device(self, device_id: str) -> Observable:
+        """emits the list of the DeviceSnapshot of a device plugged in after the startup (empty if not supported)"""
+        _LOG.debug("StartupInteractor.connect_device(%s)", device_id)
+        # pylint: disable=not-callable
+        return rx.defer(lambda _: rx.from_callable(lambda: self._connect_device(device_id)))
+
+    def _start_up(self) -> List[DeviceSnapshot]:
+        start_time = time.monotonic()
+        repositories = [self._device_registry.get_repository(device_id)
+                        for device_id in self._device_registry.get_device_ids()]
+        futures = [repository.submit(JobPriority.USER, self._connect, repository, start_time)
+                   for repository in repositories]
+        snapshots = [snapshot for snapshot in (future.result() for future in futures) if snapshot is not None]
+        if snapshots:
+            self._device_registry.start_hotplug_monitor(self._udev_interactor.get_supported_usb_ids())
+        return snapshots
+
+    def _connect_device(self, device_id: str) -> List[DeviceSnapshot]:
+        repository = self._device_registry.get_repository(device_id)
+        snapshot = repository.submit(JobPriority.USER, self._connect, repository, time.monotonic()).result()
+        return [snapshot] if snapshot is not None else []
+
+    def _connect(self, repository: DeviceRepository, start_time: float) -> Optional[DeviceSnapshot]:
+        description = self._device_registry.get_description(repository.device_id)
+        try:
+            if not repository.has_supported_kraken():
+                return None
+        except DeviceStallError as ex:
+            # the device has been found, but it doesn't respond: it will be connected again by the status polling
+            return DeviceSnapshot(repository.device_id, description, None, None, ex)
+        try:
+            status = repository.get_status()
+            lighting_modes = repository.get_lighting_modes()
+        except (OSError, ValueError) as ex:
+            # the device has been found, but it is not possible to talk to it (e.g. missing permissions)
+            return DeviceSnapshot(repository.device_id, description, None, None, ex)
+        _LOG.debug("First status of %s read in %.0f ms", repository.device_id, (time.monotonic() - start_time) * 1000)
+        return DeviceSnapshot(repository.device_id, description, status, lighting_modes)
@@ -16,6 +16,8 @@
 #  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
 
 import logging
+import re
+from typing import FrozenSet, Tuple
 
 from injector import singleton, inject
 
@@ -37,6 +39,7 @@ SUBSYSTEMS=="usb", ATTRS{idVendor}=="1e71", ATTRS{idProduct}=="2007", MODE="0666
 # NZXT Kraken Z (Z53, Z63 or Z73)
 SUBSYSTEMS=="usb", ATTRS{idVendor}=="1e71", ATTRS{idProduct}=="3008", MODE="0666"
 '''
+_UDEV_RULE_USB_ID = re.compile(r'ATTRS{idVendor}=="([0-9a-f]{4})", ATTRS{idProduct}=="([0-9a-f]{4})"')
 _UDEV_RULE_FILE_PATH = '/lib/udev/rules.d/60-gkraken.rules'
 _UDEV_RULE_RELOAD_COMMANDS = 'udevadm control --reload-rules ' \
                              '&& udevadm trigger --subsystem-match=usb --attr-match=idVendor=1e71 --action=add' \
@@ -49,6 +52,12 @@ class UdevInteractor:
     def __init__(self) -> None:
         pass
 
+    @staticmethod
+    def get_supported_usb_ids() -> FrozenSet[Tuple[int, int]]:
+        """the (VID, PID) of the devices the udev rule grants access to"""
+        return frozenset((int(vendor_id, 16), int(product_id, 16))
+                         for vendor_id, product_id in _UDEV_RULE_USB_ID.findall(_UDEV_RULE))
+
     @staticmethod
     def add_udev_rule() -> int:
         cmd = ['pkexec',
@@ -0,0 +1,78 @@
+#  This file is part of gkraken.
+#
+#  Copyright (c) 2021 Roberto Leinardi and Guy Boldon
+#
+#  gkraken is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  gkraken is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
+
+from dataclasses import dataclass, field
+from typing import List, Tuple, Union, Optional
+
+from gkraken.conf import LIQUID_TEMPERATURE_SOURCE
+from gkraken.model.control_tuning import ControlTuning, DEFAULT_CONTROL_TUNING
+from gkraken.model.lighting_settings import LightingSettings
+
+
+@dataclass(frozen=True)
+class SpeedProfileItem:
+    channel_value: str
+    profile_data: List[Tuple[int, int]]
+    tuning: ControlTuning = DEFAULT_CONTROL_TUNING
+    temperature_source: str = LIQUID_TEMPERATURE_SOURCE
+
+
+@dataclass(frozen=True)
+class LightingItem:
+    channel_value: str
+    mode_name: str
+    colors: List[List[int]]
+    speed: str
+    direction: str
+
+
+ApplyItem = Union[SpeedProfileItem, LightingItem]
+
+
+@dataclass(frozen=True)
+class ApplyResult:
+    item: ApplyItem
+    error: Optional[BaseException] = None
+
+    @property
+    def succeeded(self) -> bool:
+        return self.error is None
+
+
+@dataclass(frozen=True)
+class ApplyBatch:
+    """speed profiles and lighting settings to be applied to a device in a single session, in the given order"""
+    items: List[ApplyItem] = field(init=False, default_factory=list)
+
+    def add_speed_profile(self, channel_value: str, profile_data: List[Tuple[int, int]],
+                          tuning: ControlTuning = DEFAULT_CONTROL_TUNING,
+                          temperature_source: str = LIQUID_TEMPERATURE_SOURCE) -> 'ApplyBatch':
+        self.items.append(SpeedProfileItem(channel_value, profile_data, tuning, temperature_source))
+        return self
+
+    def add_lighting(self, settings: LightingSettings) -> 'ApplyBatch':
+        self.items.append(LightingItem(settings.channel.value, settings.mode.name, settings.colors.values(),
+                                       settings.speed_or_default, settings.direction_or_default))
+        return self
+
+    def add_color(self, channel_value: str, mode_name: str, colors: List[List[int]], speed: str,
+                  direction: str) -> 'ApplyBatch':
+        self.items.append(LightingItem(channel_value, mode_name, colors, speed, direction))
+        return self
+
+    def __len__(self) -> int:
+        return len(self.items)
@@ -0,0 +1,33 @@
+#  This file is part of gkraken.
+#
+#  Copyright (c) 2021 Roberto Leinardi and Guy Boldon
+#
+#  gkraken is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  gkraken is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
+
+from dataclasses import dataclass
+from enum import Enum
+
+
+class ConnectionState(Enum):
+    DISCONNECTED = 'disconnected'
+    CONNECTED = 'connected'
+    BACKING_OFF = 'backing_off'
+    FAILED = 'failed'
+    ABSENT = 'absent'  # unplugged, no connection is attempted until it is plugged back
+
+
+@dataclass(frozen=True)
+class DeviceConnectionState:
+    device_id: str
+    state: ConnectionState
@@ -0,0 +1,34 @@
+#  This file is part of gkraken.
+#
+#  Copyright (c) 2021 Roberto Leinardi and Guy Boldon
+#
+#  gkraken is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  gkraken is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
+
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class ControlTuning:
+    """How the duty of a speed profile driven by a software curve becomes fixed speed writes (see CurveEngine).
+    The duty follows the temperature only once it has risen by more than hysteresis_up °C, or dropped by more
+    than hysteresis_down °C, since the last change. The duty changes by at most max_slew_rate % per second
+    (0 for no limit) and is written only if it differs by at least min_duty_delta % from the one last written,
+    or if it's the highest duty of the curve"""
+    hysteresis_up: float = 0.5
+    hysteresis_down: float = 2.0
+    min_duty_delta: float = 2.0
+    max_slew_rate: float = 0.0
+
+
+DEFAULT_CONTROL_TUNING = ControlTuning()
@@ -18,11 +18,13 @@
 from peewee import CharField, Check, DateTimeField, SQL, SqliteDatabase, IntegerField, CompositeKey
 from playhouse.signals import Model
 
-from gkraken.di import INJECTOR
+from gkraken.conf import SHARED_DEVICE_ID
+from gkraken.core_di import INJECTOR
 from gkraken.model.lighting_settings import LightingChannel
 
 
 class CurrentLightingColor(Model):
+    device = CharField(default=SHARED_DEVICE_ID)
     channel = CharField(
         constraints=[
             Check("channel='%s' OR channel='%s'" % (LightingChannel.RING.value, LightingChannel.LOGO.value))])
@@ -33,6 +35,6 @@ class CurrentLightingColor(Model):
     timestamp = DateTimeField(constraints=[SQL('DEFAULT CURRENT_TIMESTAMP')])
 
     class Meta:
-        primary_key = CompositeKey('channel', 'index')
+        primary_key = CompositeKey('device', 'channel', 'index')
         legacy_table_names = False
         database = INJECTOR.get(SqliteDatabase)
@@ -15,16 +15,17 @@
 #  You should have received a copy of the GNU General Public License
 #  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
 
-from peewee import CharField, Check, DateTimeField, SQL, SqliteDatabase, IntegerField
+from peewee import CharField, Check, DateTimeField, SQL, SqliteDatabase, IntegerField, CompositeKey
 from playhouse.signals import Model
 
-from gkraken.di import INJECTOR
+from gkraken.conf import SHARED_DEVICE_ID
+from gkraken.core_di import INJECTOR
 from gkraken.model.lighting_settings import LightingChannel, LightingDirection
 
 
 class CurrentLightingProfile(Model):
+    device = CharField(default=SHARED_DEVICE_ID)
     channel = CharField(
-        primary_key=True,
         constraints=[
             Check("channel='%s' OR channel='%s'" % (LightingChannel.RING.value, LightingChannel.LOGO.value))])
     mode = IntegerField()
@@ -36,5 +37,6 @@ class CurrentLightingProfile(Model):
     timestamp = DateTimeField(constraints=[SQL('DEFAULT CURRENT_TIMESTAMP')])
 
     class Meta:
+        primary_key = CompositeKey('device', 'channel')
         legacy_table_names = False
         database = INJECTOR.get(SqliteDatabase)
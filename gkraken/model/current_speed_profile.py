@@ -15,20 +15,23 @@
 #  You should have received a copy of the GNU General Public License
 #  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
 
-from peewee import CharField, Check, ForeignKeyField, DateTimeField, SQL, SqliteDatabase
+from peewee import CharField, Check, ForeignKeyField, DateTimeField, SQL, SqliteDatabase, CompositeKey
 from playhouse.signals import Model
 
-from gkraken.di import INJECTOR
+from gkraken.conf import SHARED_DEVICE_ID
+from gkraken.core_di import INJECTOR
 from gkraken.model.channel_type import ChannelType
 from gkraken.model.speed_profile import SpeedProfile
 
 
 class CurrentSpeedProfile(Model):
-    channel = CharField(primary_key=True, constraints=[Check("channel='%s' OR channel='%s'"
-                                                             % (ChannelType.FAN.value, ChannelType.PUMP.value))])
-    profile = ForeignKeyField(SpeedProfile, unique=True)
+    device = CharField(default=SHARED_DEVICE_ID)
+    channel = CharField(constraints=[Check("channel='%s' OR channel='%s'"
+                                           % (ChannelType.FAN.value, ChannelType.PUMP.value))])
+    profile = ForeignKeyField(SpeedProfile)
     timestamp = DateTimeField(constraints=[SQL('DEFAULT CURRENT_TIMESTAMP')])
 
     class Meta:
+        primary_key = CompositeKey('device', 'channel')
         legacy_table_names = False
         database = INJECTOR.get(SqliteDatabase)
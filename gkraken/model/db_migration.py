@@ -0,0 +1,98 @@
+#  This file is part of gkraken.
+#
+#  Copyright (c) 2021 Roberto Leinardi and Guy Boldon
+#
+#  gkraken is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  gkraken is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
+
+import logging
+from typing import Type, Dict, Tuple, Any
+
+from peewee import SqliteDatabase, CharField, Field, FloatField
+from playhouse.migrate import SqliteMigrator, migrate
+from playhouse.signals import Model
+
+from gkraken.conf import SHARED_DEVICE_ID, LIQUID_TEMPERATURE_SOURCE
+from gkraken.model.current_lighting_color import CurrentLightingColor
+from gkraken.model.current_lighting_profile import CurrentLightingProfile
+from gkraken.model.control_tuning import DEFAULT_CONTROL_TUNING
+from gkraken.model.current_speed_profile import CurrentSpeedProfile
+from gkraken.model.speed_profile import SpeedProfile
+
+_LOG = logging.getLogger(__name__)
+
+
+def migrate_db(database: SqliteDatabase) -> None:
+    """brings the tables created by previous versions to the current schema, must be called before create_tables"""
+    _partition_by_device(database)
+    _add_missing_columns(database, SpeedProfile._meta.table_name, {  # pylint: disable=protected-access
+        'temperature_source': CharField(default=LIQUID_TEMPERATURE_SOURCE),
+        'hysteresis_up': FloatField(default=DEFAULT_CONTROL_TUNING.hysteresis_up),
+        'hysteresis_down': FloatField(default=DEFAULT_CONTROL_TUNING.hysteresis_down),
+        'min_duty_delta': FloatField(default=DEFAULT_CONTROL_TUNING.min_duty_delta),
+        'max_slew_rate': FloatField(default=DEFAULT_CONTROL_TUNING.max_slew_rate),
+    })
+
+
+def _partition_by_device(database: SqliteDatabase) -> None:
+    """adds the device column. Existing rows are assigned to SHARED_DEVICE_ID: existing speed profiles become
+    available to every device and the saved current profiles are used by every device until it saves its own"""
+    tables = database.get_tables()
+    speed_profile_table = SpeedProfile._meta.table_name  # pylint: disable=protected-access
+    if speed_profile_table in tables and not _has_device_column(database, speed_profile_table):
+        _LOG.info("Migrating table %s", speed_profile_table)
+        migrator = SqliteMigrator(database)
+        migrate(migrator.add_column(speed_profile_table, 'device', CharField(default=SHARED_DEVICE_ID)))
+    for model in (CurrentSpeedProfile, CurrentLightingProfile, CurrentLightingColor):
+        table = model._meta.table_name  # pylint: disable=protected-access
+        if table in tables and not _has_device_column(database, table):
+            _LOG.info("Migrating table %s", table)
+            # the primary key changes too, that requires to recreate the table
+            _recreate_with_device_column(database, model)
+
+
+def _add_missing_columns(database: SqliteDatabase, table: str, fields: Dict[str, Field]) -> None:
+    """adds the columns added to a table after its creation, filled with their default value"""
+    if table not in database.get_tables():
+        return
+    columns = {column.name for column in database.get_columns(table)}
+    migrator = SqliteMigrator(database)
+    operations = [migrator.add_column(table, column_name, field)
+                  for column_name, field in fields.items() if column_name not in columns]
+    if operations:
+        _LOG.info("Migrating table %s", table)
+        migrate(*operations)
+
+
+def _has_device_column(database: SqliteDatabase, table: str) -> bool:
+    return any(column.name == 'device' for column in database.get_columns(table))
+
+
+def _recreate_with_device_column(database: SqliteDatabase, model: Type[Model]) -> None:
+    table = model._meta.table_name  # pylint: disable=protected-access
+    old_table = f'{table}_old'
+    with database.atomic():
+        _execute_sql(database, f'ALTER TABLE "{table}" RENAME TO "{old_table}"')
+        # the indexes keep their name when the table is renamed and would prevent creating the new ones
+        for index in database.get_indexes(old_table):
+            if not index.name.startswith('sqlite_autoindex_'):
+                _execute_sql(database, f'DROP INDEX "{index.name}"')
+        columns = ', '.join(f'"{column.name}"' for column in database.get_columns(old_table))
+        database.create_tables([model])
+        _execute_sql(database, f'INSERT INTO "{table}" ("device", {columns}) SELECT ?, {columns} FROM "{old_table}"',
+                     (SHARED_DEVICE_ID,))
+        _execute_sql(database, f'DROP TABLE "{old_table}"')
+
+
+def _execute_sql(database: SqliteDatabase, sql: str, params: Tuple[Any, ...] = ()) -> None:
+    database.execute_sql(sql, params)  # type: ignore[no-untyped-call]
@@ -0,0 +1,68 @@
+#  This file is part of gkraken.
+#
+#  Copyright (c) 2021 Roberto Leinardi and Guy Boldon
+#
+#  gkraken is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  gkraken is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from peewee import prefetch
+
+from gkraken.conf import SHARED_DEVICE_ID
+from gkraken.model.current_lighting_color import CurrentLightingColor
+from gkraken.model.current_lighting_profile import CurrentLightingProfile
+from gkraken.model.current_speed_profile import CurrentSpeedProfile
+from gkraken.model.speed_profile import SpeedProfile
+from gkraken.model.speed_step import SpeedStep
+
+
+@dataclass(frozen=True)
+class SavedSettings:
+    """The speed profiles and the lighting saved for all the devices, read at once (e.g. while the devices are
+    being connected). The steps of the speed profiles are already loaded.
+    Like the presenters, the settings saved before multi-device support are used for the devices without their own"""
+    speed_profiles: List[SpeedProfile]
+    current_speed_profiles: Dict[Tuple[str, str], SpeedProfile]
+    lighting_profiles: Dict[Tuple[str, str], CurrentLightingProfile]
+    lighting_colors: Dict[Tuple[str, str], List[CurrentLightingColor]]
+
+    @classmethod
+    def load(cls) -> 'SavedSettings':
+        speed_profiles = list(prefetch(SpeedProfile.select(), SpeedStep.select()))
+        profiles_by_id = {profile.id: profile for profile in speed_profiles}
+        # pylint: disable=not-an-iterable
+        current_speed_profiles = {(current.device, current.channel): profiles_by_id[current.profile_id]
+                                  for current in CurrentSpeedProfile.select()
+                                  if current.profile_id in profiles_by_id}
+        lighting_profiles = {(profile.device, profile.channel): profile for profile in CurrentLightingProfile.select()}
+        lighting_colors: Dict[Tuple[str, str], List[CurrentLightingColor]] = {}
+        for color in CurrentLightingColor.select().order_by(CurrentLightingColor.index):
+            lighting_colors.setdefault((color.device, color.channel), []).append(color)
+        return cls(speed_profiles, current_speed_profiles, lighting_profiles, lighting_colors)
+
+    def get_profile_list(self, device_id: str, channel_value: str) -> List[Tuple[int, str]]:
+        return [(p.id, p.name) for p in self.speed_profiles
+                if p.channel == channel_value and p.device in (SHARED_DEVICE_ID, device_id)]
+
+    def get_current_speed_profile(self, device_id: str, channel_value: str) -> Optional[SpeedProfile]:
+        return self.current_speed_profiles.get((device_id, channel_value),
+                                               self.current_speed_profiles.get((SHARED_DEVICE_ID, channel_value)))
+
+    def get_lighting_profile(self, device_id: str, channel_value: str
+                             ) -> Tuple[Optional[CurrentLightingProfile], List[CurrentLightingColor]]:
+        key = (device_id, channel_value)
+        if key not in self.lighting_profiles:
+            key = (SHARED_DEVICE_ID, channel_value)
+        return self.lighting_profiles.get(key), self.lighting_colors.get(key, [])
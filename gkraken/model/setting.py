@@ -15,10 +15,17 @@
 #  You should have received a copy of the GNU General Public License
 #  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
 
+import logging
+from typing import Any
+
 from peewee import CharField, BlobField, SqliteDatabase
-from playhouse.signals import Model
+from playhouse.signals import Model, post_save
+
+from gkraken.core_di import INJECTOR, SettingChangedSubject
+from gkraken.model.db_change import DbChange
 
-from gkraken.di import INJECTOR
+_LOG = logging.getLogger(__name__)
+SETTING_CHANGED_SUBJECT = INJECTOR.get(SettingChangedSubject)
 
 
 class Setting(Model):
@@ -28,3 +35,9 @@ class Setting(Model):
     class Meta:
         legacy_table_names = False
         database = INJECTOR.get(SqliteDatabase)
+
+
+@post_save(sender=Setting)
+def on_setting_saved(_: Any, setting: Setting, created: bool) -> None:
+    _LOG.debug("Setting %s saved", setting.key)
+    SETTING_CHANGED_SUBJECT.on_next(DbChange(setting, DbChange.INSERT if created else DbChange.UPDATE))
@@ -18,12 +18,14 @@
 import logging
 from typing import Any
 
-from peewee import CharField, Check, BooleanField, DateTimeField, SQL, SqliteDatabase
+from peewee import CharField, Check, BooleanField, DateTimeField, SQL, SqliteDatabase, FloatField
 from playhouse.signals import Model, post_save, post_delete
 from playhouse.sqlite_ext import AutoIncrementField
 
-from gkraken.di import INJECTOR, SpeedProfileChangedSubject
+from gkraken.conf import SHARED_DEVICE_ID, LIQUID_TEMPERATURE_SOURCE
+from gkraken.core_di import INJECTOR, SpeedProfileChangedSubject
 from gkraken.model.channel_type import ChannelType
+from gkraken.model.control_tuning import ControlTuning, DEFAULT_CONTROL_TUNING
 from gkraken.model.db_change import DbChange
 
 _LOG = logging.getLogger(__name__)
@@ -32,17 +34,29 @@ SPEED_PROFILE_CHANGED_SUBJECT = INJECTOR.get(SpeedProfileChangedSubject)
 
 class SpeedProfile(Model):
     id = AutoIncrementField()
+    device = CharField(default=SHARED_DEVICE_ID)
     channel = CharField(constraints=[Check("channel='%s' OR channel='%s'"
                                            % (ChannelType.FAN.value, ChannelType.PUMP.value))])
     name = CharField()
     read_only = BooleanField(default=False)
     single_step = BooleanField(default=False)
     timestamp = DateTimeField(constraints=[SQL('DEFAULT CURRENT_TIMESTAMP')])
+    # the liquid, or a hwmon sensor driving the profile with a software curve
+    temperature_source = CharField(default=LIQUID_TEMPERATURE_SOURCE)
+    # the tuning of the software curve, when the profile is driven by one
+    hysteresis_up = FloatField(default=DEFAULT_CONTROL_TUNING.hysteresis_up)
+    hysteresis_down = FloatField(default=DEFAULT_CONTROL_TUNING.hysteresis_down)
+    min_duty_delta = FloatField(default=DEFAULT_CONTROL_TUNING.min_duty_delta)
+    max_slew_rate = FloatField(default=DEFAULT_CONTROL_TUNING.max_slew_rate)
 
     class Meta:
         legacy_table_names = False
         database = INJECTOR.get(SqliteDatabase)
 
+    @property
+    def control_tuning(self) -> ControlTuning:
+        return ControlTuning(self.hysteresis_up, self.hysteresis_down, self.min_duty_delta, self.max_slew_rate)
+
 
 @post_save(sender=SpeedProfile)
 def on_speed_profile_added(_: Any, profile: SpeedProfile, created: bool) -> None:
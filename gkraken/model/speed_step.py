@@ -21,7 +21,7 @@ from typing import Any
 from peewee import ForeignKeyField, IntegerField, DateTimeField, SQL, SqliteDatabase
 from playhouse.signals import Model, post_save, post_delete
 
-from gkraken.di import INJECTOR, SpeedStepChangedSubject
+from gkraken.core_di import INJECTOR, SpeedStepChangedSubject
 from gkraken.model.db_change import DbChange
 from gkraken.model.speed_profile import SpeedProfile
 
@@ -31,6 +31,7 @@ class Status:
     pump_rpm: Optional[int] = None
     pump_duty: Optional[float] = None
     device_description: str = ''
+    device_id: str = ''
 
     def with_fan_duty(self, fan_duty: float) -> 'Status':
         return Status(
@@ -41,7 +42,8 @@ class Status:
             fan_duty,
             self.pump_rpm,
             self.pump_duty,
-            self.device_description
+            self.device_description,
+            self.device_id
         )
 
     def with_pump_duty(self, pump_duty: float) -> 'Status':
@@ -53,5 +55,6 @@ class Status:
             self.fan_duty,
             self.pump_rpm,
             pump_duty,
-            self.device_description
+            self.device_description,
+            self.device_id
         )
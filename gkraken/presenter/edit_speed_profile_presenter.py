@@ -16,13 +16,15 @@
 #  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
 
 import logging
-from typing import Optional, Any
+from typing import Optional, Any, Dict
 
 from gi.repository import Gtk
 from injector import singleton, inject
 
-from gkraken.conf import MIN_TEMP, PUMP_MIN_DUTY, FAN_MIN_DUTY
+from gkraken.conf import MIN_TEMP, PUMP_MIN_DUTY, FAN_MIN_DUTY, SHARED_DEVICE_ID
+from gkraken.interactor.get_temperature_sources_interactor import GetTemperatureSourcesInteractor
 from gkraken.model import SpeedProfile, ChannelType, SpeedStep
+from gkraken.model.control_tuning import ControlTuning
 from gkraken.util.view import hide_on_delete
 
 _LOG = logging.getLogger(__name__)
@@ -44,6 +46,15 @@ class EditSpeedProfileViewInterface:
     def get_duty(self) -> int:
         raise NotImplementedError()
 
+    def get_control_tuning(self) -> ControlTuning:
+        raise NotImplementedError()
+
+    def set_temperature_sources(self, sources: Dict[str, str]) -> None:
+        raise NotImplementedError()
+
+    def get_temperature_source(self) -> str:
+        raise NotImplementedError()
+
     def has_a_step_selected(self) -> bool:
         raise NotImplementedError()
 
@@ -57,31 +68,47 @@ class EditSpeedProfileViewInterface:
 @singleton
 class EditSpeedProfilePresenter:
     @inject
-    def __init__(self) -> None:
+    def __init__(self,
+                 get_temperature_sources_interactor: GetTemperatureSourcesInteractor,
+                 ) -> None:
         _LOG.debug("init EditSpeedProfilePresenter ")
+        self._get_temperature_sources_interactor = get_temperature_sources_interactor
         self.view: EditSpeedProfileViewInterface = EditSpeedProfileViewInterface()
         self._profile = SpeedProfile()
         self._selected_step: Optional[SpeedStep] = None
         self._channel_name: str = ""
 
-    def show_add(self, channel: ChannelType) -> None:
+    def show_add(self, channel: ChannelType, device_id: str = SHARED_DEVICE_ID) -> None:
         self._channel_name = channel.value
         profile = SpeedProfile()
         profile.name = 'New profile'
         profile.channel = channel.value
+        profile.device = device_id
         profile.save()
         self.show_edit(profile)
 
     def show_edit(self, profile: SpeedProfile) -> None:
         self._channel_name = profile.channel
         self._profile = profile
+        sources = self._get_temperature_sources_interactor.execute()
+        # e.g. the module of the sensor has not been loaded
+        sources.setdefault(profile.temperature_source, f'{profile.temperature_source} (not found)')
+        self.view.set_temperature_sources(sources)
         self.view.show(profile)
 
     def on_dialog_delete_event(self, widget: Gtk.Widget, *_: Any) -> Any:
         if self._profile is not None:
             name = self.view.get_profile_name()
-            if name != self._profile.name:
+            tuning = self.view.get_control_tuning()
+            temperature_source = self.view.get_temperature_source()
+            if name != self._profile.name or tuning != self._profile.control_tuning \
+                    or temperature_source != self._profile.temperature_source:
                 self._profile.name = name
+                self._profile.temperature_source = temperature_source
+                self._profile.hysteresis_up = tuning.hysteresis_up
+                self._profile.hysteresis_down = tuning.hysteresis_down
+                self._profile.min_duty_delta = tuning.min_duty_delta
+                self._profile.max_slew_rate = tuning.max_slew_rate
                 self._profile.save()
         return hide_on_delete(widget)
 
@@ -25,6 +25,7 @@ from rx.disposable import CompositeDisposable
 from rx.scheduler import ThreadPoolScheduler
 from rx.scheduler.mainloop import GtkScheduler
 
+from gkraken.conf import SHARED_DEVICE_ID
 from gkraken.interactor.get_lighting_modes_interactor import GetLightingModesInteractor
 from gkraken.interactor.set_lighting_interactor import SetLightingInteractor
 from gkraken.interactor.settings_interactor import SettingsInteractor
@@ -34,6 +35,7 @@ from gkraken.model.lighting_modes import LightingModes
 from gkraken.model.lighting_settings import LightingColors, LightingSettings, LightingColor, LightingChannel, \
     LightingDirection
 from gkraken.model.lighting_speeds import LightingSpeeds
+from gkraken.model.saved_settings import SavedSettings
 from gkraken.presenter.scheduler import Scheduler
 from gkraken.view.lighting_view_interface import LightingViewInterface
 
@@ -59,19 +61,56 @@ class LightingPresenter:
         self._scheduler: ThreadPoolScheduler = scheduler.get()
         self._loading_logo_spin_button_override: Optional[int] = None
         self._loading_ring_spin_button_override: Optional[int] = None
+        self._device_id: str = SHARED_DEVICE_ID
 
-    def load_lighting_modes(self) -> None:
+    def load_lighting_modes(self, device_id: str) -> None:
+        """shows the lighting of the given device"""
+        self._device_id = device_id
         self._composite_disposable.add(
             self._get_lighting_modes().subscribe(
                 on_next=self._initialize_lighting_modes,
                 on_error=lambda e: _LOG.exception("Lighting error: %s", str(e))))
 
+    def show_lighting_modes(self, device_id: str, lighting_modes: LightingModes) -> None:
+        """shows the lighting of the given device, whose lighting modes are already known"""
+        self._device_id = device_id
+        self._initialize_lighting_modes(lighting_modes)
+
+    def get_lighting_to_restore(self, device_id: str, lighting_modes: Optional[LightingModes],
+                                saved: SavedSettings) -> List[LightingSettings]:
+        """the saved lighting settings of the device, empty if they are not to be restored"""
+        if lighting_modes is None or not self._settings_interactor.get_bool('settings_load_last_profile'):
+            return []
+        return self._get_saved_lighting_settings(device_id, lighting_modes, saved)
+
+    def on_lighting_applied(self, device_id: str, settings: LightingSettings) -> None:
+        self._save_current_lighting_profile(device_id, settings)
+        self._save_current_lighting_colors(device_id, settings)
+        if device_id == self._device_id:
+            self.view.set_statusbar_text('Lighting applied')
+
+    def _get_saved_lighting_settings(self, device_id: str, lighting_modes: LightingModes,
+                                     saved: SavedSettings) -> List[LightingSettings]:
+        saved_settings = []
+        for channel in LightingChannel:
+            profile, current_colors = saved.get_lighting_profile(device_id, channel.value)
+            modes = lighting_modes.modes_logo if channel is LightingChannel.LOGO else lighting_modes.modes_ring
+            if profile and profile.mode in modes:
+                lighting_mode = modes[profile.mode]
+                colors = self._convert_current_colors_to_lighting_colors(current_colors) \
+                    if lighting_mode.max_colors > 0 else LightingColors().add(LightingColor())
+                speed = LightingSpeeds().get(profile.speed) if lighting_mode.speed_enabled else None
+                direction = LightingDirection.from_str(profile.direction) if lighting_mode.direction_enabled else None
+                saved_settings.append(LightingSettings(channel, lighting_mode, colors, speed, direction))
+        return saved_settings
+
     def _initialize_lighting_modes(self, lighting_modes: LightingModes) -> None:
         self.view.load_color_modes(lighting_modes)
         self._load_current_lighting_modes()
 
-    def _get_lighting_modes(self) -> Observable:
+    def _get_lighting_modes(self, device_id: Optional[str] = None) -> Observable:
         return self._get_lighting_modes_interactor.execute(
+            self._device_id if device_id is None else device_id
         ).pipe(
             operators.subscribe_on(self._scheduler),
             operators.observe_on(GtkScheduler(GLib)),
@@ -79,32 +118,40 @@ class LightingPresenter:
 
     def _load_current_lighting_modes(self) -> None:
         if self._settings_interactor.get_bool('settings_load_last_profile'):
-            logo_profile, logo_colors = self._get_current_lighting_profiles(LightingChannel.LOGO)
+            logo_profile, logo_colors = self._get_current_lighting_profiles(self._device_id, LightingChannel.LOGO)
             if logo_profile:
                 _LOG.debug("Found saved Lighting Logo Profile: %s, mode: %s, speed: %s, direction: %s, with %s colors",
                            logo_profile, logo_profile.mode, logo_profile.speed, logo_profile.direction,
                            len(logo_colors))
                 self._set_lighting_logo_widgets(logo_profile, logo_colors)
 
-            ring_profile, ring_colors = self._get_current_lighting_profiles(LightingChannel.RING)
+            ring_profile, ring_colors = self._get_current_lighting_profiles(self._device_id, LightingChannel.RING)
             if ring_profile:
                 _LOG.debug("Found saved Lighting Ring Profile: %s, mode: %s, speed: %s, direction: %s, with %s colors",
                            ring_profile, ring_profile.mode, ring_profile.speed, ring_profile.direction,
                            len(ring_colors))
                 self._set_lighting_ring_widgets(ring_profile, ring_colors)
-            if logo_profile or ring_profile:
-                self.on_lighting_apply_button_clicked()
 
-    @staticmethod
-    def _get_current_lighting_profiles(channel: LightingChannel
+    @classmethod
+    def _get_current_lighting_profiles(cls, device_id: str, channel: LightingChannel
                                        ) -> Tuple[Optional[CurrentLightingProfile], List[CurrentLightingColor]]:
+        """the lighting saved for the device, or the one saved before multi-device support if there is none"""
+        profile, colors = cls._get_saved_lighting_profiles(device_id, channel)
+        if profile is None and device_id != SHARED_DEVICE_ID:
+            profile, colors = cls._get_saved_lighting_profiles(SHARED_DEVICE_ID, channel)
+        return profile, colors
+
+    @staticmethod
+    def _get_saved_lighting_profiles(device_id: str, channel: LightingChannel
+                                     ) -> Tuple[Optional[CurrentLightingProfile], List[CurrentLightingColor]]:
         profile: Optional[CurrentLightingProfile] = CurrentLightingProfile.get_or_none(
+            device=device_id,
             channel=channel.value
         )
 
         colors: List[CurrentLightingColor] = CurrentLightingColor.select(
         ).where(
-            CurrentLightingColor.channel == channel.value
+            (CurrentLightingColor.device == device_id) & (CurrentLightingColor.channel == channel.value)
         ).order_by(
             CurrentLightingColor.index
         )
@@ -172,12 +219,15 @@ class LightingPresenter:
         self.view.set_statusbar_text('Error applying Lighting')
 
     def _set_lighting(self, lighting_modes: LightingModes) -> None:
-        logo_mode_id = self.view.get_logo_mode_id()
-        self._set_lighting_logo(logo_mode_id, lighting_modes)
-        ring_mode_id = self.view.get_ring_mode_id()
-        self._set_lighting_ring(ring_mode_id, lighting_modes)
+        """applies the logo and the ring lighting, each with its own job: a newer apply of a channel replaces the one
+        still queued"""
+        logo_settings = self._get_lighting_logo_settings(self.view.get_logo_mode_id(), lighting_modes)
+        ring_settings = self._get_lighting_ring_settings(self.view.get_ring_mode_id(), lighting_modes)
+        for settings in (logo_settings, ring_settings):
+            if settings:
+                self._schedule_lighting_setting(self._device_id, settings)
 
-    def _set_lighting_logo(self, mode_id: int, lighting_modes: LightingModes) -> None:
+    def _get_lighting_logo_settings(self, mode_id: int, lighting_modes: LightingModes) -> Optional[LightingSettings]:
         lighting_mode = lighting_modes.modes_logo[mode_id] if mode_id > 0 else None
         if lighting_mode:
             number_of_selected_colors = self.view.get_lighting_logo_spin_button()
@@ -191,8 +241,8 @@ class LightingPresenter:
                 speed = None
             direction = self.view.get_lighting_logo_direction() \
                 if lighting_mode.direction_enabled else None
-            settings = LightingSettings.create_logo_settings(lighting_mode, colors, speed, direction)
-            self._schedule_lighting_setting(settings)
+            return LightingSettings.create_logo_settings(lighting_mode, colors, speed, direction)
+        return None
 
     def on_lighting_logo_colors_spinbutton_changed(self, spinbutton: Any) -> None:
         self.view.set_lighting_logo_color_buttons_enabled(
@@ -226,7 +276,7 @@ class LightingPresenter:
             spinbutton.get_value_as_int()
         )
 
-    def _set_lighting_ring(self, mode_id: int, lighting_modes: LightingModes) -> None:
+    def _get_lighting_ring_settings(self, mode_id: int, lighting_modes: LightingModes) -> Optional[LightingSettings]:
         lighting_mode = lighting_modes.modes_ring[mode_id] if mode_id > 0 else None
         if lighting_mode:
             number_of_selected_colors = self.view.get_lighting_ring_spin_button()
@@ -240,29 +290,24 @@ class LightingPresenter:
                 speed = None
             direction = self.view.get_lighting_ring_direction() \
                 if lighting_mode.direction_enabled else None
-            settings = LightingSettings.create_ring_settings(lighting_mode, colors, speed, direction)
-            self._schedule_lighting_setting(settings)
+            return LightingSettings.create_ring_settings(lighting_mode, colors, speed, direction)
+        return None
 
-    def _schedule_lighting_setting(self, settings: LightingSettings) -> None:
-        _LOG.info("Setting lighting: [ Channel: %s, Mode: %s, Speed: %s, Direction: %s, Colors: %s ]",
-                  settings.channel.value, settings.mode.name, settings.speed_or_default,
+    def _schedule_lighting_setting(self, device_id: str, settings: LightingSettings) -> None:
+        _LOG.info("Setting lighting of %s: [ Channel: %s, Mode: %s, Speed: %s, Direction: %s, Colors: %s ]",
+                  device_id, settings.channel.value, settings.mode.name, settings.speed_or_default,
                   settings.direction_or_default, settings.colors.values())
         self._composite_disposable.add(
             self._set_lighting_interactor.execute(
-                settings
+                device_id, settings
             ).pipe(
                 operators.subscribe_on(self._scheduler),
                 operators.observe_on(GtkScheduler(GLib)),
-            ).subscribe(on_next=lambda _: self._on_lighting_setting_complete(settings),
-                        on_error=lambda e: _LOG.exception("Lighting apply error: %s", str(e))))
-
-    def _on_lighting_setting_complete(self, settings: LightingSettings) -> None:
-        self._save_current_lighting_profile(settings)
-        self._save_current_lighting_colors(settings)
-        self.view.set_statusbar_text('Lighting applied')
+            ).subscribe(on_next=lambda _: self.on_lighting_applied(device_id, settings),
+                        on_error=self._on_lighting_apply_error))
 
-    def _save_current_lighting_profile(self, settings: LightingSettings) -> None:
-        profile, _ = self._get_current_lighting_profiles(settings.channel)
+    def _save_current_lighting_profile(self, device_id: str, settings: LightingSettings) -> None:
+        profile, _ = self._get_saved_lighting_profiles(device_id, settings.channel)
         if profile:
             profile.mode = settings.mode.mode_id
             profile.speed = settings.speed_id_or_default
@@ -270,6 +315,7 @@ class LightingPresenter:
             profile.save()
         else:
             CurrentLightingProfile.create(
+                device=device_id,
                 channel=settings.channel.value,
                 mode=settings.mode.mode_id,
                 speed=settings.speed_id_or_default,
@@ -277,13 +323,14 @@ class LightingPresenter:
             )
 
     @staticmethod
-    def _save_current_lighting_colors(settings: LightingSettings) -> None:
+    def _save_current_lighting_colors(device_id: str, settings: LightingSettings) -> None:
         CurrentLightingColor.delete().where(
-            CurrentLightingColor.channel == settings.channel.value
+            (CurrentLightingColor.device == device_id) & (CurrentLightingColor.channel == settings.channel.value)
         ).execute()
         if settings.mode.max_colors > 0:
             for index, lighting_color in enumerate(settings.colors.colors):
                 CurrentLightingColor.create(
+                    device=device_id,
                     channel=settings.channel.value,
                     index=index,
                     red=lighting_color.red,
@@ -17,44 +17,59 @@
 
 
 import logging
-from typing import Optional, Any, List, Tuple, Dict, Callable
+import time
+from functools import partial
+from typing import Optional, Any, List, Tuple, Dict, Callable, Set
 
 import rx
 from gi.repository import GLib
 from injector import inject, singleton
 from rx import Observable, operators
-from rx.disposable import CompositeDisposable
+from rx.disposable import CompositeDisposable, SerialDisposable, Disposable
 from rx.scheduler.mainloop import GtkScheduler
 
-from gkraken.conf import APP_PACKAGE_NAME, APP_NAME, APP_SOURCE_URL, APP_VERSION, APP_ID, APP_SUPPORTED_MODELS
+from gkraken.conf import APP_PACKAGE_NAME, APP_NAME, APP_SOURCE_URL, APP_VERSION, APP_ID, APP_SUPPORTED_MODELS, \
+    SHARED_DEVICE_ID, LIQUID_TEMPERATURE_SOURCE
+from gkraken.core_di import SpeedProfileChangedSubject, SpeedStepChangedSubject, ConnectionStateChangedSubject, \
+    SettingChangedSubject, SessionStateChangedSubject, DeviceAddedSubject
 from gkraken.device.settings_kraken_2 import SettingsKraken2
-from gkraken.device.settings_kraken_legacy import SettingsKrakenLegacy
-from gkraken.di import SpeedProfileChangedSubject, SpeedStepChangedSubject
+from gkraken.error.device_stall_error import DeviceStallError
 from gkraken.error.legacy_kraken_warning import LegacyKrakenWarning
+from gkraken.interactor.apply_batch_interactor import ApplyBatchInteractor
 from gkraken.interactor.check_new_version_interactor import CheckNewVersionInteractor
 from gkraken.interactor.get_status_interactor import GetStatusInteractor
-from gkraken.interactor.has_supported_kraken_interactor import HasSupportedKrakenInteractor
+from gkraken.interactor.session_interactor import SessionInteractor
 from gkraken.interactor.set_speed_profile_interactor import SetSpeedProfileInteractor
 from gkraken.interactor.settings_interactor import SettingsInteractor
+from gkraken.interactor.startup_interactor import StartupInteractor, DeviceSnapshot
+from gkraken.model.apply_batch import ApplyBatch, ApplyResult
 from gkraken.model.channel_type import ChannelType
+from gkraken.model.connection_state import ConnectionState, DeviceConnectionState
 from gkraken.model.current_speed_profile import CurrentSpeedProfile
 from gkraken.model.db_change import DbChange
+from gkraken.model.lighting_settings import LightingSettings
+from gkraken.model.saved_settings import SavedSettings
+from gkraken.model.session_state import SessionState
 from gkraken.model.speed_profile import SpeedProfile
 from gkraken.model.speed_step import SpeedStep
 from gkraken.model.status import Status
 from gkraken.presenter.edit_speed_profile_presenter import EditSpeedProfilePresenter
 from gkraken.presenter.lighting_presenter import LightingPresenter
 from gkraken.presenter.preferences_presenter import PreferencesPresenter
-from gkraken.presenter.scheduler import Scheduler
+from gkraken.presenter.scheduler import Scheduler, MainLoopScheduler
+from gkraken.util.adaptive_interval import AdaptiveInterval
 from gkraken.util.deployment import is_flatpak
+from gkraken.util.duty_lookup_table import DutyLookupTable
+from gkraken.util.poller import Poller
 from gkraken.util.view import open_uri, get_default_application
 from gkraken.view.main_view_interface import MainViewInterface
 
 _LOG = logging.getLogger(__name__)
 _ADD_NEW_PROFILE_INDEX = -10
+_REFRESH_INTERVAL_SETTINGS = ('settings_refresh_interval', 'settings_max_refresh_interval')
 
 
-# pylint: disable=too-many-public-methods
+# pylint: disable=too-many-public-methods,too-many-locals
 @singleton
 class MainPresenter:
     @inject
@@ -62,15 +77,22 @@ class MainPresenter:
                  edit_speed_profile_presenter: EditSpeedProfilePresenter,
                  preferences_presenter: PreferencesPresenter,
                  lighting_presenter: LightingPresenter,
-                 has_supported_kraken_interactor: HasSupportedKrakenInteractor,
+                 startup_interactor: StartupInteractor,
                  get_status_interactor: GetStatusInteractor,
                  set_speed_profile_interactor: SetSpeedProfileInteractor,
+                 apply_batch_interactor: ApplyBatchInteractor,
+                 session_interactor: SessionInteractor,
                  settings_interactor: SettingsInteractor,
                  check_new_version_interactor: CheckNewVersionInteractor,
                  speed_profile_changed_subject: SpeedProfileChangedSubject,
                  speed_step_changed_subject: SpeedStepChangedSubject,
+                 connection_state_changed_subject: ConnectionStateChangedSubject,
+                 setting_changed_subject: SettingChangedSubject,
+                 session_state_changed_subject: SessionStateChangedSubject,
+                 device_added_subject: DeviceAddedSubject,
                  composite_disposable: CompositeDisposable,
                  scheduler: Scheduler,
+                 main_loop_scheduler: MainLoopScheduler,
                  ) -> None:
         _LOG.debug("init MainPresenter ")
         self.main_view: MainViewInterface = MainViewInterface()
@@ -78,30 +100,49 @@ class MainPresenter:
         self._preferences_presenter = preferences_presenter
         self._lighting_presenter: LightingPresenter = lighting_presenter
         self._scheduler = scheduler.get()
-        self._has_supported_kraken_interactor = has_supported_kraken_interactor
+        self._main_loop_scheduler = main_loop_scheduler
+        self._startup_interactor = startup_interactor
         self._get_status_interactor: GetStatusInteractor = get_status_interactor
         self._set_speed_profile_interactor: SetSpeedProfileInteractor = set_speed_profile_interactor
+        self._apply_batch_interactor: ApplyBatchInteractor = apply_batch_interactor
+        self._session_interactor = session_interactor
         self._settings_interactor = settings_interactor
         self._check_new_version_interactor = check_new_version_interactor
         self._speed_profile_changed_subject = speed_profile_changed_subject
         self._speed_step_changed_subject = speed_step_changed_subject
+        self._connection_state_changed_subject = connection_state_changed_subject
+        self._setting_changed_subject = setting_changed_subject
+        self._session_state_changed_subject = session_state_changed_subject
+        self._device_added_subject = device_added_subject
         self._composite_disposable: CompositeDisposable = composite_disposable
+        self._status_pollers: Dict[str, Poller] = {}
+        self._status_poll_disposables: Dict[str, SerialDisposable] = {}
+        self._poll_intervals: Dict[str, AdaptiveInterval] = {}
+        self._window_visible: bool = True
+        self._session_idle: bool = False
+        self._sleeping: bool = False
+        self._absent_devices: Set[str] = set()
+        self._devices: List[Tuple[str, str]] = []
+        self._selected_device_id: str = SHARED_DEVICE_ID
+        self._last_status: Dict[str, Status] = {}
+        self._writes_avoided_shown: Dict[str, int] = {}
         self._profile_selected: Dict[str, SpeedProfile] = {}
-        self._should_update_fan_speed: bool = False
-        self._should_update_pump_speed: bool = False
+        self._should_update_fan_speed: Dict[str, bool] = {}
+        self._should_update_pump_speed: Dict[str, bool] = {}
+        # (profile id, table) of the speed profile applied to each (device, channel), None if there is no profile.
+        # The table is None for a profile following a hwmon sensor, so that editing the profile still invalidates it
+        self._duty_tables: Dict[Tuple[str, str], Optional[Tuple[int, Optional[DutyLookupTable]]]] = {}
         self._legacy_firmware_dialog_shown: bool = False
         self.application_quit: Callable = lambda *args: None  # will be set by the Application
         self._critical_error_occurred: bool = False  # to handle multiple startup errors
-        self._startup_process_can_continue: bool = True
 
     def on_start(self) -> None:
         self._register_db_listeners()
+        self._register_connection_state_listener()
+        self._register_session_state_listener()
+        self._register_device_added_listener()
+        self._session_interactor.start()
         self._check_supported_kraken()
-        if self._startup_process_can_continue:
-            self._load_lighting_modes()
-            self._refresh_speed_profiles(True)
-            if self._settings_interactor.get_int('settings_check_new_version'):
-                self._check_new_version()
 
     def on_application_window_delete_event(self, *_: Any) -> bool:
         if self._settings_interactor.get_int('settings_minimize_to_tray'):
@@ -109,37 +150,215 @@ class MainPresenter:
             return True
         return False
 
+    def on_application_window_visible_notify(self, window: Any, *_: Any) -> None:
+        visible = window.get_visible()
+        if visible == self._window_visible:
+            return
+        _LOG.debug("Main window %s", "shown" if visible else "hidden")
+        self._window_visible = visible
+        for poll_interval in self._poll_intervals.values():
+            poll_interval.set_window_visible(visible)
+        if visible:
+            # don't wait the relaxed interval to show fresh values
+            self._restart_refresh()
+
     def _register_db_listeners(self) -> None:
         self._speed_profile_changed_subject.subscribe(on_next=self._on_speed_profile_list_changed,
                                                       on_error=lambda e: _LOG.exception("Db signal error: %s", str(e)))
         self._speed_step_changed_subject.subscribe(on_next=self._on_speed_step_list_changed,
                                                    on_error=lambda e: _LOG.exception("Db signal error: %s", str(e)))
+        self._setting_changed_subject.subscribe(on_next=self._on_setting_changed,
+                                                on_error=lambda e: _LOG.exception("Db signal error: %s", str(e)))
+
+    def _register_connection_state_listener(self) -> None:
+        self._composite_disposable.add(self._connection_state_changed_subject.pipe(
+            operators.observe_on(GtkScheduler(GLib)),
+        ).subscribe(on_next=self._on_connection_state_changed,
+                    on_error=lambda e: _LOG.exception("Connection state error: %s", str(e))))
+
+    def _register_session_state_listener(self) -> None:
+        self._composite_disposable.add(self._session_state_changed_subject.pipe(
+            operators.observe_on(GtkScheduler(GLib)),
+        ).subscribe(on_next=self._on_session_state_changed,
+                    on_error=lambda e: _LOG.exception("Session state error: %s", str(e))))
+
+    def _register_device_added_listener(self) -> None:
+        self._composite_disposable.add(self._device_added_subject.pipe(
+            operators.observe_on(GtkScheduler(GLib)),
+        ).subscribe(on_next=self._on_device_added,
+                    on_error=lambda e: _LOG.exception("Device added error: %s", str(e))))
+
+    def _on_device_added(self, device_id: str) -> None:
+        """a device plugged in after the startup: it is connected and shown like the ones found at startup"""
+        self._composite_disposable.add(
+            rx.zip(
+                self._startup_interactor.connect_device(device_id).pipe(operators.subscribe_on(self._scheduler)),
+                rx.from_callable(SavedSettings.load).pipe(operators.subscribe_on(self._scheduler)),
+            ).pipe(
+                operators.observe_on(GtkScheduler(GLib)),
+            ).subscribe(on_next=lambda result: self._on_device_connected(result[0], result[1]),
+                        on_error=self._handle_refresh_error))
+
+    def _on_device_connected(self, snapshots: List[DeviceSnapshot], saved: SavedSettings) -> None:
+        known_device_ids = {device_id for device_id, _ in self._devices}
+        for snapshot in snapshots:
+            if snapshot.device_id in known_device_ids:
+                continue
+            if snapshot.error is not None and not isinstance(snapshot.error, DeviceStallError):
+                # unlike at startup, the devices already shown keep working: no reason to quit
+                _LOG.error("Unable to connect to %s: %s", snapshot.description, snapshot.error)
+                self.main_view.set_statusbar_text(f'Unable to connect to the {snapshot.description}')
+                continue
+            _LOG.info("%s plugged in", snapshot.description)
+            self._devices.append((snapshot.device_id, snapshot.description))
+            selected_index = next((index for index, (device_id, _) in enumerate(self._devices)
+                                   if device_id == self._selected_device_id), 0)
+            self.main_view.refresh_device_combobox(self._devices, selected_index)
+            self.main_view.set_statusbar_text(f'{snapshot.description} plugged in')
+            self._show_device(snapshot, saved)
+
+    def _on_session_state_changed(self, state: SessionState) -> None:
+        if state == SessionState.SLEEPING:
+            # the devices are released and nothing is polled until the system resumes
+            self._sleeping = True
+            for device_id in self._status_pollers:
+                self._stop_refresh(device_id)
+            self._composite_disposable.add(self._session_interactor.prepare_for_sleep().pipe(
+                operators.subscribe_on(self._scheduler),
+            ).subscribe(on_error=lambda e: _LOG.exception("Sleep preparation error: %s", str(e))))
+        elif state == SessionState.RESUMED:
+            self._sleeping = False
+            self._restore_after_resume()
+        elif state in (SessionState.IDLE, SessionState.ACTIVE):
+            self._session_idle = state == SessionState.IDLE
+            for poll_interval in self._poll_intervals.values():
+                poll_interval.set_session_idle(self._session_idle)
+            if not self._session_idle:
+                self._restart_refresh()
+
+    def _restore_after_resume(self) -> None:
+        """the devices could have been power cycled while the system was suspended, losing the settings applied:
+        they are reconnected right away and the saved settings restored with a single batch, before polling again"""
+        start_time = time.monotonic()
+        self._composite_disposable.add(
+            rx.zip(
+                self._session_interactor.resume().pipe(
+                    operators.flat_map(lambda _: self._startup_interactor.execute()),
+                    operators.subscribe_on(self._scheduler)),
+                rx.from_callable(SavedSettings.load).pipe(operators.subscribe_on(self._scheduler)),
+            ).pipe(
+                operators.observe_on(GtkScheduler(GLib)),
+            ).subscribe(on_next=lambda result: self._on_resume_completed(result[0], result[1], start_time),
+                        on_error=self._handle_refresh_error))
+
+    def _on_resume_completed(self, snapshots: List[DeviceSnapshot], saved: SavedSettings, start_time: float) -> None:
+        if self._sleeping:
+            # suspended again in the meantime
+            return
+        known_device_ids = {device_id for device_id, _ in self._devices}
+        for snapshot in snapshots:
+            if snapshot.device_id not in known_device_ids:
+                continue
+            if snapshot.error is not None:
+                _LOG.error("Unable to reconnect to %s after the resume: %s", snapshot.device_id, snapshot.error)
+                continue
+            device_id = snapshot.device_id
+            status = self._update_status(device_id, snapshot.status)
+            profiles = self._get_speed_profiles_to_restore(device_id, status, saved) if status is not None else []
+            self._apply_settings(device_id, profiles, self._lighting_presenter.get_lighting_to_restore(
+                device_id, snapshot.lighting_modes, saved))
+            poll_interval = self._get_poll_interval(device_id)
+            poll_interval.update(status)
+            self._start_refresh(device_id, poll_interval.get())
+        _LOG.info("Settings restored %.0f ms after the resume", (time.monotonic() - start_time) * 1000)
+
+    def _get_speed_profiles_to_restore(self, device_id: str, status: Status,
+                                       saved: SavedSettings) -> List[SpeedProfile]:
+        """the speed profiles last applied to the channels of the device, if they are to be restored"""
+        if not self._settings_interactor.get_bool('settings_load_last_profile'):
+            return []
+        profiles = []
+        for channel in ChannelType:
+            if self._is_channel_supported(channel, status):
+                profile = self._get_applied_speed_profile(device_id, channel, saved)
+                if profile is not None:
+                    profiles.append(profile)
+        return profiles
+
+    def _on_connection_state_changed(self, device_state: DeviceConnectionState) -> None:
+        name = self._get_device_name(device_state.device_id)
+        if device_state.state == ConnectionState.CONNECTED:
+            self.main_view.set_statusbar_text(f'{name} connected')
+        elif device_state.state == ConnectionState.BACKING_OFF:
+            self.main_view.set_statusbar_text(f'{name} connection lost, trying to reconnect...')
+        elif device_state.state == ConnectionState.FAILED:
+            self.main_view.set_statusbar_text(f'Unable to reconnect to the {name}, check the USB cable connection')
+        elif device_state.state == ConnectionState.ABSENT:
+            self.main_view.set_statusbar_text(f'{name} unplugged')
+            # nothing to poll until it is plugged back
+            self._absent_devices.add(device_state.device_id)
+            self._stop_refresh(device_state.device_id)
+        elif device_state.state == ConnectionState.DISCONNECTED and device_state.device_id in self._absent_devices:
+            self._absent_devices.discard(device_state.device_id)
+            self._start_refresh(device_state.device_id)
+
+    def _get_device_name(self, device_id: str) -> str:
+        if len(self._devices) > 1:
+            return next((name for i, name in self._devices if i == device_id), device_id)
+        return 'Kraken'
 
     def _on_speed_profile_list_changed(self, db_change: DbChange) -> None:
         profile = db_change.entry
+        if db_change.type != DbChange.INSERT:
+            self._invalidate_duty_tables(profile.id)
+        if profile.device not in (SHARED_DEVICE_ID, self._selected_device_id):
+            return
         if db_change.type == DbChange.DELETE:
-            self._refresh_speed_profile(ChannelType(profile.channel))
+            self._refresh_speed_profile(self._selected_device_id, ChannelType(profile.channel))
             self._profile_selected.pop(profile.channel, None)
         elif db_change.type == DbChange.INSERT or db_change.type == DbChange.UPDATE:
-            self._refresh_speed_profile(ChannelType(profile.channel), profile_id=profile.id)
+            self._refresh_speed_profile(self._selected_device_id, ChannelType(profile.channel), profile_id=profile.id)
 
     def _on_speed_step_list_changed(self, db_change: DbChange) -> None:
+        self._invalidate_duty_tables(db_change.entry.profile_id)
         profile = db_change.entry.profile
         if profile.channel in self._profile_selected and self._profile_selected[profile.channel].id == profile.id:
             self.main_view.refresh_chart(profile)
 
+    def _on_setting_changed(self, db_change: DbChange) -> None:
+        if db_change.entry.key in _REFRESH_INTERVAL_SETTINGS:
+            min_interval, max_interval = self._get_refresh_intervals()
+            _LOG.debug("Refresh interval changed to %d..%d s", min_interval, max_interval)
+            for poll_interval in self._poll_intervals.values():
+                poll_interval.configure(min_interval, max_interval)
+            self._restart_refresh()
+
     def _check_supported_kraken(self) -> None:
+        """The startup pipeline: while the devices are connected, and their first status read, the saved settings
+        are loaded from the database. The first status of every device is then used to show it, to find its
+        channels and to restore its saved settings, before polling starts"""
+        start_time = time.monotonic()
         self._composite_disposable.add(
-            self._has_supported_kraken_interactor.execute()
-                .subscribe(on_next=self._has_supported_kraken_result,
-                           on_error=self._handle_supported_error))
-
-    def _has_supported_kraken_result(self, has_supported_kraken: bool) -> None:
-        if has_supported_kraken:
-            self._startup_process_can_continue = True
-            self._start_refresh()
+            rx.zip(
+                self._startup_interactor.execute().pipe(operators.subscribe_on(self._scheduler)),
+                rx.from_callable(SavedSettings.load).pipe(operators.subscribe_on(self._scheduler)),
+            ).pipe(
+                operators.observe_on(GtkScheduler(GLib)),
+            ).subscribe(on_next=lambda result: self._on_startup_completed(result[0], result[1], start_time),
+                        on_error=self._handle_supported_error))
+
+    def _on_startup_completed(self, snapshots: List[DeviceSnapshot], saved: SavedSettings, start_time: float) -> None:
+        if snapshots:
+            devices = [(snapshot.device_id, snapshot.description) for snapshot in snapshots]
+            self._devices = devices
+            self._selected_device_id = devices[0][0]
+            self.main_view.refresh_device_combobox(devices, 0)
+            for snapshot in snapshots:
+                self._show_device(snapshot, saved)
+            _LOG.info("First status shown %.0f ms after the start", (time.monotonic() - start_time) * 1000)
+            if self._settings_interactor.get_int('settings_check_new_version'):
+                self._check_new_version()
         else:
-            self._startup_process_can_continue = False
             _LOG.error("Unable to find supported Kraken device!")
             self.main_view.show_error_message_dialog(
                 "Unable to find supported NZXT Kraken devices",
@@ -150,18 +369,91 @@ class MainPresenter:
             )
             get_default_application().quit()
 
-    def _start_refresh(self) -> None:
-        _LOG.debug("start refresh")
-        refresh_interval = self._settings_interactor.get_int('settings_refresh_interval')
-        self._composite_disposable.add(rx.interval(refresh_interval, scheduler=self._scheduler).pipe(
-            operators.start_with(0),
-            operators.subscribe_on(self._scheduler),
-            operators.flat_map(lambda _: self._get_status()),
-            operators.observe_on(GtkScheduler(GLib)),
-        ).subscribe(on_next=self._update_status,
-                    on_error=self._handle_refresh_error))
+    def _show_device(self, snapshot: DeviceSnapshot, saved: SavedSettings) -> None:
+        """shows the first status of a device just connected, restores its saved settings and starts polling it"""
+        if snapshot.error is not None:
+            self._handle_refresh_error(snapshot.error)
+            if not isinstance(snapshot.error, DeviceStallError):
+                return
+        device_id = snapshot.device_id
+        status = self._update_status(device_id, snapshot.status)
+        profiles = self._refresh_channels(device_id, status, saved) if status is not None else []
+        self._apply_settings(device_id, profiles, self._lighting_presenter.get_lighting_to_restore(
+            device_id, snapshot.lighting_modes, saved))
+        # the first status has just been read: the next one is due after the refresh interval
+        poll_interval = self._get_poll_interval(device_id)
+        poll_interval.update(status)
+        self._start_refresh(device_id, poll_interval.get())
+        if device_id == self._selected_device_id and snapshot.lighting_modes is not None:
+            self._lighting_presenter.show_lighting_modes(device_id, snapshot.lighting_modes)
+
+    def _start_refresh(self, device_id: str, first_poll_delay: float = 0.0) -> None:
+        _LOG.debug("start refresh of %s", device_id)
+        poll_interval = self._get_poll_interval(device_id)
+        # one poller per device: every device is polled on its own worker, a slow device doesn't delay the others.
+        # The poller runs on the main loop timers: only the status read is handed to the device worker, the status
+        # is posted back to the main loop, where the next poll is scheduled, after adapting the interval
+        poller = Poller(f'Status {device_id}',
+                        lambda: self._get_status(device_id).pipe(
+                            operators.do_action(poll_interval.update),
+                            operators.observe_on(self._main_loop_scheduler)),
+                        poll_interval.get, self._main_loop_scheduler, first_poll_delay)
+        self._status_pollers[device_id] = poller
+        poll_disposable = self._status_poll_disposables.get(device_id)
+        if poll_disposable is None:
+            poll_disposable = SerialDisposable()
+            self._status_poll_disposables[device_id] = poll_disposable
+            self._composite_disposable.add(poll_disposable)
+        poll_disposable.disposable = poller.observe().subscribe(
+            on_next=lambda status: self._update_status(device_id, status),
+            on_error=self._handle_refresh_error)
+
+    def _restart_refresh(self) -> None:
+        if self._sleeping:
+            return
+        for device_id in list(self._status_pollers):
+            if device_id not in self._absent_devices:
+                self._start_refresh(device_id)
+
+    def _get_poll_interval(self, device_id: str) -> AdaptiveInterval:
+        poll_interval = self._poll_intervals.get(device_id)
+        if poll_interval is None:
+            min_interval, max_interval = self._get_refresh_intervals()
+            poll_interval = AdaptiveInterval(min_interval, max_interval, self._window_visible)
+            poll_interval.set_session_idle(self._session_idle)
+            self._poll_intervals[device_id] = poll_interval
+        return poll_interval
+
+    def _get_refresh_intervals(self) -> Tuple[int, int]:
+        return (self._settings_interactor.get_int('settings_refresh_interval'),
+                self._settings_interactor.get_int('settings_max_refresh_interval'))
+
+    def _stop_refresh(self, device_id: str) -> None:
+        _LOG.debug("stop refresh of %s", device_id)
+        poll_disposable = self._status_poll_disposables.get(device_id)
+        if poll_disposable is not None:
+            poll_disposable.disposable = Disposable()
+
+    def on_device_selected(self, widget: Any, *_: Any) -> None:
+        active = widget.get_active()
+        if active >= 0:
+            device_id = widget.get_model()[active][0]
+            if device_id != self._selected_device_id:
+                _LOG.debug("Device %s selected", device_id)
+                self._selected_device_id = device_id
+                self._profile_selected.clear()
+                if device_id in self._last_status:
+                    self.main_view.refresh_status(self._last_status[device_id])
+                self._refresh_speed_profiles(device_id, show_current=True)
+                self._lighting_presenter.load_lighting_modes(device_id)
 
     def _handle_refresh_error(self, ex: Exception) -> None:
+        if isinstance(ex, DeviceStallError):
+            # not a permission issue: the device is connected again, with a backoff, by the status polling
+            _LOG.error("Refresh error: %s", ex)
+            self.main_view.set_statusbar_text(
+                f'The Kraken did not complete {ex.operation} within {ex.timeout:.1f} s, trying to reconnect...')
+            return
         if isinstance(ex, OSError):
             if not self._critical_error_occurred:
                 self._critical_error_occurred = True
@@ -176,7 +468,6 @@ class MainPresenter:
         _LOG.exception("Refresh error: %s", str(ex))
 
     def _handle_supported_error(self, ex: Exception) -> None:
-        self._startup_process_can_continue = False
         if isinstance(ex, LegacyKrakenWarning):
             _LOG.warning(ex)
             self._legacy_kraken_warning_message()
@@ -205,23 +496,25 @@ class MainPresenter:
         command += " --add-udev-rule"
         return command
 
-    def _update_status(self, status: Optional[Status]) -> Optional[Status]:
+    def _update_status(self, device_id: str, status: Optional[Status]) -> Optional[Status]:
         if status is not None:
-            if self._should_update_fan_speed:
-                last_applied_fan_profile: CurrentSpeedProfile = CurrentSpeedProfile.get_or_none(
-                    channel=ChannelType.FAN.value)
-                if last_applied_fan_profile is not None and status.fan_duty is None and status.fan_rpm is not None:
+            if self._should_update_fan_speed.get(device_id, False) \
+                    and status.fan_duty is None and status.fan_rpm is not None:
+                fan_duty_table = self._get_duty_table(device_id, ChannelType.FAN)
+                if fan_duty_table is not None:
                     _LOG.debug("No Fan Duty reported from device, calculating based on speed profile")
-                    status = status.with_fan_duty(self._calculate_duty(last_applied_fan_profile.profile,
-                                                                       status.liquid_temperature))
-            if self._should_update_pump_speed:
-                last_applied_pump_profile: CurrentSpeedProfile = CurrentSpeedProfile.get_or_none(
-                    channel=ChannelType.PUMP.value)
-                if last_applied_pump_profile is not None and status.pump_duty is None and status.pump_rpm is not None:
+                    status = status.with_fan_duty(fan_duty_table.duty_at(status.liquid_temperature))
+            if self._should_update_pump_speed.get(device_id, False) \
+                    and status.pump_duty is None and status.pump_rpm is not None:
+                pump_duty_table = self._get_duty_table(device_id, ChannelType.PUMP)
+                if pump_duty_table is not None:
                     _LOG.debug("No Pump Duty reported from device, calculating based on speed profile")
-                    status = status.with_pump_duty(self._calculate_duty(last_applied_pump_profile.profile,
-                                                                        status.liquid_temperature))
+                    status = status.with_pump_duty(pump_duty_table.duty_at(status.liquid_temperature))
+            self._last_status[device_id] = status
+            if device_id != self._selected_device_id:
+                return status
             self.main_view.refresh_status(status)
+            self._show_writes_avoided(device_id)
             if status.driver_type == SettingsKraken2.supported_driver \
                     and not self._legacy_firmware_dialog_shown \
                     and status.firmware_version.startswith('2.'):
@@ -229,42 +522,118 @@ class MainPresenter:
                 self.main_view.show_legacy_firmware_dialog()
         return status
 
+    def _show_writes_avoided(self, device_id: str) -> None:
+        """shows the writes avoided by the tuning of the software curves of the device, whenever they change"""
+        writes_avoided = self._get_status_interactor.get_writes_avoided(device_id)
+        if writes_avoided and writes_avoided != self._writes_avoided_shown.get(device_id):
+            self._writes_avoided_shown[device_id] = writes_avoided
+            self.main_view.set_statusbar_text(f'Software curves: {writes_avoided} writes avoided by the tuning')
+
+    def _get_duty_table(self, device_id: str, channel: ChannelType) -> Optional[DutyLookupTable]:
+        """the lookup table of the speed profile applied to the channel, compiled from the database only
+        the first time, or after the profile has been changed"""
+        key = (device_id, channel.value)
+        if key not in self._duty_tables:
+            current = self._get_current_speed_profile(device_id, channel)
+            self._duty_tables[key] = self._compile_duty_table(current.profile) if current is not None else None
+        duty_table = self._duty_tables[key]
+        return duty_table[1] if duty_table is not None else None
+
+    def _compile_duty_table(self, profile: SpeedProfile) -> Tuple[int, Optional[DutyLookupTable]]:
+        # the duty of a profile following a hwmon sensor can't be estimated from the liquid temperature
+        if profile.temperature_source != LIQUID_TEMPERATURE_SOURCE:
+            return profile.id, None
+        return profile.id, DutyLookupTable.compile(self._get_profile_data(profile))
+
+    def _invalidate_duty_tables(self, profile_id: int) -> None:
+        for key, duty_table in list(self._duty_tables.items()):
+            if duty_table is not None and duty_table[0] == profile_id:
+                del self._duty_tables[key]
+
     @staticmethod
-    def _calculate_duty(profile: SpeedProfile, liquid_temperature: float) -> float:
-        p_1 = (
-                [(i.temperature, i.duty) for i in profile.steps if i.temperature <= liquid_temperature]
-                or [None]  # type: ignore[list-item]
-        )[-1]
-        p_2 = next(((i.temperature, i.duty) for i in profile.steps if i.temperature > liquid_temperature), None)
-        duty = 0.0
-        if p_1 and p_2:
-            duty = ((p_2[1] - p_1[1]) / (p_2[0] - p_1[0])) * (liquid_temperature - p_1[0]) + p_1[1]
-        elif p_1:
-            duty = float(p_1[1])
-        elif p_2:
-            duty = float(p_2[1])
-        return duty
+    def _get_current_speed_profile(device_id: str, channel: ChannelType) -> Optional[CurrentSpeedProfile]:
+        """the profile applied to the device, or the one applied before multi-device support if there is none"""
+        current: Optional[CurrentSpeedProfile] = CurrentSpeedProfile.get_or_none(device=device_id,
+                                                                                 channel=channel.value)
+        if current is None:
+            current = CurrentSpeedProfile.get_or_none(device=SHARED_DEVICE_ID, channel=channel.value)
+        return current
+
+    @classmethod
+    def _get_applied_speed_profile(cls, device_id: str, channel: ChannelType,
+                                   saved: Optional[SavedSettings] = None) -> Optional[SpeedProfile]:
+        if saved is not None:
+            return saved.get_current_speed_profile(device_id, channel.value)
+        current = cls._get_current_speed_profile(device_id, channel)
+        return current.profile if current is not None else None
 
     @staticmethod
-    def _get_profile_list(channel: ChannelType) -> List[Tuple[int, str]]:
+    def _get_profile_list(device_id: str, channel: ChannelType,
+                          saved: Optional[SavedSettings] = None) -> List[Tuple[int, str]]:
+        if saved is not None:
+            profile_list: List[Tuple[int, str]] = saved.get_profile_list(device_id, channel.value)
+            return profile_list
         # pylint: disable=not-an-iterable
-        return [(p.id, p.name) for p in SpeedProfile.select().where(SpeedProfile.channel == channel.value)]
-
-    def _refresh_speed_profiles(self, init: bool = False, selecter_profile_id: Optional[int] = None) -> None:
-        self._get_status().pipe(
-            operators.map(self._update_status),
+        return [(p.id, p.name) for p in SpeedProfile.select().where(
+            (SpeedProfile.channel == channel.value) & (SpeedProfile.device.in_([SHARED_DEVICE_ID, device_id])))]
+
+    def _refresh_channels(self, device_id: str, status: Status, saved: SavedSettings) -> List[SpeedProfile]:
+        """refreshes the speed profiles of the channels found in the first status of the device and returns
+        the saved ones to restore"""
+        profiles = []
+        for channel in ChannelType:
+            if self._is_channel_supported(channel, status):
+                profile = self._refresh_speed_profile(device_id, channel, True, saved=saved)
+                if profile is not None:
+                    profiles.append(profile)
+        return profiles
+
+    def _refresh_speed_profiles(self, device_id: str, show_current: bool = False) -> None:
+        self._get_status(device_id).pipe(
+            operators.observe_on(GtkScheduler(GLib)),
+            operators.map(lambda status: self._update_status(device_id, status)),
             operators.flat_map(lambda status: rx.from_list(  # pylint: disable=not-callable
                 list(ChannelType)
             ).pipe(
-                operators.filter(lambda channel: self._is_channel_supported(channel, status)),
-                operators.map(lambda channel: (channel, status))
+                operators.filter(lambda channel: self._is_channel_supported(channel, status))
             ))
         ).subscribe(
-            on_next=lambda channel_status_tuple: self._check_driver_and_refresh_profile(channel_status_tuple, init,
-                                                                                        selecter_profile_id),
+            on_next=lambda channel: self._refresh_speed_profile(device_id, channel, show_current=show_current),
             on_error=self._handle_refresh_error
         )
 
+    def _apply_settings(self, device_id: str, profiles: List[SpeedProfile],
+                        lighting_settings: List[LightingSettings]) -> None:
+        """applies the speed profiles and the lighting with a single batch, to reduce the device round trips"""
+        batch = ApplyBatch()
+        on_applied: List[Callable[[], None]] = []
+        for profile in profiles:
+            batch.add_speed_profile(profile.channel, self._get_profile_data(profile), profile.control_tuning,
+                                    profile.temperature_source)
+            on_applied.append(partial(self._update_current_speed_profile, device_id, profile))
+        for settings in lighting_settings:
+            batch.add_lighting(settings)
+            on_applied.append(partial(self._lighting_presenter.on_lighting_applied, device_id, settings))
+        if batch:
+            self._composite_disposable.add(self._apply_batch_interactor.execute(device_id, batch).pipe(
+                operators.subscribe_on(self._scheduler),
+                operators.observe_on(GtkScheduler(GLib)),
+            ).subscribe(on_next=lambda results: self._on_settings_applied(device_id, results, on_applied),
+                        on_error=lambda e: self._on_apply_settings_error(e, device_id)))
+
+    def _on_settings_applied(self, device_id: str, results: List[ApplyResult],
+                             on_applied: List[Callable[[], None]]) -> None:
+        for result, callback in zip(results, on_applied):
+            if result.succeeded:
+                callback()
+            else:
+                self._on_apply_settings_error(result.error, device_id)
+
+    def _on_apply_settings_error(self, exception: Optional[BaseException], device_id: str) -> None:
+        _LOG.error("Error restoring the settings of %s: %s", device_id, exception)
+        if device_id == self._selected_device_id:
+            self.main_view.set_statusbar_text('Error restoring the saved settings!')
+
     @staticmethod
     def _is_channel_supported(channel: ChannelType, status: Status) -> bool:
         return {
@@ -272,49 +641,36 @@ class MainPresenter:
             ChannelType.PUMP: status.pump_rpm is not None
         }.get(channel, True)
 
-    def _check_driver_and_refresh_profile(self, channel_status_tuple: Tuple[ChannelType, Status],
-                                          init: bool,
-                                          selector_profile_id: Optional[int]
-                                          ) -> None:
-        channel, status = channel_status_tuple
-        if status.driver_type is SettingsKrakenLegacy.supported_driver:
-            self._refresh_speed_profile_fixed_only(channel, init, selector_profile_id)
-        else:
-            self._refresh_speed_profile(channel, init, selector_profile_id)
-
-    def _refresh_speed_profile_fixed_only(self, channel: ChannelType,
-                                          init: bool = False,
-                                          profile_id: Optional[int] = None
-                                          ) -> None:
-        """This method will only allow fixed profiles for those models that only support fixed speeds"""
-        data = list(filter(lambda profile_data: profile_data[1] == 'Fixed', self._get_profile_list(channel)))
-        active = None
-        if profile_id is not None:
-            active = next(i for i, item in enumerate(data) if item[0] == profile_id)
-        elif init and self._settings_interactor.get_bool('settings_load_last_profile'):
-            self._should_update_fan_speed = True
-            self._should_update_pump_speed = True
-            current: CurrentSpeedProfile = CurrentSpeedProfile.get_or_none(channel=channel.value)
-            if current is not None and current.profile.single_step:  # make sure current is fixed only
-                active = next(i for i, item in enumerate(data) if item[0] == current.profile.id)
-                self._set_speed_profile(current.profile)
-        self.main_view.refresh_profile_combobox(channel, data, active)
-
-    def _refresh_speed_profile(self, channel: ChannelType, init: bool = False,
-                               profile_id: Optional[int] = None) -> None:
-        data = self._get_profile_list(channel)
+    def _refresh_speed_profile(self, device_id: str, channel: ChannelType, init: bool = False,
+                               profile_id: Optional[int] = None, show_current: bool = False,
+                               saved: Optional[SavedSettings] = None
+                               ) -> Optional[SpeedProfile]:
+        """refreshes the speed profiles shown for a channel. When init, returns the profile last applied to the
+        channel, if it has to be restored"""
+        data = self._get_profile_list(device_id, channel, saved)
         active = None
+        restored_profile = None
         if profile_id is not None:
             active = next(i for i, item in enumerate(data) if item[0] == profile_id)
         elif init and self._settings_interactor.get_bool('settings_load_last_profile'):
-            self._should_update_fan_speed = True
-            self._should_update_pump_speed = True
-            current: CurrentSpeedProfile = CurrentSpeedProfile.get_or_none(channel=channel.value)
+            self._should_update_fan_speed[device_id] = True
+            self._should_update_pump_speed[device_id] = True
+            current = self._get_applied_speed_profile(device_id, channel, saved)
             if current is not None:
-                active = next(i for i, item in enumerate(data) if item[0] == current.profile.id)
-                self._set_speed_profile(current.profile)
+                active = self._find_profile_index(data, current.id)
+                restored_profile = current
+        elif show_current:
+            current = self._get_applied_speed_profile(device_id, channel)
+            if current is not None:
+                active = self._find_profile_index(data, current.id)
         data.append((_ADD_NEW_PROFILE_INDEX, "<span style='italic' alpha='50%'>Add new profile...</span>"))
-        self.main_view.refresh_profile_combobox(channel, data, active)
+        if device_id == self._selected_device_id:
+            self.main_view.refresh_profile_combobox(channel, data, active)
+        return restored_profile
+
+    @staticmethod
+    def _find_profile_index(data: List[Tuple[int, str]], profile_id: int) -> Optional[int]:
+        return next((i for i, item in enumerate(data) if item[0] == profile_id), None)
 
     def on_menu_settings_clicked(self, *_: Any) -> None:
         self._preferences_presenter.show()
@@ -352,7 +708,7 @@ class MainPresenter:
             self.main_view.set_edit_button_enabled(channel, False)
             self.main_view.show_add_speed_profile_dialog(channel)
             self.main_view.refresh_chart(channel_to_reset=channel.value)
-            self._edit_speed_profile_presenter.show_add(channel)
+            self._edit_speed_profile_presenter.show_add(channel, self._selected_device_id)
         else:
             profile: SpeedProfile = SpeedProfile.get(id=profile_id)
             self._profile_selected[profile.channel] = profile
@@ -387,44 +743,47 @@ class MainPresenter:
         speed_step.duty = value
         speed_step.save()
         if channel == ChannelType.FAN.value:
-            self._should_update_fan_speed = False
+            self._should_update_fan_speed[self._selected_device_id] = False
         elif channel == ChannelType.PUMP.value:
-            self._should_update_pump_speed = False
+            self._should_update_pump_speed[self._selected_device_id] = False
         self.main_view.refresh_chart(profile)
 
     def on_fan_apply_button_clicked(self, *_: Any) -> None:
         channel = ChannelType.FAN.value
         self.main_view.set_statusbar_text('applying %s cooling profile...' % channel)
-        self._set_speed_profile(self._profile_selected[channel])
-        self._should_update_fan_speed = True
+        self._set_speed_profile(self._selected_device_id, self._profile_selected[channel])
+        self._should_update_fan_speed[self._selected_device_id] = True
 
     def on_pump_apply_button_clicked(self, *_: Any) -> None:
         channel = ChannelType.PUMP.value
         self.main_view.set_statusbar_text('applying %s cooling profile...' % channel)
-        self._set_speed_profile(self._profile_selected[channel])
-        self._should_update_pump_speed = True
+        self._set_speed_profile(self._selected_device_id, self._profile_selected[channel])
+        self._should_update_pump_speed[self._selected_device_id] = True
 
-    def _set_speed_profile(self, profile: SpeedProfile) -> None:
+    def _set_speed_profile(self, device_id: str, profile: SpeedProfile) -> None:
         observable = self._set_speed_profile_interactor \
-            .execute(profile.channel, self._get_profile_data(profile))
+            .execute(device_id, profile.channel, self._get_profile_data(profile), profile.control_tuning,
+                     profile.temperature_source)
         self._composite_disposable.add(observable.pipe(
             operators.subscribe_on(self._scheduler),
             operators.observe_on(GtkScheduler(GLib)),
-        ).subscribe(on_next=lambda _: self._update_current_speed_profile(profile),
+        ).subscribe(on_next=lambda _: self._update_current_speed_profile(device_id, profile),
                     on_error=lambda e: self._on_set_speed_profile_error(e, profile)))
 
     def _on_set_speed_profile_error(self, exception: Exception, profile: SpeedProfile) -> None:
         _LOG.exception("Set cooling error: %s", str(exception))
         self.main_view.set_statusbar_text('Error applying %s speed profile!' % profile.channel)
 
-    def _update_current_speed_profile(self, profile: SpeedProfile) -> None:
-        current: CurrentSpeedProfile = CurrentSpeedProfile.get_or_none(channel=profile.channel)
+    def _update_current_speed_profile(self, device_id: str, profile: SpeedProfile) -> None:
+        current: CurrentSpeedProfile = CurrentSpeedProfile.get_or_none(device=device_id, channel=profile.channel)
         if current is None:
-            CurrentSpeedProfile.create(channel=profile.channel, profile=profile)
+            CurrentSpeedProfile.create(device=device_id, channel=profile.channel, profile=profile)
         else:
             current.profile = profile
             current.save()
-        self.main_view.set_statusbar_text('%s cooling profile applied' % profile.channel.capitalize())
+        self._duty_tables[(device_id, profile.channel)] = self._compile_duty_table(profile)
+        if device_id == self._selected_device_id:
+            self.main_view.set_statusbar_text('%s cooling profile applied' % profile.channel.capitalize())
 
     def _log_exception_return_empty_observable(self, ex: Exception, _: Observable) -> Observable:
         _LOG.exception("Err = %s", ex)
@@ -435,8 +794,8 @@ class MainPresenter:
         assert isinstance(operators, Observable)
         return observable
 
-    def _get_status(self) -> Observable:
-        observable = self._get_status_interactor.execute().pipe(
+    def _get_status(self, device_id: str) -> Observable:
+        observable = self._get_status_interactor.execute(device_id).pipe(
             operators.catch(self._log_exception_return_empty_observable),
             operators.map(self.log_status)
         )
@@ -466,9 +825,6 @@ class MainPresenter:
     def _get_changelog_uri(version: str = APP_VERSION) -> str:
         return f"{APP_SOURCE_URL}/blob/{version}/CHANGELOG.md"
 
-    def _load_lighting_modes(self) -> None:
-        self._lighting_presenter.load_lighting_modes()
-
     def on_logo_mode_selected(self, *_: Any) -> None:
         self._lighting_presenter.on_logo_mode_selected()
 
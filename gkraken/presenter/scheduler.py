@@ -15,17 +15,81 @@
 #  You should have received a copy of the GNU General Public License
 #  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
 
-import multiprocessing
+import threading
+from typing import Optional, Any
 
-from injector import singleton
+from gi.repository import GLib
+from injector import singleton, inject
+from rx.core import typing
+from rx.disposable import CompositeDisposable, Disposable, SingleAssignmentDisposable
 from rx.scheduler import ThreadPoolScheduler
+from rx.scheduler.periodicscheduler import PeriodicScheduler
+
+from gkraken.util.wakeup_stats import WakeupStats
+
+# the device I/O runs on the KrakenRepository device thread, this pool only runs short lived jobs
+_MAX_WORKERS = 4
 
 
 @singleton
 class Scheduler:
 
     def __init__(self) -> None:
-        self._scheduler = ThreadPoolScheduler(multiprocessing.cpu_count())
+        self._scheduler = ThreadPoolScheduler(_MAX_WORKERS)
 
     def get(self) -> ThreadPoolScheduler:
         return self._scheduler
+
+
+@singleton
+class MainLoopScheduler(PeriodicScheduler):
+    """Schedules the actions on the GLib main loop, like GtkScheduler, but waking the CPU up as little as possible:
+    the timers of one second or more are GLib.timeout_add_seconds() ones, that the main loop fires together with
+    the other timers due in the same second, and disposing of a scheduled action removes its timer instead of
+    waking up just to skip the action"""
+
+    @inject
+    def __init__(self, wakeup_stats: WakeupStats) -> None:
+        super().__init__()
+        self._wakeup_stats = wakeup_stats
+
+    def schedule(self, action: typing.ScheduledAction, state: Optional[typing.TState] = None) -> typing.Disposable:
+        return self._schedule_timer(0.0, action, state)
+
+    def schedule_relative(self, duetime: typing.RelativeTime, action: typing.ScheduledAction,
+                          state: Optional[typing.TState] = None) -> typing.Disposable:
+        return self._schedule_timer(self.to_seconds(duetime), action, state)
+
+    def schedule_absolute(self, duetime: typing.AbsoluteTime, action: typing.ScheduledAction,
+                          state: Optional[typing.TState] = None) -> typing.Disposable:
+        return self._schedule_timer(self.to_seconds(self.to_datetime(duetime) - self.now), action, state)
+
+    def _schedule_timer(self, seconds: float, action: typing.ScheduledAction,
+                        state: Optional[typing.TState]) -> typing.Disposable:
+        lock = threading.Lock()
+        action_disposable = SingleAssignmentDisposable()
+        source_id: Optional[int] = None
+
+        def on_timeout(*_: Any) -> bool:
+            nonlocal source_id
+            with lock:
+                if source_id is None:
+                    return False  # removed in the meantime
+                source_id = None
+            self._wakeup_stats.count('main loop')
+            action_disposable.disposable = self.invoke_action(action, state=state)
+            return False
+
+        def remove_timer() -> None:
+            nonlocal source_id
+            with lock:
+                if source_id is not None:
+                    GLib.source_remove(source_id)
+                    source_id = None
+
+        with lock:
+            if seconds >= 1.0:
+                source_id = GLib.timeout_add_seconds(round(seconds), on_timeout)
+            else:
+                source_id = GLib.timeout_add(max(0, int(seconds * 1000)), on_timeout)
+        return CompositeDisposable(action_disposable, Disposable(remove_timer))
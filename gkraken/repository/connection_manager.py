@@ -0,0 +1,143 @@
+#  This file is part of gkraken.
+#
+#  Copyright (c) 2021 Roberto Leinardi and Guy Boldon
+#
+#  gkraken is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  gkraken is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
+
+import logging
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional, Dict, List, Tuple
+
+from gkraken.core_di import ConnectionStateChangedSubject
+from gkraken.model.connection_state import ConnectionState, DeviceConnectionState
+from gkraken.util.concurrency import synchronized_with_attr
+
+_LOG = logging.getLogger(__name__)
+_RECONNECT_BASE_DELAY = 1.0  # seconds
+_RECONNECT_MAX_DELAY = 60.0  # seconds
+_RECONNECT_MAX_ATTEMPTS = 8  # after that the state becomes FAILED, but attempts continue every _RECONNECT_MAX_DELAY
+
+
+@dataclass(frozen=True)
+class InitResult:
+    init_status: List[Tuple]
+    firmware_version: Optional[str]
+
+
+class ConnectionManager:
+    """Keeps track of the connection of a device: schedules reconnections with exponential backoff and jitter,
+    and remembers the initialization results (by serial number) so that reconnecting to the same device
+    doesn't need to initialize it again."""
+
+    def __init__(self, device_id: str, connection_state_changed_subject: ConnectionStateChangedSubject) -> None:
+        self.lock = threading.RLock()
+        self._device_id = device_id
+        self._connection_state_changed_subject = connection_state_changed_subject
+        self._state = ConnectionState.DISCONNECTED
+        self._has_been_connected: bool = False
+        self._failed_attempts: int = 0
+        self._next_attempt_time: float = 0.0
+        self._init_results: Dict[str, InitResult] = {}
+
+    @property
+    def state(self) -> ConnectionState:
+        return self._state
+
+    @property
+    def is_present(self) -> bool:
+        """False if the device has been reported unplugged (and not plugged back yet)"""
+        return self._state is not ConnectionState.ABSENT
+
+    @property
+    def has_been_connected(self) -> bool:
+        """True if a connection has been established at least once, so any further connection is a reconnection"""
+        return self._has_been_connected
+
+    @synchronized_with_attr("lock")
+    def is_attempt_due(self) -> bool:
+        return time.monotonic() >= self._next_attempt_time
+
+    @synchronized_with_attr("lock")
+    def on_connected(self) -> None:
+        self._has_been_connected = True
+        self._failed_attempts = 0
+        self._next_attempt_time = 0.0
+        self._set_state(ConnectionState.CONNECTED)
+
+    @synchronized_with_attr("lock")
+    def on_connection_lost(self) -> None:
+        self._failed_attempts += 1
+        delay = min(_RECONNECT_MAX_DELAY, _RECONNECT_BASE_DELAY * 2 ** (self._failed_attempts - 1))
+        delay = random.uniform(delay / 2, delay)  # jitter
+        self._next_attempt_time = time.monotonic() + delay
+        _LOG.warning("Connection to %s lost, next attempt in %.1f s (failed attempts: %d)", self._device_id,
+                     delay, self._failed_attempts)
+        if self._failed_attempts >= _RECONNECT_MAX_ATTEMPTS:
+            self._set_state(ConnectionState.FAILED)
+        else:
+            self._set_state(ConnectionState.BACKING_OFF)
+
+    @synchronized_with_attr("lock")
+    def on_device_removed(self) -> None:
+        _LOG.info("Device %s unplugged", self._device_id)
+        # once plugged back it will have been power cycled
+        self._init_results.clear()
+        self._set_state(ConnectionState.ABSENT)
+
+    @synchronized_with_attr("lock")
+    def on_device_added(self) -> None:
+        """the device has been plugged back: the next connection is attempted right away, without backoff"""
+        if self._state is ConnectionState.ABSENT:
+            _LOG.info("Device %s plugged back", self._device_id)
+            self._failed_attempts = 0
+            self._next_attempt_time = 0.0
+            self._set_state(ConnectionState.DISCONNECTED)
+
+    @synchronized_with_attr("lock")
+    def on_system_sleep(self) -> None:
+        """the device has been released before a system suspension, that could power cycle it"""
+        self._init_results.clear()
+        if self._state is not ConnectionState.ABSENT:
+            self._set_state(ConnectionState.DISCONNECTED)
+
+    @synchronized_with_attr("lock")
+    def on_system_resumed(self) -> None:
+        """the system resumed: the next connection is attempted right away, without backoff"""
+        self._failed_attempts = 0
+        self._next_attempt_time = 0.0
+        if self._state in (ConnectionState.BACKING_OFF, ConnectionState.FAILED):
+            self._set_state(ConnectionState.DISCONNECTED)
+
+    @synchronized_with_attr("lock")
+    def get_init_result(self, serial_number: Optional[str]) -> Optional[InitResult]:
+        return self._init_results.get(serial_number) if serial_number else None
+
+    @synchronized_with_attr("lock")
+    def store_init_result(self, serial_number: Optional[str], init_result: InitResult) -> None:
+        if serial_number:
+            self._init_results[serial_number] = init_result
+
+    @synchronized_with_attr("lock")
+    def forget_init_results(self) -> None:
+        """to be called when the devices could have been power cycled, and need to be initialized again"""
+        self._init_results.clear()
+
+    def _set_state(self, state: ConnectionState) -> None:
+        if state is not self._state:
+            _LOG.debug("Connection state of %s: %s -> %s", self._device_id, self._state.value, state.value)
+            self._state = state
+            self._connection_state_changed_subject.on_next(DeviceConnectionState(self._device_id, state))
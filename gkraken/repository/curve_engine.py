@@ -0,0 +1,221 @@
+#  This file is part of gkraken.
+#
+#  Copyright (c) 2021 Roberto Leinardi and Guy Boldon
+#
+#  gkraken is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  gkraken is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
+
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple, Set
+
+from gkraken.conf import LIQUID_TEMPERATURE_SOURCE
+from gkraken.model.control_tuning import ControlTuning, DEFAULT_CONTROL_TUNING
+from gkraken.model.status import Status
+from gkraken.repository.hwmon_sensors import is_hwmon_source
+from gkraken.util.duty_lookup_table import DutyLookupTable
+
+_LOG = logging.getLogger(__name__)
+
+CONTROL_PERIOD = 1.0  # seconds between two evaluations of the software curves
+CPU_BUDGET = 0.002  # seconds of CPU time an evaluation of all the curves may take, writes excluded
+_MAX_OVER_BUDGET = 3  # consecutive evaluations over the CPU budget before giving the channels back to the hardware
+
+
+@dataclass(frozen=True)
+class SoftwareCurve:
+    """A speed profile evaluated on the host: the duty for the temperature read from temperature_source (the liquid
+    or a hwmon sensor) is interpolated between the steps (temperature, duty), with a lookup table compiled once"""
+    channel: str
+    steps: Tuple[Tuple[int, int], ...]
+    temperature_source: str = LIQUID_TEMPERATURE_SOURCE
+    tuning: ControlTuning = DEFAULT_CONTROL_TUNING
+    duty_table: DutyLookupTable = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, 'duty_table', DutyLookupTable.compile(self.steps))
+
+    def duty_at(self, temperature: float) -> int:
+        duty: int = round(self.duty_table.duty_at(temperature))
+        return duty
+
+    @property
+    def max_duty(self) -> int:
+        return max(duty for _, duty in self.steps)
+
+
+class _ControlOutput:
+    """The control output stage of a channel: applies the ControlTuning of its curve to the duties"""
+
+    def __init__(self, curve: SoftwareCurve) -> None:
+        self.curve = curve
+        self.written_duty: Optional[int] = None
+        # the duty of the curve for the latest temperature, without the tuning
+        self.untuned_duty: Optional[int] = None
+        self._reference_temperature: Optional[float] = None
+        self._duty: Optional[float] = None
+        self._time: float = 0.0
+
+    def next_duty(self, temperature: float, now: float) -> Optional[int]:
+        """the duty to write for the temperature read, None if no write is needed"""
+        tuning = self.curve.tuning
+        reference = self._reference_temperature
+        if reference is None or temperature > reference + tuning.hysteresis_up \
+                or temperature < reference - tuning.hysteresis_down:
+            self._reference_temperature = reference = temperature
+        duty = self.curve.duty_table.duty_at(reference)
+        if self._duty is not None and tuning.max_slew_rate > 0:
+            max_change = tuning.max_slew_rate * (now - self._time)
+            duty = min(max(duty, self._duty - max_change), self._duty + max_change)
+        self._duty = duty
+        self._time = now
+        rounded_duty: int = round(duty)
+        written_duty = self.written_duty
+        if written_duty is None:
+            return rounded_duty
+        if rounded_duty == written_duty:
+            return None
+        # the highest duty of the curve is always reached, whatever the minimum delta
+        if abs(rounded_duty - written_duty) >= tuning.min_duty_delta or rounded_duty >= self.curve.max_duty:
+            return rounded_duty
+        return None
+
+
+class CurveEngine:
+    """Drives with fixed speeds the channels whose speed profile can't be applied by the device (e.g. devices
+    supporting only fixed speeds, or profiles following a hwmon sensor): on every status, the curves are evaluated
+    and a fixed speed written only when the duty of a channel changes enough, according to the ControlTuning of
+    the curve.
+    It's not thread safe: it must be used only on the thread owning the device.
+
+    An evaluation must stay within CPU_BUDGET. If the engine fails (an evaluation raises, or exceeds the budget
+    too many times in a row) every channel is given back to the hardware, with hand_back, and the engine
+    stops, so that no channel is left unmanaged. The same happens when stopped, or when a hwmon sensor can't be
+    read: read_sensors returns the temperatures of the hwmon sensors, by source, read once per evaluation."""
+
+    def __init__(self,
+                 write_duty: Callable[[str, int], None],
+                 hand_back: Callable[[SoftwareCurve], None],
+                 cpu_budget: float = CPU_BUDGET,
+                 read_sensors: Callable[[], Dict[str, float]] = dict) -> None:
+        self._write_duty = write_duty
+        self._hand_back = hand_back
+        self._cpu_budget = cpu_budget
+        self._read_sensors = read_sensors
+        self._outputs: Dict[str, _ControlOutput] = {}
+        self._over_budget: int = 0
+        self._writes_avoided: int = 0
+
+    @property
+    def has_curves(self) -> bool:
+        return bool(self._outputs)
+
+    @property
+    def temperature_sources(self) -> Set[str]:
+        return {output.curve.temperature_source for output in self._outputs.values()}
+
+    @property
+    def writes_avoided(self) -> int:
+        """number of duty changes of the curves that, without the tuning, would have been written"""
+        return self._writes_avoided
+
+    def get_curve(self, channel: str) -> Optional[SoftwareCurve]:
+        output = self._outputs.get(channel)
+        return output.curve if output is not None else None
+
+    def set_curve(self, curve: SoftwareCurve) -> None:
+        if self.get_curve(curve.channel) != curve:
+            _LOG.info("Driving the %s speed with a software curve on %s, %s", curve.channel,
+                      curve.temperature_source, curve.tuning)
+            self._outputs[curve.channel] = _ControlOutput(curve)
+
+    def remove_curve(self, channel: str) -> None:
+        """the channel is now driven by the hardware"""
+        if self._outputs.pop(channel, None) is not None:
+            _LOG.info("The %s speed is no longer driven by a software curve", channel)
+
+    def forget_written_duties(self) -> None:
+        """the device could have lost its settings (e.g. disconnected): the duties are written again"""
+        for output in self._outputs.values():
+            output.written_duty = None
+
+    def on_status(self, status: Status) -> None:
+        """evaluates the curves for the given status and writes the duties that changed"""
+        if not self._outputs:
+            return
+        # the sensors are read before the evaluation, like the status: only the evaluation is within the budget
+        sensor_temperatures = self._read_sensors() if any(map(is_hwmon_source, self.temperature_sources)) else {}
+        start = time.thread_time()
+        try:
+            duties = self._evaluate(status, sensor_temperatures)
+        except Exception as ex:  # pylint: disable=broad-except
+            _LOG.exception("Unable to evaluate the software curves: %s", ex)
+            self.stop()
+            return
+        cpu_time = time.thread_time() - start
+        if cpu_time > self._cpu_budget:
+            self._over_budget += 1
+            _LOG.warning("Software curves evaluation over the CPU budget: %.1f ms", cpu_time * 1000)
+            if self._over_budget >= _MAX_OVER_BUDGET:
+                _LOG.error("Software curves evaluation over the CPU budget %d times in a row", self._over_budget)
+                self.stop()
+                return
+        else:
+            self._over_budget = 0
+        for output, duty in duties:
+            _LOG.debug("Software curve %s duty: %d%%", output.curve.channel, duty)
+            self._write_duty(output.curve.channel, duty)
+            output.written_duty = duty
+
+    def stop(self) -> None:
+        """gives every channel back to the hardware"""
+        curves = [output.curve for output in self._outputs.values()]
+        self._outputs.clear()
+        self._over_budget = 0
+        for curve in curves:
+            _LOG.warning("Giving the %s speed back to the hardware", curve.channel)
+            try:
+                self._hand_back(curve)
+            except Exception as ex:  # pylint: disable=broad-except
+                _LOG.exception("Unable to give the %s speed back to the hardware: %s", curve.channel, ex)
+
+    def _evaluate(self, status: Status, sensor_temperatures: Dict[str, float]) -> List[Tuple[_ControlOutput, int]]:
+        now = time.monotonic()
+        duties = []
+        for output in self._outputs.values():
+            temperature = self._read_temperature(output.curve.temperature_source, status, sensor_temperatures)
+            if temperature is None:
+                continue
+            duty = output.next_duty(temperature, now)
+            untuned_duty = output.curve.duty_at(temperature)
+            untuned_duty_changed = output.untuned_duty is not None and untuned_duty != output.untuned_duty
+            output.untuned_duty = untuned_duty
+            if duty is not None:
+                duties.append((output, duty))
+            elif untuned_duty_changed:
+                self._writes_avoided += 1
+                _LOG.debug("Skipping %s write, within the tuning of the curve (writes avoided: %d)",
+                           output.curve.channel, self._writes_avoided)
+        return duties
+
+    @staticmethod
+    def _read_temperature(source: str, status: Status, sensor_temperatures: Dict[str, float]) -> Optional[float]:
+        if source == LIQUID_TEMPERATURE_SOURCE:
+            liquid_temperature: float = status.liquid_temperature
+            return liquid_temperature
+        if not is_hwmon_source(source):
+            raise ValueError(f"Unknown temperature source {source}")
+        if source not in sensor_temperatures:
+            raise ValueError(f"Unable to read the temperature sensor {source}")
+        return sensor_temperatures[source]
@@ -0,0 +1,153 @@
+#  This file is part of gkraken.
+#
+#  Copyright (c) 2021 Roberto Leinardi and Guy Boldon
+#
+#  gkraken is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  gkraken is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
+
+import itertools
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Any, Callable, Optional, Tuple, Dict, Hashable, List
+
+from gkraken.util.wakeup_stats import WakeupStats
+
+_LOG = logging.getLogger(__name__)
+
+
+class JobPriority(IntEnum):
+    """Lower values run first"""
+    SAFETY = 0
+    USER = 1
+    BACKGROUND = 2
+
+
+@dataclass
+class DeviceJob:
+    name: str
+    priority: JobPriority
+    function: Callable[[], Any]
+    future: Future = field(default_factory=Future)
+    coalesce_key: Optional[Hashable] = None
+    superseded: bool = False
+    coalesced_futures: List[Future] = field(default_factory=list)
+    enqueue_time: float = field(default_factory=time.monotonic)
+    start_time: Optional[float] = None
+    finish_time: Optional[float] = None
+
+    @property
+    def wait_time(self) -> float:
+        return (self.start_time or self.enqueue_time) - self.enqueue_time
+
+    @property
+    def run_time(self) -> float:
+        return (self.finish_time or self.start_time or 0.0) - (self.start_time or 0.0)
+
+
+class DeviceExecutor:
+    """Runs all the I/O of a device on a single thread that owns it.
+
+    Jobs are picked by priority (safety writes, then user initiated writes, then background reads)
+    and, for the same priority, in submission order.
+    Jobs submitted with the same coalesce_key are coalesced, latest wins: a job still queued is dropped when
+    a newer one with the same key is submitted, and its future completes with the result of the newer job.
+    Once shut down, the executor refuses new jobs: their futures fail with a RuntimeError.
+    """
+
+    def __init__(self, name: str, wakeup_stats: Optional[WakeupStats] = None) -> None:
+        self._name = name
+        self._wakeup_stats = wakeup_stats
+        self._queue: 'queue.PriorityQueue[Tuple[int, int, Optional[DeviceJob]]]' = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._pending: Dict[Hashable, DeviceJob] = {}
+        self._is_shut_down: bool = False
+
+    def submit(self, priority: JobPriority, function: Callable[..., Any], *args: Any,
+               coalesce_key: Optional[Hashable] = None) -> Future:
+        job = DeviceJob(getattr(function, '__name__', repr(function)), priority, lambda: function(*args),
+                        coalesce_key=coalesce_key)
+        with self._lock:
+            if self._is_shut_down:
+                _LOG.debug("Device job %s refused, %s is shut down", job.name, self._name)
+                job.future.set_exception(RuntimeError(f"{self._name} is shut down"))
+                return job.future
+            self._ensure_thread_started()
+            if coalesce_key is not None:
+                self._supersede_pending_job(job)
+            self._queue.put((job.priority, next(self._sequence), job))
+        return job.future
+
+    def _supersede_pending_job(self, job: DeviceJob) -> None:
+        pending = self._pending.get(job.coalesce_key)
+        if pending is not None:
+            _LOG.debug("Device job %s superseded by a newer one (key: %s)", pending.name, job.coalesce_key)
+            pending.superseded = True
+            job.coalesced_futures = pending.coalesced_futures + [pending.future]
+            job.priority = min(job.priority, pending.priority)
+        self._pending[job.coalesce_key] = job
+
+    def shutdown(self, timeout: Optional[float] = None) -> None:
+        """runs the pending jobs, then stops the thread, waiting at most timeout seconds for it to finish"""
+        with self._lock:
+            self._is_shut_down = True
+            thread = self._thread
+            if thread is not None:
+                # the sentinel is queued after every pending job, whatever their priority
+                self._queue.put((len(JobPriority), next(self._sequence), None))
+                self._thread = None
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+            if thread.is_alive():
+                _LOG.warning("%s still running a job after %s s", self._name, timeout)
+
+    def _ensure_thread_started(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=self._name, daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            _, _, job = self._queue.get()
+            if job is None:
+                return
+            if self._wakeup_stats is not None:
+                self._wakeup_stats.count('device job')
+            with self._lock:
+                if job.superseded:
+                    continue
+                if job.coalesce_key is not None:
+                    del self._pending[job.coalesce_key]
+            futures = [future for future in [job.future] + job.coalesced_futures
+                       if future.set_running_or_notify_cancel()]
+            if not futures:
+                continue
+            job.start_time = time.monotonic()
+            try:
+                result = job.function()
+            except BaseException as ex:  # pylint: disable=broad-except
+                job.finish_time = time.monotonic()
+                for future in futures:
+                    future.set_exception(ex)
+            else:
+                job.finish_time = time.monotonic()
+                for future in futures:
+                    future.set_result(result)
+            _LOG.debug("Device job %s (%s) waited %.1f ms, ran in %.1f ms",
+                       job.name, job.priority.name, job.wait_time * 1000, job.run_time * 1000)
@@ -0,0 +1,207 @@
+#  This file is part of gkraken.
+#
+#  Copyright (c) 2021 Roberto Leinardi and Guy Boldon
+#
+#  gkraken is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  gkraken is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
+
+import logging
+import socket
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Dict, List, Tuple, Union, Optional, Callable, AbstractSet
+
+from injector import singleton, inject
+
+from gkraken.core_di import ConnectionStateChangedSubject, StatusReceivedSubject, DeviceAddedSubject
+from gkraken.device.device_discovery import DeviceDiscovery, get_port_path
+from gkraken.device.hotplug_monitor import HotplugMonitor, HotplugEvent, open_uevent_socket
+from gkraken.repository.connection_manager import ConnectionManager
+from gkraken.repository.device_executor import JobPriority, DeviceExecutor
+from gkraken.repository.device_state_mirror import DeviceStateMirror
+from gkraken.repository.helper_client import HelperClient, RemoteKrakenRepository
+from gkraken.repository.kraken_repository import KrakenRepository
+from gkraken.util.concurrency import synchronized_with_attr
+
+_SLEEP_PREPARATION_TIMEOUT = 4.0  # seconds, logind waits at most InhibitDelayMaxSec (5 s by default)
+
+_LOG = logging.getLogger(__name__)
+DeviceRepository = Union[KrakenRepository, RemoteKrakenRepository]
+
+
+@singleton
+class DeviceRegistry:
+    """Keeps a KrakenRepository, with its own worker thread and connection manager, for every supported device
+    found, so that the devices are accessed concurrently and a slow device doesn't delay the others.
+    Repositories are never removed: a device that disappears is handled by the reconnection of its repository.
+    When the helper process is enabled, the devices are the ones found by the helper, that owns them.
+
+    Once the hotplug monitor is started, unplugging a device releases it and pauses its reconnection attempts,
+    plugging it back reconnects it right away (see ConnectionState.ABSENT). A device is unplugged only when a
+    removal event matches its VID/PID and USB port. The devices plugged in for the first time get their repository
+    and are published to the DeviceAddedSubject. The events are handled on a thread of their own, not on the one
+    receiving them.
+    The devices are released as well before a system suspension, and reconnected right away on resume."""
+
+    @inject
+    def __init__(self,
+                 device_discovery: DeviceDiscovery,
+                 device_state_mirror: DeviceStateMirror,
+                 status_received_subject: StatusReceivedSubject,
+                 connection_state_changed_subject: ConnectionStateChangedSubject,
+                 device_added_subject: DeviceAddedSubject,
+                 helper_client: HelperClient,
+                 ) -> None:
+        self.lock = threading.RLock()
+        self._device_discovery = device_discovery
+        self._device_state_mirror = device_state_mirror
+        self._status_received_subject = status_received_subject
+        self._connection_state_changed_subject = connection_state_changed_subject
+        self._device_added_subject = device_added_subject
+        self._helper_client = helper_client
+        self._repositories: Dict[str, DeviceRepository] = {}
+        self._descriptions: Dict[str, str] = {}
+        self._locations: Dict[str, Tuple[int, int, str]] = {}  # VID, PID and USB port path of the local devices
+        self._hotplug_monitor: Optional[HotplugMonitor] = None
+        self._hotplug_executor: Optional[DeviceExecutor] = None
+
+    @synchronized_with_attr("lock")
+    def get_device_ids(self) -> List[str]:
+        """the ids of all the devices found so far, in discovery order. Newly found devices get their repository"""
+        for device_id, description in self._find_devices():
+            if device_id not in self._repositories:
+                _LOG.info("Found device %s (%s)", description, device_id)
+                self._descriptions[device_id] = description
+                self._repositories[device_id] = self._create_repository(device_id, description)
+        return list(self._repositories)
+
+    @synchronized_with_attr("lock")
+    def get_repository(self, device_id: str) -> DeviceRepository:
+        return self._repositories[device_id]
+
+    @synchronized_with_attr("lock")
+    def get_description(self, device_id: str) -> str:
+        return self._descriptions.get(device_id, device_id)
+
+    @synchronized_with_attr("lock")
+    def start_hotplug_monitor(self, usb_ids: AbstractSet[Tuple[int, int]],
+                              open_socket: Callable[[], socket.socket] = open_uevent_socket) -> None:
+        """starts monitoring the devices with the given (VID, PID) being plugged in or unplugged. The helper process,
+        when enabled, monitors the devices it owns by itself"""
+        if self._hotplug_monitor is None and not self._helper_client.is_enabled:
+            self._hotplug_executor = DeviceExecutor('kraken-hotplug-events')
+            self._hotplug_monitor = HotplugMonitor(usb_ids, self._on_hotplug_events, open_socket)
+            if not self._hotplug_monitor.start():
+                self._hotplug_monitor = None
+                self._hotplug_executor.shutdown()
+                self._hotplug_executor = None
+
+    def prepare_for_sleep(self) -> None:
+        """releases the devices before the system suspends, waiting for at most _SLEEP_PREPARATION_TIMEOUT"""
+        # on the threads owning the devices, ahead of any other pending operation
+        futures = [repository.submit(JobPriority.SAFETY, repository.on_system_sleep)
+                   for repository in self.get_local_repositories()]
+        deadline = time.monotonic() + _SLEEP_PREPARATION_TIMEOUT
+        for future in futures:
+            try:
+                future.result(max(0.0, deadline - time.monotonic()))
+            except (FutureTimeoutError, OSError, ValueError) as ex:
+                _LOG.warning("Unable to release a device before the suspension: %r", ex)
+
+    def on_system_resumed(self) -> None:
+        """the devices could have been power cycled, or unplugged, while the system was suspended"""
+        self._device_discovery.invalidate()
+        for repository in self.get_local_repositories():
+            repository.submit(JobPriority.SAFETY, repository.on_system_resumed)
+
+    def shutdown(self) -> None:
+        with self.lock:
+            hotplug_monitor, self._hotplug_monitor = self._hotplug_monitor, None
+            hotplug_executor, self._hotplug_executor = self._hotplug_executor, None
+        # not holding the lock: the events being handled need it
+        if hotplug_monitor is not None:
+            hotplug_monitor.stop()
+        if hotplug_executor is not None:
+            hotplug_executor.shutdown()
+        with self.lock:
+            for repository in self._repositories.values():
+                repository.shutdown()
+        self._helper_client.stop()
+
+    def _find_devices(self) -> List[Tuple[str, str]]:
+        """the (device id, description) of the supported devices found. The location of the local ones is updated"""
+        if self._helper_client.is_enabled:
+            try:
+                devices: List[Tuple[str, str]] = self._helper_client.list_devices()
+                return devices
+            except OSError as ex:
+                _LOG.error("Unable to get the devices found by the helper process: %s", ex)
+                return []
+        drivers = self._device_discovery.find_devices()
+        for device_id, driver in drivers.items():
+            self._locations[device_id] = (driver.vendor_id, driver.product_id, get_port_path(driver))
+        return [(device_id, driver.description) for device_id, driver in drivers.items()]
+
+    def _on_hotplug_events(self, events: List[HotplugEvent]) -> None:
+        """called on the thread receiving the events, that must not wait for the buses to be enumerated"""
+        executor = self._hotplug_executor
+        if executor is not None:
+            executor.submit(JobPriority.SAFETY, self._handle_hotplug_events, events).add_done_callback(
+                self._log_hotplug_error)
+
+    @staticmethod
+    def _log_hotplug_error(future: Future) -> None:
+        error = future.exception()
+        if error is not None:
+            _LOG.error("Error handling the hotplug events: %r", error)
+
+    def _handle_hotplug_events(self, events: List[HotplugEvent]) -> None:
+        _LOG.info("Devices plugged in or unplugged: %s",
+                  ', '.join(f'{event.action} {event.vendor_id:04x}:{event.product_id:04x}' for event in events))
+        removals = [event for event in events if event.action == 'remove']
+        for repository in self.get_local_repositories():
+            location = self._get_location(repository.device_id)
+            if location is not None and any(event.is_at(*location) for event in removals):
+                # on the thread owning the device, ahead of any other pending operation
+                repository.submit(JobPriority.SAFETY, repository.on_device_removed)
+        if len(removals) == len(events):
+            return
+        with self.lock:
+            known_device_ids = set(self._repositories)
+            self._device_discovery.invalidate()
+            device_ids = self.get_device_ids()
+            present_device_ids = set(self._device_discovery.find_devices())
+        for repository in self.get_local_repositories():
+            if repository.device_id in known_device_ids and repository.device_id in present_device_ids:
+                repository.submit(JobPriority.SAFETY, repository.on_device_added)
+        for device_id in device_ids:
+            if device_id not in known_device_ids:
+                self._device_added_subject.on_next(device_id)
+
+    @synchronized_with_attr("lock")
+    def _get_location(self, device_id: str) -> Optional[Tuple[int, int, str]]:
+        return self._locations.get(device_id)
+
+    @synchronized_with_attr("lock")
+    def get_local_repositories(self) -> List[KrakenRepository]:
+        """the repositories of the devices owned by this process, not by the helper process"""
+        return [repository for repository in self._repositories.values() if isinstance(repository, KrakenRepository)]
+
+    def _create_repository(self, device_id: str, description: str) -> DeviceRepository:
+        connection_manager = ConnectionManager(device_id, self._connection_state_changed_subject)
+        if self._helper_client.is_enabled:
+            return RemoteKrakenRepository(device_id, description, self._helper_client, connection_manager,
+                                          self._status_received_subject)
+        return KrakenRepository(device_id, connection_manager, self._device_state_mirror,
+                                self._status_received_subject)
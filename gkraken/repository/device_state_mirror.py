@@ -0,0 +1,74 @@
+#  This file is part of gkraken.
+#
+#  Copyright (c) 2021 Roberto Leinardi and Guy Boldon
+#
+#  gkraken is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  gkraken is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
+
+import logging
+import threading
+from typing import Optional, Dict, Hashable
+
+from injector import singleton
+
+from gkraken.util.concurrency import synchronized_with_attr
+
+_LOG = logging.getLogger(__name__)
+
+
+@singleton
+class DeviceStateMirror:
+    """Mirrors the settings last confirmed by each device (by serial number), as a hash per channel,
+    so that writing again the same settings can be skipped.
+    The mirror must be invalidated every time the device could have lost its settings (disconnection,
+    power cycle), since from then on its state is unknown."""
+
+    def __init__(self) -> None:
+        self.lock = threading.RLock()
+        self._state_hashes: Dict[str, Dict[str, int]] = {}
+        self._suppressed_writes: int = 0
+
+    @property
+    def suppressed_writes(self) -> int:
+        """number of writes skipped because the device was already holding the same settings"""
+        return self._suppressed_writes
+
+    @staticmethod
+    def hash_state(state: Hashable) -> int:
+        return hash(state)
+
+    @synchronized_with_attr("lock")
+    def is_applied(self, serial_number: Optional[str], channel: str, state_hash: int) -> bool:
+        """returns True, and counts the write as suppressed, if the device already holds this state"""
+        if serial_number and self._state_hashes.get(serial_number, {}).get(channel) == state_hash:
+            self._suppressed_writes += 1
+            _LOG.debug("Skipping %s write, settings already applied (suppressed writes: %d)",
+                       channel, self._suppressed_writes)
+            return True
+        return False
+
+    @synchronized_with_attr("lock")
+    def confirm(self, serial_number: Optional[str], channel: str, state_hash: int) -> None:
+        if serial_number:
+            self._state_hashes.setdefault(serial_number, {})[channel] = state_hash
+
+    @synchronized_with_attr("lock")
+    def invalidate(self, serial_number: Optional[str] = None, channel: Optional[str] = None) -> None:
+        """forgets the state of the given channel of the device, of all its channels if channel is None or,
+        if serial_number is None, of all the devices"""
+        if serial_number is None:
+            self._state_hashes.clear()
+        elif channel is None:
+            self._state_hashes.pop(serial_number, None)
+        else:
+            self._state_hashes.get(serial_number, {}).pop(channel, None)
@@ -0,0 +1,103 @@
+#  This file is part of gkraken.
+#
+#  Copyright (c) 2021 Roberto Leinardi and Guy Boldon
+#
+#  gkraken is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  gkraken is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Callable, Dict, Optional, Tuple, TypeVar, Any
+
+from gkraken.error.device_stall_error import DeviceStallError
+from gkraken.util.wakeup_stats import WakeupStats
+
+_LOG = logging.getLogger(__name__)
+_T = TypeVar('_T')
+_DEFAULT_TIMEOUT = 5.0  # seconds
+
+_CallRequest = Tuple[str, Callable[[], Any], float, Future]
+
+
+class DeviceWatchdog:
+    """Runs the device operations on a worker thread and waits for each of them up to its deadline.
+
+    A stalled operation can't be interrupted: when its deadline expires the worker thread is abandoned
+    (the next operation will start a new one) and DeviceStallError is raised, so that the caller can
+    abandon the device handle too and go through the reconnection path.
+    If the stalled operation ever returns, the total duration of the stall is logged."""
+
+    def __init__(self, name: str, timeouts: Dict[str, float], wakeup_stats: Optional[WakeupStats] = None) -> None:
+        self._name = name
+        self._timeouts = timeouts
+        self._wakeup_stats = wakeup_stats
+        self._lock = threading.Lock()
+        self._worker_queue: Optional['queue.SimpleQueue[Optional[_CallRequest]]'] = None
+        self._worker_count: int = 0
+
+    def call(self, operation: str, function: Callable[[], _T]) -> _T:
+        timeout = self._timeouts.get(operation, _DEFAULT_TIMEOUT)
+        future: Future = Future()
+        worker_queue = self._get_worker_queue()
+        worker_queue.put((operation, function, timeout, future))
+        try:
+            result: _T = future.result(timeout)
+            return result
+        except FutureTimeoutError:
+            self._abandon_worker(worker_queue)
+            _LOG.error("Device operation %s stalled for more than %.1f s, abandoning the device handle",
+                       operation, timeout)
+            raise DeviceStallError(operation, timeout) from None
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._worker_queue is not None:
+                self._worker_queue.put(None)
+                self._worker_queue = None
+
+    def _get_worker_queue(self) -> 'queue.SimpleQueue[Optional[_CallRequest]]':
+        with self._lock:
+            if self._worker_queue is None:
+                self._worker_queue = queue.SimpleQueue()
+                self._worker_count += 1
+                threading.Thread(target=self._run, args=(self._worker_queue, self._wakeup_stats),
+                                 name=f"{self._name}-{self._worker_count}", daemon=True).start()
+            return self._worker_queue
+
+    def _abandon_worker(self, worker_queue: 'queue.SimpleQueue[Optional[_CallRequest]]') -> None:
+        with self._lock:
+            if self._worker_queue is worker_queue:
+                self._worker_queue = None
+        # the stalled worker will stop as soon as (if ever) the operation returns
+        worker_queue.put(None)
+
+    @staticmethod
+    def _run(worker_queue: 'queue.SimpleQueue[Optional[_CallRequest]]', wakeup_stats: Optional[WakeupStats]) -> None:
+        while True:
+            request = worker_queue.get()
+            if request is None:
+                return
+            if wakeup_stats is not None:
+                wakeup_stats.count('device I/O')
+            operation, function, timeout, future = request
+            start_time = time.monotonic()
+            try:
+                future.set_result(function())
+            except BaseException as ex:  # pylint: disable=broad-except
+                future.set_exception(ex)
+            duration = time.monotonic() - start_time
+            if duration > timeout:
+                _LOG.error("Stalled device operation %s returned after %.1f s", operation, duration)
@@ -0,0 +1,162 @@
+#  This file is part of gkraken.
+#
+#  Copyright (c) 2021 Roberto Leinardi and Guy Boldon
+#
+#  gkraken is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  gkraken is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
+
+import csv
+import logging
+import math
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from injector import singleton, inject
+
+from gkraken.repository.device_executor import JobPriority
+from gkraken.repository.device_registry import DeviceRegistry
+from gkraken.util.concurrency import synchronized_with_attr
+from gkraken.util.sample_ring_buffer import SampleRingBuffer, SAMPLE_COLUMNS
+from gkraken.util.wakeup_stats import WakeupStats
+
+_LOG = logging.getLogger(__name__)
+
+MIN_SAMPLING_RATE = 5.0  # Hz
+MAX_SAMPLING_RATE = 20.0  # Hz
+DEFAULT_SAMPLING_RATE = 10.0  # Hz
+SAMPLING_TIME_LIMIT = 600  # seconds, the sampling stops by itself once elapsed
+_BUFFER_DURATION = 300  # seconds of samples kept for every device
+DECIMATED_POINTS = 300  # points of the decimated view of the samples of every device
+
+# only the latest sample job of a device is kept queued, a device slower than the rate is sampled as fast as it answers
+_SAMPLE_JOB_KEY = 'diagnostic-sample'
+
+
+@singleton
+class DiagnosticSampler:
+    """Samples the temperature, speeds and duties of the devices at a high rate, for debugging, independently of
+    the status refresh interval. Every device is read by jobs on the thread owning it, at background priority,
+    and its samples are kept in a SampleRingBuffer: nothing is allocated per sample but the driver status itself.
+    Only the devices owned by this process are sampled, not the ones owned by the helper process.
+
+    The sampling is off unless requested (see the --diagnostic-sampling option) and stops by itself after
+    SAMPLING_TIME_LIMIT. The samples are dumped to a CSV file when it stops, or on demand by dump(), along with
+    their decimated view, the only one exported (see get_decimated_path())"""
+
+    @inject
+    def __init__(self,
+                 device_registry: DeviceRegistry,
+                 wakeup_stats: WakeupStats,
+                 ) -> None:
+        self.lock = threading.RLock()
+        self._device_registry = device_registry
+        self._wakeup_stats = wakeup_stats
+        self._buffers: Dict[str, SampleRingBuffer] = {}
+        self._buffer_capacity: int = 0
+        self._dump_path: Optional[str] = None
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @synchronized_with_attr("lock")
+    def start(self, dump_path: str, rate: float = DEFAULT_SAMPLING_RATE,
+              time_limit: float = SAMPLING_TIME_LIMIT) -> None:
+        """samples the devices rate times per second, for at most time_limit seconds"""
+        if self.is_running:
+            return
+        rate = min(max(rate, MIN_SAMPLING_RATE), MAX_SAMPLING_RATE)
+        time_limit = min(max(time_limit, 0.0), SAMPLING_TIME_LIMIT)
+        _LOG.info("Sampling the devices at %.1f Hz for at most %d s, dumping the samples to %s",
+                  rate, time_limit, dump_path)
+        self._dump_path = dump_path
+        self._buffer_capacity = math.ceil(rate * min(time_limit, _BUFFER_DURATION)) or 1
+        self._buffers.clear()
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, args=(1 / rate, time.monotonic() + time_limit),
+                                        name='kraken-diagnostic-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """stops the sampling, the samples are dumped"""
+        self._stop_event.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+    @synchronized_with_attr("lock")
+    def dump(self) -> int:
+        """writes the samples of all the devices to the dump file, and their decimated view to the file next to it.
+        Returns the number of samples written"""
+        if self._dump_path is None:
+            return 0
+        rows = 0
+        decimated_path = get_decimated_path(self._dump_path)
+        try:
+            with open(self._dump_path, 'w', encoding='utf-8', newline='') as file:
+                file.write(','.join(('device_id',) + SAMPLE_COLUMNS) + '\n')
+                for device_id, buffer in self._buffers.items():
+                    rows += buffer.dump(file, device_id)
+            with open(decimated_path, 'w', encoding='utf-8', newline='') as file:
+                writer = csv.writer(file)
+                writer.writerow(('device_id',) + SAMPLE_COLUMNS)
+                for device_id in self._buffers:
+                    writer.writerows([device_id] + ['' if math.isnan(value) else repr(value) for value in point]
+                                     for point in self.get_decimated_samples(device_id, DECIMATED_POINTS))
+        except OSError as ex:
+            _LOG.error("Unable to dump the diagnostic samples to %s: %s", self._dump_path, ex)
+            return 0
+        _LOG.info("%d diagnostic samples dumped to %s, decimated to %s", rows, self._dump_path, decimated_path)
+        return rows
+
+    @synchronized_with_attr("lock")
+    def get_decimated_samples(self, device_id: str, max_points: int) -> List[Tuple[float, ...]]:
+        """the samples of the device, in the SAMPLE_COLUMNS order, averaged down to at most max_points"""
+        buffer = self._buffers.get(device_id)
+        return buffer.decimated(max_points) if buffer is not None else []
+
+    @synchronized_with_attr("lock")
+    def _get_buffer(self, device_id: str) -> SampleRingBuffer:
+        buffer = self._buffers.get(device_id)
+        if buffer is None:
+            buffer = SampleRingBuffer(self._buffer_capacity)
+            self._buffers[device_id] = buffer
+        return buffer
+
+    def _run(self, period: float, deadline: float) -> None:
+        next_time = time.monotonic()
+        while not self._stop_event.wait(max(0.0, next_time - time.monotonic())):
+            now = time.monotonic()
+            if now >= deadline:
+                _LOG.info("Diagnostic sampling time limit reached")
+                break
+            self._wakeup_stats.count('diagnostic sampling')
+            for repository in self._device_registry.get_local_repositories():
+                repository.submit(JobPriority.BACKGROUND, repository.read_sample,
+                                  self._get_buffer(repository.device_id), coalesce_key=_SAMPLE_JOB_KEY)
+            # the ticks missed (e.g. while the system was suspended) are skipped
+            next_time += period
+            if next_time < now:
+                next_time = now + period
+        _LOG.info("Diagnostic sampling stopped")
+        self.dump()
+
+
+def get_decimated_path(dump_path: str) -> str:
+    """the file the decimated view of the samples dumped to dump_path is exported to"""
+    root, extension = os.path.splitext(dump_path)
+    return f'{root}-decimated{extension or ".csv"}'
@@ -0,0 +1,408 @@
+#  This file is part of gkraken.
+#
+#  Copyright (c) 2021 Roberto Leinardi and Guy Boldon
+#
+#  gkraken is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  gkraken is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
+
+import itertools
+import logging
+import os
+import re
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Optional, List, Tuple, Dict, Type, Sequence, Callable, Any
+
+from injector import singleton, inject
+from liquidctl.driver.base import BaseDriver
+
+from gkraken.conf import LIQUID_TEMPERATURE_SOURCE
+from gkraken.core_di import INJECTOR, StatusReceivedSubject
+from gkraken.device.device_settings import DeviceSettings
+from gkraken.error.device_stall_error import DeviceStallError
+from gkraken.error.legacy_kraken_warning import LegacyKrakenWarning
+from gkraken.model.apply_batch import ApplyBatch, ApplyResult, ApplyItem, SpeedProfileItem, LightingItem
+from gkraken.model.control_tuning import ControlTuning, DEFAULT_CONTROL_TUNING
+from gkraken.model.lighting_modes import LightingModes
+from gkraken.model.lighting_settings import LightingSettings
+from gkraken.model.status import Status
+from gkraken.repository.connection_manager import ConnectionManager
+from gkraken.repository.device_executor import DeviceExecutor, JobPriority
+from gkraken.repository.helper_protocol import MessageType, send_frame, receive_frame, decode_devices, \
+    decode_device_info, decode_status, decode_error, encode_device_id, encode_speed_profile, encode_color, \
+    encode_apply_batch, decode_batch_results
+from gkraken.util.concurrency import synchronized_with_attr
+from gkraken.util.wakeup_stats import WakeupStats
+
+_LOG = logging.getLogger(__name__)
+_HELPER_MODULE = 'gkraken.repository.helper_server'
+_START_TIMEOUT = 10.0  # seconds, for the helper process to connect
+_STOP_TIMEOUT = 5.0  # seconds, for the helper process to exit before being killed
+_RESTART_DELAY = 2.0  # seconds, minimum time between two starts of the helper process
+# seconds: the helper has its own deadlines on the device operations, this only detects a helper that hangs
+_REQUEST_TIMEOUT = 30.0
+
+
+class HelperConnection:
+    """A connection to the helper process. Requests can be sent from any thread: a reader thread completes them
+    as the responses arrive. Once closed, by either side, the connection can't be used anymore"""
+
+    def __init__(self, sock: socket.socket) -> None:
+        self._sock = sock
+        self._lock = threading.Lock()
+        self._request_ids = itertools.count(1)
+        self._pending: Dict[int, Future] = {}
+        self._closed = False
+        self._reader = threading.Thread(target=self._read_responses, name='kraken-helper-reader', daemon=True)
+        self._reader.start()
+
+    @property
+    def is_closed(self) -> bool:
+        return self._closed
+
+    def request(self, message_type: MessageType, payload: bytes = b'',
+                timeout: float = _REQUEST_TIMEOUT) -> Tuple[MessageType, bytes]:
+        """sends a request and waits for its response. Errors raised by the helper are raised again"""
+        future: Future = Future()
+        with self._lock:
+            if self._closed:
+                raise ConnectionError("Helper connection closed")
+            request_id = next(self._request_ids) & 0xffffffff
+            self._pending[request_id] = future
+            try:
+                send_frame(self._sock, message_type, request_id, payload)
+            except OSError as ex:
+                del self._pending[request_id]
+                raise ConnectionError(f"Unable to send the request to the helper: {ex}") from ex
+        try:
+            response_type, response = future.result(timeout)
+        except FutureTimeoutError as ex:
+            _LOG.error("No response from the helper in %.1f s, closing the connection", timeout)
+            self.close()
+            raise ConnectionError("Helper not responding") from ex
+        if response_type == MessageType.ERROR:
+            raise create_error(*decode_error(response))
+        return response_type, response
+
+    def close(self) -> None:
+        try:
+            self._sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass  # already closed
+
+    def _read_responses(self) -> None:
+        try:
+            while True:
+                frame = receive_frame(self._sock)
+                if frame is None:
+                    break
+                message_type, request_id, payload = frame
+                with self._lock:
+                    future = self._pending.pop(request_id, None)
+                if future is not None:
+                    future.set_result((message_type, payload))
+        except OSError as ex:
+            _LOG.error("Helper connection error: %s", ex)
+        finally:
+            with self._lock:
+                self._closed = True
+                pending = list(self._pending.values())
+                self._pending.clear()
+            for future in pending:
+                future.set_exception(ConnectionError("Helper connection closed"))
+            self._sock.close()
+
+
+_STALL_MESSAGE = re.compile(r'Device operation (\S+) stalled for more than ([0-9.]+) s')
+
+
+def create_error(type_name: str, message: str) -> Exception:
+    """the error to raise in the GUI for an error raised by the helper"""
+    stall = _STALL_MESSAGE.fullmatch(message) if type_name == DeviceStallError.__name__ else None
+    if stall is not None:
+        stall_error: Exception = DeviceStallError(stall.group(1), float(stall.group(2)))
+        return stall_error
+    error: Exception = LegacyKrakenWarning(message) if type_name == LegacyKrakenWarning.__name__ \
+        else OSError(f"{type_name}: {message}")
+    return error
+
+
+@singleton
+class HelperClient:
+    """Starts the helper process owning the devices and connects to it. The helper is started on the first request
+    and, if it crashes, started again on the next one. The GUI listens on a socket in a private directory and the
+    helper connects to it, so the helper can be started with more privileges (e.g. with pkexec as launcher).
+    The helper is not used unless requested from the command line"""
+
+    @inject
+    def __init__(self) -> None:
+        self.lock = threading.RLock()
+        self._enabled = False
+        self._launcher: List[str] = []
+        self._connection: Optional[HelperConnection] = None
+        self._process: Optional[subprocess.Popen] = None
+        self._socket_dir: Optional[str] = None
+        self._last_start_time = -_RESTART_DELAY
+        self._starts: int = 0
+
+    @property
+    def is_enabled(self) -> bool:
+        return self._enabled
+
+    @synchronized_with_attr("lock")
+    def connect(self) -> int:
+        """connects to the helper process, started if needed. Returns the number of times it has been started:
+        when it changes, the devices are owned by a new helper, which knows nothing of the settings applied"""
+        self._get_connection()
+        return self._starts
+
+    @synchronized_with_attr("lock")
+    def enable(self, launcher: Sequence[str] = ()) -> None:
+        _LOG.info("Accessing the devices through the helper process")
+        self._enabled = True
+        self._launcher = list(launcher)
+
+    def request(self, message_type: MessageType, payload: bytes = b'') -> Tuple[MessageType, bytes]:
+        response: Tuple[MessageType, bytes] = self._get_connection().request(message_type, payload)
+        return response
+
+    def list_devices(self) -> List[Tuple[str, str]]:
+        """the (device id, description) of the devices found by the helper"""
+        _, payload = self.request(MessageType.LIST_DEVICES)
+        devices: List[Tuple[str, str]] = decode_devices(payload)
+        return devices
+
+    @synchronized_with_attr("lock")
+    def stop(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+        self._stop_process()
+        if self._socket_dir is not None:
+            shutil.rmtree(self._socket_dir, ignore_errors=True)
+            self._socket_dir = None
+
+    @synchronized_with_attr("lock")
+    def _get_connection(self) -> HelperConnection:
+        if self._connection is None or self._connection.is_closed:
+            self._connection = self._start_helper()
+        return self._connection
+
+    def _start_helper(self) -> HelperConnection:
+        if time.monotonic() - self._last_start_time < _RESTART_DELAY:
+            raise ConnectionError("Helper process restarted too recently")
+        self._last_start_time = time.monotonic()
+        self._stop_process()
+        if self._socket_dir is None:
+            self._socket_dir = tempfile.mkdtemp(prefix='gkraken-')
+        socket_path = os.path.join(self._socket_dir, 'helper.sock')
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        command = self._launcher + [sys.executable, '-m', _HELPER_MODULE, socket_path]
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as listener:
+            listener.bind(socket_path)
+            listener.listen(1)
+            listener.settimeout(_START_TIMEOUT)
+            _LOG.info("Starting the helper process: %s", ' '.join(command))
+            self._process = subprocess.Popen(command)  # pylint: disable=consider-using-with
+            try:
+                sock, _ = listener.accept()
+            except socket.timeout as ex:
+                self._stop_process()
+                raise ConnectionError("The helper process didn't connect") from ex
+        sock.settimeout(None)
+        self._starts += 1
+        return HelperConnection(sock)
+
+    def _stop_process(self) -> None:
+        process = self._process
+        self._process = None
+        if process is None:
+            return
+        if process.poll() is None:
+            process.terminate()
+            try:
+                process.wait(_STOP_TIMEOUT)
+            except subprocess.TimeoutExpired:
+                _LOG.warning("The helper process didn't exit, killing it")
+                process.kill()
+                process.wait()
+        elif process.returncode != 0:
+            _LOG.error("The helper process exited with status %d", process.returncode)
+
+
+class RemoteKrakenRepository:
+    """Gives access to a device owned by the helper process, with the same interface of the KrakenRepository.
+    The requests are sent by the worker thread of the device, so a slow device doesn't delay the others.
+    Losing the helper is handled like losing the device: the connection manager reports it. The settings applied
+    are sent again, with a single batch, to a helper started again after it crashed"""
+
+    def __init__(self,
+                 device_id: str,
+                 description: str,
+                 helper_client: HelperClient,
+                 connection_manager: ConnectionManager,
+                 status_received_subject: StatusReceivedSubject,
+                 ) -> None:
+        self._device_id = device_id
+        self._description = description
+        self._helper_client = helper_client
+        self._connection_manager = connection_manager
+        self._status_received_subject = status_received_subject
+        self._executor = DeviceExecutor(f'kraken-remote-{device_id}', INJECTOR.get(WakeupStats))
+        self._settings: Optional[Type[DeviceSettings]] = None
+        self._firmware_version: Optional[str] = None
+        # the latest item applied to every (item type, channel), and the helper start they have been applied to
+        self._applied: Dict[Tuple[type, str], ApplyItem] = {}
+        self._helper_start: Optional[int] = None
+
+    @property
+    def device_id(self) -> str:
+        return self._device_id
+
+    @property
+    def driver_type(self) -> Optional[Type[BaseDriver]]:
+        return self._settings.supported_driver if self._settings is not None else None
+
+    @property
+    def firmware_version(self) -> Optional[str]:
+        return self._firmware_version
+
+    @property
+    def writes_avoided(self) -> Optional[int]:
+        """not reported by the helper process"""
+        return None
+
+    def has_supported_kraken(self) -> bool:
+        try:
+            _, payload = self._request(MessageType.CONNECT, encode_device_id(self._device_id))
+        except ConnectionError:
+            return False
+        connected: bool
+        connected, driver_name, firmware_version = decode_device_info(payload)
+        self._settings = self._find_settings(driver_name)
+        self._firmware_version = firmware_version or None
+        return connected
+
+    def submit(self, priority: JobPriority, function: Callable[..., Any], *args: Any,
+               coalesce_key: Optional[str] = None) -> Future:
+        future: Future = self._executor.submit(priority, function, *args, coalesce_key=coalesce_key)
+        return future
+
+    def shutdown(self) -> None:
+        self._executor.shutdown()
+
+    def cleanup(self) -> None:
+        """the device is owned, and released, by the helper process"""
+
+    def get_status(self) -> Optional[Status]:
+        try:
+            _, payload = self._request(MessageType.GET_STATUS, encode_device_id(self._device_id))
+        except OSError as ex:
+            _LOG.error("Error getting the status: %s", ex)
+            return None
+        if not payload or self._settings is None:
+            return None
+        liquid_temperature, firmware_version, fan_rpm, fan_duty, pump_rpm, pump_duty = decode_status(payload)
+        status = Status(self._settings.supported_driver, liquid_temperature, firmware_version, fan_rpm, fan_duty,
+                        pump_rpm, pump_duty, self._description, self._device_id)
+        self._status_received_subject.on_next(status)
+        return status
+
+    def set_speed_profile(self, channel_value: str, profile_data: List[Tuple[int, int]],
+                          tuning: ControlTuning = DEFAULT_CONTROL_TUNING,
+                          temperature_source: str = LIQUID_TEMPERATURE_SOURCE) -> None:
+        if profile_data:
+            try:
+                self._request(MessageType.SET_SPEED_PROFILE, encode_speed_profile(
+                    self._device_id, channel_value, profile_data, tuning, temperature_source))
+            except OSError as ex:
+                _LOG.error("Error setting the speed profile: %s", ex)
+                return
+            self._remember_applied(SpeedProfileItem(channel_value, profile_data, tuning, temperature_source))
+
+    def get_lighting_modes(self) -> Optional[LightingModes]:
+        return self._settings.get_compatible_lighting_modes() if self._settings is not None else None
+
+    def set_lighting_mode(self, settings: LightingSettings) -> None:
+        if settings:
+            try:
+                self._request(MessageType.SET_COLOR, encode_color(
+                    self._device_id, settings.channel.value, settings.mode.name, settings.colors.values(),
+                    settings.speed_or_default, settings.direction_or_default))
+            except OSError as ex:
+                _LOG.error("Error setting the Lighting Profile: %s", ex)
+                return
+            self._remember_applied(LightingItem(settings.channel.value, settings.mode.name, settings.colors.values(),
+                                                settings.speed_or_default, settings.direction_or_default))
+
+    def apply_batch(self, batch: ApplyBatch) -> List[ApplyResult]:
+        """the whole batch is sent with a single request and applied by the helper in a single session"""
+        try:
+            _, payload = self._request(MessageType.APPLY_BATCH, encode_apply_batch(self._device_id, batch))
+        except OSError as ex:
+            _LOG.error("Error applying the batch: %s", ex)
+            return [ApplyResult(item, ex) for item in batch.items]
+        results = [ApplyResult(item, None if error is None else create_error(*error))
+                   for item, error in zip(batch.items, decode_batch_results(payload))]
+        for result in results:
+            if result.succeeded:
+                self._remember_applied(result.item)
+        return results
+
+    def _remember_applied(self, item: ApplyItem) -> None:
+        self._applied[(type(item), item.channel_value)] = item
+
+    def _request(self, message_type: MessageType, payload: bytes) -> Tuple[MessageType, bytes]:
+        try:
+            self._restore_applied()
+            response = self._helper_client.request(message_type, payload)
+        except ConnectionError:
+            self._connection_manager.on_connection_lost()
+            raise
+        self._connection_manager.on_connected()
+        return response
+
+    def _restore_applied(self) -> None:
+        """sends the settings applied again, with a single batch, if the helper has been started again since they
+        have been applied: the one that applied them, and the software curves it was running, are gone"""
+        helper_start = self._helper_client.connect()
+        if self._helper_start is not None and helper_start != self._helper_start and self._applied:
+            batch = ApplyBatch()
+            batch.items.extend(self._applied.values())
+            _LOG.warning("Helper process started again, applying the settings of %s again", self._device_id)
+            _, payload = self._helper_client.request(MessageType.APPLY_BATCH,
+                                                     encode_apply_batch(self._device_id, batch))
+            errors = [(item, error) for item, error in zip(batch.items, decode_batch_results(payload))
+                      if error is not None]
+            for item, error in errors:
+                _LOG.error("Unable to apply %s again: %s", item, create_error(*error))
+            if errors:
+                # tried again on the next request
+                return
+        self._helper_start = helper_start
+
+    @staticmethod
+    def _find_settings(driver_name: str) -> Optional[Type[DeviceSettings]]:
+        for device_setting in DeviceSettings.__subclasses__():
+            driver_type = device_setting.supported_driver
+            if f'{driver_type.__module__}.{driver_type.__qualname__}' == driver_name:
+                settings: Type[DeviceSettings] = device_setting
+                return settings
+        return None
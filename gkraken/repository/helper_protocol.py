@@ -0,0 +1,324 @@
+#  This file is part of gkraken.
+#
+#  Copyright (c) 2021 Roberto Leinardi and Guy Boldon
+#
+#  gkraken is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  gkraken is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
+
+"""The binary protocol spoken between the GUI and the helper process owning the devices, over a Unix socket.
+
+Every frame is a 9 bytes header (payload length, message type and request id) followed by the payload.
+The response to a request carries the id of the request: requests to different devices are served concurrently
+and their responses can arrive in any order.
+Strings are UTF-8 prefixed by their length, numbers are little endian.
+"""
+
+import socket
+import struct
+from enum import IntEnum
+from typing import Optional, Tuple, List, Sequence, Any
+
+from gkraken.conf import LIQUID_TEMPERATURE_SOURCE
+from gkraken.model.apply_batch import ApplyBatch, SpeedProfileItem
+from gkraken.model.control_tuning import ControlTuning, DEFAULT_CONTROL_TUNING
+
+_HEADER = struct.Struct('<IBI')  # payload length, message type, request id
+_STRING_LENGTH = struct.Struct('<H')
+_COUNT = struct.Struct('<H')
+_FLAG = struct.Struct('<B')
+# presence flags, liquid temperature, fan rpm, fan duty, pump rpm, pump duty
+_STATUS = struct.Struct('<Bfifif')
+_SPEED_STEP = struct.Struct('<BB')
+_TUNING = struct.Struct('<ffff')
+_COLOR = struct.Struct('<BBB')
+_MAX_PAYLOAD_LENGTH = 1 << 20
+
+_FAN_RPM_FLAG = 0x1
+_FAN_DUTY_FLAG = 0x2
+_PUMP_RPM_FLAG = 0x4
+_PUMP_DUTY_FLAG = 0x8
+
+_SPEED_PROFILE_ITEM = 0
+_COLOR_ITEM = 1
+
+
+class MessageType(IntEnum):
+    # requests, sent by the GUI
+    LIST_DEVICES = 1
+    CONNECT = 2
+    GET_STATUS = 3
+    SET_SPEED_PROFILE = 4
+    SET_COLOR = 5
+    APPLY_BATCH = 6
+    # responses, sent by the helper
+    DEVICES = 64
+    DEVICE_INFO = 65
+    STATUS = 66
+    OK = 67
+    ERROR = 68
+    BATCH_RESULTS = 69
+
+
+class ProtocolError(OSError):
+    """a malformed frame: the connection can't be used anymore"""
+
+
+class PayloadWriter:
+    def __init__(self) -> None:
+        self._buffer = bytearray()
+
+    def pack(self, packer: struct.Struct, *values: Any) -> 'PayloadWriter':
+        self._buffer += packer.pack(*values)
+        return self
+
+    def string(self, value: str) -> 'PayloadWriter':
+        encoded = value.encode('utf-8')
+        self._buffer += _STRING_LENGTH.pack(len(encoded))
+        self._buffer += encoded
+        return self
+
+    def to_bytes(self) -> bytes:
+        return bytes(self._buffer)
+
+
+class PayloadReader:
+    def __init__(self, payload: bytes) -> None:
+        self._payload = memoryview(payload)
+        self._offset = 0
+
+    def unpack(self, packer: struct.Struct) -> Tuple:
+        if self._offset + packer.size > len(self._payload):
+            raise ProtocolError("Truncated payload")
+        values = packer.unpack_from(self._payload, self._offset)
+        self._offset += packer.size
+        return values
+
+    def string(self) -> str:
+        length, = self.unpack(_STRING_LENGTH)
+        if self._offset + length > len(self._payload):
+            raise ProtocolError("Truncated string")
+        value = bytes(self._payload[self._offset:self._offset + length]).decode('utf-8')
+        self._offset += length
+        return value
+
+
+def send_frame(sock: socket.socket, message_type: MessageType, request_id: int, payload: bytes = b'') -> None:
+    sock.sendall(_HEADER.pack(len(payload), message_type, request_id) + payload)
+
+
+def receive_frame(sock: socket.socket) -> Optional[Tuple[MessageType, int, bytes]]:
+    """the next frame (message type, request id, payload) or None if the connection has been closed"""
+    header = _receive_exactly(sock, _HEADER.size)
+    if header is None:
+        return None
+    length, message_type, request_id = _HEADER.unpack(header)
+    if length > _MAX_PAYLOAD_LENGTH:
+        raise ProtocolError(f"Frame too long: {length} bytes")
+    payload = _receive_exactly(sock, length) if length else b''
+    if payload is None:
+        raise ProtocolError("Connection closed in the middle of a frame")
+    try:
+        return MessageType(message_type), request_id, payload
+    except ValueError as ex:
+        raise ProtocolError(f"Unknown message type {message_type}") from ex
+
+
+def _receive_exactly(sock: socket.socket, length: int) -> Optional[bytes]:
+    buffer = bytearray(length)
+    view = memoryview(buffer)
+    received = 0
+    while received < length:
+        count = sock.recv_into(view[received:])
+        if count == 0:
+            if received == 0:
+                return None
+            raise ProtocolError("Connection closed in the middle of a frame")
+        received += count
+    return bytes(buffer)
+
+
+def encode_devices(devices: Sequence[Tuple[str, str]]) -> bytes:
+    writer = PayloadWriter().pack(_COUNT, len(devices))
+    for device_id, description in devices:
+        writer.string(device_id).string(description)
+    return writer.to_bytes()
+
+
+def decode_devices(payload: bytes) -> List[Tuple[str, str]]:
+    """the (device id, description) of the devices found by the helper"""
+    reader = PayloadReader(payload)
+    count, = reader.unpack(_COUNT)
+    return [(reader.string(), reader.string()) for _ in range(count)]
+
+
+def encode_device_info(connected: bool, driver_name: str, firmware_version: str) -> bytes:
+    return PayloadWriter().pack(_FLAG, connected).string(driver_name).string(firmware_version).to_bytes()
+
+
+def decode_device_info(payload: bytes) -> Tuple[bool, str, str]:
+    """the connection result, the driver class (module.qualname) and the firmware version of a device"""
+    reader = PayloadReader(payload)
+    connected, = reader.unpack(_FLAG)
+    return bool(connected), reader.string(), reader.string()
+
+
+def encode_status(liquid_temperature: float, firmware_version: str,
+                  fan_rpm: Optional[int], fan_duty: Optional[float],
+                  pump_rpm: Optional[int], pump_duty: Optional[float]) -> bytes:
+    flags = ((_FAN_RPM_FLAG if fan_rpm is not None else 0)
+             | (_FAN_DUTY_FLAG if fan_duty is not None else 0)
+             | (_PUMP_RPM_FLAG if pump_rpm is not None else 0)
+             | (_PUMP_DUTY_FLAG if pump_duty is not None else 0))
+    return PayloadWriter() \
+        .pack(_STATUS, flags, liquid_temperature, fan_rpm or 0, fan_duty or 0.0, pump_rpm or 0, pump_duty or 0.0) \
+        .string(firmware_version) \
+        .to_bytes()
+
+
+def decode_status(payload: bytes) -> Tuple[float, str, Optional[int], Optional[float], Optional[int],
+                                           Optional[float]]:
+    """liquid temperature, firmware version, fan rpm, fan duty, pump rpm and pump duty"""
+    reader = PayloadReader(payload)
+    flags, liquid_temperature, fan_rpm, fan_duty, pump_rpm, pump_duty = reader.unpack(_STATUS)
+    firmware_version = reader.string()
+    return (round(liquid_temperature, 2),
+            firmware_version,
+            fan_rpm if flags & _FAN_RPM_FLAG else None,
+            round(fan_duty, 2) if flags & _FAN_DUTY_FLAG else None,
+            pump_rpm if flags & _PUMP_RPM_FLAG else None,
+            round(pump_duty, 2) if flags & _PUMP_DUTY_FLAG else None)
+
+
+def encode_speed_profile(device_id: str, channel: str, profile_data: Sequence[Sequence[int]],
+                         tuning: ControlTuning = DEFAULT_CONTROL_TUNING,
+                         temperature_source: str = LIQUID_TEMPERATURE_SOURCE) -> bytes:
+    return _write_speed_profile(PayloadWriter().string(device_id), channel, profile_data, tuning,
+                                temperature_source).to_bytes()
+
+
+def decode_speed_profile(payload: bytes) -> Tuple[str, str, List[Tuple[int, int]], ControlTuning, str]:
+    """device id, channel, profile data, control tuning and temperature source"""
+    reader = PayloadReader(payload)
+    device_id = reader.string()
+    return (device_id, *_read_speed_profile(reader))
+
+
+def encode_color(device_id: str, channel: str, mode: str, colors: Sequence[Sequence[int]], speed: str,
+                 direction: str) -> bytes:
+    return _write_color(PayloadWriter().string(device_id), channel, mode, colors, speed, direction).to_bytes()
+
+
+def decode_color(payload: bytes) -> Tuple[str, str, str, List[List[int]], str, str]:
+    """device id, channel, mode, colors, speed and direction"""
+    reader = PayloadReader(payload)
+    device_id = reader.string()
+    return (device_id, *_read_color(reader))
+
+
+def encode_apply_batch(device_id: str, batch: ApplyBatch) -> bytes:
+    writer = PayloadWriter().string(device_id).pack(_COUNT, len(batch))
+    for item in batch.items:
+        if isinstance(item, SpeedProfileItem):
+            _write_speed_profile(writer.pack(_FLAG, _SPEED_PROFILE_ITEM), item.channel_value, item.profile_data,
+                                 item.tuning, item.temperature_source)
+        else:
+            _write_color(writer.pack(_FLAG, _COLOR_ITEM), item.channel_value, item.mode_name, item.colors,
+                         item.speed, item.direction)
+    return writer.to_bytes()
+
+
+def decode_apply_batch(payload: bytes) -> Tuple[str, ApplyBatch]:
+    """device id and batch"""
+    reader = PayloadReader(payload)
+    device_id = reader.string()
+    count, = reader.unpack(_COUNT)
+    batch = ApplyBatch()
+    for _ in range(count):
+        item_type, = reader.unpack(_FLAG)
+        if item_type == _SPEED_PROFILE_ITEM:
+            batch.add_speed_profile(*_read_speed_profile(reader))
+        elif item_type == _COLOR_ITEM:
+            batch.add_color(*_read_color(reader))
+        else:
+            raise ProtocolError(f"Unknown batch item {item_type}")
+    return device_id, batch
+
+
+def encode_batch_results(errors: Sequence[Optional[BaseException]]) -> bytes:
+    """the outcome of every item of a batch: None if it has been applied, otherwise the error raised"""
+    writer = PayloadWriter().pack(_COUNT, len(errors))
+    for error in errors:
+        writer.pack(_FLAG, error is not None)
+        if error is not None:
+            writer.string(error.__class__.__name__).string(str(error))
+    return writer.to_bytes()
+
+
+def decode_batch_results(payload: bytes) -> List[Optional[Tuple[str, str]]]:
+    """for every item of a batch None if it has been applied, otherwise the class name and the message of the error"""
+    reader = PayloadReader(payload)
+    count, = reader.unpack(_COUNT)
+    results: List[Optional[Tuple[str, str]]] = []
+    for _ in range(count):
+        failed, = reader.unpack(_FLAG)
+        results.append((reader.string(), reader.string()) if failed else None)
+    return results
+
+
+def _write_speed_profile(writer: PayloadWriter, channel: str, profile_data: Sequence[Sequence[int]],
+                         tuning: ControlTuning, temperature_source: str) -> PayloadWriter:
+    writer.string(channel).pack(_COUNT, len(profile_data))
+    for temperature, duty in profile_data:
+        writer.pack(_SPEED_STEP, temperature, duty)
+    writer.pack(_TUNING, tuning.hysteresis_up, tuning.hysteresis_down, tuning.min_duty_delta, tuning.max_slew_rate)
+    return writer.string(temperature_source)
+
+
+def _read_speed_profile(reader: PayloadReader) -> Tuple[str, List[Tuple[int, int]], ControlTuning, str]:
+    channel = reader.string()
+    count, = reader.unpack(_COUNT)
+    profile_data = [reader.unpack(_SPEED_STEP) for _ in range(count)]
+    tuning = ControlTuning(*(round(value, 3) for value in reader.unpack(_TUNING)))
+    return channel, profile_data, tuning, reader.string()
+
+
+def _write_color(writer: PayloadWriter, channel: str, mode: str, colors: Sequence[Sequence[int]], speed: str,
+                 direction: str) -> PayloadWriter:
+    writer.string(channel).string(mode).string(speed).string(direction).pack(_COUNT, len(colors))
+    for red, green, blue in colors:
+        writer.pack(_COLOR, red, green, blue)
+    return writer
+
+
+def _read_color(reader: PayloadReader) -> Tuple[str, str, List[List[int]], str, str]:
+    channel, mode, speed, direction = (reader.string() for _ in range(4))
+    count, = reader.unpack(_COUNT)
+    return channel, mode, [list(reader.unpack(_COLOR)) for _ in range(count)], speed, direction
+
+
+def encode_error(error: BaseException) -> bytes:
+    return PayloadWriter().string(error.__class__.__name__).string(str(error)).to_bytes()
+
+
+def decode_error(payload: bytes) -> Tuple[str, str]:
+    """the class name and the message of the error raised by the helper"""
+    reader = PayloadReader(payload)
+    return reader.string(), reader.string()
+
+
+def encode_device_id(device_id: str) -> bytes:
+    return PayloadWriter().string(device_id).to_bytes()
+
+
+def decode_device_id(payload: bytes) -> str:
+    return PayloadReader(payload).string()
@@ -0,0 +1,182 @@
+#  This file is part of gkraken.
+#
+#  Copyright (c) 2021 Roberto Leinardi and Guy Boldon
+#
+#  gkraken is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  gkraken is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
+
+"""The helper process: owns the devices, through their KrakenRepository, on behalf of the GUI.
+
+Started by the HelperClient of the GUI as: python3 -m gkraken.repository.helper_server SOCKET_PATH
+It connects to the socket the GUI is listening on, serves the requests until the GUI closes the connection
+and then releases the devices and exits.
+"""
+
+import logging
+import socket
+import sys
+import threading
+from concurrent.futures import Future
+from typing import Callable, Any, Dict, Tuple
+
+from injector import singleton, inject
+
+from gkraken.core_di import INJECTOR
+from gkraken.interactor.udev_interactor import UdevInteractor
+from gkraken.repository.device_executor import JobPriority
+from gkraken.repository.device_registry import DeviceRegistry
+from gkraken.repository.helper_protocol import MessageType, send_frame, receive_frame, encode_devices, \
+    encode_device_info, encode_status, decode_speed_profile, decode_color, encode_error, decode_device_id, \
+    ProtocolError, decode_apply_batch, encode_batch_results
+from gkraken.repository.kraken_repository import KrakenRepository
+from gkraken.util.log import set_log_level
+
+_LOG = logging.getLogger(__name__)
+
+
+@singleton
+class HelperServer:
+    """Serves the requests of the GUI on a single connection. Each request to a device is run by the worker
+    of its repository, so requests to different devices don't wait for each other, and the response is sent
+    as soon as it completes"""
+
+    @inject
+    def __init__(self, device_registry: DeviceRegistry) -> None:
+        self._device_registry = device_registry
+        self._send_lock = threading.Lock()
+        self._handlers: Dict[MessageType, Callable[[socket.socket, int, bytes], None]] = {
+            MessageType.LIST_DEVICES: self._list_devices,
+            MessageType.CONNECT: self._connect,
+            MessageType.GET_STATUS: self._get_status,
+            MessageType.SET_SPEED_PROFILE: self._set_speed_profile,
+            MessageType.SET_COLOR: self._set_color,
+            MessageType.APPLY_BATCH: self._apply_batch,
+        }
+
+    def serve(self, socket_path: str) -> None:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(socket_path)
+            self.serve_connection(sock)
+
+    def serve_connection(self, sock: socket.socket) -> None:
+        try:
+            while True:
+                frame = receive_frame(sock)
+                if frame is None:
+                    _LOG.info("Connection closed by the GUI")
+                    return
+                message_type, request_id, payload = frame
+                try:
+                    self._handle_request(sock, message_type, request_id, payload)
+                except Exception as ex:  # pylint: disable=broad-except
+                    # the frames are still in sync: the connection can still be used
+                    _LOG.exception("Error handling the %s request: %s", message_type.name, ex)
+                    self._send(sock, MessageType.ERROR, request_id, encode_error(ex))
+        except (ProtocolError, ConnectionError) as ex:
+            _LOG.error("Connection to the GUI lost: %s", ex)
+
+    def _handle_request(self, sock: socket.socket, message_type: MessageType, request_id: int,
+                        payload: bytes) -> None:
+        handler = self._handlers.get(message_type)
+        if handler is None:
+            raise ProtocolError(f"Unexpected message {message_type.name}")
+        handler(sock, request_id, payload)
+
+    def _list_devices(self, sock: socket.socket, request_id: int, _: bytes) -> None:
+        device_ids = self._device_registry.get_device_ids()
+        self._send(sock, MessageType.DEVICES, request_id, encode_devices(
+            [(device_id, self._device_registry.get_description(device_id)) for device_id in device_ids]))
+
+    def _connect(self, sock: socket.socket, request_id: int, payload: bytes) -> None:
+        repository = self._get_repository(decode_device_id(payload))
+        self._submit(sock, request_id, repository, JobPriority.USER, repository.has_supported_kraken,
+                     lambda connected: (MessageType.DEVICE_INFO, self._encode_device_info(repository, connected)))
+
+    def _get_status(self, sock: socket.socket, request_id: int, payload: bytes) -> None:
+        repository = self._get_repository(decode_device_id(payload))
+        self._submit(sock, request_id, repository, JobPriority.BACKGROUND, repository.get_status,
+                     lambda status: (MessageType.STATUS, b'' if status is None else encode_status(
+                         status.liquid_temperature, status.firmware_version, status.fan_rpm, status.fan_duty,
+                         status.pump_rpm, status.pump_duty)))
+
+    def _set_speed_profile(self, sock: socket.socket, request_id: int, payload: bytes) -> None:
+        device_id, channel, profile_data, tuning, temperature_source = decode_speed_profile(payload)
+        repository = self._get_repository(device_id)
+        self._submit(sock, request_id, repository, JobPriority.USER,
+                     lambda: repository.set_speed_profile(channel, profile_data, tuning, temperature_source),
+                     lambda _: (MessageType.OK, b''))
+
+    def _set_color(self, sock: socket.socket, request_id: int, payload: bytes) -> None:
+        device_id, channel, mode, colors, speed, direction = decode_color(payload)
+        repository = self._get_repository(device_id)
+        self._submit(sock, request_id, repository, JobPriority.USER,
+                     lambda: repository.set_color(channel, mode, colors, speed, direction),
+                     lambda _: (MessageType.OK, b''))
+
+    def _apply_batch(self, sock: socket.socket, request_id: int, payload: bytes) -> None:
+        device_id, batch = decode_apply_batch(payload)
+        repository = self._get_repository(device_id)
+        self._submit(sock, request_id, repository, JobPriority.USER, lambda: repository.apply_batch(batch),
+                     lambda results: (MessageType.BATCH_RESULTS,
+                                      encode_batch_results([result.error for result in results])))
+
+    def _get_repository(self, device_id: str) -> KrakenRepository:
+        repository = self._device_registry.get_repository(device_id) \
+            if device_id in self._device_registry.get_device_ids() else None
+        if not isinstance(repository, KrakenRepository):
+            raise KeyError(f"Unknown device {device_id}")
+        return repository
+
+    def _submit(self, sock: socket.socket, request_id: int, repository: KrakenRepository, priority: JobPriority,
+                function: Callable[[], Any],
+                encode_response: Callable[[Any], Tuple[MessageType, bytes]]) -> None:
+        def on_done(future: Future) -> None:
+            error = future.exception()
+            if error is not None:
+                self._send(sock, MessageType.ERROR, request_id, encode_error(error))
+            else:
+                message_type, response = encode_response(future.result())
+                self._send(sock, message_type, request_id, response)
+
+        repository.submit(priority, function).add_done_callback(on_done)
+
+    @staticmethod
+    def _encode_device_info(repository: KrakenRepository, connected: bool) -> bytes:
+        driver_type = repository.driver_type
+        driver_name = f'{driver_type.__module__}.{driver_type.__qualname__}' if driver_type is not None else ''
+        device_info: bytes = encode_device_info(connected, driver_name, repository.firmware_version or '')
+        return device_info
+
+    def _send(self, sock: socket.socket, message_type: MessageType, request_id: int, payload: bytes) -> None:
+        try:
+            with self._send_lock:
+                send_frame(sock, message_type, request_id, payload)
+        except OSError as ex:
+            _LOG.warning("Unable to send the %s response: %s", message_type.name, ex)
+
+
+def main() -> int:
+    set_log_level(logging.INFO)
+    if len(sys.argv) != 2:
+        print(f"Usage: {sys.argv[0]} SOCKET_PATH", file=sys.stderr)
+        return 2
+    INJECTOR.get(DeviceRegistry).start_hotplug_monitor(UdevInteractor.get_supported_usb_ids())
+    try:
+        INJECTOR.get(HelperServer).serve(sys.argv[1])
+    finally:
+        INJECTOR.get(DeviceRegistry).shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
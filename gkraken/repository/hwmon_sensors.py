@@ -0,0 +1,155 @@
+#  This file is part of gkraken.
+#
+#  Copyright (c) 2021 Roberto Leinardi and Guy Boldon
+#
+#  gkraken is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  gkraken is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
+
+import glob
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Iterable, Set
+
+from injector import singleton, inject
+
+from gkraken.util.concurrency import synchronized_with_attr
+
+_LOG = logging.getLogger(__name__)
+
+HWMON_PATH = '/sys/class/hwmon'
+HWMON_SOURCE_PREFIX = 'hwmon:'
+MAX_READING_AGE = 0.5  # seconds a read pass is reused for, so that the curves of all the devices share it
+_READ_SIZE = 16
+
+
+def is_hwmon_source(temperature_source: str) -> bool:
+    return temperature_source.startswith(HWMON_SOURCE_PREFIX)
+
+
+@dataclass(frozen=True)
+class HwmonSensor:
+    """A temperature sensor of the kernel hwmon subsystem (e.g. CPU package, GPU). The source is made of the name
+    of the chip and of the sensor, that, unlike the hwmonN directories, don't change across reboots"""
+    source: str
+    label: str
+    path: str
+
+
+@singleton
+class HwmonSensors:
+    """Provides the temperatures of the hwmon sensors to the software curves.
+    The input files of the selected sensors are opened once and kept open: a read pass reads all of them,
+    with a single pread at offset 0 each, without resolving their paths again"""
+
+    @inject
+    def __init__(self) -> None:
+        self.lock = threading.RLock()
+        self.root = HWMON_PATH
+        self._sensors: Dict[str, HwmonSensor] = {}
+        self._selections: Dict[str, Set[str]] = {}
+        self._fds: Dict[str, int] = {}
+        self._temperatures: Dict[str, float] = {}
+        self._unreadable: Set[str] = set()
+        self._read_time: Optional[float] = None
+
+    @synchronized_with_attr("lock")
+    def discover(self) -> List[HwmonSensor]:
+        """the temperature sensors found, by chip and sensor number"""
+        sensors: Dict[str, HwmonSensor] = {}
+        for hwmon_path in sorted(glob.glob(os.path.join(self.root, 'hwmon*')), key=_number_of):
+            chip = _read_text(os.path.join(hwmon_path, 'name')) or os.path.basename(hwmon_path)
+            for input_path in sorted(glob.glob(os.path.join(hwmon_path, 'temp*_input')), key=_number_of):
+                sensor = os.path.basename(input_path)[:-len('_input')]
+                source = f'{HWMON_SOURCE_PREFIX}{chip}/{sensor}'
+                # chips with the same name, e.g. one per GPU
+                copy = 1
+                while source in sensors:
+                    copy += 1
+                    source = f'{HWMON_SOURCE_PREFIX}{chip}#{copy}/{sensor}'
+                label = _read_text(os.path.join(hwmon_path, f'{sensor}_label')) or sensor
+                sensors[source] = HwmonSensor(source, f'{chip} {label}', input_path)
+        self._sensors = sensors
+        return list(sensors.values())
+
+    @synchronized_with_attr("lock")
+    def select(self, owner: str, sources: Iterable[str]) -> None:
+        """the sensors read by the software curves of the owner (e.g. a device): the files of the sensors selected
+        by no owner are closed"""
+        self._selections[owner] = {source for source in sources if is_hwmon_source(source)}
+        selected = set().union(*self._selections.values())
+        for source in set(self._fds) - selected:
+            os.close(self._fds.pop(source))
+            self._temperatures.pop(source, None)
+        for source in selected - set(self._fds):
+            self._open(source)
+
+    @synchronized_with_attr("lock")
+    def read_temperatures(self, max_age: float = MAX_READING_AGE) -> Dict[str, float]:
+        """the temperatures of the selected sensors, in °C, by source. The sensors that can't be read are missing.
+        The sensors are read again only if the last read pass is older than max_age seconds"""
+        now = time.monotonic()
+        if self._read_time is None or now - self._read_time >= max_age:
+            self._read_all()
+            self._read_time = now
+        return dict(self._temperatures)
+
+    @synchronized_with_attr("lock")
+    def close(self) -> None:
+        for fd in self._fds.values():
+            os.close(fd)
+        self._fds.clear()
+        self._selections.clear()
+        self._temperatures.clear()
+
+    def _open(self, source: str) -> None:
+        sensor = self._sensors.get(source)
+        if sensor is None:
+            # a sensor that appeared after the last discovery, e.g. a module loaded later
+            sensor = next((found for found in self.discover() if found.source == source), None)
+        if sensor is None:
+            _LOG.error("Temperature sensor %s not found", source)
+            return
+        try:
+            self._fds[source] = os.open(sensor.path, os.O_RDONLY)
+            self._read_time = None
+        except OSError as ex:
+            _LOG.error("Unable to open the temperature sensor %s: %s", source, ex)
+
+    def _read_all(self) -> None:
+        temperatures: Dict[str, float] = {}
+        for source, fd in self._fds.items():
+            try:
+                temperatures[source] = int(os.pread(fd, _READ_SIZE, 0)) / 1000
+                self._unreadable.discard(source)
+            except (OSError, ValueError) as ex:
+                if source not in self._unreadable:
+                    self._unreadable.add(source)
+                    _LOG.warning("Unable to read the temperature sensor %s: %s", source, ex)
+        self._temperatures = temperatures
+
+
+def _read_text(path: str) -> Optional[str]:
+    try:
+        with open(path, encoding='utf-8') as file:
+            return file.read().strip() or None
+    except OSError:
+        return None
+
+
+def _number_of(path: str) -> int:
+    """the number of a hwmonN directory or of a tempN_input file, to sort them as numbers"""
+    digits = ''.join(character for character in os.path.basename(path).split('_')[0] if character.isdigit())
+    return int(digits) if digits else 0
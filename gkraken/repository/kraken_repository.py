@@ -17,116 +17,355 @@
 
 import logging
 import threading
-from typing import Optional, List, Tuple
+import time
+from concurrent.futures import Future
+from typing import Optional, List, Tuple, Callable, TypeVar, Any, Type
 
-from injector import singleton, inject
 from liquidctl.driver.usb import BaseDriver
 
-from gkraken.device.device_settings import DeviceSettings
+from gkraken.conf import LIQUID_TEMPERATURE_SOURCE
+from gkraken.core_di import INJECTOR, StatusReceivedSubject
+from gkraken.device.device_binding import DeviceBinding
+from gkraken.device.device_discovery import DeviceDiscovery
+from gkraken.device.device_settings import DeviceSettings, StatusLayout
+from gkraken.device.driver_trace import DriverTracing
 from gkraken.device.settings_kraken_legacy import SettingsKrakenLegacy
-from gkraken.di import INJECTOR
+from gkraken.error.device_stall_error import DeviceStallError
 from gkraken.error.legacy_kraken_warning import LegacyKrakenWarning
+from gkraken.model.apply_batch import ApplyBatch, ApplyResult, SpeedProfileItem
+from gkraken.model.control_tuning import ControlTuning, DEFAULT_CONTROL_TUNING
 from gkraken.model.lighting_modes import LightingModes
 from gkraken.model.lighting_settings import LightingSettings
 from gkraken.model.status import Status
+from gkraken.repository.connection_manager import ConnectionManager, InitResult
+from gkraken.repository.curve_engine import CurveEngine, SoftwareCurve, CONTROL_PERIOD
+from gkraken.repository.device_executor import DeviceExecutor, JobPriority
+from gkraken.repository.device_state_mirror import DeviceStateMirror
+from gkraken.repository.device_watchdog import DeviceWatchdog
+from gkraken.repository.hwmon_sensors import HwmonSensors
+from gkraken.repository.status_report_listener import StatusReportListener
 from gkraken.util.concurrency import synchronized_with_attr
+from gkraken.util.sample_ring_buffer import SampleRingBuffer, SAMPLE_COLUMNS
+from gkraken.util.wakeup_stats import WakeupStats
 
 _LOG = logging.getLogger(__name__)
+_T = TypeVar('_T')
+# deadlines of the device operations, in seconds: a stalled operation makes the device handle to be abandoned
+_OPERATION_TIMEOUTS = {
+    'connect': 5.0,
+    'initialize': 10.0,
+    'disconnect': 2.0,
+    'get_status': 3.0,
+    'set_speed_profile': 5.0,
+    'set_fixed_speed': 5.0,
+    'set_color': 5.0,
+}
+_MAX_STATUS_REPORT_AGE = 3.0  # seconds, older status reports are not used and the status is polled instead
+_CURVE_TICK_KEY = 'software-curves'
+_SHUTDOWN_TIMEOUT = 15.0  # seconds the pending device jobs are given to complete on shutdown
 
 
-@singleton
 class KrakenRepository:
+    """Gives access to a single device, identified by its device id (see DeviceDiscovery).
+    Every device has its own repository, created by the DeviceRegistry, with its own worker thread"""
 
-    @inject
-    def __init__(self) -> None:
+    def __init__(self,
+                 device_id: str,
+                 connection_manager: ConnectionManager,
+                 device_state_mirror: DeviceStateMirror,
+                 status_received_subject: StatusReceivedSubject,
+                 ) -> None:
         self.lock = threading.RLock()
+        self._device_id = device_id
+        self._connection_manager = connection_manager
+        self._device_state_mirror = device_state_mirror
+        self._status_received_subject = status_received_subject
+        self._status_report_listener: Optional[StatusReportListener] = None
+        wakeup_stats = INJECTOR.get(WakeupStats)
+        self._executor = DeviceExecutor(f'kraken-device-{device_id}', wakeup_stats)
+        self._watchdog = DeviceWatchdog(f'kraken-io-{device_id}', _OPERATION_TIMEOUTS, wakeup_stats)
         self._driver: Optional[BaseDriver] = None
+        self._binding: Optional[DeviceBinding] = None
         self._init_firmware_version: Optional[str] = None
         self._legacy_kraken_warning_issued: bool = False
+        self._sample_indexes: Optional[Tuple[StatusLayout, Tuple[Optional[int], ...]]] = None
+        self._last_sampled_report_time: float = 0.0
+        self._hwmon_sensors = INJECTOR.get(HwmonSensors)
+        self._curve_engine = CurveEngine(self._write_software_duty, self._hand_back_to_hardware,
+                                         read_sensors=self._hwmon_sensors.read_temperatures)
+        self._curve_ticker: Optional[threading.Thread] = None
+        self._curve_ticker_stop = threading.Event()
+
+    @property
+    def device_id(self) -> str:
+        return self._device_id
+
+    @property
+    def driver_type(self) -> Optional[Type[BaseDriver]]:
+        """the class of the driver of the connected device (or of the driver it stands in for)"""
+        driver = self._driver
+        return getattr(driver, 'stand_in_for', driver.__class__) if driver else None
+
+    @property
+    def firmware_version(self) -> Optional[str]:
+        return self._init_firmware_version
+
+    @property
+    def writes_avoided(self) -> Optional[int]:
+        """the writes avoided by the tuning of the software curves, None if no channel is driven by one"""
+        return self._curve_engine.writes_avoided if self._curve_engine.has_curves else None
 
     def has_supported_kraken(self) -> bool:
         """Checks only if a supported device is found. Connection issues are handled later in the startup process"""
         try:
             self._load_driver()
-            return self._driver is not None or INJECTOR.get(Optional[BaseDriver]) is not None
+            return self._driver is not None or INJECTOR.get(DeviceDiscovery).find_driver(self._device_id) is not None
         except ValueError:
             # ValueError when no device is found
             return False
+        except DeviceStallError:
+            # the device is found, but it doesn't respond: it is connected again with a backoff
+            self._connection_manager.on_connection_lost()
+            raise
         except OSError:
             # OSError when device is found, but the connection fails
             self.cleanup()
             return True
 
+    def submit(self, priority: JobPriority, function: Callable[..., Any], *args: Any,
+               coalesce_key: Optional[str] = None) -> Future:
+        """Schedules a call to one of the repository methods on the thread owning the device.
+        Calls with the same coalesce_key (e.g. writes to the same channel) are coalesced: only the latest one runs"""
+        future: Future = self._executor.submit(priority, function, *args, coalesce_key=coalesce_key)
+        return future
+
+    def shutdown(self) -> None:
+        """gives the channels driven by software curves back to the device, on the thread owning it, and stops
+        that thread before releasing the device"""
+        with self.lock:
+            ticker = self._curve_ticker
+        self.submit(JobPriority.SAFETY, self._stop_curve_engine)
+        self._executor.shutdown(_SHUTDOWN_TIMEOUT)
+        if ticker is not None:
+            ticker.join(CONTROL_PERIOD)
+        self.cleanup()
+        self._watchdog.shutdown()
+
     @synchronized_with_attr("lock")
     def cleanup(self) -> None:
         _LOG.debug("KrakenRepository cleanup")
+        self._stop_status_report_listener()
+        self._curve_engine.forget_written_duties()
         if self._driver:
-            self._driver.disconnect()
+            # once disconnected, the device could be power cycled and lose its settings
+            self._device_state_mirror.invalidate(self._driver.serial_number)
+            try:
+                self._watchdog.call('disconnect', self._driver.disconnect)
+            except DeviceStallError:
+                self._abandon_driver()
             self._driver = None
+        self._binding = None
+
+    @synchronized_with_attr("lock")
+    def on_device_removed(self) -> None:
+        """the device has been unplugged: its handle is released and no connection is attempted, until
+        on_device_added() is called"""
+        if self._connection_manager.is_present:
+            self.cleanup()
+            self._connection_manager.on_device_removed()
+
+    def on_device_added(self) -> None:
+        self._connection_manager.on_device_added()
+
+    @synchronized_with_attr("lock")
+    def on_system_sleep(self) -> None:
+        """the system is about to suspend: the handle is released, the device will be connected and initialized
+        again once resumed"""
+        try:
+            self.cleanup()
+        finally:
+            self._connection_manager.on_system_sleep()
+
+    def on_system_resumed(self) -> None:
+        self._connection_manager.on_system_resumed()
 
     @synchronized_with_attr("lock")
     def get_status(self) -> Optional[Status]:
-        self._load_driver()
+        """returns the latest status report received from the device, if listening to them, otherwise polls
+        the status. Every new status is also published by the StatusReceivedSubject"""
+        self._reconnect_if_due()
         if self._driver:
+            reported_status = self._get_reported_status()
+            if reported_status is not None:
+                self._run_curve_engine(reported_status)
+                return reported_status
             try:
-                driver_status = self._driver.get_status()
+                binding = self._get_binding()
+                driver_status = self._call_driver('get_status', self._driver.get_status)
                 _LOG.debug("Reported driver status:\n%s", driver_status)
-                for device_setting in DeviceSettings.__subclasses__():
-                    if device_setting.supported_driver is self._driver.__class__:
-                        status_list = [v for k, v, u in driver_status]
-                        return device_setting.determine_status(
-                            status_list, self._driver.description, self._init_firmware_version
-                        )
+                if binding is not None:
+                    status = binding.decode_status(driver_status)
+                    if status is not None:
+                        self._status_received_subject.on_next(status)
+                        self._run_curve_engine(status)
+                    return status
                 if self._driver:
                     _LOG.error("Driver Instance is not recognized: %s", self._driver.description)
                 else:
                     _LOG.error("Race cleanup condition has removed the driver")
             except BaseException as ex:
                 _LOG.exception("Error getting the status: %s", ex)
-                self.cleanup()
+                self._on_device_error(ex)
         return None
 
     @synchronized_with_attr("lock")
-    def set_speed_profile(self, channel_value: str, profile_data: List[Tuple[int, int]]) -> None:
+    def read_sample(self, buffer: SampleRingBuffer) -> bool:
+        """appends the current values of the device to the buffer, without creating a Status: they are read from
+        the latest status report, if listening to them, otherwise straight from the positions of the values in the
+        driver status. The values are not validated. The device is not reconnected, sampling pauses meanwhile.
+        Every status report is appended once, with the time it was received: returns False if no newer one
+        has been received since the previous sample"""
         if not self._driver:
-            self._load_driver()
+            return False
+        report = self._get_status_report()
+        if report is not None:
+            return self._append_status_report(buffer, report)
+        try:
+            binding = self._get_binding()
+            if binding is None:
+                return False
+            driver_status = self._call_driver('get_status', self._driver.get_status)
+            timestamp = time.time()
+            indexes = self._get_sample_indexes(binding, driver_status)
+            if indexes is None:
+                return False
+            liquid_temperature_index, fan_rpm_index, fan_duty_index, pump_rpm_index, pump_duty_index = indexes
+            buffer.append(timestamp,
+                          None if liquid_temperature_index is None else driver_status[liquid_temperature_index][1],
+                          None if fan_rpm_index is None else driver_status[fan_rpm_index][1],
+                          None if fan_duty_index is None else driver_status[fan_duty_index][1],
+                          None if pump_rpm_index is None else driver_status[pump_rpm_index][1],
+                          None if pump_duty_index is None else driver_status[pump_duty_index][1])
+            return True
+        except BaseException as ex:
+            _LOG.exception("Error sampling the status: %s", ex)
+            self._on_device_error(ex)
+        return False
+
+    def _append_status_report(self, buffer: SampleRingBuffer, report: Tuple[float, Status]) -> bool:
+        report_time, reported_status = report
+        if report_time == self._last_sampled_report_time:
+            return False
+        self._last_sampled_report_time = report_time
+        buffer.append(report_time, reported_status.liquid_temperature, reported_status.fan_rpm,
+                      reported_status.fan_duty, reported_status.pump_rpm, reported_status.pump_duty)
+        return True
+
+    @synchronized_with_attr("lock")
+    def set_speed_profile(self, channel_value: str, profile_data: List[Tuple[int, int]],
+                          tuning: ControlTuning = DEFAULT_CONTROL_TUNING,
+                          temperature_source: str = LIQUID_TEMPERATURE_SOURCE) -> None:
+        self._reconnect_if_due()
         if self._driver and profile_data:
             try:
-                if len(profile_data) == 1:
-                    self._driver.set_fixed_speed(channel_value, profile_data[0][1])
-                else:
-                    self._driver.set_speed_profile(channel_value, profile_data)
+                self._apply_speed_profile(self._driver, channel_value, profile_data, tuning, temperature_source)
             except BaseException as ex:
                 _LOG.exception("Error setting the status: %s", ex)
-                self.cleanup()
+                self._on_device_error(ex)
 
     def get_lighting_modes(self) -> Optional[LightingModes]:
-        if not self._driver:
-            self._load_driver()
+        self._reconnect_if_due()
         if self._driver:
-            for device_setting in DeviceSettings.__subclasses__():
-                if device_setting.supported_driver is self._driver.__class__:
-                    return device_setting.get_compatible_lighting_modes()
-        _LOG.error("Driver Instance is not recognized: %s", self._driver.description)
+            binding = self._get_binding()
+            if binding is not None:
+                return binding.settings.get_compatible_lighting_modes()
+            _LOG.error("Driver Instance is not recognized: %s", self._driver.description)
         return None
 
     def set_lighting_mode(self, settings: LightingSettings) -> None:
-        if self._driver and settings:
+        if settings:
+            self.set_color(settings.channel.value, settings.mode.name, settings.colors.values(),
+                           settings.speed_or_default, settings.direction_or_default)
+
+    def set_color(self, channel_value: str, mode_name: str, colors: List[List[int]], speed: str,
+                  direction: str) -> None:
+        if self._driver:
             try:
-                self._driver.set_color(
-                    settings.channel.value,
-                    settings.mode.name,
-                    settings.colors.values(),
-                    speed=settings.speed_or_default,
-                    direction=settings.direction_or_default)
+                self._apply_color(self._driver, channel_value, mode_name, colors, speed, direction)
             except BaseException as ex:
                 _LOG.exception("Error setting the Lighting Profile: %s", ex)
-                self.cleanup()
+                self._on_device_error(ex)
+
+    @synchronized_with_attr("lock")
+    def apply_batch(self, batch: ApplyBatch) -> List[ApplyResult]:
+        """Applies the items of the batch back to back, holding the device for the whole batch.
+        A failing item does not prevent the following ones from being attempted: the results are in the same
+        order as the items"""
+        self._reconnect_if_due()
+        results = []
+        for item in batch.items:
+            driver = self._driver
+            if driver is None:
+                results.append(ApplyResult(item, ConnectionError("The device is not connected")))
+                continue
+            try:
+                if isinstance(item, SpeedProfileItem):
+                    self._apply_speed_profile(driver, item.channel_value, item.profile_data, item.tuning,
+                                              item.temperature_source)
+                else:
+                    self._apply_color(driver, item.channel_value, item.mode_name, item.colors, item.speed,
+                                      item.direction)
+                results.append(ApplyResult(item))
+            except BaseException as ex:
+                _LOG.exception("Error applying %s: %s", item, ex)
+                self._on_device_error(ex)
+                results.append(ApplyResult(item, ex))
+        return results
+
+    def _apply_speed_profile(self, driver: BaseDriver, channel_value: str, profile_data: List[Tuple[int, int]],
+                             tuning: ControlTuning = DEFAULT_CONTROL_TUNING,
+                             temperature_source: str = LIQUID_TEMPERATURE_SOURCE,
+                             allow_software_curve: bool = True) -> None:
+        """applies the profile with the device, or with a software curve, driven with the given tuning,
+        if the device can't apply it (e.g. it follows a hwmon sensor)"""
+        if not profile_data:
+            return
+        if allow_software_curve and self._needs_software_curve(profile_data, temperature_source):
+            self._curve_engine.set_curve(SoftwareCurve(channel_value, tuple(map(tuple, profile_data)),
+                                                       temperature_source, tuning))
+            self._select_hwmon_sensors()
+            # the fixed speeds written by the curve are not tracked by the mirror
+            self._device_state_mirror.invalidate(driver.serial_number, channel_value)
+            self._start_curve_ticker()
+            return
+        self._curve_engine.remove_curve(channel_value)
+        self._select_hwmon_sensors()
+        state_hash = self._device_state_mirror.hash_state(tuple(map(tuple, profile_data)))
+        if self._device_state_mirror.is_applied(driver.serial_number, channel_value, state_hash):
+            return
+        if len(profile_data) == 1:
+            self._call_driver('set_fixed_speed', lambda: driver.set_fixed_speed(channel_value, profile_data[0][1]))
+        else:
+            self._call_driver('set_speed_profile', lambda: driver.set_speed_profile(channel_value, profile_data))
+        self._device_state_mirror.confirm(driver.serial_number, channel_value, state_hash)
+
+    def _apply_color(self, driver: BaseDriver, channel_value: str, mode_name: str, colors: List[List[int]],
+                     speed: str, direction: str) -> None:
+        state_hash = self._device_state_mirror.hash_state((mode_name, tuple(map(tuple, colors)), speed, direction))
+        if self._device_state_mirror.is_applied(driver.serial_number, channel_value, state_hash):
+            return
+        self._call_driver('set_color', lambda: driver.set_color(
+            channel_value,
+            mode_name,
+            colors,
+            speed=speed,
+            direction=direction))
+        self._device_state_mirror.confirm(driver.serial_number, channel_value, state_hash)
 
     @synchronized_with_attr("lock")
     def _load_driver(self) -> None:
         if not self._driver:
-            self._driver = INJECTOR.get(Optional[BaseDriver])
+            self._driver = INJECTOR.get(DeviceDiscovery).find_driver(self._device_id)
 
             if isinstance(self._driver, SettingsKrakenLegacy.supported_driver) \
                     and not self._legacy_kraken_warning_issued:
@@ -135,9 +374,225 @@ class KrakenRepository:
                 raise LegacyKrakenWarning(
                     "Aestek potential driver conflict detected. Requires user confirmation to continue.")
             if self._driver:
-                self._driver.connect()
-                init_status: List[Tuple] = self._driver.initialize()
-                _LOG.debug("Driver Initialize response: %s", init_status)
-                self._init_firmware_version = DeviceSettings.find_firmware(init_status)
+                try:
+                    self._watchdog.call('connect', self._driver.connect)
+                except DeviceStallError:
+                    self._abandon_driver()
+                    raise
+                except OSError:
+                    # the cached handle could belong to a device that has been unplugged: rediscover on next load
+                    # and, since it might have been power cycled, initialize it again
+                    INJECTOR.get(DeviceDiscovery).invalidate()
+                    self._connection_manager.forget_init_results()
+                    raise
+                # nothing is known about the settings of a device that has just been (re)connected
+                self._device_state_mirror.invalidate(self._driver.serial_number)
+                init_result = self._connection_manager.get_init_result(self._driver.serial_number)
+                if init_result is None:
+                    try:
+                        init_status: List[Tuple] = self._watchdog.call('initialize', self._driver.initialize)
+                    except DeviceStallError:
+                        self._abandon_driver()
+                        raise
+                    _LOG.debug("Driver Initialize response: %s", init_status)
+                    init_result = InitResult(init_status, DeviceSettings.find_firmware(init_status))
+                    self._connection_manager.store_init_result(self._driver.serial_number, init_result)
+                else:
+                    _LOG.debug("Reusing the initialization results of device %s", self._driver.serial_number)
+                self._init_firmware_version = init_result.firmware_version
+                self._binding = DeviceBinding.bind(self._driver, self._init_firmware_version, self._device_id)
+                self._connection_manager.on_connected()
+                self._start_status_report_listener()
             else:
                 raise ValueError("Kraken USB interface error (check USB cable connection)")
+
+    def _get_binding(self) -> Optional[DeviceBinding]:
+        """the binding is resolved when the driver is loaded, this only checks it still refers to the current one"""
+        if self._binding is None or self._binding.driver is not self._driver:
+            self._binding = DeviceBinding.bind(self._driver, self._init_firmware_version, self._device_id)
+        return self._binding
+
+    def _get_sample_indexes(self, binding: DeviceBinding,
+                            driver_status: List[Tuple]) -> Optional[Tuple[Optional[int], ...]]:
+        """the positions of the sampled values in the driver status, in the SAMPLE_COLUMNS order"""
+        layout = binding.settings.get_status_layout(self._init_firmware_version)
+        if layout is None or layout.length != len(driver_status):
+            # decoding a status finds the positions of its values
+            binding.decode_status(driver_status)
+            layout = binding.settings.get_status_layout(self._init_firmware_version)
+            if layout is None or layout.length != len(driver_status):
+                return None
+        if self._sample_indexes is None or self._sample_indexes[0] is not layout:
+            self._sample_indexes = (layout, tuple(layout.index_of(column) for column in SAMPLE_COLUMNS[1:]))
+        return self._sample_indexes[1]
+
+    def _needs_software_curve(self, profile_data: List[Tuple[int, int]], temperature_source: str) -> bool:
+        if len(profile_data) < 2:
+            return False
+        # the devices apply the speed profiles only on the liquid temperature
+        if temperature_source != LIQUID_TEMPERATURE_SOURCE:
+            return True
+        binding = self._get_binding()
+        return binding is not None and not binding.settings.supports_speed_profiles
+
+    def _select_hwmon_sensors(self) -> None:
+        self._hwmon_sensors.select(self._device_id, self._curve_engine.temperature_sources)
+
+    def _run_curve_engine(self, status: Status) -> None:
+        if not self._curve_engine.has_curves:
+            return
+        try:
+            self._curve_engine.on_status(status)
+        except BaseException as ex:
+            _LOG.exception("Error writing the duty of a software curve: %s", ex)
+            self._on_device_error(ex)
+
+    def _write_software_duty(self, channel_value: str, duty: int) -> None:
+        driver = self._driver
+        if driver is not None:
+            self._call_driver('set_fixed_speed', lambda: driver.set_fixed_speed(channel_value, duty))
+
+    def _hand_back_to_hardware(self, curve: SoftwareCurve) -> None:
+        """applies a liquid temperature curve with the device, if it supports speed profiles, otherwise the highest
+        duty of the curve, the safest fixed speed"""
+        driver = self._driver
+        if driver is None:
+            return
+        binding = self._get_binding()
+        profile_data = list(curve.steps)
+        if binding is None or not binding.settings.supports_speed_profiles \
+                or curve.temperature_source != LIQUID_TEMPERATURE_SOURCE:
+            profile_data = [(0, curve.max_duty)]
+        try:
+            self._apply_speed_profile(driver, curve.channel, profile_data, allow_software_curve=False)
+        except BaseException as ex:
+            _LOG.exception("Error giving the %s speed back to the device: %s", curve.channel, ex)
+            self._on_device_error(ex)
+
+    @synchronized_with_attr("lock")
+    def _start_curve_ticker(self) -> None:
+        if self._curve_ticker is None:
+            self._curve_ticker_stop = threading.Event()
+            self._curve_ticker = threading.Thread(target=self._run_curve_ticker, args=(self._curve_ticker_stop,),
+                                                  name=f'kraken-curves-{self._device_id}', daemon=True)
+            self._curve_ticker.start()
+
+    def _run_curve_ticker(self, stop_event: threading.Event) -> None:
+        """evaluates the software curves every CONTROL_PERIOD, with a status read on the thread owning the device.
+        If the ticker fails, the channels are given back to the hardware"""
+        try:
+            while not stop_event.wait(CONTROL_PERIOD):
+                with self.lock:
+                    if not self._curve_engine.has_curves:
+                        if self._curve_ticker is threading.current_thread():
+                            self._curve_ticker = None
+                        return
+                self.submit(JobPriority.BACKGROUND, self._on_curve_tick, coalesce_key=_CURVE_TICK_KEY)
+        except BaseException as ex:
+            _LOG.exception("The software curves ticker failed: %s", ex)
+            self.submit(JobPriority.SAFETY, self._stop_curve_engine)
+            raise
+
+    @synchronized_with_attr("lock")
+    def _on_curve_tick(self) -> None:
+        # a disconnected device is reconnected by the status polling, not by the curves
+        if self._driver and self._curve_engine.has_curves:
+            self.get_status()
+
+    @synchronized_with_attr("lock")
+    def _stop_curve_engine(self) -> None:
+        self._curve_ticker_stop.set()
+        self._curve_ticker = None
+        self._curve_engine.stop()
+        self._select_hwmon_sensors()
+
+    def _reconnect_if_due(self) -> None:
+        """Loads the driver if needed. After the first connection has been established, failures are not raised:
+        the connection manager schedules the next attempt with an exponential backoff"""
+        if self._driver or not self._connection_manager.is_present:
+            return
+        if not self._connection_manager.has_been_connected:
+            if not self._connection_manager.is_attempt_due():
+                return
+            try:
+                self._load_driver()
+            except DeviceStallError as ex:
+                # unlike the other errors of the first connection (e.g. missing permissions), a stall is transient
+                _LOG.warning("Unable to connect to the device: %s", ex)
+                self._connection_manager.on_connection_lost()
+        elif self._connection_manager.is_attempt_due():
+            try:
+                self._load_driver()
+            except (OSError, ValueError) as ex:
+                _LOG.warning("Unable to reconnect to the device: %s", ex)
+                self._on_device_error(ex)
+
+    def _call_driver(self, operation_name: str, operation: Callable[[], _T]) -> _T:
+        """Runs a driver operation under the watchdog. A single failure is considered transient and the operation
+        is retried on the same handle; if the retry fails too, the error is raised and the device considered lost.
+        A stalled operation is never retried"""
+        try:
+            result: _T = self._watchdog.call(operation_name, operation)
+        except DeviceStallError:
+            raise
+        except Exception as ex:  # pylint: disable=broad-except
+            _LOG.warning("Device operation %s failed, retrying on the same handle: %s", operation_name, ex)
+            result = self._watchdog.call(operation_name, operation)
+        return result
+
+    def _on_device_error(self, ex: BaseException) -> None:
+        if isinstance(ex, DeviceStallError):
+            self._abandon_driver()
+        else:
+            self.cleanup()
+        self._connection_manager.on_connection_lost()
+
+    @synchronized_with_attr("lock")
+    def _abandon_driver(self) -> None:
+        """drops a device handle that is stuck in an operation, without even trying to disconnect it:
+        the device will be discovered and initialized again on the next connection"""
+        self._stop_status_report_listener()
+        if self._driver:
+            _LOG.warning("Abandoning the handle of device %s", self._driver.description)
+            self._device_state_mirror.invalidate(self._driver.serial_number)
+            self._driver = None
+        self._binding = None
+        INJECTOR.get(DeviceDiscovery).invalidate()
+        self._connection_manager.forget_init_results()
+
+    def _start_status_report_listener(self) -> None:
+        if INJECTOR.get(DriverTracing).is_recording:
+            _LOG.debug("Recording the driver calls, the status is polled instead of listening to the status reports")
+            return
+        if self._driver and self._binding is not None and self._binding.parse_status_report is not None \
+                and getattr(self._driver, 'device', None) is not None:
+            self._status_report_listener = StatusReportListener(f'kraken-status-reports-{self._device_id}',
+                                                                self._driver.device,
+                                                                self._binding.parse_status_report,
+                                                                self._status_received_subject.on_next)
+            self._status_report_listener.start()
+
+    def _stop_status_report_listener(self) -> None:
+        if self._status_report_listener is not None:
+            self._status_report_listener.stop()
+            self._status_report_listener = None
+
+    def _get_reported_status(self) -> Optional[Status]:
+        report = self._get_status_report()
+        return report[1] if report is not None else None
+
+    def _get_status_report(self) -> Optional[Tuple[float, Status]]:
+        """the reception time and Status of the latest status report received by the listener, waiting for the
+        first one after connecting: polling meanwhile would read from the handle the listener is reading.
+        If the device stops sending them, the listener is stopped and the status polled"""
+        listener = self._status_report_listener
+        if listener is None:
+            return None
+        report: Optional[Tuple[float, Status]] = listener.get_latest_report(_MAX_STATUS_REPORT_AGE)
+        if report is None and not listener.is_stale(_MAX_STATUS_REPORT_AGE):
+            report = listener.wait_for_report(_MAX_STATUS_REPORT_AGE)
+        if report is None:
+            _LOG.warning("No status report received in the last %.1f s, polling the status instead",
+                         _MAX_STATUS_REPORT_AGE)
+            self._stop_status_report_listener()
+        return report
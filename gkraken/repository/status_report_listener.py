@@ -0,0 +1,112 @@
+#  This file is part of gkraken.
+#
+#  Copyright (c) 2021 Roberto Leinardi and Guy Boldon
+#
+#  gkraken is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  gkraken is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Optional, Tuple
+
+from gkraken.device.device_settings import StatusReportParser
+from gkraken.model.status import Status
+
+_LOG = logging.getLogger(__name__)
+_READ_LENGTH = 64
+_READ_TIMEOUT_MS = 500  # bounds the time needed to stop the listener
+
+
+class StatusReportListener:
+    """Reads, on a dedicated thread, the status reports that the device sends by itself on its interrupt
+    endpoint and keeps the latest decoded Status: reading the status doesn't need any USB transfer.
+
+    The listener must run only while no other operation reads from the device (e.g. initialize() or
+    get_status()), otherwise one of the two readers could consume the reports expected by the other."""
+
+    def __init__(self,
+                 name: str,
+                 hid_device: Any,
+                 parse_status_report: StatusReportParser,
+                 on_status: Callable[[Status], None]) -> None:
+        self._name = name
+        self._hid_device = hid_device
+        self._parse_status_report = parse_status_report
+        self._on_status = on_status
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._start_time: float = 0.0
+        self._latest: Optional[Tuple[float, float, Status]] = None  # monotonic and wall clock time of reception
+        self._reported = threading.Event()  # set on the first status report or when the listener stops
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        self._stop_event.clear()
+        self._reported.clear()
+        self._start_time = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name=self._name, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(_READ_TIMEOUT_MS / 1000 + 1)
+        self._thread = None
+
+    def get_latest_status(self, max_age: float) -> Optional[Status]:
+        report = self.get_latest_report(max_age)
+        return report[1] if report is not None else None
+
+    def get_latest_report(self, max_age: float) -> Optional[Tuple[float, Status]]:
+        """the time (as time.time()) the latest status report was received and its Status"""
+        latest = self._latest
+        if latest is not None and time.monotonic() - latest[0] <= max_age:
+            return latest[1], latest[2]
+        return None
+
+    def wait_for_report(self, max_age: float) -> Optional[Tuple[float, Status]]:
+        """like get_latest_report(), but waits for the first status report, until the listener would be stale"""
+        self._reported.wait(max(0.0, self._start_time + max_age - time.monotonic()))
+        return self.get_latest_report(max_age)
+
+    def is_stale(self, max_age: float) -> bool:
+        """True if no status report has been received in the last max_age seconds since starting"""
+        latest = self._latest
+        last_report_time = latest[0] if latest is not None else self._start_time
+        return time.monotonic() - last_report_time > max_age
+
+    def _run(self) -> None:
+        _LOG.debug("Listening for status reports")
+        hiddev = self._hid_device.hiddev
+        parse_status_report = self._parse_status_report
+        try:
+            while not self._stop_event.is_set():
+                try:
+                    report = hiddev.read(_READ_LENGTH, timeout_ms=_READ_TIMEOUT_MS)
+                except (OSError, ValueError) as ex:
+                    _LOG.warning("Unable to read the status reports: %s", ex)
+                    return
+                if not report:
+                    continue
+                status = parse_status_report(bytes(report))  # hidapi returns a list of ints
+                if status is not None:
+                    self._latest = (time.monotonic(), time.time(), status)
+                    self._reported.set()
+                    self._on_status(status)
+            _LOG.debug("Stopped listening for status reports")
+        finally:
+            self._reported.set()
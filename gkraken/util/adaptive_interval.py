@@ -0,0 +1,105 @@
+#  This file is part of gkraken.
+#
+#  Copyright (c) 2021 Roberto Leinardi and Guy Boldon
+#
+#  gkraken is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  gkraken is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
+import logging
+import threading
+from typing import Optional
+
+from gkraken.conf import MIN_REFRESH_INTERVAL, MAX_REFRESH_INTERVAL
+from gkraken.model.status import Status
+from gkraken.util.concurrency import synchronized_with_attr
+
+_LOG = logging.getLogger(__name__)
+
+# a status is steady when the liquid temperature and the speeds changed less than this since the previous one
+_TEMPERATURE_CHANGE = 0.5  # °C
+_RPM_CHANGE_RATIO = 0.05
+_BACKOFF_FACTOR = 2.0
+# the interval is relaxed by this factor while the main window is hidden, and the app lives only in the tray
+_HIDDEN_WINDOW_FACTOR = 2.0
+
+
+class AdaptiveInterval:
+    """The interval between two status polls of a device: min_interval while the liquid temperature or the
+    speeds are changing, doubled after every steady status up to max_interval.
+    The interval is relaxed while the main window is hidden, it stays at max_interval while the session is idle,
+    and it never leaves the hard bounds
+    MIN_REFRESH_INTERVAL..MAX_REFRESH_INTERVAL"""
+
+    def __init__(self, min_interval: float, max_interval: float, window_visible: bool = True) -> None:
+        self.lock = threading.Lock()
+        self._min_interval = MIN_REFRESH_INTERVAL
+        self._max_interval = MAX_REFRESH_INTERVAL
+        self._interval = MIN_REFRESH_INTERVAL
+        self._window_visible = window_visible
+        self._session_idle = False
+        self._last_status: Optional[Status] = None
+        self.configure(min_interval, max_interval)
+
+    @synchronized_with_attr("lock")
+    def configure(self, min_interval: float, max_interval: float) -> None:
+        self._min_interval = _clamp(min_interval)
+        self._max_interval = max(self._min_interval, _clamp(max_interval))
+        # start over from the fastest interval, the new bounds apply to the very next poll
+        self._interval = self._min_interval
+
+    @synchronized_with_attr("lock")
+    def set_window_visible(self, visible: bool) -> None:
+        if visible and not self._window_visible:
+            # the user is looking: show fresh values quickly
+            self._interval = self._min_interval
+        self._window_visible = visible
+
+    @synchronized_with_attr("lock")
+    def set_session_idle(self, idle: bool) -> None:
+        if not idle and self._session_idle:
+            self._interval = self._min_interval
+        self._session_idle = idle
+
+    @synchronized_with_attr("lock")
+    def update(self, status: Optional[Status]) -> None:
+        """backs off when the status is steady compared to the previous one, goes back to min_interval otherwise"""
+        if status is None:
+            return
+        if self._last_status is None or self._is_changing(self._last_status, status):
+            self._interval = self._min_interval
+        else:
+            self._interval = min(self._interval * _BACKOFF_FACTOR, self._max_interval)
+        self._last_status = status
+
+    @synchronized_with_attr("lock")
+    def get(self) -> float:
+        """the seconds to wait before the next poll"""
+        interval = self._max_interval if self._session_idle else self._interval
+        if not self._window_visible:
+            interval *= _HIDDEN_WINDOW_FACTOR
+        return _clamp(interval)
+
+    @staticmethod
+    def _is_changing(previous: Status, status: Status) -> bool:
+        return abs(status.liquid_temperature - previous.liquid_temperature) >= _TEMPERATURE_CHANGE \
+               or _is_rpm_changing(previous.fan_rpm, status.fan_rpm) \
+               or _is_rpm_changing(previous.pump_rpm, status.pump_rpm)
+
+
+def _is_rpm_changing(previous: Optional[int], rpm: Optional[int]) -> bool:
+    if previous is None or rpm is None:
+        return previous != rpm
+    return abs(rpm - previous) > previous * _RPM_CHANGE_RATIO
+
+
+def _clamp(interval: float) -> float:
+    return float(min(max(interval, MIN_REFRESH_INTERVAL), MAX_REFRESH_INTERVAL))
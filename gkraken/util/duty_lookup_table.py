@@ -0,0 +1,61 @@
+#  This file is part of gkraken.
+#
+#  Copyright (c) 2021 Roberto Leinardi and Guy Boldon
+#
+#  gkraken is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  gkraken is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
+
+from array import array
+from typing import Iterator, Sequence, Tuple
+
+from gkraken.conf import MIN_TEMP, MAX_TEMP
+
+_STEPS_PER_DEGREE = 10  # 0.1 °C resolution
+
+
+class DutyLookupTable:
+    """The duties of a speed profile, precompiled for every temperature from MIN_TEMP to MAX_TEMP at 0.1 °C
+    resolution: looking a duty up is an array index. Outside of the range the duty of the closest end is used.
+    The duties are interpolated linearly between the steps (temperature, duty) of the profile: below the first
+    step the duty of the first step is used, above the last step the duty of the last step"""
+
+    def __init__(self, duties: array) -> None:
+        self._duties = duties
+        self._last_index = len(duties) - 1
+
+    @classmethod
+    def compile(cls, steps: Sequence[Tuple[int, int]]) -> 'DutyLookupTable':
+        size = (MAX_TEMP - MIN_TEMP) * _STEPS_PER_DEGREE + 1
+        if not steps:
+            return cls(array('d', bytes(8 * size)))
+        return cls(array('d', cls._interpolate(sorted(steps), size)))
+
+    def duty_at(self, temperature: float) -> float:
+        index = int((temperature - MIN_TEMP) * _STEPS_PER_DEGREE + 0.5)
+        duty: float = self._duties[min(max(index, 0), self._last_index)]
+        return duty
+
+    @staticmethod
+    def _interpolate(steps: Sequence[Tuple[int, int]], size: int) -> Iterator[float]:
+        """the duties of the table entries, in temperature order: the steps must be sorted"""
+        step_index = 0
+        for index in range(size):
+            temperature = MIN_TEMP + index / _STEPS_PER_DEGREE
+            while step_index < len(steps) - 1 and steps[step_index + 1][0] <= temperature:
+                step_index += 1
+            temperature_1, duty_1 = steps[step_index]
+            if temperature < temperature_1 or step_index == len(steps) - 1:
+                yield float(duty_1)
+            else:
+                temperature_2, duty_2 = steps[step_index + 1]
+                yield (duty_2 - duty_1) / (temperature_2 - temperature_1) * (temperature - temperature_1) + duty_1
@@ -0,0 +1,160 @@
+#  This file is part of gkraken.
+#
+#  Copyright (c) 2021 Roberto Leinardi and Guy Boldon
+#
+#  gkraken is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  gkraken is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
+import logging
+import os
+import threading
+from typing import Callable, Optional, List, Dict, Any
+
+from gi.repository import Gio, GLib
+
+from gkraken.conf import APP_NAME
+
+_LOG = logging.getLogger(__name__)
+
+LOGIND_BUS_NAME = 'org.freedesktop.login1'
+LOGIND_PATH = '/org/freedesktop/login1'
+LOGIND_MANAGER_INTERFACE = 'org.freedesktop.login1.Manager'
+LOGIND_SESSION_INTERFACE = 'org.freedesktop.login1.Session'
+_PROPERTIES_INTERFACE = 'org.freedesktop.DBus.Properties'
+_IDLE_HINTS = ('IdleHint', 'LockedHint')
+_CALL_TIMEOUT_MS = 5000
+
+
+class LogindMonitor:
+    """Listens to the systemd-logind signals on the system bus (or on the bus at bus_address, e.g. a private
+    dbus-daemon standing in for it): on_prepare_for_sleep(True) is called before the system suspends or
+    hibernates and on_prepare_for_sleep(False) once it resumes; on_idle_changed(True) is called when the session
+    becomes idle or locked and on_idle_changed(False) when it is active again.
+
+    While started, a delay inhibitor lock is held: the suspension waits until release_sleep_delay() is called
+    (or until logind's InhibitDelayMaxSec). The callbacks run in the main context of the thread calling start()"""
+
+    def __init__(self,
+                 on_prepare_for_sleep: Callable[[bool], None],
+                 on_idle_changed: Callable[[bool], None],
+                 bus_address: Optional[str] = None) -> None:
+        self.lock = threading.Lock()
+        self._on_prepare_for_sleep = on_prepare_for_sleep
+        self._on_idle_changed = on_idle_changed
+        self._bus_address = bus_address
+        self._connection: Optional[Gio.DBusConnection] = None
+        self._subscription_ids: List[int] = []
+        self._inhibitor_fd: Optional[int] = None
+        self._idle_hints: Dict[str, bool] = {}
+
+    def start(self) -> bool:
+        """returns False if the bus is not available (e.g. in a sandbox without access to the system bus)"""
+        try:
+            connection = self._connect()
+        except GLib.Error as ex:
+            _LOG.warning("Unable to monitor the system suspension and the session idle state: %s", ex.message)
+            return False
+        self._connection = connection
+        self._subscription_ids.append(connection.signal_subscribe(
+            LOGIND_BUS_NAME, LOGIND_MANAGER_INTERFACE, 'PrepareForSleep', LOGIND_PATH, None,
+            Gio.DBusSignalFlags.NONE, self._on_prepare_for_sleep_signal))
+        session_path = self._get_session_path(connection)
+        if session_path is not None:
+            self._subscription_ids.append(connection.signal_subscribe(
+                LOGIND_BUS_NAME, _PROPERTIES_INTERFACE, 'PropertiesChanged', session_path, LOGIND_SESSION_INTERFACE,
+                Gio.DBusSignalFlags.NONE, self._on_session_properties_changed_signal))
+        self._take_sleep_delay()
+        return True
+
+    def stop(self) -> None:
+        connection = self._connection
+        if connection is None:
+            return
+        for subscription_id in self._subscription_ids:
+            connection.signal_unsubscribe(subscription_id)
+        self._subscription_ids.clear()
+        self.release_sleep_delay()
+        if self._bus_address is not None:
+            # the system bus connection is shared, a private one is not
+            connection.close_sync(None)
+        self._connection = None
+
+    def release_sleep_delay(self) -> None:
+        """lets the system suspend, to be called once ready for it"""
+        with self.lock:
+            if self._inhibitor_fd is not None:
+                os.close(self._inhibitor_fd)
+                self._inhibitor_fd = None
+                _LOG.debug("Sleep delay lock released")
+
+    def _connect(self) -> Gio.DBusConnection:
+        if self._bus_address is None:
+            return Gio.bus_get_sync(Gio.BusType.SYSTEM, None)
+        return Gio.DBusConnection.new_for_address_sync(
+            self._bus_address,
+            Gio.DBusConnectionFlags.AUTHENTICATION_CLIENT | Gio.DBusConnectionFlags.MESSAGE_BUS_CONNECTION,
+            None, None)
+
+    @staticmethod
+    def _get_session_path(connection: Gio.DBusConnection) -> Optional[str]:
+        try:
+            result = connection.call_sync(LOGIND_BUS_NAME, LOGIND_PATH, LOGIND_MANAGER_INTERFACE, 'GetSessionByPID',
+                                          GLib.Variant('(u)', (os.getpid(),)), GLib.VariantType.new('(o)'),
+                                          Gio.DBusCallFlags.NONE, _CALL_TIMEOUT_MS, None)
+        except GLib.Error as ex:
+            _LOG.info("Not running in a logind session, the idle state is not monitored: %s", ex.message)
+            return None
+        session_path: str = result.unpack()[0]
+        return session_path
+
+    def _take_sleep_delay(self) -> None:
+        with self.lock:
+            if self._inhibitor_fd is not None or self._connection is None:
+                return
+            try:
+                result, fd_list = self._connection.call_with_unix_fd_list_sync(
+                    LOGIND_BUS_NAME, LOGIND_PATH, LOGIND_MANAGER_INTERFACE, 'Inhibit',
+                    GLib.Variant('(ssss)', ('sleep', APP_NAME, 'Releasing the devices before the suspension', 'delay')),
+                    GLib.VariantType.new('(h)'), Gio.DBusCallFlags.NONE, _CALL_TIMEOUT_MS, None, None)
+                self._inhibitor_fd = fd_list.get(result.unpack()[0])
+                _LOG.debug("Sleep delay lock taken")
+            except GLib.Error as ex:
+                _LOG.warning("Unable to delay the system suspension: %s", ex.message)
+
+    def _on_prepare_for_sleep_signal(self, *args: Any) -> None:
+        parameters: GLib.Variant = args[5]
+        sleeping = bool(parameters.unpack()[0])
+        _LOG.info("System %s", "going to sleep" if sleeping else "resumed")
+        if not sleeping:
+            # for the next suspension
+            self._take_sleep_delay()
+        try:
+            self._on_prepare_for_sleep(sleeping)
+        except Exception as ex:  # pylint: disable=broad-except
+            _LOG.exception("Error handling the system suspension: %s", ex)
+            self.release_sleep_delay()
+
+    def _on_session_properties_changed_signal(self, *args: Any) -> None:
+        parameters: GLib.Variant = args[5]
+        _, changed_properties, _ = parameters.unpack()
+        idle_hints = {name: bool(changed_properties[name]) for name in _IDLE_HINTS if name in changed_properties}
+        if not idle_hints:
+            return
+        was_idle = any(self._idle_hints.values())
+        self._idle_hints.update(idle_hints)
+        idle = any(self._idle_hints.values())
+        if idle != was_idle:
+            _LOG.debug("Session %s", "idle" if idle else "active")
+            try:
+                self._on_idle_changed(idle)
+            except Exception as ex:  # pylint: disable=broad-except
+                _LOG.exception("Error handling the session idle state: %s", ex)
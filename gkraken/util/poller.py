@@ -0,0 +1,95 @@
+#  This file is part of gkraken.
+#
+#  Copyright (c) 2021 Roberto Leinardi and Guy Boldon
+#
+#  gkraken is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  gkraken is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
+
+import logging
+import threading
+from typing import Callable, Any, Optional, Union
+
+import rx
+from rx import Observable
+from rx.core.typing import Observer, Scheduler
+from rx.disposable import CompositeDisposable, SerialDisposable, Disposable
+
+_LOG = logging.getLogger(__name__)
+
+
+class Poller:
+    """Repeatedly subscribes to the poll observable, with exhaust semantics: a new poll never starts
+    while the previous one is still in flight, and the next one is scheduled interval seconds after
+    the completion of the previous one, not from wall-clock ticks.
+    Every tick that a slow poll made skip is counted as an overrun.
+    The first poll starts first_poll_delay seconds after the subscription.
+    The interval is either fixed or a function, called after every poll, returning the next one."""
+
+    def __init__(self, name: str, poll: Callable[[], Observable], interval: Union[float, Callable[[], float]],
+                 scheduler: Scheduler,
+                 first_poll_delay: float = 0.0) -> None:
+        self.lock = threading.Lock()
+        self._name = name
+        self._poll = poll
+        self._interval = interval
+        self._first_poll_delay = first_poll_delay
+        self._scheduler = scheduler
+        self._overruns: int = 0
+
+    @property
+    def overruns(self) -> int:
+        """number of ticks skipped because a poll was still in flight"""
+        return self._overruns
+
+    def observe(self) -> Observable:
+        observable: Observable = rx.create(self._subscribe)
+        return observable
+
+    def _subscribe(self, observer: Observer, _: Optional[Scheduler] = None) -> Disposable:
+        tick_disposable = SerialDisposable()
+        poll_disposable = SerialDisposable()
+        composite_disposable = CompositeDisposable(tick_disposable, poll_disposable)
+
+        def on_poll_completed(start_time: Any) -> None:
+            interval = self._next_interval()
+            self._count_overruns(self._seconds_since(start_time), interval)
+            if not composite_disposable.is_disposed:
+                tick_disposable.disposable = self._scheduler.schedule_relative(interval, tick)
+
+        def tick(*_: Any) -> None:
+            start_time = self._scheduler.now
+            poll_disposable.disposable = self._poll().subscribe(
+                on_next=observer.on_next,
+                on_error=observer.on_error,
+                on_completed=lambda: on_poll_completed(start_time))
+
+        tick_disposable.disposable = self._scheduler.schedule_relative(self._first_poll_delay, tick) \
+            if self._first_poll_delay > 0 else self._scheduler.schedule(tick)
+        return composite_disposable
+
+    def _next_interval(self) -> float:
+        if callable(self._interval):
+            return self._interval()
+        return self._interval
+
+    def _seconds_since(self, start_time: Any) -> float:
+        seconds: float = (self._scheduler.now - start_time).total_seconds()
+        return seconds
+
+    def _count_overruns(self, duration: float, interval: float) -> None:
+        skipped_ticks = int(duration // interval)
+        if skipped_ticks > 0:
+            with self.lock:
+                self._overruns += skipped_ticks
+            _LOG.warning("%s poll overrun: took %.1f s, %d tick(s) skipped (total overruns: %d)",
+                         self._name, duration, skipped_ticks, self._overruns)
@@ -0,0 +1,99 @@
+#  This file is part of gkraken.
+#
+#  Copyright (c) 2021 Roberto Leinardi and Guy Boldon
+#
+#  gkraken is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  gkraken is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
+
+import csv
+import math
+import threading
+from array import array
+from typing import List, Optional, Tuple, TextIO
+
+SAMPLE_COLUMNS = ('time', 'liquid_temperature', 'fan_rpm', 'fan_duty', 'pump_rpm', 'pump_duty')
+
+_NAN = float('nan')
+
+
+class SampleRingBuffer:
+    """Keeps the latest capacity samples of a device in preallocated arrays of doubles, one per column
+    (see SAMPLE_COLUMNS): appending a sample allocates nothing. Missing values are stored as NaN.
+    The samples are read only decimated, or dumped as CSV"""
+
+    def __init__(self, capacity: int) -> None:
+        if capacity < 1:
+            raise ValueError(f"Invalid capacity {capacity}")
+        self.lock = threading.Lock()
+        self.capacity = capacity
+        self._columns = tuple(array('d', bytes(8 * capacity)) for _ in SAMPLE_COLUMNS)
+        self._next = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, timestamp: float, liquid_temperature: Optional[float], fan_rpm: Optional[float],
+               fan_duty: Optional[float], pump_rpm: Optional[float], pump_duty: Optional[float]) -> None:
+        times, liquid_temperatures, fan_rpms, fan_duties, pump_rpms, pump_duties = self._columns
+        with self.lock:
+            position = self._next
+            times[position] = timestamp
+            liquid_temperatures[position] = _NAN if liquid_temperature is None else liquid_temperature
+            fan_rpms[position] = _NAN if fan_rpm is None else fan_rpm
+            fan_duties[position] = _NAN if fan_duty is None else fan_duty
+            pump_rpms[position] = _NAN if pump_rpm is None else pump_rpm
+            pump_duties[position] = _NAN if pump_duty is None else pump_duty
+            self._next = (position + 1) % self.capacity
+            self._size = min(self._size + 1, self.capacity)
+
+    def clear(self) -> None:
+        with self.lock:
+            self._next = 0
+            self._size = 0
+
+    def decimated(self, max_points: int) -> List[Tuple[float, ...]]:
+        """the samples, oldest first, averaged in at most max_points consecutive groups of the same size.
+        NaN values are left out of the averages (a group with no value at all averages to NaN)"""
+        with self.lock:
+            size = self._size
+            start = (self._next - size) % self.capacity
+            group_size = max(1, math.ceil(size / max(1, max_points)))
+            points: List[Tuple[float, ...]] = []
+            for group_start in range(0, size, group_size):
+                group_end = min(group_start + group_size, size)
+                points.append(tuple(self._average(column, start + group_start, start + group_end)
+                                    for column in self._columns))
+            return points
+
+    def dump(self, file: TextIO, device_id: str = '') -> int:
+        """writes all the samples, oldest first, as CSV rows prefixed by the device id. Returns the rows written"""
+        writer = csv.writer(file)
+        with self.lock:
+            size = self._size
+            start = (self._next - size) % self.capacity
+            for offset in range(size):
+                position = (start + offset) % self.capacity
+                writer.writerow([device_id] + ['' if math.isnan(column[position]) else repr(column[position])
+                                               for column in self._columns])
+            return size
+
+    def _average(self, column: array, start: int, end: int) -> float:
+        total = 0.0
+        count = 0
+        for position in range(start, end):
+            value = column[position % self.capacity]
+            if not math.isnan(value):
+                total += value
+                count += 1
+        return total / count if count else _NAN
@@ -0,0 +1,72 @@
+#  This file is part of gkraken.
+#
+#  Copyright (c) 2021 Roberto Leinardi and Guy Boldon
+#
+#  gkraken is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  gkraken is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
+import logging
+import threading
+import time
+from collections import Counter
+from typing import Dict, Any
+
+from injector import singleton, inject
+
+_LOG = logging.getLogger(__name__)
+
+REPORT_PERIOD = 60  # seconds
+
+
+@singleton
+class WakeupStats:
+    """Counts the thread wakeups caused by the app, by source (e.g. the main loop timers, the device jobs), to
+    verify how often it wakes the CPU up. Nothing is counted unless enabled (see the --debug-stats option)"""
+
+    @inject
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self._enabled: bool = False
+        self._counts: 'Counter[str]' = Counter()
+        self._start_time: float = time.monotonic()
+
+    @property
+    def is_enabled(self) -> bool:
+        return self._enabled
+
+    def enable(self) -> None:
+        with self.lock:
+            self._enabled = True
+            self._counts.clear()
+            self._start_time = time.monotonic()
+
+    def count(self, source: str) -> None:
+        if self._enabled:
+            with self.lock:
+                self._counts[source] += 1
+
+    def take_per_minute(self) -> Dict[str, float]:
+        """the wakeups per minute of every source since the previous call, or since enabled"""
+        with self.lock:
+            now = time.monotonic()
+            minutes = max(now - self._start_time, 1e-3) / 60
+            per_minute = {source: count / minutes for source, count in sorted(self._counts.items())}
+            self._counts.clear()
+            self._start_time = now
+        return per_minute
+
+    def log_report(self, *_: Any) -> bool:
+        """logs the wakeups per minute. Returns True to be used as a periodic GLib timeout callback"""
+        per_minute = self.take_per_minute()
+        _LOG.info("Wakeups per minute: %.1f (%s)", sum(per_minute.values()),
+                  ', '.join(f'{source}: {value:.1f}' for source, value in per_minute.items()) or 'none')
+        return True
@@ -27,6 +27,7 @@ from matplotlib.figure import Figure
 from gkraken.conf import MIN_TEMP, FAN_MIN_DUTY, PUMP_MIN_DUTY, MAX_TEMP, MAX_DUTY
 from gkraken.di import EditSpeedProfileBuilder
 from gkraken.model import SpeedProfile, SpeedStep, ChannelType
+from gkraken.model.control_tuning import ControlTuning
 from gkraken.presenter.edit_speed_profile_presenter import EditSpeedProfileViewInterface, EditSpeedProfilePresenter
 from gkraken.util.view import init_plot_chart, get_speed_profile_data
 
@@ -70,6 +71,12 @@ class EditSpeedProfileView(EditSpeedProfileViewInterface):
             .get_object('save_step_button')
         self._delete_step_button: Gtk.Button = self._builder \
             .get_object('delete_step_button')
+        self._hysteresis_up_adjustment: Gtk.Adjustment = self._builder.get_object('hysteresis_up_adjustment')
+        self._hysteresis_down_adjustment: Gtk.Adjustment = self._builder.get_object('hysteresis_down_adjustment')
+        self._min_duty_delta_adjustment: Gtk.Adjustment = self._builder.get_object('min_duty_delta_adjustment')
+        self._max_slew_rate_adjustment: Gtk.Adjustment = self._builder.get_object('max_slew_rate_adjustment')
+        self._temperature_source_combobox: Gtk.ComboBoxText = self._builder \
+            .get_object('temperature_source_combobox')
         self._init_plot_charts()
 
     def set_transient_for(self, window: Gtk.Window) -> None:
@@ -99,6 +106,12 @@ class EditSpeedProfileView(EditSpeedProfileViewInterface):
     def show(self, profile: SpeedProfile) -> None:
         self._treeselection.unselect_all()
         self._profile_name_entry.set_text(profile.name)
+        self._temperature_source_combobox.set_active_id(profile.temperature_source)
+        tuning = profile.control_tuning
+        self._hysteresis_up_adjustment.set_value(tuning.hysteresis_up)
+        self._hysteresis_down_adjustment.set_value(tuning.hysteresis_down)
+        self._min_duty_delta_adjustment.set_value(tuning.min_duty_delta)
+        self._max_slew_rate_adjustment.set_value(tuning.max_slew_rate)
         self.refresh_liststore(profile)
         self.refresh_controls()
         self._dialog.show_all()
@@ -115,6 +128,20 @@ class EditSpeedProfileView(EditSpeedProfileViewInterface):
     def get_duty(self) -> int:
         return int(self._duty_adjustment.get_value())
 
+    def get_control_tuning(self) -> ControlTuning:
+        return ControlTuning(float(self._hysteresis_up_adjustment.get_value()),
+                             float(self._hysteresis_down_adjustment.get_value()),
+                             float(self._min_duty_delta_adjustment.get_value()),
+                             float(self._max_slew_rate_adjustment.get_value()))
+
+    def set_temperature_sources(self, sources: Dict[str, str]) -> None:
+        self._temperature_source_combobox.remove_all()
+        for source, label in sources.items():
+            self._temperature_source_combobox.append(source, label)
+
+    def get_temperature_source(self) -> str:
+        return str(self._temperature_source_combobox.get_active_id())
+
     def has_a_step_selected(self) -> bool:
         return self._treeselection.get_selected()[1] is not None
 
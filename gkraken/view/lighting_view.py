@@ -104,6 +104,10 @@ class LightingView(LightingViewInterface):
         ]
 
     def load_color_modes(self, lighting_modes: LightingModes) -> None:
+        self._lighting_logo_mode_liststore.clear()
+        self._lighting_ring_mode_liststore.clear()
+        self._lighting_logo_speed_liststore.clear()
+        self._lighting_ring_speed_liststore.clear()
         for mode_id, lighting_mode in lighting_modes.modes_logo.items():
             self._lighting_logo_mode_liststore.append([str(mode_id), lighting_mode.frontend_name])
         for mode_id, lighting_mode in lighting_modes.modes_ring.items():
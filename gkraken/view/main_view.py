@@ -91,6 +91,8 @@ class MainView(MainViewInterface):
         self._cooling_pump_rpm: Gtk.Label = self._builder.get_object('cooling_pump_rpm')
         self._cooling_pump_duty: Gtk.Label = self._builder.get_object('cooling_pump_duty')
         self._firmware_version: Gtk.Label = self._builder.get_object('firmware_version')
+        self._device_combobox: Gtk.ComboBox = self._builder.get_object('device_combobox')
+        self._device_liststore: Gtk.ListStore = self._builder.get_object('device_liststore')
         self._cooling_fan_combobox: Gtk.ComboBox = self._builder.get_object('cooling_fan_profile_combobox')
         self._cooling_fan_liststore: Gtk.ListStore = self._builder.get_object('cooling_fan_profile_liststore')
         self._cooling_pump_combobox: Gtk.ComboBox = self._builder.get_object('cooling_pump_profile_combobox')
@@ -242,6 +244,16 @@ class MainView(MainViewInterface):
             if profile is not None:
                 self._plot_chart(profile.channel, get_speed_profile_data(profile))
 
+    def refresh_device_combobox(self, data: List[Tuple[str, str]], active: Optional[int]) -> None:
+        self._device_liststore.clear()
+        for item in data:
+            self._device_liststore.append([item[0], item[1]])
+        self._device_combobox.set_model(self._device_liststore)
+        if active is not None:
+            self._device_combobox.set_active(active)
+        # the selector is only useful when there is more than one device
+        self._device_combobox.set_visible(len(self._device_liststore) > 1)
+
     def refresh_profile_combobox(self, channel: ChannelType, data: List[Tuple[int, str]],
                                  active: Optional[int]) -> None:
         if channel is ChannelType.FAN:
@@ -29,6 +29,9 @@ class MainViewInterface:
     def refresh_status(self, status: Optional[Status]) -> None:
         raise NotImplementedError()
 
+    def refresh_device_combobox(self, data: List[Tuple[str, str]], active: Optional[int]) -> None:
+        raise NotImplementedError()
+
     def refresh_profile_combobox(self, channel: ChannelType, data: List[Tuple[int, str]],
                                  active: Optional[int]) -> None:
         raise NotImplementedError()
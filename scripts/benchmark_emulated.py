@@ -0,0 +1,57 @@
+#  This file is part of gkraken.
+#
+#  Copyright (c) 2021 Roberto Leinardi and Guy Boldon
+#
+#  gkraken is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  gkraken is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Microbenchmark of the unchanged liquidctl drivers (report building and parsing included) against the emulated
+Kraken X3 and Kraken2 HID devices (no hardware needed).
+
+Run from the project root with: PYTHONPATH=. python3 scripts/benchmark_emulated.py
+"""
+
+import timeit
+from typing import Callable, List, Tuple
+
+from liquidctl.driver.base import BaseDriver
+
+from gkraken.device.hid_emulator import EmulatedHidapi, EmulatedKrakenX3, EmulatedKraken2, find_emulated_drivers
+
+_CALLS = 2_000
+_PROFILE = [(20, 30), (30, 40), (40, 60), (50, 80), (60, 100)]
+_COLOR_CHANNELS = {'KrakenX3': 'ring', 'Kraken2': 'logo'}
+
+
+def _operations(driver: BaseDriver) -> List[Tuple[str, Callable[[], object]]]:
+    color_channel = _COLOR_CHANNELS[driver.__class__.__name__]
+    return [
+        ('get_status()', driver.get_status),
+        ('set_speed_profile()', lambda: driver.set_speed_profile('pump', _PROFILE)),
+        ('set_fixed_speed()', lambda: driver.set_fixed_speed('pump', 70)),
+        ('set_color()', lambda: driver.set_color(color_channel, 'fading', [(255, 0, 0), (0, 0, 255)])),
+    ]
+
+
+def main() -> None:
+    for driver in find_emulated_drivers(EmulatedHidapi(EmulatedKrakenX3('x3'), EmulatedKraken2('kraken2'))):
+        driver.connect()
+        driver.initialize()
+        for name, operation in _operations(driver):
+            best = min(timeit.repeat(operation, number=_CALLS, repeat=5))
+            print(f"{driver.__class__.__name__}.{name}: {best / _CALLS * 1e6:.2f} µs/call ({_CALLS} calls, best of 5)")
+        driver.disconnect()
+
+
+if __name__ == "__main__":
+    main()
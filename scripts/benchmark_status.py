@@ -0,0 +1,71 @@
+#  This file is part of gkraken.
+#
+#  Copyright (c) 2021 Roberto Leinardi and Guy Boldon
+#
+#  gkraken is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  gkraken is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Microbenchmark of the KrakenRepository.get_status() hot path, using a fake driver (no hardware needed).
+
+Run from the project root with: PYTHONPATH=. python3 scripts/benchmark_status.py [TRACE]
+If a trace recorded with --record-trace is given, the first device recorded is replayed (without its latencies)
+instead of the fake driver.
+"""
+
+import sys
+import timeit
+from typing import Any, List, Tuple, Optional
+
+from liquidctl.driver.base import BaseDriver
+from liquidctl.driver.kraken3 import KrakenZ3
+
+from gkraken.device.driver_trace import load_trace
+from gkraken.di import INJECTOR, ConnectionStateChangedSubject, StatusReceivedSubject
+from gkraken.repository.connection_manager import ConnectionManager
+from gkraken.repository.device_state_mirror import DeviceStateMirror
+from gkraken.repository.kraken_repository import KrakenRepository
+
+_DEVICE_ID = 'benchmark'
+_CALLS = 100_000
+_DRIVER_STATUS: List[Tuple[str, Any, str]] = [
+    ('Liquid temperature', 31.2, '°C'),
+    ('Pump speed', 1848, 'rpm'),
+    ('Pump duty', 70, '%'),
+    ('Fan speed', 1120, 'rpm'),
+    ('Fan duty', 45, '%'),
+]
+
+
+def _create_repository(trace: Optional[str]) -> KrakenRepository:
+    driver: BaseDriver
+    if trace is not None:
+        driver = next(iter(load_trace(trace, time_scale=0).values()))
+    else:
+        driver = KrakenZ3(None, 'Fake Kraken Z3', speed_channels={}, color_channels={})
+        driver.get_status = lambda **_: _DRIVER_STATUS  # type: ignore[assignment]
+    repository = KrakenRepository(_DEVICE_ID,
+                                  ConnectionManager(_DEVICE_ID, INJECTOR.get(ConnectionStateChangedSubject)),
+                                  INJECTOR.get(DeviceStateMirror),
+                                  INJECTOR.get(StatusReceivedSubject))
+    repository._driver = driver  # pylint: disable=protected-access
+    return repository
+
+
+def main() -> None:
+    repository = _create_repository(sys.argv[1] if len(sys.argv) > 1 else None)
+    best = min(timeit.repeat(repository.get_status, number=_CALLS, repeat=5))
+    print(f"KrakenRepository.get_status(): {best / _CALLS * 1e6:.2f} µs/call ({_CALLS} calls, best of 5)")
+
+
+if __name__ == "__main__":
+    main()
@@ -19,7 +19,15 @@ import logging
 
 import pytest
 
+from gkraken.device.device_discovery import DeviceDiscovery
+from gkraken.di import INJECTOR
+
 
 @pytest.fixture(autouse=True)
 def enable_logging_for_errors() -> None:
     logging.getLogger().setLevel(logging.DEBUG)
+
+
+@pytest.fixture(autouse=True)
+def invalidate_device_discovery() -> None:
+    INJECTOR.get(DeviceDiscovery).invalidate()
@@ -0,0 +1,89 @@
+#  This file is part of gkraken.
+#
+#  Copyright (c) 2021 Roberto Leinardi and Guy Boldon
+#
+#  gkraken is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  gkraken is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
+
+from liquidctl.driver.kraken2 import Kraken2
+from liquidctl.driver.kraken3 import KrakenZ3
+from pytest_mock import MockerFixture
+
+from gkraken.device.device_settings import DeviceSettings, StatusLayout
+from gkraken.device.settings_kraken_2 import SettingsKraken2
+from gkraken.device.settings_kraken_z3 import SettingsKrakenZ3
+from gkraken.model.status import Status
+
+_Z3_STATUS = [
+    ('Liquid temperature', 31.2, '°C'),
+    ('Pump speed', 1848, 'rpm'),
+    ('Pump duty', 70, '%'),
+    ('Fan speed', 1120, 'rpm'),
+    ('Fan duty', 45, '%'),
+]
+
+
+class TestStatusDecoder:
+
+    def test_values_found_by_key(self, mocker: MockerFixture) -> None:
+        # arrange
+        mocker.patch.dict(DeviceSettings._status_layouts, clear=True)
+        decode_status = SettingsKrakenZ3.create_status_decoder('Kraken Z', '1.0.0', 'serial')
+        # act
+        status = decode_status(list(reversed(_Z3_STATUS)))
+        # assert
+        assert status == Status(KrakenZ3, 31.2, '1.0.0', 1120, 45, 1848, 70, 'Kraken Z', 'serial')
+
+    def test_firmware_version_from_status(self, mocker: MockerFixture) -> None:
+        # arrange
+        mocker.patch.dict(DeviceSettings._status_layouts, clear=True)
+        decode_status = SettingsKraken2.create_status_decoder('Kraken X', None)
+        # act
+        status = decode_status([('Liquid temperature', 29.9, '°C'), ('Fan speed', 853, 'rpm'),
+                                ('Pump speed', 1948, 'rpm'), ('Firmware version', '6.0.2', '')])
+        # assert
+        assert status is not None
+        assert status.driver_type is Kraken2
+        assert (status.fan_rpm, status.pump_rpm, status.firmware_version) == (853, 1948, '6.0.2')
+
+    def test_layout_cached_per_driver_and_firmware(self, mocker: MockerFixture) -> None:
+        # arrange
+        mocker.patch.dict(DeviceSettings._status_layouts, clear=True)
+        introspect = mocker.spy(StatusLayout, 'introspect')
+        # act
+        for _ in range(3):
+            SettingsKrakenZ3.create_status_decoder('Kraken Z', '1.0.0')(_Z3_STATUS)
+        SettingsKrakenZ3.create_status_decoder('Kraken Z', '2.0.0')(_Z3_STATUS)
+        # assert
+        assert introspect.call_count == 2
+        assert set(DeviceSettings._status_layouts) == {(KrakenZ3, '1.0.0'), (KrakenZ3, '2.0.0')}
+
+    def test_changed_layout_introspected_again(self, mocker: MockerFixture) -> None:
+        # arrange
+        mocker.patch.dict(DeviceSettings._status_layouts, clear=True)
+        decode_status = SettingsKrakenZ3.create_status_decoder('Kraken Z', '1.0.0')
+        decode_status(_Z3_STATUS)
+        # act
+        status = decode_status([('Pump duty', 70, '%'), ('Liquid temperature', 31.2, '°C')])
+        # assert
+        assert status is not None
+        assert (status.liquid_temperature, status.pump_duty, status.pump_rpm) == (31.2, 70, None)
+
+    def test_no_liquid_temperature(self, mocker: MockerFixture) -> None:
+        # arrange
+        mocker.patch.dict(DeviceSettings._status_layouts, clear=True)
+        decode_status = SettingsKrakenZ3.create_status_decoder('Kraken Z', '1.0.0')
+        # act
+        status = decode_status([('Pump duty', 70, '%')])
+        # assert
+        assert status is None
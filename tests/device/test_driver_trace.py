@@ -0,0 +1,114 @@
+#  This file is part of gkraken.
+#
+#  Copyright (c) 2021 Roberto Leinardi and Guy Boldon
+#
+#  gkraken is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  gkraken is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
+
+import time
+from pathlib import Path
+from typing import Any
+
+import pytest
+from liquidctl.driver.kraken3 import KrakenX3
+from liquidctl.driver.usb import HidapiDevice
+from pytest_mock import MockerFixture
+
+from gkraken.device.device_discovery import DeviceDiscovery
+from gkraken.device.device_settings import DeviceSettings
+from gkraken.device.driver_trace import TraceRecorder, load_trace, DriverTracing
+from gkraken.device.settings_kraken_x3 import SettingsKrakenX3
+
+_STATUS = [('Liquid temperature', 30.1, '°C'), ('Pump speed', 1848, 'rpm'), ('Pump duty', 90, '%')]
+
+
+def _driver(mocker: MockerFixture) -> Any:
+    driver = mocker.Mock(spec=KrakenX3, description='NZXT Kraken X (X53, X63 or X73)', serial_number='serial',
+                         bus='hid', address='/dev/hidraw0')
+    driver.get_status.return_value = _STATUS
+    driver.set_fixed_speed.side_effect = OSError('write error')
+    return driver
+
+
+def _record(path: Path, driver: Any) -> None:
+    recorder = TraceRecorder(str(path))
+    recorder.record_driver('serial', driver)
+    driver.connect()
+    driver.get_status()
+    driver.set_speed_profile('pump', [(20, 50), (60, 100)])
+    with pytest.raises(OSError):
+        driver.set_fixed_speed('fan', 50)
+    recorder.close()
+
+
+class TestDriverTrace:
+
+    def test_replay_recorded_calls(self, tmp_path: Path, mocker: MockerFixture) -> None:
+        # arrange
+        trace = tmp_path / 'trace.jsonl.gz'
+        _record(trace, _driver(mocker))
+        # act
+        replay_driver = load_trace(str(trace), time_scale=0)['serial']
+        # assert
+        assert replay_driver.connect() is replay_driver
+        assert replay_driver.get_status() == _STATUS
+        assert replay_driver.get_status() == _STATUS  # replayed calls start over
+        replay_driver.set_speed_profile('pump', [(20, 50), (60, 100)])
+        with pytest.raises(OSError, match='write error'):
+            replay_driver.set_fixed_speed('fan', 50)
+        assert replay_driver.set_color('ring', 'off', []) is None  # never recorded
+        assert replay_driver.description == 'NZXT Kraken X (X53, X63 or X73)'
+        assert replay_driver.serial_number == 'serial'
+
+    def test_replay_driver_uses_recorded_driver_settings(self, tmp_path: Path, mocker: MockerFixture) -> None:
+        # arrange
+        trace = tmp_path / 'trace.jsonl.gz'
+        _record(trace, _driver(mocker))
+        # act
+        replay_driver = load_trace(str(trace), time_scale=0)['serial']
+        # assert
+        assert replay_driver.stand_in_for is KrakenX3
+        assert DeviceSettings.for_driver(replay_driver) is SettingsKrakenX3
+
+    def test_replay_scales_recorded_latency(self, tmp_path: Path, mocker: MockerFixture) -> None:
+        # arrange
+        trace = tmp_path / 'trace.jsonl.gz'
+        driver = _driver(mocker)
+        driver.get_status.side_effect = lambda: time.sleep(0.05) or _STATUS
+        _record(trace, driver)
+        original_timing = load_trace(str(trace), time_scale=1)['serial']
+        no_timing = load_trace(str(trace), time_scale=0)['serial']
+        # act
+        start = time.monotonic()
+        original_timing.get_status()
+        original_duration = time.monotonic() - start
+        start = time.monotonic()
+        no_timing.get_status()
+        no_timing_duration = time.monotonic() - start
+        # assert
+        assert original_duration >= 0.05
+        assert no_timing_duration < 0.05
+
+    def test_discovery_replays_trace(self, tmp_path: Path, mocker: MockerFixture) -> None:
+        # arrange
+        trace = tmp_path / 'trace.jsonl.gz'
+        _record(trace, _driver(mocker))
+        enumerate_hid = mocker.patch.object(HidapiDevice, 'enumerate')
+        driver_tracing = DriverTracing()
+        driver_tracing.start_replay(str(trace), 0)
+        # act
+        devices = DeviceDiscovery(driver_tracing).find_devices()
+        # assert
+        assert list(devices) == ['serial']
+        assert devices['serial'].get_status() == _STATUS
+        enumerate_hid.assert_not_called()
@@ -0,0 +1,115 @@
+#  This file is part of gkraken.
+#
+#  Copyright (c) 2021 Roberto Leinardi and Guy Boldon
+#
+#  gkraken is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  gkraken is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
+
+from typing import List
+
+from liquidctl.driver.kraken2 import Kraken2
+from liquidctl.driver.kraken3 import KrakenX3
+
+from gkraken.device.hid_emulator import ThermalModel, EmulatedKrakenX3, EmulatedKraken2, EmulatedHidapi, \
+    find_emulated_drivers
+from gkraken.device.settings_kraken_x3 import SettingsKrakenX3
+
+
+class _FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+        self.sleeps: List[float] = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class TestHidEmulator:
+
+    def test_kraken_x3_driver(self) -> None:
+        # arrange
+        device = EmulatedKrakenX3('x3-serial')
+        driver = find_emulated_drivers(EmulatedHidapi(device))[0]
+        driver.connect()
+        # act
+        init_result = driver.initialize()
+        driver.set_speed_profile('pump', [(20, 30), (60, 100)])
+        driver.set_fixed_speed('pump', 80)
+        driver.set_color('ring', 'fixed', [(255, 0, 0)])
+        status = driver.get_status()
+        driver.disconnect()
+        # assert
+        assert isinstance(driver, KrakenX3)
+        assert driver.serial_number == 'x3-serial'
+        assert ('Firmware version', '1.10.0', '') in init_result
+        assert ('Pump Ring LEDs', 'detected', '') in init_result
+        assert ('Pump duty', 80, '%') in status
+        assert ('Liquid temperature', 25.0, '°C') in status
+        assert 0x02 in device.color_reports
+
+    def test_kraken_2_driver(self) -> None:
+        # arrange
+        device = EmulatedKraken2('k2-serial')
+        driver = find_emulated_drivers(EmulatedHidapi(device))[0]
+        driver.connect()
+        # act
+        driver.initialize()
+        driver.set_speed_profile('fan', [(20, 30), (60, 100)])
+        driver.set_fixed_speed('pump', 50)
+        driver.set_color('logo', 'fixed', [(0, 255, 0)])
+        status = driver.get_status()
+        driver.disconnect()
+        # assert
+        assert isinstance(driver, Kraken2)
+        assert ('Firmware version', '6.0.2', '') in status
+        assert ('Pump speed', 1400, 'rpm') in status
+        assert ('Fan speed', 780, 'rpm') in status  # 39% at 25°C
+        assert 0x01 in device.color_reports
+
+    def test_thermal_model_responds_to_duty(self) -> None:
+        # arrange
+        clock = _FakeClock()
+        quiet = ThermalModel(clock=clock)
+        cool = ThermalModel(clock=clock)
+        # act
+        clock.now = 600
+        quiet_temperature = quiet.update(pump_duty=30, fan_duty=20)
+        cool_temperature = cool.update(pump_duty=100, fan_duty=100)
+        # assert
+        assert 25 < cool_temperature < quiet_temperature
+        assert quiet_temperature < 25 + 150 / (2 + 0.6 + 1.2)  # still below the equilibrium temperature
+
+    def test_periodic_status_reports(self) -> None:
+        # arrange
+        clock = _FakeClock()
+        device = EmulatedKrakenX3('x3-serial', report_interval=1, clock=clock, sleep=clock.sleep)
+        handle = EmulatedHidapi(device).device()
+        handle.open_path(device.path)
+        parse_status_report = SettingsKrakenX3.create_status_report_parser('Kraken X3', '1.10.0', 'x3-serial')
+        assert parse_status_report is not None
+        # act
+        handle.set_nonblocking(1)
+        not_due_report = handle.read(64)
+        handle.set_nonblocking(0)
+        report = handle.read(64, timeout_ms=1500)
+        # assert
+        assert not not_due_report
+        assert clock.sleeps == [1]
+        status = parse_status_report(bytes(report))
+        assert status is not None
+        assert status.pump_duty == 60
+        assert status.pump_rpm == 1680
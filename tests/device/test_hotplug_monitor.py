@@ -0,0 +1,99 @@
+#  This file is part of gkraken.
+#
+#  Copyright (c) 2021 Roberto Leinardi and Guy Boldon
+#
+#  gkraken is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  gkraken is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
+
+import socket
+import threading
+from typing import List
+
+from gkraken.device.hotplug_monitor import HotplugMonitor, HotplugEvent, parse_uevent
+
+_KRAKEN_X3 = (0x1e71, 0x2007)
+
+
+def _uevent(action: str, **properties: str) -> bytes:
+    devpath = properties.get('DEVPATH', '/devices/pci0000:00/usb1/1-4')
+    fields = [f'{action}@{devpath}', f'ACTION={action}'] + [f'{key}={value}' for key, value in properties.items()]
+    return '\0'.join(fields).encode() + b'\0'
+
+
+class TestHotplugMonitor:
+
+    def test_parse_usb_device_event(self) -> None:
+        # act
+        event = parse_uevent(_uevent('remove', DEVPATH='/devices/usb1/1-4', SUBSYSTEM='usb', DEVTYPE='usb_device',
+                                     PRODUCT='1e71/2007/200'))
+        # assert
+        assert event == HotplugEvent('remove', 0x1e71, 0x2007, '/devices/usb1/1-4')
+
+    def test_parse_hid_event(self) -> None:
+        # act
+        event = parse_uevent(_uevent('add', SUBSYSTEM='hid', HID_ID='0003:00001E71:0000170E'))
+        # assert
+        assert event is not None
+        assert (event.action, event.vendor_id, event.product_id) == ('add', 0x1e71, 0x170e)
+
+    def test_event_location(self) -> None:
+        # arrange
+        usb_event = HotplugEvent('remove', 0x1e71, 0x2007, '/devices/pci0000:00/0000:00:14.0/usb1/1-4')
+        hid_event = HotplugEvent('remove', 0x1e71, 0x2007,
+                                 '/devices/pci0000:00/0000:00:14.0/usb1/1-4/1-4.2/1-4.2:1.0/0003:1E71:2007.0005')
+        # assert
+        assert usb_event.is_at(0x1e71, 0x2007, '1-4')
+        assert not usb_event.is_at(0x1e71, 0x2007, '1-4.2')
+        assert not usb_event.is_at(0x1e71, 0x170e, '1-4')
+        assert hid_event.is_at(0x1e71, 0x2007, '1-4.2')
+        assert not hid_event.is_at(0x1e71, 0x2007, '1-5')
+
+    def test_ignored_events(self) -> None:
+        # assert
+        assert parse_uevent(_uevent('bind', SUBSYSTEM='usb', DEVTYPE='usb_device', PRODUCT='1e71/2007/200')) is None
+        assert parse_uevent(_uevent('add', SUBSYSTEM='usb', DEVTYPE='usb_interface', PRODUCT='1e71/2007/200')) is None
+        assert parse_uevent(_uevent('add', SUBSYSTEM='block', DEVNAME='sda')) is None
+        assert parse_uevent(b'libudev\0garbage') is None
+
+    def test_burst_of_events_reported_together(self) -> None:
+        # arrange
+        kernel, monitor_socket = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+        reported: List[List[HotplugEvent]] = []
+        done = threading.Event()
+
+        def on_events(events: List[HotplugEvent]) -> None:
+            reported.append(events)
+            done.set()
+
+        monitor = HotplugMonitor({_KRAKEN_X3}, on_events, lambda: monitor_socket, settle_time=0.05)
+        assert monitor.start()
+        # act
+        kernel.send(_uevent('add', SUBSYSTEM='usb', DEVTYPE='usb_device', PRODUCT='1e71/2007/200'))
+        kernel.send(_uevent('add', SUBSYSTEM='usb', DEVTYPE='usb_device', PRODUCT='46d/c52b/1211'))  # a mouse
+        kernel.send(_uevent('add', SUBSYSTEM='hid', HID_ID='0003:00001E71:00002007'))
+        # assert
+        assert done.wait(timeout=2)
+        monitor.stop()
+        kernel.close()
+        assert [[event.action for event in events] for events in reported] == [['add', 'add']]
+
+    def test_netlink_not_available(self) -> None:
+        # arrange
+        def open_socket() -> socket.socket:
+            raise PermissionError('not permitted')
+
+        monitor = HotplugMonitor({_KRAKEN_X3}, lambda _: None, open_socket)
+        # act
+        started = monitor.start()
+        # assert
+        assert not started
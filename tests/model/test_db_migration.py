@@ -0,0 +1,115 @@
+#  This file is part of gkraken.
+#
+#  Copyright (c) 2021 Roberto Leinardi and Guy Boldon
+#
+#  gkraken is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  gkraken is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
+
+from peewee import SqliteDatabase
+
+from gkraken.conf import SHARED_DEVICE_ID, LIQUID_TEMPERATURE_SOURCE
+from gkraken.model.control_tuning import DEFAULT_CONTROL_TUNING
+from gkraken.model.current_lighting_color import CurrentLightingColor
+from gkraken.model.current_lighting_profile import CurrentLightingProfile
+from gkraken.model.current_speed_profile import CurrentSpeedProfile
+from gkraken.model.db_migration import migrate_db
+from gkraken.model.speed_profile import SpeedProfile
+from gkraken.model.speed_step import SpeedStep
+
+_MODELS = [SpeedProfile, SpeedStep, CurrentSpeedProfile, CurrentLightingProfile, CurrentLightingColor]
+
+# schema created by the versions without multi-device support
+_LEGACY_SCHEMA = [
+    'CREATE TABLE "speed_profile" ("id" INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT, "channel" VARCHAR(255) NOT NULL, '
+    '"name" VARCHAR(255) NOT NULL, "read_only" INTEGER NOT NULL, "single_step" INTEGER NOT NULL, '
+    '"timestamp" DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL)',
+    'CREATE TABLE "current_speed_profile" ("channel" VARCHAR(255) NOT NULL PRIMARY KEY, '
+    '"profile_id" INTEGER NOT NULL, "timestamp" DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL, '
+    'FOREIGN KEY ("profile_id") REFERENCES "speed_profile" ("id"))',
+    'CREATE UNIQUE INDEX "currentspeedprofile_profile_id" ON "current_speed_profile" ("profile_id")',
+    'CREATE TABLE "current_lighting_profile" ("channel" VARCHAR(255) NOT NULL PRIMARY KEY, '
+    '"mode" INTEGER NOT NULL, "speed" INTEGER NOT NULL, "direction" VARCHAR(255) NOT NULL, '
+    '"timestamp" DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL)',
+    'CREATE TABLE "current_lighting_color" ("channel" VARCHAR(255) NOT NULL, "index" INTEGER NOT NULL, '
+    '"red" INTEGER NOT NULL, "green" INTEGER NOT NULL, "blue" INTEGER NOT NULL, '
+    '"timestamp" DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL, PRIMARY KEY ("channel", "index"))',
+    'INSERT INTO "speed_profile" ("id", "channel", "name", "read_only", "single_step") VALUES (1, \'fan\', '
+    '\'Silent\', 0, 0)',
+    'INSERT INTO "current_speed_profile" ("channel", "profile_id") VALUES (\'fan\', 1)',
+    'INSERT INTO "current_lighting_profile" ("channel", "mode", "speed", "direction") VALUES (\'ring\', 2, 1, '
+    '\'forward\')',
+    'INSERT INTO "current_lighting_color" ("channel", "index", "red", "green", "blue") VALUES (\'ring\', 0, 1, 2, 3)',
+]
+
+
+def test_migrate_db_assigns_legacy_rows_to_shared_device() -> None:
+    # arrange
+    database = SqliteDatabase(':memory:')
+    with database.bind_ctx(_MODELS):
+        for statement in _LEGACY_SCHEMA:
+            database.execute_sql(statement)
+
+        # act
+        migrate_db(database)
+        database.create_tables(_MODELS)
+
+        # assert
+        assert SpeedProfile.get_by_id(1).device == SHARED_DEVICE_ID
+        assert CurrentSpeedProfile.get(device=SHARED_DEVICE_ID, channel='fan').profile.name == 'Silent'
+        assert CurrentLightingProfile.get(device=SHARED_DEVICE_ID, channel='ring').mode == 2
+        assert CurrentLightingColor.get(device=SHARED_DEVICE_ID, channel='ring', index=0).blue == 3
+        assert not database.get_tables().count('current_speed_profile_old')
+
+
+def test_migrate_db_allows_a_current_profile_per_device() -> None:
+    # arrange
+    database = SqliteDatabase(':memory:')
+    with database.bind_ctx(_MODELS):
+        for statement in _LEGACY_SCHEMA:
+            database.execute_sql(statement)
+        migrate_db(database)
+        database.create_tables(_MODELS)
+
+        # act
+        CurrentSpeedProfile.create(device='serial-2', channel='fan', profile=1)
+        migrate_db(database)
+
+        # assert
+        assert CurrentSpeedProfile.select().where(CurrentSpeedProfile.profile == 1).count() == 2
+
+
+def test_migrate_db_adds_the_software_control_columns_with_defaults() -> None:
+    # arrange
+    database = SqliteDatabase(':memory:')
+    with database.bind_ctx(_MODELS):
+        for statement in _LEGACY_SCHEMA:
+            database.execute_sql(statement)
+
+        # act
+        migrate_db(database)
+        database.create_tables(_MODELS)
+
+        # assert
+        assert SpeedProfile.get_by_id(1).control_tuning == DEFAULT_CONTROL_TUNING
+        assert SpeedProfile.get_by_id(1).temperature_source == LIQUID_TEMPERATURE_SOURCE
+
+
+def test_migrate_db_on_empty_database_does_nothing() -> None:
+    # arrange
+    database = SqliteDatabase(':memory:')
+
+    # act
+    migrate_db(database)
+
+    # assert
+    assert database.get_tables() == []
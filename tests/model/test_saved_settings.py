@@ -0,0 +1,61 @@
+#  This file is part of gkraken.
+#
+#  Copyright (c) 2021 Roberto Leinardi and Guy Boldon
+#
+#  gkraken is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  gkraken is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
+
+from peewee import SqliteDatabase
+
+from gkraken.conf import SHARED_DEVICE_ID
+from gkraken.model.current_lighting_color import CurrentLightingColor
+from gkraken.model.current_lighting_profile import CurrentLightingProfile
+from gkraken.model.current_speed_profile import CurrentSpeedProfile
+from gkraken.model.saved_settings import SavedSettings
+from gkraken.model.speed_profile import SpeedProfile
+from gkraken.model.speed_step import SpeedStep
+
+_MODELS = [SpeedProfile, SpeedStep, CurrentSpeedProfile, CurrentLightingProfile, CurrentLightingColor]
+
+
+def test_saved_settings_of_device() -> None:
+    # arrange
+    database = SqliteDatabase(':memory:')
+    with database.bind_ctx(_MODELS):
+        database.create_tables(_MODELS)
+        silent = SpeedProfile.create(channel='fan', name='Silent')
+        SpeedStep.create(profile=silent, temperature=20, duty=25)
+        SpeedStep.create(profile=silent, temperature=60, duty=100)
+        performance = SpeedProfile.create(device='serial-1', channel='fan', name='Performance')
+        SpeedProfile.create(device='serial-2', channel='fan', name='Other device')
+        SpeedProfile.create(channel='pump', name='Fixed', single_step=True)
+        CurrentSpeedProfile.create(device=SHARED_DEVICE_ID, channel='fan', profile=silent)
+        CurrentSpeedProfile.create(device='serial-1', channel='fan', profile=performance)
+        CurrentLightingProfile.create(device=SHARED_DEVICE_ID, channel='ring', mode=2, speed=1, direction='forward')
+        CurrentLightingColor.create(device=SHARED_DEVICE_ID, channel='ring', index=1, red=4, green=5, blue=6)
+        CurrentLightingColor.create(device=SHARED_DEVICE_ID, channel='ring', index=0, red=1, green=2, blue=3)
+
+        # act
+        saved = SavedSettings.load()
+
+        # assert
+        assert saved.get_profile_list('serial-1', 'fan') == [(silent.id, 'Silent'), (performance.id, 'Performance')]
+        assert saved.get_current_speed_profile('serial-1', 'fan') == performance
+        assert saved.get_current_speed_profile('serial-2', 'fan') == silent
+        assert saved.get_current_speed_profile('serial-2', 'pump') is None
+        assert [(step.temperature, step.duty) for step in saved.get_current_speed_profile('serial-2', 'fan').steps] \
+               == [(20, 25), (60, 100)]
+        profile, colors = saved.get_lighting_profile('serial-1', 'ring')
+        assert profile is not None and profile.mode == 2
+        assert [color.red for color in colors] == [1, 4]
+        assert saved.get_lighting_profile('serial-1', 'logo') == (None, [])
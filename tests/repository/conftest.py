@@ -15,15 +15,49 @@
 #  You should have received a copy of the GNU General Public License
 #  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
 
+import socket
+import threading
+from concurrent.futures import Future
+from typing import Iterator, Any, Tuple
+
 import pytest
+from liquidctl.driver.kraken3 import KrakenX3
 from pytest_mock import MockerFixture
 
+from rx.subject import Subject
+
+from gkraken.core_di import ConnectionStateChangedSubject, StatusReceivedSubject, DeviceAddedSubject
+from gkraken.device.device_discovery import DeviceDiscovery
+from gkraken.device.driver_trace import DriverTracing
+from gkraken.repository.connection_manager import ConnectionManager
+from gkraken.repository.device_registry import DeviceRegistry
+from gkraken.repository.device_state_mirror import DeviceStateMirror
+from gkraken.model.status import Status
+from gkraken.repository.helper_client import HelperClient, HelperConnection
+from gkraken.repository.helper_server import HelperServer
 from gkraken.repository.kraken_repository import KrakenRepository
 
 
 @pytest.fixture
-def repo_init() -> KrakenRepository:
-    return KrakenRepository()
+def connection_manager() -> ConnectionManager:
+    return ConnectionManager('test-serial', ConnectionStateChangedSubject(Subject()))
+
+
+@pytest.fixture
+def device_state_mirror() -> DeviceStateMirror:
+    return DeviceStateMirror()
+
+
+@pytest.fixture
+def status_received_subject() -> StatusReceivedSubject:
+    return StatusReceivedSubject(Subject())
+
+
+@pytest.fixture
+def repo_init(connection_manager: ConnectionManager,
+              device_state_mirror: DeviceStateMirror,
+              status_received_subject: StatusReceivedSubject) -> KrakenRepository:
+    return KrakenRepository('test-serial', connection_manager, device_state_mirror, status_received_subject)
 
 
 @pytest.fixture
@@ -33,3 +67,55 @@ def repo(repo_init: KrakenRepository, mocker: MockerFixture) -> KrakenRepository
         repo_init, '_load_driver'
     )
     return repo_init
+
+
+@pytest.fixture
+def device_registry(device_state_mirror: DeviceStateMirror,
+                    status_received_subject: StatusReceivedSubject,
+                    mocker: MockerFixture) -> Iterator[DeviceRegistry]:
+    device_discovery = DeviceDiscovery(DriverTracing())
+    mocker.patch.object(device_discovery, 'find_devices', return_value={
+        'serial-1': mocker.Mock(description='Kraken 1', vendor_id=0x1e71, product_id=0x2007, bus='usb1', port=(4,)),
+        'serial-2': mocker.Mock(description='Kraken 2', vendor_id=0x1e71, product_id=0x2007, bus='usb1', port=(5,)),
+    })
+    registry = DeviceRegistry(device_discovery, device_state_mirror, status_received_subject,
+                              ConnectionStateChangedSubject(Subject()), DeviceAddedSubject(Subject()), HelperClient())
+    yield registry
+    registry.shutdown()
+
+
+def _run_now(_: Any, function: Any, *args: Any, **__: Any) -> Future:
+    future: Future = Future()
+    try:
+        future.set_result(function(*args))
+    except Exception as ex:  # pylint: disable=broad-except
+        future.set_exception(ex)
+    return future
+
+
+@pytest.fixture
+def local_repository(mocker: MockerFixture) -> Any:
+    repository = mocker.Mock(spec=KrakenRepository, driver_type=KrakenX3, firmware_version='1.0.7')
+    repository.submit.side_effect = _run_now
+    repository.has_supported_kraken.return_value = True
+    repository.get_status.return_value = Status(KrakenX3, 31.5, '1.0.7', pump_rpm=1848, pump_duty=70.0)
+    return repository
+
+
+@pytest.fixture
+def helper(local_repository: Any, mocker: MockerFixture) -> Iterator[Tuple[HelperClient, HelperConnection]]:
+    device_registry = mocker.Mock(spec=DeviceRegistry)
+    device_registry.get_device_ids.return_value = ['test-serial']
+    device_registry.get_description.return_value = 'NZXT Kraken X'
+    device_registry.get_repository.return_value = local_repository
+    gui_socket, helper_socket = socket.socketpair()
+    server = threading.Thread(target=HelperServer(device_registry).serve_connection, args=(helper_socket,))
+    server.start()
+    connection = HelperConnection(gui_socket)
+    helper_client = HelperClient()
+    mocker.patch.object(helper_client, 'request', side_effect=connection.request)
+    mocker.patch.object(helper_client, 'connect', return_value=1)
+    yield helper_client, connection
+    connection.close()
+    server.join(timeout=1)
+    helper_socket.close()
@@ -0,0 +1,205 @@
+#  This file is part of gkraken.
+#
+#  Copyright (c) 2021 Roberto Leinardi and Guy Boldon
+#
+#  gkraken is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  gkraken is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
+
+from liquidctl.driver.kraken3 import KrakenX3
+from pytest_mock import MockerFixture
+
+from gkraken.device.device_discovery import DeviceDiscovery
+from gkraken.model.connection_state import ConnectionState, DeviceConnectionState
+from gkraken.repository import connection_manager as connection_manager_module
+from gkraken.repository.connection_manager import ConnectionManager, InitResult
+from gkraken.repository.kraken_repository import KrakenRepository
+
+
+class TestConnectionManager:
+
+    def test_exponential_backoff(self, connection_manager: ConnectionManager, mocker: MockerFixture) -> None:
+        # arrange
+        mocker.patch.object(connection_manager_module.time, 'monotonic', return_value=100.0)
+        uniform = mocker.patch.object(connection_manager_module.random, 'uniform', side_effect=lambda _, b: b)
+        # act
+        for _ in range(3):
+            connection_manager.on_connection_lost()
+        # assert
+        assert [call.args for call in uniform.call_args_list] == [(0.5, 1.0), (1.0, 2.0), (2.0, 4.0)]
+        assert connection_manager.state == ConnectionState.BACKING_OFF
+        assert not connection_manager.is_attempt_due()
+
+    def test_failed_after_max_attempts(self, connection_manager: ConnectionManager) -> None:
+        # act
+        for _ in range(connection_manager_module._RECONNECT_MAX_ATTEMPTS):
+            connection_manager.on_connection_lost()
+        # assert
+        assert connection_manager.state == ConnectionState.FAILED
+
+    def test_connected_resets_backoff(self, connection_manager: ConnectionManager) -> None:
+        # arrange
+        states = []
+        connection_manager._connection_state_changed_subject.subscribe(states.append)
+        connection_manager.on_connection_lost()
+        # act
+        connection_manager.on_connected()
+        # assert
+        assert connection_manager.is_attempt_due()
+        assert connection_manager.has_been_connected
+        assert states == [DeviceConnectionState('test-serial', ConnectionState.BACKING_OFF),
+                          DeviceConnectionState('test-serial', ConnectionState.CONNECTED)]
+
+    def test_init_results_by_serial_number(self, connection_manager: ConnectionManager) -> None:
+        # arrange
+        init_result = InitResult([('Firmware version', '1.2.3', '')], '1.2.3')
+        # act
+        connection_manager.store_init_result('serial', init_result)
+        connection_manager.store_init_result(None, init_result)
+        # assert
+        assert connection_manager.get_init_result('serial') is init_result
+        assert connection_manager.get_init_result('other') is None
+        assert connection_manager.get_init_result(None) is None
+        connection_manager.forget_init_results()
+        assert connection_manager.get_init_result('serial') is None
+
+    def test_unplugged_device(self, connection_manager: ConnectionManager) -> None:
+        # arrange
+        connection_manager.store_init_result('serial', InitResult([], '1.2.3'))
+        connection_manager.on_connected()
+        connection_manager.on_connection_lost()
+        # act
+        connection_manager.on_device_removed()
+        absent_state = connection_manager.state
+        connection_manager.on_device_added()
+        # assert
+        assert absent_state == ConnectionState.ABSENT
+        assert connection_manager.state == ConnectionState.DISCONNECTED
+        assert connection_manager.is_present
+        assert connection_manager.is_attempt_due()
+        assert connection_manager.get_init_result('serial') is None
+
+    def test_system_sleep_and_resume(self, connection_manager: ConnectionManager) -> None:
+        # arrange
+        connection_manager.store_init_result('serial', InitResult([], '1.2.3'))
+        connection_manager.on_connected()
+        connection_manager.on_connection_lost()
+        # act
+        connection_manager.on_system_sleep()
+        sleeping_state = connection_manager.state
+        connection_manager.on_system_resumed()
+        # assert
+        assert sleeping_state == ConnectionState.DISCONNECTED
+        assert connection_manager.is_attempt_due()
+        assert connection_manager.get_init_result('serial') is None
+
+
+class TestKrakenRepositoryReconnection:
+
+    def test_transient_error_retried_on_same_handle(self, repo: KrakenRepository, mocker: MockerFixture) -> None:
+        # arrange
+        mocker.patch.object(repo, '_driver', spec=KrakenX3)
+        mocker.patch.object(repo._driver, 'get_status', side_effect=[
+            OSError('read error'),
+            [('Liquid temperature', 30.1, '°C'), ('Pump speed', 1848, 'rpm'), ('Pump duty', 90, '%')],
+        ])
+        mocker.patch.object(repo, 'cleanup')
+        # act
+        status = repo.get_status()
+        # assert
+        assert status is not None
+        assert status.liquid_temperature == 30.1
+        repo.cleanup.assert_not_called()
+
+    def test_no_reconnection_while_backing_off(self, repo_init: KrakenRepository,
+                                               connection_manager: ConnectionManager,
+                                               mocker: MockerFixture) -> None:
+        # arrange
+        connection_manager.on_connected()
+        connection_manager.on_connection_lost()
+        load_driver = mocker.patch.object(repo_init, '_load_driver')
+        # act
+        status = repo_init.get_status()
+        # assert
+        assert status is None
+        load_driver.assert_not_called()
+
+    def test_failed_reconnection_is_not_raised(self, repo_init: KrakenRepository,
+                                               connection_manager: ConnectionManager,
+                                               mocker: MockerFixture) -> None:
+        # arrange
+        connection_manager.on_connected()
+        mocker.patch.object(repo_init, '_load_driver', side_effect=ValueError('no device'))
+        # act
+        status = repo_init.get_status()
+        # assert
+        assert status is None
+        assert connection_manager.state == ConnectionState.BACKING_OFF
+
+    def test_reconnection_reuses_init_results(self, repo_init: KrakenRepository,
+                                              connection_manager: ConnectionManager,
+                                              mocker: MockerFixture) -> None:
+        # arrange
+        driver = mocker.Mock(spec=KrakenX3, serial_number='serial', description='test device')
+        driver.initialize.return_value = [('Firmware version', '1.2.3', '')]
+        driver.device = mocker.Mock()
+        driver.device.hiddev.read.side_effect = OSError('no status reports')
+        driver.get_status.return_value = [('Liquid temperature', 30.1, '°C'), ('Pump speed', 1848, 'rpm'),
+                                          ('Pump duty', 90, '%')]
+        mocker.patch.object(DeviceDiscovery, 'find_driver', return_value=driver)
+        # act
+        repo_init.get_status()
+        repo_init.cleanup()
+        repo_init.get_status()
+        # assert
+        driver.initialize.assert_called_once()
+        assert driver.connect.call_count == 2
+        assert repo_init._init_firmware_version == '1.2.3'
+
+    def test_no_reconnection_while_unplugged(self, repo_init: KrakenRepository,
+                                             connection_manager: ConnectionManager,
+                                             mocker: MockerFixture) -> None:
+        # arrange
+        connection_manager.on_connected()
+        repo_init.on_device_removed()
+        load_driver = mocker.patch.object(repo_init, '_load_driver')
+        # act
+        status = repo_init.get_status()
+        repo_init.on_device_added()
+        repo_init.get_status()
+        # assert
+        assert status is None
+        load_driver.assert_called_once()
+
+    def test_initialized_again_after_system_sleep(self, repo_init: KrakenRepository,
+                                                  connection_manager: ConnectionManager,
+                                                  mocker: MockerFixture) -> None:
+        # arrange
+        driver = mocker.Mock(spec=KrakenX3, serial_number='serial', description='test device')
+        driver.initialize.return_value = [('Firmware version', '1.2.3', '')]
+        driver.device = mocker.Mock()
+        driver.device.hiddev.read.side_effect = OSError('no status reports')
+        driver.get_status.return_value = [('Liquid temperature', 30.1, '°C'), ('Pump speed', 1848, 'rpm'),
+                                          ('Pump duty', 90, '%')]
+        mocker.patch.object(DeviceDiscovery, 'find_driver', return_value=driver)
+        repo_init.get_status()
+        # act
+        repo_init.on_system_sleep()
+        released = repo_init._driver is None
+        repo_init.on_system_resumed()
+        status = repo_init.get_status()
+        # assert
+        assert released
+        assert status is not None
+        driver.disconnect.assert_called_once()
+        assert driver.initialize.call_count == 2
+        assert connection_manager.state == ConnectionState.CONNECTED
@@ -0,0 +1,190 @@
+#  This file is part of gkraken.
+#
+#  Copyright (c) 2021 Roberto Leinardi and Guy Boldon
+#
+#  gkraken is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  gkraken is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
+
+import threading
+from typing import List, Tuple
+
+import pytest
+from liquidctl.driver.asetek import Legacy690Lc
+from liquidctl.driver.kraken3 import KrakenX3
+from pytest_mock import MockerFixture
+
+from gkraken.model.control_tuning import ControlTuning
+from gkraken.model.status import Status
+from gkraken.repository.device_executor import JobPriority
+from gkraken.repository.curve_engine import CurveEngine, SoftwareCurve, _ControlOutput
+from gkraken.repository.kraken_repository import KrakenRepository
+
+_CURVE = SoftwareCurve('fan', ((20, 30), (40, 50), (60, 100)))
+
+
+def _status(liquid_temperature: float) -> Status:
+    return Status(Legacy690Lc, liquid_temperature, fan_rpm=1000, pump_rpm=2000)
+
+
+# pylint: disable=protected-access
+class TestCurveEngine:
+
+    def test_duty_interpolated_between_steps(self) -> None:
+        # assert
+        assert [_CURVE.duty_at(temperature) for temperature in (10, 20, 30, 45, 60, 70)] == [30, 30, 40, 62, 100, 100]
+
+    def test_writes_only_changed_duties(self) -> None:
+        # arrange
+        written: List[Tuple[str, int]] = []
+        engine = CurveEngine(lambda channel, duty: written.append((channel, duty)), lambda _: None)
+        engine.set_curve(_CURVE)
+        # act
+        for temperature in (30.0, 30.2, 30.0, 34.0):
+            engine.on_status(_status(temperature))
+        # assert
+        assert written == [('fan', 40), ('fan', 44)]
+
+    def test_hysteresis_and_min_duty_delta(self) -> None:
+        # arrange
+        written: List[Tuple[str, int]] = []
+        engine = CurveEngine(lambda channel, duty: written.append((channel, duty)), lambda _: None)
+        engine.set_curve(SoftwareCurve('fan', _CURVE.steps, tuning=ControlTuning(hysteresis_up=1.0,
+                                                                                  hysteresis_down=3.0,
+                                                                                  min_duty_delta=3.0)))
+        # act
+        for temperature in (30.0, 30.8, 31.5, 29.0, 27.0, 60.0):
+            engine.on_status(_status(temperature))
+        # assert
+        assert written == [('fan', 40), ('fan', 37), ('fan', 100)]
+        assert engine.writes_avoided == 3
+
+    def test_writes_avoided_counted_once_per_duty_change(self) -> None:
+        # arrange
+        engine = CurveEngine(lambda channel, duty: None, lambda _: None)
+        engine.set_curve(SoftwareCurve('fan', _CURVE.steps, tuning=ControlTuning(hysteresis_up=1.0)))
+        # act
+        for temperature in (30.0, 30.8, 30.8, 30.8, 30.8):
+            engine.on_status(_status(temperature))
+        # assert
+        assert engine.writes_avoided == 1
+
+    def test_writes_avoided_by_repository(self, repo: KrakenRepository, mocker: MockerFixture) -> None:
+        # arrange
+        mocker.patch.object(repo, '_driver', spec=Legacy690Lc)
+        mocker.patch.object(repo, '_start_curve_ticker')
+        writes_avoided = repo.writes_avoided
+        # act
+        repo.set_speed_profile('fan', [(20, 30), (40, 50), (60, 100)])
+        # assert
+        assert writes_avoided is None
+        assert repo.writes_avoided == 0
+
+    def test_max_slew_rate(self) -> None:
+        # arrange
+        output = _ControlOutput(SoftwareCurve('pump', ((20, 60), (60, 100)), tuning=ControlTuning(max_slew_rate=5.0)))
+        duties = []
+        # act
+        for now in (0.0, 1.0, 2.0, 10.0):
+            duty = output.next_duty(50.0 if now else 20.0, now)
+            if duty is not None:
+                output.written_duty = duty
+            duties.append(duty)
+        # assert
+        assert duties == [60, 65, 70, 90]
+
+    def test_failure_hands_back_to_hardware(self, mocker: MockerFixture) -> None:
+        # arrange
+        hand_back = mocker.Mock()
+        engine = CurveEngine(mocker.Mock(), hand_back)
+        engine.set_curve(SoftwareCurve('pump', ((20, 60), (60, 100)), temperature_source='missing'))
+        # act
+        engine.on_status(_status(30.0))
+        # assert
+        hand_back.assert_called_once()
+        assert not engine.has_curves
+
+    def test_curve_on_hwmon_sensor(self, mocker: MockerFixture) -> None:
+        # arrange
+        written: List[Tuple[str, int]] = []
+        read_sensors = mocker.Mock(side_effect=[{'hwmon:k10temp/temp1': 60.0}, {}])
+        hand_back = mocker.Mock()
+        engine = CurveEngine(lambda channel, duty: written.append((channel, duty)), hand_back,
+                             read_sensors=read_sensors)
+        curve = SoftwareCurve('fan', _CURVE.steps, temperature_source='hwmon:k10temp/temp1')
+        engine.set_curve(curve)
+        # act
+        engine.on_status(_status(30.0))
+        engine.on_status(_status(30.0))
+        # assert
+        assert written == [('fan', 100)]
+        hand_back.assert_called_once_with(curve)
+
+    def test_over_cpu_budget_hands_back_to_hardware(self, mocker: MockerFixture) -> None:
+        # arrange
+        hand_back = mocker.Mock()
+        engine = CurveEngine(mocker.Mock(), hand_back, cpu_budget=-1.0)
+        engine.set_curve(_CURVE)
+        # act
+        for _ in range(3):
+            engine.on_status(_status(30.0))
+        # assert
+        hand_back.assert_called_once_with(_CURVE)
+        assert not engine.has_curves
+
+    def test_fixed_only_device_driven_by_software_curve(self, repo: KrakenRepository, mocker: MockerFixture) -> None:
+        # arrange
+        mocker.patch.object(repo, '_driver', spec=Legacy690Lc)
+        driver = repo._driver
+        driver.get_status.return_value = [('Liquid temperature', 30.0, '°C'), ('Fan speed', 1000, 'rpm'),
+                                          ('Pump speed', 2000, 'rpm')]
+        mocker.patch.object(repo, '_start_curve_ticker')
+        # act
+        repo.set_speed_profile('fan', [(20, 30), (40, 50), (60, 100)])
+        repo.get_status()
+        repo.get_status()
+        repo._stop_curve_engine()
+        # assert
+        driver.set_speed_profile.assert_not_called()
+        assert driver.set_fixed_speed.call_args_list == [mocker.call('fan', 40), mocker.call('fan', 100)]
+
+    def test_hwmon_curve_handed_back_at_its_highest_duty(self, repo: KrakenRepository, mocker: MockerFixture
+                                                         ) -> None:
+        # arrange
+        mocker.patch.object(repo, '_driver', spec=KrakenX3)
+        driver = repo._driver
+        curve = SoftwareCurve('fan', _CURVE.steps, temperature_source='hwmon:k10temp/temp1')
+        # act
+        repo._hand_back_to_hardware(curve)
+        repo._hand_back_to_hardware(_CURVE)
+        # assert
+        driver.set_fixed_speed.assert_called_once_with('fan', 100)
+        driver.set_speed_profile.assert_called_once_with('fan', list(_CURVE.steps))
+
+    def test_shutdown_hands_back_on_the_device_thread(self, repo: KrakenRepository, mocker: MockerFixture) -> None:
+        # arrange
+        mocker.patch.object(repo, '_driver', spec=Legacy690Lc)
+        driver = repo._driver
+        driver.get_status.return_value = [('Liquid temperature', 30.0, '°C'), ('Fan speed', 1000, 'rpm'),
+                                          ('Pump speed', 2000, 'rpm')]
+        writes: List[Tuple[str, int, bool]] = []
+        driver.set_fixed_speed.side_effect = \
+            lambda channel, duty: writes.append((channel, duty, threading.current_thread() is threading.main_thread()))
+        repo.submit(JobPriority.USER, repo.set_speed_profile, 'fan', [(20, 30), (40, 50), (60, 100)]).result(5)
+        ticker = repo._curve_ticker
+        # act
+        repo.shutdown()
+        # assert
+        assert writes == [('fan', 100, False)]
+        assert ticker is not None and not ticker.is_alive()
+        with pytest.raises(RuntimeError):
+            repo.submit(JobPriority.BACKGROUND, repo.get_status).result(5)
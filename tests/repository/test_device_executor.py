@@ -0,0 +1,166 @@
+#  This file is part of gkraken.
+#
+#  Copyright (c) 2021 Roberto Leinardi and Guy Boldon
+#
+#  gkraken is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  gkraken is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
+
+import threading
+from typing import List
+
+import pytest
+
+from gkraken.repository.device_executor import DeviceExecutor, JobPriority
+from gkraken.util.wakeup_stats import WakeupStats
+
+
+class TestDeviceExecutor:
+
+    def test_jobs_run_by_priority(self) -> None:
+        # arrange
+        executor = DeviceExecutor('test-device')
+        started = threading.Event()
+        release = threading.Event()
+        order: List[str] = []
+
+        def blocking_job() -> None:
+            started.set()
+            release.wait(5)
+
+        executor.submit(JobPriority.BACKGROUND, blocking_job)
+        started.wait(5)
+        # act
+        futures = [
+            executor.submit(JobPriority.BACKGROUND, order.append, 'status 1'),
+            executor.submit(JobPriority.BACKGROUND, order.append, 'status 2'),
+            executor.submit(JobPriority.USER, order.append, 'user write'),
+            executor.submit(JobPriority.SAFETY, order.append, 'safety write'),
+        ]
+        release.set()
+        for future in futures:
+            future.result(5)
+        executor.shutdown()
+        # assert
+        assert order == ['safety write', 'user write', 'status 1', 'status 2']
+
+    def test_jobs_run_on_single_thread(self) -> None:
+        # arrange
+        executor = DeviceExecutor('test-device')
+        # act
+        threads = {executor.submit(JobPriority.BACKGROUND, threading.current_thread).result(5) for _ in range(10)}
+        executor.shutdown()
+        # assert
+        assert len(threads) == 1
+        assert threads.pop().name == 'test-device'
+
+    def test_exception_set_on_future(self) -> None:
+        # arrange
+        executor = DeviceExecutor('test-device')
+
+        def failing_job() -> None:
+            raise OSError('USB error')
+
+        # act
+        future = executor.submit(JobPriority.USER, failing_job)
+        # assert
+        with pytest.raises(OSError):
+            future.result(5)
+        executor.shutdown()
+
+    def test_writes_with_same_key_coalesced(self) -> None:
+        # arrange
+        executor = DeviceExecutor('test-device')
+        started = threading.Event()
+        release = threading.Event()
+        writes: List[str] = []
+
+        def blocking_job() -> None:
+            started.set()
+            release.wait(5)
+
+        def write(value: str) -> str:
+            writes.append(value)
+            return value
+
+        executor.submit(JobPriority.BACKGROUND, blocking_job)
+        started.wait(5)
+        # act
+        futures = [executor.submit(JobPriority.USER, write, value, coalesce_key='fan')
+                   for value in ['fan 1', 'fan 2', 'fan 3']]
+        pump_future = executor.submit(JobPriority.USER, write, 'pump 1', coalesce_key='pump')
+        release.set()
+        results = [future.result(5) for future in futures]
+        pump_result = pump_future.result(5)
+        executor.shutdown()
+        # assert
+        assert writes == ['fan 3', 'pump 1']
+        assert results == ['fan 3', 'fan 3', 'fan 3']
+        assert pump_result == 'pump 1'
+
+    def test_write_with_same_key_not_coalesced_once_started(self) -> None:
+        # arrange
+        executor = DeviceExecutor('test-device')
+        started = threading.Event()
+        release = threading.Event()
+
+        def blocking_write(value: str) -> str:
+            started.set()
+            release.wait(5)
+            return value
+
+        first = executor.submit(JobPriority.USER, blocking_write, 'fan 1', coalesce_key='fan')
+        started.wait(5)
+        # act
+        second = executor.submit(JobPriority.USER, blocking_write, 'fan 2', coalesce_key='fan')
+        release.set()
+        # assert
+        assert first.result(5) == 'fan 1'
+        assert second.result(5) == 'fan 2'
+        executor.shutdown()
+
+    def test_shutdown_runs_pending_jobs_and_refuses_new_ones(self) -> None:
+        # arrange
+        executor = DeviceExecutor('test-device')
+        started = threading.Event()
+        release = threading.Event()
+        done: List[str] = []
+
+        def blocking_job() -> None:
+            started.set()
+            release.wait(5)
+
+        executor.submit(JobPriority.BACKGROUND, blocking_job)
+        started.wait(5)
+        pending = executor.submit(JobPriority.BACKGROUND, done.append, 'pending')
+        threading.Timer(0.1, release.set).start()
+        # act
+        executor.shutdown(5)
+        refused = executor.submit(JobPriority.SAFETY, done.append, 'refused')
+        # assert
+        assert pending.done()
+        assert done == ['pending']
+        with pytest.raises(RuntimeError):
+            refused.result(5)
+        assert not any(thread.name == 'test-device' for thread in threading.enumerate())
+
+    def test_wakeups_counted(self) -> None:
+        # arrange
+        wakeup_stats = WakeupStats()
+        wakeup_stats.enable()
+        executor = DeviceExecutor('test-device', wakeup_stats)
+        # act
+        for _ in range(3):
+            executor.submit(JobPriority.BACKGROUND, lambda: None).result(5)
+        executor.shutdown()
+        # assert
+        assert wakeup_stats._counts == {'device job': 3}
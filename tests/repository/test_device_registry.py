@@ -0,0 +1,115 @@
+#  This file is part of gkraken.
+#
+#  Copyright (c) 2021 Roberto Leinardi and Guy Boldon
+#
+#  gkraken is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  gkraken is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
+
+import socket
+import threading
+from typing import List
+
+from pytest_mock import MockerFixture
+
+from gkraken.model.connection_state import ConnectionState, DeviceConnectionState
+from gkraken.repository.device_executor import JobPriority
+from gkraken.repository.device_registry import DeviceRegistry
+
+
+class TestDeviceRegistry:
+
+    def test_repository_per_device(self, device_registry: DeviceRegistry) -> None:
+        # act
+        device_ids = device_registry.get_device_ids()
+        # assert
+        assert device_ids == ['serial-1', 'serial-2']
+        assert device_registry.get_repository('serial-1').device_id == 'serial-1'
+        assert device_registry.get_repository('serial-1') is not device_registry.get_repository('serial-2')
+        assert device_registry.get_repository('serial-1') is device_registry.get_repository('serial-1')
+        assert device_registry.get_description('serial-2') == 'Kraken 2'
+
+    def test_stalled_device_does_not_delay_the_others(self, device_registry: DeviceRegistry) -> None:
+        # arrange
+        device_registry.get_device_ids()
+        release = threading.Event()
+        stalled = device_registry.get_repository('serial-1').submit(JobPriority.BACKGROUND, release.wait, 5)
+        # act
+        result = device_registry.get_repository('serial-2').submit(JobPriority.BACKGROUND, lambda: 42).result(timeout=1)
+        # assert
+        assert result == 42
+        assert not stalled.done()
+        release.set()
+        assert stalled.result(timeout=1)
+
+    def test_unplugged_device(self, device_registry: DeviceRegistry, mocker: MockerFixture) -> None:
+        # arrange
+        device_registry.get_device_ids()
+        absent = threading.Event()
+        states: List[DeviceConnectionState] = []
+        device_registry._connection_state_changed_subject.subscribe(
+            lambda state: (states.append(state), absent.set()))
+        kernel, monitor_socket = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+        device_registry.start_hotplug_monitor({(0x1e71, 0x2007)}, lambda: monitor_socket)
+        find_devices = mocker.patch.object(device_registry._device_discovery, 'find_devices')
+        # act
+        kernel.send(b'remove@/devices/usb1/1-4\0ACTION=remove\0SUBSYSTEM=usb\0DEVTYPE=usb_device\0'
+                    b'PRODUCT=1e71/2007/200\0')
+        # assert
+        assert absent.wait(timeout=3)
+        kernel.close()
+        assert states == [DeviceConnectionState('serial-1', ConnectionState.ABSENT)]
+        find_devices.assert_not_called()
+
+    def test_plugged_in_device(self, device_registry: DeviceRegistry, mocker: MockerFixture) -> None:
+        # arrange
+        device_registry.get_device_ids()
+        device_registry.get_repository('serial-1')._connection_manager.on_device_removed()
+        added = threading.Event()
+        added_device_ids: List[str] = []
+        device_registry._device_added_subject.subscribe(lambda device_id: (added_device_ids.append(device_id),
+                                                                           added.set()))
+        kernel, monitor_socket = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+        device_registry.start_hotplug_monitor({(0x1e71, 0x2007)}, lambda: monitor_socket)
+        enumerating_threads: List[str] = []
+        devices = dict(device_registry._device_discovery.find_devices())
+        devices['serial-3'] = mocker.Mock(description='Kraken 3', vendor_id=0x1e71, product_id=0x2007, bus='usb1',
+                                          port=(6,))
+        mocker.patch.object(device_registry._device_discovery, 'find_devices',
+                            side_effect=lambda: (enumerating_threads.append(threading.current_thread().name),
+                                                 devices)[1])
+        # act
+        kernel.send(b'add@/devices/usb1/1-6\0ACTION=add\0SUBSYSTEM=usb\0DEVTYPE=usb_device\0'
+                    b'PRODUCT=1e71/2007/200\0')
+        # assert
+        assert added.wait(timeout=3)
+        kernel.close()
+        assert added_device_ids == ['serial-3']
+        assert device_registry.get_description('serial-3') == 'Kraken 3'
+        assert 'kraken-hotplug' not in enumerating_threads
+        assert device_registry.get_repository('serial-1').submit(
+            JobPriority.BACKGROUND, lambda: None).result(timeout=1) is None
+        assert device_registry.get_repository('serial-1')._connection_manager.state == ConnectionState.DISCONNECTED
+
+    def test_devices_released_before_sleep(self, device_registry: DeviceRegistry) -> None:
+        # arrange
+        device_registry.get_device_ids()
+        for device_id in ('serial-1', 'serial-2'):
+            device_registry.get_repository(device_id)._connection_manager.on_connected()
+        states: List[DeviceConnectionState] = []
+        device_registry._connection_state_changed_subject.subscribe(states.append)
+        # act
+        device_registry.prepare_for_sleep()
+        # assert
+        assert sorted(states, key=lambda state: state.device_id) == [
+            DeviceConnectionState('serial-1', ConnectionState.DISCONNECTED),
+            DeviceConnectionState('serial-2', ConnectionState.DISCONNECTED)]
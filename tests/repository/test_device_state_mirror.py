@@ -0,0 +1,102 @@
+#  This file is part of gkraken.
+#
+#  Copyright (c) 2021 Roberto Leinardi and Guy Boldon
+#
+#  gkraken is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  gkraken is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
+
+from liquidctl.driver.kraken3 import KrakenX3
+from pytest_mock import MockerFixture
+
+from gkraken.model.lighting_settings import LightingSettings, LightingColors, LightingColor
+from gkraken.model.lighting_modes import LightingMode
+from gkraken.repository.device_state_mirror import DeviceStateMirror
+from gkraken.repository.kraken_repository import KrakenRepository
+
+_PROFILE = [(20, 30), (40, 60), (60, 100)]
+
+
+class TestDeviceStateMirror:
+
+    def test_state_by_serial_number_and_channel(self, device_state_mirror: DeviceStateMirror) -> None:
+        # arrange
+        state_hash = device_state_mirror.hash_state(tuple(_PROFILE))
+        # act
+        device_state_mirror.confirm('serial', 'fan', state_hash)
+        device_state_mirror.confirm(None, 'fan', state_hash)
+        # assert
+        assert device_state_mirror.is_applied('serial', 'fan', state_hash)
+        assert not device_state_mirror.is_applied('serial', 'pump', state_hash)
+        assert not device_state_mirror.is_applied('other', 'fan', state_hash)
+        assert not device_state_mirror.is_applied(None, 'fan', state_hash)
+        assert device_state_mirror.suppressed_writes == 1
+        device_state_mirror.invalidate('serial')
+        assert not device_state_mirror.is_applied('serial', 'fan', state_hash)
+
+
+class TestKrakenRepositoryWriteSuppression:
+
+    def test_same_speed_profile_written_once(self, repo: KrakenRepository,
+                                             device_state_mirror: DeviceStateMirror,
+                                             mocker: MockerFixture) -> None:
+        # arrange
+        mocker.patch.object(repo, '_driver', spec=KrakenX3, serial_number='serial')
+        # act
+        repo.set_speed_profile('fan', _PROFILE)
+        repo.set_speed_profile('fan', list(_PROFILE))
+        repo.set_speed_profile('pump', _PROFILE)
+        # assert
+        assert repo._driver.set_speed_profile.call_count == 2
+        assert device_state_mirror.suppressed_writes == 1
+
+    def test_same_lighting_written_once(self, repo: KrakenRepository,
+                                        device_state_mirror: DeviceStateMirror,
+                                        mocker: MockerFixture) -> None:
+        # arrange
+        mocker.patch.object(repo, '_driver', spec=KrakenX3, serial_number='serial')
+
+        def create_settings() -> LightingSettings:
+            return LightingSettings.create_ring_settings(
+                LightingMode(1, 'fixed', 'Fixed', 1, 1, False, False),
+                LightingColors().add(LightingColor(255, 0, 0)))
+
+        # act
+        repo.set_lighting_mode(create_settings())
+        repo.set_lighting_mode(create_settings())
+        # assert
+        repo._driver.set_color.assert_called_once()
+        assert device_state_mirror.suppressed_writes == 1
+
+    def test_write_not_suppressed_after_cleanup(self, repo: KrakenRepository, mocker: MockerFixture) -> None:
+        # arrange
+        driver = mocker.Mock(spec=KrakenX3, serial_number='serial')
+        repo._driver = driver
+        repo.set_speed_profile('fan', _PROFILE)
+        # act
+        repo.cleanup()
+        repo._driver = driver
+        repo.set_speed_profile('fan', _PROFILE)
+        # assert
+        assert driver.set_speed_profile.call_count == 2
+
+    def test_failed_write_not_confirmed(self, repo: KrakenRepository, mocker: MockerFixture) -> None:
+        # arrange
+        driver = mocker.Mock(spec=KrakenX3, serial_number='serial')
+        driver.set_fixed_speed.side_effect = [OSError('write error'), OSError('write error'), None]
+        repo._driver = driver
+        repo.set_speed_profile('pump', [(0, 60)])
+        # act
+        repo._driver = driver
+        repo.set_speed_profile('pump', [(0, 60)])
+        # assert
+        assert driver.set_fixed_speed.call_count == 3
@@ -15,6 +15,7 @@
 #  You should have received a copy of the GNU General Public License
 #  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
 
+import io
 from typing import Optional
 
 import pytest
@@ -25,6 +26,7 @@ from pytest_mock import MockerFixture
 
 from gkraken.model.status import Status
 from gkraken.repository.kraken_repository import KrakenRepository
+from gkraken.util.sample_ring_buffer import SampleRingBuffer
 
 TEST_DESCRIPTION: str = 'Test Device Description'
 
@@ -309,3 +311,29 @@ class TestDeviceStatus:
         assert status.pump_duty is None
         assert status.firmware_version == firmware
         assert status.device_description == TEST_DESCRIPTION
+
+    def test_read_sample_without_creating_statuses(self, repo: KrakenRepository, mocker: MockerFixture) -> None:
+        # arrange
+        mocker.patch.object(repo, '_driver', spec=KrakenX3)
+        mocker.patch.object(repo, '_init_firmware_version', 'sample-test')
+        mocker.patch.object(repo._driver, 'description', TEST_DESCRIPTION)
+        mocker.patch.object(repo._driver, 'get_status', return_value=[
+            ('Liquid temperature', 31.5, '°C'),
+            ('Pump speed', 1850, 'rpm'),
+            ('Pump duty', 70, '%'),
+        ])
+        buffer = SampleRingBuffer(10)
+        # the first sample finds the positions of the values
+        repo.read_sample(buffer)
+        status_class = mocker.patch('gkraken.device.device_settings.Status')
+        # act
+        sampled = repo.read_sample(buffer)
+        # assert
+        assert sampled
+        status_class.assert_not_called()
+        assert len(buffer) == 2
+        file = io.StringIO()
+        buffer.dump(file)
+        _, _, liquid_temperature, fan_rpm, _, pump_rpm, pump_duty = file.getvalue().splitlines()[1].split(',')
+        assert (liquid_temperature, pump_rpm, pump_duty) == ('31.5', '1850.0', '70.0')
+        assert fan_rpm == ''
@@ -0,0 +1,100 @@
+#  This file is part of gkraken.
+#
+#  Copyright (c) 2021 Roberto Leinardi and Guy Boldon
+#
+#  gkraken is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  gkraken is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
+
+import threading
+
+import pytest
+from liquidctl.driver.kraken3 import KrakenX3
+from pytest_mock import MockerFixture
+
+from gkraken.error.device_stall_error import DeviceStallError
+from gkraken.model.connection_state import ConnectionState
+from gkraken.repository import kraken_repository as kraken_repository_module
+from gkraken.repository.connection_manager import ConnectionManager
+from gkraken.repository.device_watchdog import DeviceWatchdog
+from gkraken.repository.kraken_repository import KrakenRepository
+
+
+class TestDeviceWatchdog:
+
+    def test_result_and_exception_returned(self) -> None:
+        # arrange
+        watchdog = DeviceWatchdog('test-io', {})
+
+        def failing_operation() -> None:
+            raise OSError('USB error')
+
+        # act
+        result = watchdog.call('get_status', lambda: 42)
+        # assert
+        assert result == 42
+        with pytest.raises(OSError):
+            watchdog.call('get_status', failing_operation)
+        watchdog.shutdown()
+
+    def test_stalled_operation_abandoned(self) -> None:
+        # arrange
+        watchdog = DeviceWatchdog('test-io', {'get_status': 0.05})
+        release = threading.Event()
+        # act
+        with pytest.raises(DeviceStallError) as exc_info:
+            watchdog.call('get_status', lambda: release.wait(5))
+        result = watchdog.call('get_status', threading.current_thread)
+        release.set()
+        # assert
+        assert exc_info.value.operation == 'get_status'
+        assert result.name == 'test-io-2'
+        watchdog.shutdown()
+
+
+class TestKrakenRepositoryStall:
+
+    def test_stalled_status_abandons_handle(self, repo: KrakenRepository,
+                                            connection_manager: ConnectionManager,
+                                            mocker: MockerFixture) -> None:
+        # arrange
+        mocker.patch.dict(kraken_repository_module._OPERATION_TIMEOUTS, {'get_status': 0.05})
+        release = threading.Event()
+        driver = mocker.Mock(spec=KrakenX3, serial_number='serial', description='test device')
+        driver.get_status.side_effect = lambda: release.wait(5)
+        repo._driver = driver
+        invalidate = mocker.patch('gkraken.repository.kraken_repository.DeviceDiscovery.invalidate')
+        connection_manager.on_connected()
+        # act
+        status = repo.get_status()
+        release.set()
+        # assert
+        assert status is None
+        assert repo._driver is None
+        driver.get_status.assert_called_once()
+        driver.disconnect.assert_not_called()
+        invalidate.assert_called_once()
+        assert connection_manager.state == ConnectionState.BACKING_OFF
+
+    def test_stalled_connection_backs_off(self, repo: KrakenRepository,
+                                          connection_manager: ConnectionManager) -> None:
+        # arrange
+        load_driver = repo._load_driver
+        load_driver.side_effect = DeviceStallError('connect', 5.0)  # type: ignore[attr-defined]
+        # act
+        with pytest.raises(DeviceStallError):
+            repo.has_supported_kraken()
+        status = repo.get_status()
+        # assert
+        assert status is None
+        load_driver.assert_called_once()  # type: ignore[attr-defined]
+        assert connection_manager.state == ConnectionState.BACKING_OFF
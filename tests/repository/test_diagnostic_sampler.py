@@ -0,0 +1,77 @@
+#  This file is part of gkraken.
+#
+#  Copyright (c) 2021 Roberto Leinardi and Guy Boldon
+#
+#  gkraken is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  gkraken is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
+
+import time
+from pathlib import Path
+from typing import Any
+
+from pytest_mock import MockerFixture
+
+from gkraken.repository.device_executor import JobPriority
+from gkraken.repository.diagnostic_sampler import DiagnosticSampler, get_decimated_path
+from gkraken.util.sample_ring_buffer import SampleRingBuffer
+from gkraken.util.wakeup_stats import WakeupStats
+
+
+def _append_sample(buffer: SampleRingBuffer) -> bool:
+    buffer.append(time.time(), 31.5, None, None, 1848, 70)
+    return True
+
+
+class TestDiagnosticSampler:
+
+    def test_samples_until_the_time_limit_and_dumps(self, local_repository: Any, mocker: MockerFixture,
+                                                    tmp_path: Path) -> None:
+        # arrange
+        local_repository.device_id = 'serial-1'
+        local_repository.read_sample.side_effect = _append_sample
+        device_registry = mocker.Mock(**{'get_local_repositories.return_value': [local_repository]})
+        sampler = DiagnosticSampler(device_registry, WakeupStats())
+        dump_path = tmp_path / 'samples.csv'
+        # act
+        sampler.start(str(dump_path), rate=20, time_limit=0.5)
+        deadline = time.monotonic() + 5
+        while sampler.is_running and time.monotonic() < deadline:
+            time.sleep(0.05)
+        # assert
+        assert not sampler.is_running
+        assert local_repository.submit.call_args.args[0] == JobPriority.BACKGROUND
+        rows = dump_path.read_text(encoding='utf-8').splitlines()
+        assert rows[0] == 'device_id,time,liquid_temperature,fan_rpm,fan_duty,pump_rpm,pump_duty'
+        assert 1 <= len(rows) - 1 <= 11
+        assert rows[1].startswith('serial-1,')
+        assert rows[1].split(',')[2] == '31.5'
+        assert sampler.get_decimated_samples('serial-1', 1)[0][1] == 31.5
+        decimated_rows = Path(get_decimated_path(str(dump_path))).read_text(encoding='utf-8').splitlines()
+        assert decimated_rows[0] == rows[0]
+        assert 1 <= len(decimated_rows) - 1 <= len(rows) - 1
+        assert decimated_rows[1].split(',')[2:] == ['31.5', '', '', '1848.0', '70.0']
+
+    def test_stop_dumps_the_samples(self, local_repository: Any, mocker: MockerFixture, tmp_path: Path) -> None:
+        # arrange
+        local_repository.device_id = 'serial-1'
+        local_repository.read_sample.side_effect = _append_sample
+        device_registry = mocker.Mock(**{'get_local_repositories.return_value': [local_repository]})
+        sampler = DiagnosticSampler(device_registry, WakeupStats())
+        dump_path = tmp_path / 'samples.csv'
+        sampler.start(str(dump_path), rate=20)
+        time.sleep(0.2)
+        # act
+        sampler.stop()
+        # assert
+        assert not sampler.is_running
+        assert len(dump_path.read_text(encoding='utf-8').splitlines()) > 1
@@ -0,0 +1,83 @@
+#  This file is part of gkraken.
+#
+#  Copyright (c) 2021 Roberto Leinardi and Guy Boldon
+#
+#  gkraken is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  gkraken is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
+
+import socket
+
+import pytest
+
+from gkraken.model.apply_batch import ApplyBatch
+from gkraken.model.control_tuning import ControlTuning
+from gkraken.repository.helper_protocol import MessageType, send_frame, receive_frame, encode_status, \
+    decode_status, encode_color, decode_color, encode_speed_profile, decode_speed_profile, ProtocolError, \
+    encode_apply_batch, decode_apply_batch, encode_batch_results, decode_batch_results
+
+
+class TestHelperProtocol:
+
+    def test_frames_round_trip(self) -> None:
+        # arrange
+        gui, helper = socket.socketpair()
+        # act
+        send_frame(gui, MessageType.GET_STATUS, 7, b'payload')
+        send_frame(gui, MessageType.LIST_DEVICES, 8)
+        gui.close()
+        # assert
+        assert receive_frame(helper) == (MessageType.GET_STATUS, 7, b'payload')
+        assert receive_frame(helper) == (MessageType.LIST_DEVICES, 8, b'')
+        assert receive_frame(helper) is None
+        helper.close()
+
+    def test_truncated_frame(self) -> None:
+        # arrange
+        gui, helper = socket.socketpair()
+        # act
+        gui.sendall(b'\x10\x00\x00\x00\x03\x01\x00\x00\x00partial')
+        gui.close()
+        # assert
+        with pytest.raises(ProtocolError):
+            receive_frame(helper)
+        helper.close()
+
+    def test_status_round_trip(self) -> None:
+        # act
+        status = decode_status(encode_status(31.5, '1.2.3', None, None, 1848, 70.0))
+        # assert
+        assert status == (31.5, '1.2.3', None, None, 1848, 70.0)
+
+    def test_commands_round_trip(self) -> None:
+        # act
+        tuning = ControlTuning(hysteresis_up=1.0, hysteresis_down=2.5, min_duty_delta=3.0, max_slew_rate=0.2)
+        profile = decode_speed_profile(encode_speed_profile('serial', 'pump', [(20, 30), (60, 100)], tuning,
+                                                            'hwmon:k10temp/temp1'))
+        color = decode_color(encode_color('serial', 'ring', 'fading', [[255, 0, 0], [0, 0, 255]], 'fast', 'forward'))
+        # assert
+        assert profile == ('serial', 'pump', [(20, 30), (60, 100)], tuning, 'hwmon:k10temp/temp1')
+        assert color == ('serial', 'ring', 'fading', [[255, 0, 0], [0, 0, 255]], 'fast', 'forward')
+
+    def test_batch_round_trip(self) -> None:
+        # arrange
+        batch = ApplyBatch() \
+            .add_speed_profile('fan', [(20, 30), (60, 100)]) \
+            .add_color('logo', 'fixed', [[0, 255, 0]], 'normal', 'forward') \
+            .add_speed_profile('pump', [(20, 70)], ControlTuning(max_slew_rate=5.0))
+        # act
+        device_id, decoded_batch = decode_apply_batch(encode_apply_batch('serial', batch))
+        results = decode_batch_results(encode_batch_results([None, OSError('write failed'), None]))
+        # assert
+        assert device_id == 'serial'
+        assert decoded_batch == batch
+        assert results == [None, ('OSError', 'write failed'), None]
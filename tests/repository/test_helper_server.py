@@ -0,0 +1,165 @@
+#  This file is part of gkraken.
+#
+#  Copyright (c) 2021 Roberto Leinardi and Guy Boldon
+#
+#  gkraken is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  gkraken is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
+
+import subprocess
+import sys
+from typing import Any, Tuple
+
+import pytest
+from liquidctl.driver.kraken3 import KrakenX3
+from pytest_mock import MockerFixture
+from rx.subject import Subject
+
+from gkraken.core_di import ConnectionStateChangedSubject, StatusReceivedSubject
+from gkraken.error.device_stall_error import DeviceStallError
+from gkraken.error.legacy_kraken_warning import LegacyKrakenWarning
+from gkraken.model.apply_batch import ApplyBatch, ApplyResult
+from gkraken.model.control_tuning import ControlTuning
+from gkraken.model.status import Status
+from gkraken.repository.connection_manager import ConnectionManager
+from gkraken.repository.helper_client import HelperConnection, RemoteKrakenRepository, HelperClient
+from gkraken.repository.helper_protocol import MessageType
+
+
+def _remote_repository(helper_client: HelperClient,
+                       status_received_subject: StatusReceivedSubject) -> RemoteKrakenRepository:
+    return RemoteKrakenRepository('test-serial', 'NZXT Kraken X', helper_client,
+                                  ConnectionManager('test-serial', ConnectionStateChangedSubject(Subject())),
+                                  status_received_subject)
+
+
+class TestHelperServer:
+
+    def test_list_devices(self, helper: Tuple[HelperClient, HelperConnection]) -> None:
+        # arrange
+        helper_client, _ = helper
+        # act
+        devices = helper_client.list_devices()
+        # assert
+        assert devices == [('test-serial', 'NZXT Kraken X')]
+
+    def test_remote_status(self, helper: Tuple[HelperClient, HelperConnection],
+                           status_received_subject: StatusReceivedSubject) -> None:
+        # arrange
+        helper_client, _ = helper
+        repository = _remote_repository(helper_client, status_received_subject)
+        received = []
+        status_received_subject.subscribe(received.append)
+        # act
+        connected = repository.has_supported_kraken()
+        status = repository.get_status()
+        # assert
+        assert connected
+        assert repository.driver_type is KrakenX3
+        assert status == Status(KrakenX3, 31.5, '1.0.7', None, None, 1848, 70.0, 'NZXT Kraken X', 'test-serial')
+        assert received == [status]
+        assert repository.get_lighting_modes() is not None
+
+    def test_remote_writes(self, helper: Tuple[HelperClient, HelperConnection], local_repository: Any,
+                           status_received_subject: StatusReceivedSubject) -> None:
+        # arrange
+        helper_client, _ = helper
+        repository = _remote_repository(helper_client, status_received_subject)
+        # act
+        repository.set_speed_profile('pump', [(20, 50), (60, 100)], ControlTuning(max_slew_rate=2.5))
+        # assert
+        local_repository.set_speed_profile.assert_called_once_with('pump', [(20, 50), (60, 100)],
+                                                                   ControlTuning(max_slew_rate=2.5), 'liquid')
+
+    def test_remote_batch(self, helper: Tuple[HelperClient, HelperConnection], local_repository: Any,
+                          status_received_subject: StatusReceivedSubject) -> None:
+        # arrange
+        helper_client, _ = helper
+        repository = _remote_repository(helper_client, status_received_subject)
+        batch = ApplyBatch() \
+            .add_speed_profile('pump', [(20, 50), (60, 100)]) \
+            .add_color('ring', 'fading', [[255, 0, 0]], 'fast', 'forward')
+        local_repository.apply_batch.side_effect = lambda local_batch: [
+            ApplyResult(local_batch.items[0]), ApplyResult(local_batch.items[1], OSError('write failed'))]
+        # act
+        results = repository.apply_batch(batch)
+        # assert
+        local_repository.apply_batch.assert_called_once_with(batch)
+        assert [result.item for result in results] == batch.items
+        assert results[0].succeeded
+        assert isinstance(results[1].error, OSError)
+        assert 'write failed' in str(results[1].error)
+
+    def test_settings_applied_again_to_restarted_helper(self, helper: Tuple[HelperClient, HelperConnection],
+                                                        local_repository: Any, mocker: MockerFixture,
+                                                        status_received_subject: StatusReceivedSubject) -> None:
+        # arrange
+        helper_client, _ = helper
+        repository = _remote_repository(helper_client, status_received_subject)
+        mocker.patch.object(helper_client, 'connect', side_effect=[1, 1, 2, 2])
+        local_repository.apply_batch.side_effect = lambda local_batch: [ApplyResult(item)
+                                                                        for item in local_batch.items]
+        repository.set_speed_profile('pump', [(20, 50), (60, 100)])
+        repository.set_speed_profile('pump', [(20, 60), (60, 100)])
+        # act
+        repository.get_status()
+        repository.get_status()
+        # assert
+        local_repository.apply_batch.assert_called_once_with(
+            ApplyBatch().add_speed_profile('pump', [(20, 60), (60, 100)]))
+        assert [name for name, _, _ in local_repository.method_calls if name != 'submit'] == \
+            ['set_speed_profile', 'set_speed_profile', 'apply_batch', 'get_status', 'get_status']
+
+    def test_helper_errors_are_raised_again(self, helper: Tuple[HelperClient, HelperConnection],
+                                            local_repository: Any,
+                                            status_received_subject: StatusReceivedSubject) -> None:
+        # arrange
+        helper_client, _ = helper
+        local_repository.has_supported_kraken.side_effect = LegacyKrakenWarning('driver conflict')
+        repository = _remote_repository(helper_client, status_received_subject)
+        # act / assert
+        with pytest.raises(LegacyKrakenWarning, match='driver conflict'):
+            repository.has_supported_kraken()
+
+    def test_helper_stalls_are_raised_again(self, helper: Tuple[HelperClient, HelperConnection],
+                                            local_repository: Any,
+                                            status_received_subject: StatusReceivedSubject) -> None:
+        # arrange
+        helper_client, _ = helper
+        local_repository.has_supported_kraken.side_effect = DeviceStallError('connect', 5.0)
+        repository = _remote_repository(helper_client, status_received_subject)
+        # act
+        with pytest.raises(DeviceStallError) as stall:
+            repository.has_supported_kraken()
+        # assert
+        assert stall.value.operation == 'connect'
+        assert stall.value.timeout == 5.0
+
+    def test_lost_helper(self, helper: Tuple[HelperClient, HelperConnection],
+                         status_received_subject: StatusReceivedSubject) -> None:
+        # arrange
+        helper_client, connection = helper
+        repository = _remote_repository(helper_client, status_received_subject)
+        # act
+        connection.close()
+        # assert
+        assert repository.get_status() is None
+        with pytest.raises(ConnectionError):
+            connection.request(MessageType.LIST_DEVICES)
+
+    def test_helper_does_not_load_gtk(self) -> None:
+        # act
+        result = subprocess.run([sys.executable, '-c', 'import sys, gkraken.repository.helper_server; '
+                                                       'print("gkraken.di" in sys.modules)'],
+                                capture_output=True, text=True, check=True)
+        # assert
+        assert result.stdout.strip() == 'False'
@@ -0,0 +1,113 @@
+#  This file is part of gkraken.
+#
+#  Copyright (c) 2021 Roberto Leinardi and Guy Boldon
+#
+#  gkraken is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  gkraken is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+from pathlib import Path
+from typing import Optional, Iterator
+
+import pytest
+from pytest_mock import MockerFixture
+
+from gkraken.repository.hwmon_sensors import HwmonSensors
+
+_CPU = 'hwmon:k10temp/temp1'
+_GPU = 'hwmon:amdgpu/temp2'
+
+
+def _add_sensor(hwmon_path: Path, sensor: str, millidegrees: int, label: Optional[str] = None) -> None:
+    hwmon_path.mkdir(parents=True, exist_ok=True)
+    (hwmon_path / f'{sensor}_input').write_text(f'{millidegrees}\n')
+    if label is not None:
+        (hwmon_path / f'{sensor}_label').write_text(f'{label}\n')
+
+
+@pytest.fixture
+def hwmon_sensors(tmp_path: Path) -> Iterator[HwmonSensors]:
+    (tmp_path / 'hwmon10').mkdir()
+    (tmp_path / 'hwmon10' / 'name').write_text('k10temp\n')
+    _add_sensor(tmp_path / 'hwmon10', 'temp1', 45250, 'Tctl')
+    (tmp_path / 'hwmon2').mkdir()
+    (tmp_path / 'hwmon2' / 'name').write_text('amdgpu\n')
+    _add_sensor(tmp_path / 'hwmon2', 'temp10', 50000)
+    _add_sensor(tmp_path / 'hwmon2', 'temp2', 61000, 'junction')
+    (tmp_path / 'hwmon3').mkdir()
+    (tmp_path / 'hwmon3' / 'name').write_text('amdgpu\n')
+    _add_sensor(tmp_path / 'hwmon3', 'temp2', 38000)
+    sensors = HwmonSensors()
+    sensors.root = str(tmp_path)
+    yield sensors
+    sensors.close()
+
+
+class TestHwmonSensors:
+
+    def test_discover(self, hwmon_sensors: HwmonSensors) -> None:
+        # act
+        sensors = hwmon_sensors.discover()
+        # assert
+        assert [(sensor.source, sensor.label) for sensor in sensors] == [
+            (_GPU, 'amdgpu junction'),
+            ('hwmon:amdgpu/temp10', 'amdgpu temp10'),
+            ('hwmon:amdgpu#2/temp2', 'amdgpu temp2'),
+            (_CPU, 'k10temp Tctl'),
+        ]
+
+    def test_reads_the_selected_sensors_without_reopening(self, hwmon_sensors: HwmonSensors, tmp_path: Path,
+                                                           mocker: MockerFixture) -> None:
+        # arrange
+        os_open = mocker.spy(os, 'open')
+        hwmon_sensors.select('device-1', [_CPU, 'liquid'])
+        hwmon_sensors.select('device-2', [_CPU, _GPU])
+        first = hwmon_sensors.read_temperatures(max_age=0)
+        (tmp_path / 'hwmon10' / 'temp1_input').write_text('47000\n')
+        # act
+        second = hwmon_sensors.read_temperatures(max_age=0)
+        # assert
+        assert first == {_CPU: 45.25, _GPU: 61.0}
+        assert second == {_CPU: 47.0, _GPU: 61.0}
+        assert os_open.call_count == 2
+
+    def test_read_pass_shared_within_max_age(self, hwmon_sensors: HwmonSensors, mocker: MockerFixture) -> None:
+        # arrange
+        hwmon_sensors.select('device-1', [_CPU])
+        pread = mocker.spy(os, 'pread')
+        # act
+        for _ in range(3):
+            hwmon_sensors.read_temperatures(max_age=60)
+        # assert
+        assert pread.call_count == 1
+
+    def test_sensors_selected_by_no_owner_are_closed(self, hwmon_sensors: HwmonSensors,
+                                                     mocker: MockerFixture) -> None:
+        # arrange
+        os_close = mocker.spy(os, 'close')
+        hwmon_sensors.select('device-1', [_CPU, _GPU])
+        hwmon_sensors.select('device-2', [_GPU])
+        # act
+        hwmon_sensors.select('device-1', [])
+        # assert
+        assert os_close.call_count == 1
+        assert hwmon_sensors.read_temperatures(max_age=0) == {_GPU: 61.0}
+
+    def test_unreadable_sensors_are_missing(self, hwmon_sensors: HwmonSensors, tmp_path: Path) -> None:
+        # arrange
+        hwmon_sensors.select('device-1', [_CPU, _GPU, 'hwmon:nct6775/temp1'])
+        (tmp_path / 'hwmon2' / 'temp2_input').write_text('\n')
+        # act
+        temperatures = hwmon_sensors.read_temperatures(max_age=0)
+        # assert
+        assert temperatures == {_CPU: 45.25}
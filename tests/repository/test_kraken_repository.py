@@ -39,12 +39,15 @@ from liquidctl.driver.asetek import Legacy690Lc
 from liquidctl.driver.corsair_hid_psu import CorsairHidPsu
 from liquidctl.driver.kraken2 import Kraken2
 from liquidctl.driver.kraken3 import KrakenX3
+from liquidctl.driver.usb import HidapiDevice, PyUsbDevice
 from pytest_mock import MockerFixture
 
 from gkraken.device import DeviceSettings
+from gkraken.device.device_discovery import DeviceDiscovery
 from gkraken.device.settings_kraken_2 import SettingsKraken2
 from gkraken.device.settings_kraken_legacy import SettingsKrakenLegacy
 from gkraken.error.legacy_kraken_warning import LegacyKrakenWarning
+from gkraken.model.apply_batch import ApplyBatch
 from gkraken.repository.kraken_repository import KrakenRepository
 
 
@@ -99,6 +102,50 @@ class TestKrakenRepository:
         assert f'Error getting the status: {error_message}' in caplog.text
         repo.cleanup.assert_called_once()
 
+    def test_status_binding_resolved_once(self, repo: KrakenRepository, mocker: MockerFixture) -> None:
+        # arrange
+        mocker.patch.object(
+            repo, '_driver', spec=KrakenX3
+        )
+        mocker.patch.object(
+            repo._driver, 'get_status', return_value=[
+                ('Liquid temperature', 30.1, '°C'),
+                ('Pump speed', 1848, 'rpm'),
+                ('Pump duty', 90, '%')
+            ]
+        )
+        for_driver = mocker.spy(DeviceSettings, 'for_driver')
+        # act
+        first_status = repo.get_status()
+        second_status = repo.get_status()
+        # assert
+        assert first_status == second_status
+        for_driver.assert_called_once()
+
+    def test_apply_batch(self, repo: KrakenRepository, mocker: MockerFixture) -> None:
+        # arrange
+        mocker.patch.object(
+            repo, '_driver', spec=KrakenX3
+        )
+        driver = repo._driver
+        driver.set_fixed_speed.side_effect = OSError('write failed')
+        mocker.patch.object(repo, 'cleanup', side_effect=lambda: setattr(repo, '_driver', None))
+        batch = ApplyBatch() \
+            .add_speed_profile('fan', [(20, 30), (60, 100)]) \
+            .add_color('ring', 'fading', [[255, 0, 0]], 'fast', 'forward') \
+            .add_speed_profile('pump', [(20, 70)]) \
+            .add_color('logo', 'off', [], 'normal', 'forward')
+        # act
+        results = repo.apply_batch(batch)
+        # assert
+        assert [result.item for result in results] == batch.items
+        assert [result.succeeded for result in results] == [True, True, False, False]
+        assert str(results[2].error) == 'write failed'
+        assert isinstance(results[3].error, ConnectionError)
+        driver.set_speed_profile.assert_called_once_with('fan', [(20, 30), (60, 100)])
+        driver.set_color.assert_called_once_with('ring', 'fading', [[255, 0, 0]], speed='fast', direction='forward')
+        repo.cleanup.assert_called_once()
+
     def test_has_supported_kraken_no_device_found(self, repo_init: KrakenRepository, mocker: MockerFixture) -> None:
         # arrange
         mocker.patch.object(DeviceSettings, '__subclasses__', return_value=[])
@@ -111,19 +158,23 @@ class TestKrakenRepository:
     def test_has_supported_kraken_connection_error(self, repo_init: KrakenRepository, mocker: MockerFixture) -> None:
         # arrange
         mocker.patch.object(DeviceSettings, '__subclasses__', return_value=[SettingsKraken2])
-        mocker.patch.object(Kraken2, 'find_supported_devices', return_value=[Kraken2('012345', 'test device')])
+        handle = mocker.Mock(vendor_id=0x1e71, product_id=0x170e, serial_number='test-serial')
+        mocker.patch.object(HidapiDevice, 'enumerate', return_value=[handle])
         mocker.patch.object(Kraken2, 'connect', side_effect=OSError("open failed"))
         mocker.patch.object(Kraken2, 'disconnect')
+        invalidate = mocker.patch.object(DeviceDiscovery, 'invalidate')
         # act
         is_supported = repo_init.has_supported_kraken()
         # assert
         assert repo_init._driver is None  # should be reset after has_supported_kraken call
         assert is_supported
+        invalidate.assert_called_once()
 
     def test_has_supported_kraken_yes(self, repo_init: KrakenRepository, mocker: MockerFixture) -> None:
         # arrange
         mocker.patch.object(DeviceSettings, '__subclasses__', return_value=[SettingsKraken2])
-        mocker.patch.object(Kraken2, 'find_supported_devices', return_value=[Kraken2('012345', 'test device')])
+        handle = mocker.Mock(vendor_id=0x1e71, product_id=0x170e, serial_number='test-serial')
+        mocker.patch.object(HidapiDevice, 'enumerate', return_value=[handle])
         mocker.patch.object(Kraken2, 'connect')
         mocker.patch.object(Kraken2, 'initialize')
         # act
@@ -158,7 +209,8 @@ class TestKrakenRepository:
     def test_legacy_kraken_warning(self, repo_init: KrakenRepository, mocker: MockerFixture) -> None:
         # arrange
         mocker.patch.object(DeviceSettings, '__subclasses__', return_value=[SettingsKrakenLegacy])
-        mocker.patch.object(Legacy690Lc, 'find_supported_devices', return_value=[Legacy690Lc('012345', 'test device')])
+        handle = mocker.Mock(vendor_id=0x2433, product_id=0xb200, serial_number='test-serial')
+        mocker.patch.object(PyUsbDevice, 'enumerate', return_value=[handle])
         mocker.patch.object(Legacy690Lc, 'connect')
         mocker.patch.object(Legacy690Lc, 'initialize')
         # act
@@ -0,0 +1,209 @@
+#  This file is part of gkraken.
+#
+#  Copyright (c) 2021 Roberto Leinardi and Guy Boldon
+#
+#  gkraken is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  gkraken is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
+
+import io
+import threading
+from typing import List
+
+from liquidctl.driver.kraken3 import KrakenX3
+from pytest_mock import MockerFixture
+
+from gkraken.core_di import StatusReceivedSubject
+from gkraken.device.device_binding import DeviceBinding
+from gkraken.device.driver_trace import DriverTracing
+from gkraken.device.settings_kraken_x3 import SettingsKrakenX3
+from gkraken.model.status import Status
+from gkraken.repository.kraken_repository import KrakenRepository
+from gkraken.repository.status_report_listener import StatusReportListener
+from gkraken.util.sample_ring_buffer import SampleRingBuffer
+
+TEST_DESCRIPTION: str = 'Test Device Description'
+
+
+def _status_report(temperature: int, temperature_decimal: int, pump_rpm: int, pump_duty: int) -> List[int]:
+    report = [0x75, 0x02] + [0x00] * 62
+    report[15:20] = [temperature, temperature_decimal, pump_rpm & 0xff, pump_rpm >> 8, pump_duty]
+    return report
+
+
+# pylint: disable=protected-access
+class TestStatusReportParser:
+
+    def test_status_report_decoded(self) -> None:
+        # arrange
+        parse_status_report = SettingsKrakenX3.create_status_report_parser(TEST_DESCRIPTION, '1.2.3')
+        assert parse_status_report is not None
+        # act
+        status = parse_status_report(bytes(_status_report(30, 5, 1848, 70)))
+        # assert
+        assert status == Status(KrakenX3, 30.5, '1.2.3', None, None, 1848, 70, TEST_DESCRIPTION)
+
+    def test_other_reports_ignored(self) -> None:
+        # arrange
+        parse_status_report = SettingsKrakenX3.create_status_report_parser(TEST_DESCRIPTION, '1.2.3')
+        assert parse_status_report is not None
+        other_report = _status_report(30, 5, 1848, 70)
+        other_report[0:2] = [0x11, 0x01]
+        # assert
+        assert parse_status_report(bytes(other_report)) is None
+        assert parse_status_report(bytes(_status_report(0xff, 0xff, 1848, 70))) is None
+        assert parse_status_report(bytes([0x75, 0x02])) is None
+
+
+class TestStatusReportListener:
+
+    def test_latest_status_published(self, mocker: MockerFixture) -> None:
+        # arrange
+        reports = [_status_report(30, 5, 1848, 70), [], _status_report(31, 0, 1900, 75)]
+        read_done = threading.Event()
+
+        def read(*_: object, **__: object) -> List[int]:
+            if reports:
+                return reports.pop(0)
+            read_done.set()
+            return []
+
+        hid_device = mocker.Mock()
+        hid_device.hiddev.read.side_effect = read
+        parse_status_report = SettingsKrakenX3.create_status_report_parser(TEST_DESCRIPTION, '1.2.3')
+        assert parse_status_report is not None
+        statuses: List[Status] = []
+        listener = StatusReportListener('test-reports', hid_device, parse_status_report, statuses.append)
+        # act
+        listener.start()
+        read_done.wait(5)
+        listener.stop()
+        # assert
+        assert [status.liquid_temperature for status in statuses] == [30.5, 31.0]
+        latest = listener.get_latest_status(60)
+        assert latest is not None
+        assert latest.pump_rpm == 1900
+        assert not listener.is_running
+
+    def test_read_error_stops_listener(self, mocker: MockerFixture) -> None:
+        # arrange
+        hid_device = mocker.Mock()
+        hid_device.hiddev.read.side_effect = OSError('read error')
+        listener = StatusReportListener('test-reports', hid_device, mocker.Mock(), mocker.Mock())
+        # act
+        listener.start()
+        listener.stop()
+        # assert
+        assert listener.get_latest_status(60) is None
+        assert not listener.is_running
+
+
+class TestKrakenRepositoryStatusReports:
+
+    def test_reported_status_returned_without_polling(self, repo: KrakenRepository, mocker: MockerFixture) -> None:
+        # arrange
+        status = Status(KrakenX3, 30.5, '1.2.3', None, None, 1848, 70, TEST_DESCRIPTION)
+        mocker.patch.object(repo, '_driver', spec=KrakenX3)
+        listener = mocker.Mock(spec=StatusReportListener)
+        listener.get_latest_report.return_value = (1000.0, status)
+        repo._status_report_listener = listener
+        # act
+        result = repo.get_status()
+        # assert
+        assert result is status
+        repo._driver.get_status.assert_not_called()
+
+    def test_stale_reports_fall_back_to_polling(self, repo: KrakenRepository,
+                                                status_received_subject: StatusReceivedSubject,
+                                                mocker: MockerFixture) -> None:
+        # arrange
+        mocker.patch.object(repo, '_driver', spec=KrakenX3, description=TEST_DESCRIPTION)
+        mocker.patch.object(repo._driver, 'get_status', return_value=[
+            ('Liquid temperature', 30.1, '°C'), ('Pump speed', 1848, 'rpm'), ('Pump duty', 90, '%')])
+        repo._binding = DeviceBinding.bind(repo._driver, '1.2.3')
+        listener = mocker.Mock(spec=StatusReportListener)
+        listener.get_latest_report.return_value = None
+        listener.is_stale.return_value = True
+        repo._status_report_listener = listener
+        published: List[Status] = []
+        status_received_subject.subscribe(published.append)
+        # act
+        result = repo.get_status()
+        # assert
+        assert result is not None
+        assert result.liquid_temperature == 30.1
+        assert published == [result]
+        listener.stop.assert_called_once()
+        assert repo._status_report_listener is None
+
+    def test_first_report_awaited_instead_of_polling(self, repo: KrakenRepository, mocker: MockerFixture) -> None:
+        # arrange
+        reading = threading.Event()
+        release = threading.Event()
+
+        def read(*_: object, **__: object) -> List[int]:
+            if release.is_set():
+                return []
+            reading.set()
+            release.wait(5)
+            return _status_report(30, 5, 1848, 70)
+
+        hid_device = mocker.Mock()
+        hid_device.hiddev.read.side_effect = read
+        parse_status_report = SettingsKrakenX3.create_status_report_parser(TEST_DESCRIPTION, '1.2.3')
+        assert parse_status_report is not None
+        mocker.patch.object(repo, '_driver', spec=KrakenX3)
+        listener = StatusReportListener('test-reports', hid_device, parse_status_report, mocker.Mock())
+        repo._status_report_listener = listener
+        listener.start()
+        reading.wait(5)
+        threading.Timer(0.1, release.set).start()
+        # act
+        result = repo.get_status()
+        listener.stop()
+        # assert
+        assert result is not None
+        assert result.liquid_temperature == 30.5
+        repo._driver.get_status.assert_not_called()
+
+    def test_listener_not_started_while_recording(self, repo: KrakenRepository, mocker: MockerFixture) -> None:
+        # arrange
+        mocker.patch.object(DriverTracing, 'is_recording', new_callable=mocker.PropertyMock, return_value=True)
+        mocker.patch.object(repo, '_driver', spec=KrakenX3, description=TEST_DESCRIPTION, device=mocker.Mock())
+        repo._binding = DeviceBinding.bind(repo._driver, '1.2.3')
+        listener = mocker.patch('gkraken.repository.kraken_repository.StatusReportListener')
+        # act
+        repo._start_status_report_listener()
+        # assert
+        assert repo._binding.parse_status_report is not None
+        listener.assert_not_called()
+        assert repo._status_report_listener is None
+
+    def test_every_report_sampled_once(self, repo: KrakenRepository, mocker: MockerFixture) -> None:
+        # arrange
+        mocker.patch.object(repo, '_driver', spec=KrakenX3)
+        listener = mocker.Mock(spec=StatusReportListener)
+        listener.get_latest_report.side_effect = [
+            (1000.0, Status(KrakenX3, 30.5, '1.2.3', None, None, 1848, 70, TEST_DESCRIPTION)),
+            (1000.0, Status(KrakenX3, 30.5, '1.2.3', None, None, 1848, 70, TEST_DESCRIPTION)),
+            (1000.5, Status(KrakenX3, 31.0, '1.2.3', None, None, 1850, 70, TEST_DESCRIPTION)),
+        ]
+        repo._status_report_listener = listener
+        buffer = SampleRingBuffer(10)
+        file = io.StringIO()
+        # act
+        sampled = [repo.read_sample(buffer) for _ in range(3)]
+        buffer.dump(file)
+        # assert
+        assert sampled == [True, False, True]
+        assert file.getvalue().splitlines() == [',1000.0,30.5,,,1848.0,70.0', ',1000.5,31.0,,,1850.0,70.0']
+        repo._driver.get_status.assert_not_called()
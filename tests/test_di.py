@@ -14,40 +14,56 @@
 #
 #  You should have received a copy of the GNU General Public License
 #  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
-from typing import Optional
+from typing import Optional, Any
 
+from liquidctl.driver.asetek import Legacy690Lc
 from liquidctl.driver.base import BaseDriver
 from liquidctl.driver.kraken2 import Kraken2
 from liquidctl.driver.kraken3 import KrakenZ3, KrakenX3
+from liquidctl.driver.usb import HidapiDevice, PyUsbDevice
 from pytest_mock import MockerFixture
 
 from gkraken.device import DeviceSettings
+from gkraken.device.device_discovery import DeviceDiscovery
 from gkraken.device.settings_kraken_2 import SettingsKraken2
+from gkraken.device.settings_kraken_legacy import SettingsKrakenLegacy
 from gkraken.device.settings_kraken_x3 import SettingsKrakenX3
 from gkraken.device.settings_kraken_z3 import SettingsKrakenZ3
 from gkraken.di import INJECTOR
 
+KRAKEN_2_IDS = (0x1e71, 0x170e)
+KRAKEN_X3_IDS = (0x1e71, 0x2007)
+KRAKEN_Z3_IDS = (0x1e71, 0x3008)
+ASETEK_IDS = (0x2433, 0xb200)
 
-# pylint: disable=no-self-use
-class TestProvideKrakenDriver:
+
+def _handle(mocker: MockerFixture, ids: Any, serial_number: str = '012345') -> Any:
+    vendor_id, product_id = ids
+    return mocker.Mock(vendor_id=vendor_id, product_id=product_id, serial_number=serial_number)
+
+
+def _first_driver() -> Optional[BaseDriver]:
+    return next(iter(INJECTOR.get(DeviceDiscovery).find_drivers()), None)
+
+
+class TestFindDrivers:
 
     def test_driver(self, mocker: MockerFixture) -> None:
         # arrange
-        description = 'test device'
         mocker.patch.object(DeviceSettings, '__subclasses__', return_value=[SettingsKraken2])
-        mocker.patch.object(Kraken2, 'find_supported_devices', return_value=[Kraken2('012345', description)])
+        mocker.patch.object(HidapiDevice, 'enumerate', return_value=[_handle(mocker, KRAKEN_2_IDS)])
         # act
-        driver = INJECTOR.get(Optional[BaseDriver])
+        driver = _first_driver()
         # assert
         assert isinstance(driver, Kraken2)
-        assert driver.description == description
+        assert driver.description == 'NZXT Kraken X (X42, X52, X62 or X72)'
 
     def test_driver_none(self, mocker: MockerFixture) -> None:
         # arrange
         mocker.patch.object(DeviceSettings, '__subclasses__', return_value=[SettingsKraken2])
-        mocker.patch.object(Kraken2, 'find_supported_devices', return_value=[])
+        mocker.patch.object(HidapiDevice, 'enumerate', return_value=[_handle(mocker, (0x1234, 0x5678))])
         # act
-        driver = INJECTOR.get(Optional[BaseDriver])
+        driver = _first_driver()
         # assert
         assert driver is None
 
@@ -55,29 +71,115 @@ class TestProvideKrakenDriver:
         # arrange
         mocker.patch.object(DeviceSettings, '__subclasses__',
                             return_value=[SettingsKrakenZ3, SettingsKrakenX3, SettingsKraken2])
-        mocker.patch.object(Kraken2, 'find_supported_devices', return_value=[Kraken2('01234', 'test device')])
-        mocker.patch.object(KrakenX3, 'find_supported_devices', return_value=[KrakenX3('01234', 'test device', [], [])])
-        mocker.patch.object(KrakenZ3, 'find_supported_devices',
-                            return_value=[
-                                KrakenZ3('01234', 'test device 1', [], []),
-                                KrakenZ3('01234', 'test device 2', [], []),
-                            ])
+        mocker.patch.object(HidapiDevice, 'enumerate', return_value=[
+            _handle(mocker, KRAKEN_2_IDS),
+            _handle(mocker, KRAKEN_X3_IDS),
+            _handle(mocker, KRAKEN_Z3_IDS, 'z1'),
+            _handle(mocker, KRAKEN_Z3_IDS, 'z2'),
+        ])
         # act
-        driver = INJECTOR.get(Optional[BaseDriver])
+        driver = _first_driver()
         # assert should take the first found device from the first driver in the list of supported_drivers
         assert isinstance(driver, KrakenZ3)
-        assert driver.description == 'test device 1'
+        assert driver.serial_number == 'z1'
 
     def test_driver_x_vs_z(self, mocker: MockerFixture) -> None:
         # arrange
         mocker.patch.object(DeviceSettings, '__subclasses__', return_value=[SettingsKrakenX3, SettingsKrakenZ3])
-        mocker.patch.object(KrakenX3, 'find_supported_devices', return_value=[])
-        mocker.patch.object(KrakenZ3, 'find_supported_devices',
-                            return_value=[KrakenZ3('01234', 'test device z', [], []), ])
+        mocker.patch.object(HidapiDevice, 'enumerate', return_value=[_handle(mocker, KRAKEN_Z3_IDS)])
         # act
-        driver = INJECTOR.get(Optional[BaseDriver])
+        driver = _first_driver()
         # assert even though the z driver is a subclass of the x driver, that it correctly pulls the right one
         assert isinstance(driver, KrakenZ3)
         assert isinstance(driver, KrakenX3)
         assert KrakenZ3 is driver.__class__
         assert KrakenX3 is not driver.__class__
+
+    def test_driver_legacy_on_usb_bus(self, mocker: MockerFixture) -> None:
+        # arrange
+        mocker.patch.object(DeviceSettings, '__subclasses__', return_value=[SettingsKraken2, SettingsKrakenLegacy])
+        mocker.patch.object(HidapiDevice, 'enumerate', return_value=[])
+        mocker.patch.object(PyUsbDevice, 'enumerate', return_value=[_handle(mocker, ASETEK_IDS)])
+        # act
+        driver = _first_driver()
+        # assert
+        assert isinstance(driver, Legacy690Lc)
+
+
+class TestDeviceDiscovery:
+
+    def test_single_enumeration_pass(self, mocker: MockerFixture) -> None:
+        # arrange
+        mocker.patch.object(DeviceSettings, '__subclasses__',
+                            return_value=[SettingsKrakenZ3, SettingsKrakenX3, SettingsKraken2])
+        enumerate_hid = mocker.patch.object(HidapiDevice, 'enumerate', return_value=[_handle(mocker, KRAKEN_X3_IDS)])
+        enumerate_usb = mocker.patch.object(PyUsbDevice, 'enumerate', return_value=[])
+        # act
+        drivers = INJECTOR.get(DeviceDiscovery).find_drivers()
+        # assert
+        assert [driver.__class__ for driver in drivers] == [KrakenX3]
+        enumerate_hid.assert_called_once()
+        enumerate_usb.assert_not_called()
+
+    def test_cached_until_invalidated(self, mocker: MockerFixture) -> None:
+        # arrange
+        mocker.patch.object(DeviceSettings, '__subclasses__', return_value=[SettingsKraken2])
+        enumerate_hid = mocker.patch.object(HidapiDevice, 'enumerate', return_value=[_handle(mocker, KRAKEN_2_IDS)])
+        discovery = INJECTOR.get(DeviceDiscovery)
+        # act
+        first = discovery.find_drivers()[0]
+        second = discovery.find_drivers()[0]
+        discovery.invalidate()
+        third = discovery.find_drivers()[0]
+        # assert
+        assert first is second
+        assert third is not first
+        assert enumerate_hid.call_count == 2
+
+    def test_device_ids(self, mocker: MockerFixture) -> None:
+        # arrange
+        mocker.patch.object(DeviceSettings, '__subclasses__', return_value=[SettingsKrakenZ3, SettingsKrakenX3])
+        handles = [_handle(mocker, KRAKEN_X3_IDS, 'x1'), _handle(mocker, KRAKEN_Z3_IDS, 'z1'),
+                   _handle(mocker, KRAKEN_Z3_IDS, 'z1'), _handle(mocker, KRAKEN_Z3_IDS, '')]
+        for index, handle in enumerate(handles):
+            handle.bus = 'hid'
+            handle.address = f'/dev/hidraw{index}'
+            handle.port = None
+        mocker.patch.object(HidapiDevice, 'enumerate', return_value=handles)
+        sysfs_paths = {
+            '/sys/class/hidraw/hidraw1': '/sys/devices/pci0000:00/0000:00:14.0/usb1/1-2/1-2:1.0/'
+                                         '0003:1E71:3008.0002/hidraw/hidraw1',
+            '/sys/class/hidraw/hidraw2': '/sys/devices/pci0000:00/0000:00:14.0/usb1/1-4/1-4.1/1-4.1:1.0/'
+                                         '0003:1E71:3008.0003/hidraw/hidraw2',
+        }
+        mocker.patch('os.path.realpath', side_effect=lambda path: sysfs_paths.get(path, path))
+        # act
+        devices = INJECTOR.get(DeviceDiscovery).find_devices()
+        # assert the serial number is used only when present and unique, otherwise the VID/PID and the port path
+        assert list(devices) == ['1e71:3008@1-2', '1e71:3008@1-4.1', '1e71:3008@/dev/hidraw3', 'x1']
+        assert INJECTOR.get(DeviceDiscovery).find_driver('x1') is devices['x1']
+
+    def test_usb_device_id(self, mocker: MockerFixture) -> None:
+        # arrange
+        mocker.patch.object(DeviceSettings, '__subclasses__', return_value=[SettingsKrakenLegacy])
+        handle = _handle(mocker, ASETEK_IDS, '')
+        handle.bus = 'usb3'
+        handle.address = 7
+        handle.port = (2, 1)
+        mocker.patch.object(PyUsbDevice, 'enumerate', return_value=[handle])
+        # act
+        devices = INJECTOR.get(DeviceDiscovery).find_devices()
+        # assert
+        assert list(devices) == ['2433:b200@3-2.1']
+
+    def test_empty_result_not_cached(self, mocker: MockerFixture) -> None:
+        # arrange
+        mocker.patch.object(DeviceSettings, '__subclasses__', return_value=[SettingsKraken2])
+        enumerate_hid = mocker.patch.object(HidapiDevice, 'enumerate', side_effect=[
+            [], [_handle(mocker, KRAKEN_2_IDS)]
+        ])
+        discovery = INJECTOR.get(DeviceDiscovery)
+        # act & assert
+        assert not discovery.find_drivers()
+        assert isinstance(discovery.find_drivers()[0], Kraken2)
+        assert enumerate_hid.call_count == 2
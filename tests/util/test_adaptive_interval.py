@@ -0,0 +1,106 @@
+#  This file is part of gkraken.
+#
+#  Copyright (c) 2021 Roberto Leinardi and Guy Boldon
+#
+#  gkraken is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  gkraken is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
+from typing import Optional
+
+from gkraken.conf import MIN_REFRESH_INTERVAL, MAX_REFRESH_INTERVAL
+from gkraken.model.status import Status
+from gkraken.util.adaptive_interval import AdaptiveInterval
+
+
+def _status(liquid_temperature: float, fan_rpm: Optional[int] = 1000, pump_rpm: Optional[int] = 2000) -> Status:
+    return Status(None, liquid_temperature, fan_rpm=fan_rpm, pump_rpm=pump_rpm)  # type: ignore[arg-type]
+
+
+class TestAdaptiveInterval:
+
+    def test_backs_off_while_steady(self) -> None:
+        # arrange
+        interval = AdaptiveInterval(2, 10)
+        intervals = []
+        # act
+        for _ in range(5):
+            interval.update(_status(28.0))
+            intervals.append(interval.get())
+        # assert
+        assert intervals == [2.0, 4.0, 8.0, 10.0, 10.0]
+
+    def test_tightens_when_temperature_changes(self) -> None:
+        # arrange
+        interval = AdaptiveInterval(2, 10)
+        for _ in range(4):
+            interval.update(_status(28.0))
+        # act
+        interval.update(_status(29.0))
+        # assert
+        assert interval.get() == 2.0
+
+    def test_tightens_when_rpm_changes(self) -> None:
+        # arrange
+        interval = AdaptiveInterval(2, 10)
+        for _ in range(4):
+            interval.update(_status(28.0))
+        # act
+        interval.update(_status(28.0, fan_rpm=1500))
+        # assert
+        assert interval.get() == 2.0
+
+    def test_ignores_small_changes(self) -> None:
+        # arrange
+        interval = AdaptiveInterval(2, 10)
+        interval.update(_status(28.0))
+        # act
+        interval.update(_status(28.1, fan_rpm=1010, pump_rpm=1990))
+        # assert
+        assert interval.get() == 4.0
+
+    def test_relaxes_while_window_hidden_and_tightens_when_shown(self) -> None:
+        # arrange
+        interval = AdaptiveInterval(2, 10)
+        interval.update(_status(28.0))
+        interval.update(_status(28.0))
+        # act
+        interval.set_window_visible(False)
+        hidden_interval = interval.get()
+        interval.set_window_visible(True)
+        # assert
+        assert hidden_interval == 8.0
+        assert interval.get() == 2.0
+
+    def test_stays_slow_while_session_idle(self) -> None:
+        # arrange
+        interval = AdaptiveInterval(2, 10)
+        interval.set_session_idle(True)
+        # act
+        interval.update(_status(28.0))
+        interval.update(_status(35.0))
+        idle_interval = interval.get()
+        interval.set_session_idle(False)
+        # assert
+        assert idle_interval == 10.0
+        assert interval.get() == 2.0
+
+    def test_configure_respects_hard_bounds(self) -> None:
+        # arrange
+        interval = AdaptiveInterval(2, 10)
+        # act
+        interval.configure(0, MAX_REFRESH_INTERVAL * 2)
+        for _ in range(20):
+            interval.update(_status(28.0))
+        # assert
+        assert interval.get() == MAX_REFRESH_INTERVAL
+        interval.configure(0, 0)
+        assert interval.get() == MIN_REFRESH_INTERVAL
@@ -0,0 +1,54 @@
+#  This file is part of gkraken.
+#
+#  Copyright (c) 2021 Roberto Leinardi and Guy Boldon
+#
+#  gkraken is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  gkraken is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
+
+import pytest
+
+from gkraken.conf import MIN_TEMP, MAX_TEMP
+from gkraken.util.duty_lookup_table import DutyLookupTable
+
+
+class TestDutyLookupTable:
+
+    @pytest.mark.parametrize('temperature, duty', [
+        (MIN_TEMP - 5, 30.0),
+        (25.0, 30.0),
+        (30.0, 30.0),
+        (35.0, 50.0),
+        (37.5, 60.0),
+        (37.52, 60.0),
+        (50.0, 100.0),
+        (MAX_TEMP + 5, 100.0),
+    ])
+    def test_duty_interpolated_between_steps(self, temperature: float, duty: float) -> None:
+        # arrange
+        table = DutyLookupTable.compile([(30, 30), (40, 70), (50, 100)])
+        # act
+        result = table.duty_at(temperature)
+        # assert
+        assert result == pytest.approx(duty)
+
+    def test_single_step(self) -> None:
+        # arrange
+        table = DutyLookupTable.compile([(MIN_TEMP, 45)])
+        # assert
+        assert {table.duty_at(temperature) for temperature in (MIN_TEMP, 33.3, MAX_TEMP)} == {45.0}
+
+    def test_no_steps(self) -> None:
+        # arrange
+        table = DutyLookupTable.compile([])
+        # assert
+        assert table.duty_at(40.0) == 0.0
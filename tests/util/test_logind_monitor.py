@@ -0,0 +1,180 @@
+#  This file is part of gkraken.
+#
+#  Copyright (c) 2021 Roberto Leinardi and Guy Boldon
+#
+#  gkraken is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  gkraken is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
+import os
+import select
+import shutil
+import subprocess
+import threading
+import time
+from typing import List, Iterator, Any, Callable
+
+import pytest
+from gi.repository import Gio, GLib
+
+from gkraken.util.logind_monitor import LogindMonitor, LOGIND_BUS_NAME, LOGIND_PATH, LOGIND_MANAGER_INTERFACE, \
+    LOGIND_SESSION_INTERFACE
+
+pytestmark = pytest.mark.skipif(shutil.which('dbus-daemon') is None, reason="dbus-daemon not found")
+
+_SESSION_PATH = '/org/freedesktop/login1/session/_31'
+_LOGIND_XML = f"""
+<node>
+  <interface name="{LOGIND_MANAGER_INTERFACE}">
+    <method name="GetSessionByPID">
+      <arg type="u" direction="in"/>
+      <arg type="o" direction="out"/>
+    </method>
+    <method name="Inhibit">
+      <arg type="s" direction="in"/>
+      <arg type="s" direction="in"/>
+      <arg type="s" direction="in"/>
+      <arg type="s" direction="in"/>
+      <arg type="h" direction="out"/>
+    </method>
+    <signal name="PrepareForSleep">
+      <arg type="b"/>
+    </signal>
+  </interface>
+</node>
+"""
+_BUS_FLAGS = Gio.DBusConnectionFlags.AUTHENTICATION_CLIENT | Gio.DBusConnectionFlags.MESSAGE_BUS_CONNECTION
+
+
+class _LogindStandIn:
+    """a private dbus-daemon, with a fake logind owning its name and running its own main loop"""
+
+    def __init__(self) -> None:
+        self._process = subprocess.Popen(['dbus-daemon', '--session', '--nofork', '--print-address=1'],
+                                         stdout=subprocess.PIPE, text=True)
+        self.address = self._process.stdout.readline().strip()  # type: ignore[union-attr]
+        self.connection = Gio.DBusConnection.new_for_address_sync(self.address, _BUS_FLAGS, None, None)
+        self.inhibitors: List[int] = []
+        self._context = GLib.MainContext.new()
+        self._loop = GLib.MainLoop.new(self._context, False)
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self._ready.wait(5)
+
+    def is_inhibited(self) -> bool:
+        """True while the write end of an inhibitor is held: the read end is readable (EOF) once it is closed"""
+        return any(not select.select([fd], [], [], 0)[0] for fd in self.inhibitors)
+
+    def emit(self, path: str, interface: str, signal: str, parameters: GLib.Variant) -> None:
+        self.connection.emit_signal(None, path, interface, signal, parameters)
+        self.connection.flush_sync(None)
+
+    def close(self) -> None:
+        self._loop.quit()
+        self._thread.join(5)
+        self.connection.close_sync(None)
+        for fd in self.inhibitors:
+            os.close(fd)
+        self._process.terminate()
+        self._process.wait(5)
+
+    def _run(self) -> None:
+        # the methods of the objects registered here are called in this thread
+        self._context.push_thread_default()
+        node = Gio.DBusNodeInfo.new_for_xml(_LOGIND_XML)
+        self.connection.register_object(LOGIND_PATH, node.interfaces[0], self._on_method_call, None, None)
+        self.connection.call_sync('org.freedesktop.DBus', '/org/freedesktop/DBus', 'org.freedesktop.DBus',
+                                  'RequestName', GLib.Variant('(su)', (LOGIND_BUS_NAME, 0)), None,
+                                  Gio.DBusCallFlags.NONE, -1, None)
+        self._ready.set()
+        self._loop.run()
+        self._context.pop_thread_default()
+
+    def _on_method_call(self, *args: Any) -> None:
+        method_name: str = args[4]
+        invocation: Gio.DBusMethodInvocation = args[6]
+        if method_name == 'GetSessionByPID':
+            invocation.return_value(GLib.Variant('(o)', (_SESSION_PATH,)))
+        else:
+            read_fd, write_fd = os.pipe()
+            self.inhibitors.append(read_fd)
+            fd_list = Gio.UnixFDList.new()
+            index = fd_list.append(write_fd)
+            os.close(write_fd)
+            invocation.return_value_with_unix_fd_list(GLib.Variant('(h)', (index,)), fd_list)
+
+
+@pytest.fixture
+def logind() -> Iterator[_LogindStandIn]:
+    stand_in = _LogindStandIn()
+    yield stand_in
+    stand_in.close()
+
+
+def _iterate_until(condition: Callable[[], bool], timeout: float = 5.0) -> None:
+    context = GLib.MainContext.default()
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        context.iteration(False)
+        time.sleep(0.01)
+
+
+def _session_properties(**hints: bool) -> GLib.Variant:
+    return GLib.Variant('(sa{sv}as)', (LOGIND_SESSION_INTERFACE,
+                                       {name: GLib.Variant('b', value) for name, value in hints.items()}, []))
+
+
+class TestLogindMonitor:
+
+    def test_sleep_delayed_until_released(self, logind: _LogindStandIn) -> None:
+        # arrange
+        sleeping: List[bool] = []
+        monitor = LogindMonitor(sleeping.append, lambda _: None, logind.address)
+        started = monitor.start()
+        inhibited_on_start = logind.is_inhibited()
+        # act
+        logind.emit(LOGIND_PATH, LOGIND_MANAGER_INTERFACE, 'PrepareForSleep', GLib.Variant('(b)', (True,)))
+        _iterate_until(lambda: len(sleeping) == 1)
+        monitor.release_sleep_delay()
+        inhibited_after_release = logind.is_inhibited()
+        logind.emit(LOGIND_PATH, LOGIND_MANAGER_INTERFACE, 'PrepareForSleep', GLib.Variant('(b)', (False,)))
+        _iterate_until(lambda: len(sleeping) == 2)
+        monitor.stop()
+        # assert
+        assert started
+        assert inhibited_on_start
+        assert not inhibited_after_release
+        assert sleeping == [True, False]
+        assert len(logind.inhibitors) == 2  # taken again on resume
+        assert not logind.is_inhibited()
+
+    def test_idle_and_locked_session(self, logind: _LogindStandIn) -> None:
+        # arrange
+        idle: List[bool] = []
+        monitor = LogindMonitor(lambda _: None, idle.append, logind.address)
+        monitor.start()
+        # act
+        for hints in ({'IdleHint': True}, {'LockedHint': True}, {'IdleHint': False}, {'LockedHint': False}):
+            logind.emit(_SESSION_PATH, 'org.freedesktop.DBus.Properties', 'PropertiesChanged',
+                        _session_properties(**hints))
+        _iterate_until(lambda: len(idle) == 2)
+        monitor.stop()
+        # assert
+        assert idle == [True, False]
+
+    def test_bus_not_available(self) -> None:
+        # arrange
+        monitor = LogindMonitor(lambda _: None, lambda _: None, 'unix:path=/nonexistent/bus')
+        # act
+        started = monitor.start()
+        # assert
+        assert not started
@@ -0,0 +1,114 @@
+#  This file is part of gkraken.
+#
+#  Copyright (c) 2021 Roberto Leinardi and Guy Boldon
+#
+#  gkraken is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  gkraken is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
+
+from typing import List
+
+import rx
+from rx import operators
+from rx.testing import TestScheduler
+
+from gkraken.util.poller import Poller
+
+
+class TestPoller:
+
+    def test_next_poll_scheduled_from_completion(self) -> None:
+        # arrange
+        scheduler = TestScheduler()
+        poll_times: List[float] = []
+
+        def poll() -> rx.Observable:
+            poll_times.append(scheduler.clock)
+            return rx.timer(0.5, scheduler=scheduler)
+
+        poller = Poller('Test', poll, 2.0, scheduler)
+        # act
+        poller.observe().subscribe(scheduler=scheduler)
+        scheduler.advance_to(10.0)
+        # assert
+        assert poll_times == [0.0, 2.5, 5.0, 7.5, 10.0]
+        assert poller.overruns == 0
+
+    def test_first_poll_delayed(self) -> None:
+        # arrange
+        scheduler = TestScheduler()
+        poll_times: List[float] = []
+
+        def poll() -> rx.Observable:
+            poll_times.append(scheduler.clock)
+            return rx.empty()
+
+        poller = Poller('Test', poll, 2.0, scheduler, first_poll_delay=2.0)
+        # act
+        poller.observe().subscribe(scheduler=scheduler)
+        scheduler.advance_to(6.0)
+        # assert
+        assert poll_times == [2.0, 4.0, 6.0]
+
+    def test_interval_function_called_after_every_poll(self) -> None:
+        # arrange
+        scheduler = TestScheduler()
+        poll_times: List[float] = []
+        intervals = iter([1.0, 2.0, 4.0])
+
+        def poll() -> rx.Observable:
+            poll_times.append(scheduler.clock)
+            return rx.empty()
+
+        poller = Poller('Test', poll, lambda: next(intervals), scheduler)
+        # act
+        poller.observe().subscribe(scheduler=scheduler)
+        scheduler.advance_to(6.0)
+        # assert
+        assert poll_times == [0.0, 1.0, 3.0]
+
+    def test_slow_poll_is_not_overlapped_and_counted_as_overrun(self) -> None:
+        # arrange
+        scheduler = TestScheduler()
+        poll_times: List[float] = []
+        values: List[float] = []
+
+        def poll() -> rx.Observable:
+            poll_times.append(scheduler.clock)
+            return rx.timer(5.0, scheduler=scheduler).pipe(operators.map(lambda _: scheduler.clock))
+
+        poller = Poller('Test', poll, 2.0, scheduler)
+        # act
+        poller.observe().subscribe(on_next=values.append, scheduler=scheduler)
+        scheduler.advance_to(13.0)
+        # assert
+        assert poll_times == [0.0, 7.0]
+        assert values == [5.0, 12.0]
+        assert poller.overruns == 4
+
+    def test_disposed_poller_stops_polling(self) -> None:
+        # arrange
+        scheduler = TestScheduler()
+        poll_times: List[float] = []
+
+        def poll() -> rx.Observable:
+            poll_times.append(scheduler.clock)
+            return rx.empty()
+
+        poller = Poller('Test', poll, 1.0, scheduler)
+        disposable = poller.observe().subscribe(scheduler=scheduler)
+        scheduler.advance_to(2.0)
+        # act
+        disposable.dispose()
+        scheduler.advance_to(10.0)
+        # assert
+        assert poll_times == [0.0, 1.0, 2.0]
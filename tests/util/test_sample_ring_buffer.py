@@ -0,0 +1,60 @@
+#  This file is part of gkraken.
+#
+#  Copyright (c) 2021 Roberto Leinardi and Guy Boldon
+#
+#  gkraken is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  gkraken is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
+
+import io
+import math
+
+from gkraken.util.sample_ring_buffer import SampleRingBuffer
+
+
+class TestSampleRingBuffer:
+
+    def test_keeps_the_latest_samples(self) -> None:
+        # arrange
+        buffer = SampleRingBuffer(3)
+        # act
+        for second in range(5):
+            buffer.append(float(second), 30.0 + second, 1000, None, 2000, 60)
+        # assert
+        assert len(buffer) == 3
+        file = io.StringIO()
+        assert buffer.dump(file) == 3
+        assert [row.split(',')[1] for row in file.getvalue().splitlines()] == ['2.0', '3.0', '4.0']
+
+    def test_decimated_averages_groups(self) -> None:
+        # arrange
+        buffer = SampleRingBuffer(100)
+        for second in range(100):
+            buffer.append(float(second), float(second), None, None, None, None)
+        # act
+        points = buffer.decimated(10)
+        # assert
+        assert len(points) == 10
+        assert points[0][:2] == (4.5, 4.5)
+        assert points[-1][:2] == (94.5, 94.5)
+        assert math.isnan(points[0][2])
+
+    def test_dump_writes_csv_rows(self) -> None:
+        # arrange
+        buffer = SampleRingBuffer(2)
+        buffer.append(1.0, 30.5, 1000, None, 2000, 60)
+        file = io.StringIO()
+        # act
+        rows = buffer.dump(file, 'serial-1')
+        # assert
+        assert rows == 1
+        assert file.getvalue().splitlines() == ['serial-1,1.0,30.5,1000.0,,2000.0,60.0']
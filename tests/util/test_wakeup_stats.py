@@ -0,0 +1,46 @@
+#  This file is part of gkraken.
+#
+#  Copyright (c) 2021 Roberto Leinardi and Guy Boldon
+#
+#  gkraken is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  gkraken is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with gkraken.  If not, see <http://www.gnu.org/licenses/>.
+from pytest_mock import MockerFixture
+
+from gkraken.util import wakeup_stats as wakeup_stats_module
+from gkraken.util.wakeup_stats import WakeupStats
+
+
+class TestWakeupStats:
+
+    def test_not_counted_unless_enabled(self) -> None:
+        # arrange
+        wakeup_stats = WakeupStats()
+        # act
+        wakeup_stats.count('main loop')
+        # assert
+        assert not wakeup_stats.is_enabled
+        assert wakeup_stats.take_per_minute() == {}
+
+    def test_wakeups_per_minute(self, mocker: MockerFixture) -> None:
+        # arrange
+        monotonic = mocker.patch.object(wakeup_stats_module.time, 'monotonic', return_value=100.0)
+        wakeup_stats = WakeupStats()
+        wakeup_stats.enable()
+        for source in ('main loop', 'device job', 'device job', 'main loop', 'device job', 'device job'):
+            wakeup_stats.count(source)
+        monotonic.return_value = 130.0
+        # act
+        per_minute = wakeup_stats.take_per_minute()
+        # assert
+        assert per_minute == {'device job': 8.0, 'main loop': 4.0}
+        assert wakeup_stats.take_per_minute() == {}